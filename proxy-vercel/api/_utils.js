@@ -1,4 +1,6 @@
-const OPENAI_BASE = "https://api.openai.com";
+// OPENAI_BASE_URL may point the proxy at another OpenAI-compatible endpoint (e.g. the local mock
+// server); like the SDK's setting it may end in /v1, which the forwarded paths already carry.
+const OPENAI_BASE = (process.env.OPENAI_BASE_URL || "https://api.openai.com").replace(/\/+$/, "").replace(/\/v1$/, "");
 
 function setCors(res){
   res.setHeader("Access-Control-Allow-Origin", "*");
@@ -1,13 +1,24 @@
-import sys
+import argparse
 import os
-import openai
 from bs4 import BeautifulSoup
 
+from minipcb_ai import CACHE_USE, ResponseCache, add_cache_args, cache_mode_from_args, cached_call, client_pool
+from minipcb_ai_batch import BatchJob, BatchRunner, add_batch_args, estimate_tokens
+from minipcb_eta import EtaModel
+from minipcb_usage import USAGE_DB_NAME, USAGE_DIR_NAME
+
 # ✅ Set your API key in the environment like this (before running):
 # $env:OPENAI_API_KEY = "sk-..."
 
-# Initialize OpenAI client (for openai>=1.0.0)
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Shared keep-alive client (openai>=1.0.0); concurrent batch calls reuse its connections
+client = client_pool().openai(os.getenv("OPENAI_API_KEY"))
+
+# Byte-identical prompts (e.g. re-running after a crash) are served from the shared response cache
+cache = ResponseCache()
+cache_mode = CACHE_USE
+
+MODEL = "gpt-4"
+MAX_OUTPUT = 800          # expected answer length, in tokens, for rate limiting
 
 def extract_data(html_path):
     with open(html_path, "r", encoding="utf-8") as f:
@@ -47,13 +58,20 @@ Write a <div id='ai-overview' class='tab-content'> HTML block that includes:
 Use proper HTML tags like <h2>, <p>, and <ul>, but do not include <html>, <head>, or <body>.
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7
-    )
+    messages = [{"role": "user", "content": prompt}]
 
-    return response.choices[0].message.content.strip()
+    def call():
+        response = client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=0.7
+        )
+        return response.choices[0].message.content.strip()
+
+    text, from_cache = cached_call(cache, cache_mode, MODEL, {"api": "chat", "temperature": 0.7}, messages, call)
+    if from_cache:
+        print("[CACHE] Reusing cached overview")
+    return text
 
 def insert_ai_overview(html_path, overview_html):
     print(f"[INFO] Inserting AI Overview into: {html_path}")
@@ -108,18 +126,40 @@ def insert_ai_overview(html_path, overview_html):
     print(f"[DONE] Updated file saved: {html_path}\\n")
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python gen_ai_overview.py file1.html [file2.html ...]")
-        return
-
-    for html_file in sys.argv[1:]:
+    global cache_mode
+    ap = argparse.ArgumentParser(description="Insert an AI Overview tab into board pages.")
+    ap.add_argument("files", nargs="+", help="HTML files to update")
+    add_cache_args(ap)
+    add_batch_args(ap, default_checkpoint=".minipcb_ai/overview_checkpoint.jsonl")
+    args = ap.parse_args()
+    cache_mode = cache_mode_from_args(args)
+
+    # Latency history from miniPCB Studio/Catalog runs here orders the batch shortest-first
+    eta = EtaModel(os.path.join(USAGE_DIR_NAME, USAGE_DB_NAME))
+    runner = BatchRunner(call=lambda job: generate_overview(*job.payload),
+                         write=lambda job, overview_html: insert_ai_overview(job.key, overview_html),
+                         concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm, checkpoint=args.checkpoint,
+                         predict=lambda job: eta.predict(MODEL, estimate_tokens("".join(job.payload))))
+    if args.fresh:
+        runner.checkpoint.reset()
+    done = runner.checkpoint.load_done()
+
+    jobs = []
+    for html_file in args.files:
+        if html_file in done:
+            continue
         try:
             slogan, details = extract_data(html_file)
-            print(f"Generating overview for {html_file}...")
-            overview_html = generate_overview(slogan, details)
-            insert_ai_overview(html_file, overview_html)
         except Exception as e:
             print(f"[ERROR] {html_file}: {str(e)}")
+            continue
+        jobs.append(BatchJob(key=html_file, payload=(slogan, details),
+                             est_tokens=estimate_tokens(slogan + details, max_output=MAX_OUTPUT)))
+
+    print(f"Generating overviews for {len(jobs)} file(s) ({len(done)} already done)...")
+    summary = runner.run(jobs)
+    print(f"[INFO] {summary.done} updated, {summary.failed} failed in {summary.elapsed:.1f}s")
+    print(f"[INFO] HTTP pool: {client_pool().summary()}")
 
 if __name__ == "__main__":
     main()
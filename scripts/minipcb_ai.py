@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_ai.py — shared plumbing for the AI generation paths.
+
+Used by minipcb_studio.py (AiService), minipcb_catalog.py (BaseAIWorker), the
+minipcb_catalog package (services/ai_service.py),
+taza_evaluate_datasheet.py, gen_ai_overview.py and update_keywords_with_openai.py.
+
+ResponseCache
+- Content-addressed: the key is a SHA-256 over (model, call parameters, prompt),
+  so a byte-identical request is answered from disk instead of the API.
+- Stored in SQLite (WAL) with age- and size-based eviction (oldest-used first).
+- Session hit/miss counters for status displays.
+
+Cache modes (CLI: --no-cache / --refresh):
+  use      read and write the cache (default)
+  refresh  skip the lookup but store the fresh answer
+  off      bypass the cache entirely
+
+Streaming
+- stream_chat / stream_responses iterate the SDK's Chat Completions and
+  Responses stream events; stream_sse_post does the same for the plain
+  `requests` fallback by parsing the server-sent-event body (iter_sse).
+- Every delta goes to an on_delta callback; DeltaThrottle coalesces them so a
+  GUI signal fires at most every STREAM_EMIT_INTERVAL seconds.
+- A threading.Event passed as `cancel` stops the stream between chunks and
+  raises StreamCancelled carrying the partial text (never cached).
+
+Client pool
+- client_pool() is the process-wide ClientPool: one OpenAI client (backed by a
+  keep-alive httpx pool) per (base URL, API key) and one requests.Session per
+  base URL, so repeated generations reuse TLS connections instead of
+  re-handshaking. Base URLs resolve from OPENAI_BASE_URL like the SDK does.
+- stats() reports requests / connections opened / reused per base URL for the
+  usage log; summary() is the same as one line.
+
+The OpenAI SDK and the requests fallback both honour OPENAI_BASE_URL, so every
+path can be pointed at a local stand-in endpoint for testing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import sqlite3   # annotations only; _db() imports it on first use
+
+CACHE_USE = "use"
+CACHE_REFRESH = "refresh"
+CACHE_OFF = "off"
+CACHE_MODES = (CACHE_USE, CACHE_REFRESH, CACHE_OFF)
+
+CACHE_DB_NAME = "response_cache.db"
+DEFAULT_CACHE_DIR = Path.home() / ".minipcb_ai"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30.0
+EVICT_EVERY_PUTS = 25            # run eviction after this many writes
+STREAM_EMIT_INTERVAL = 0.1       # seconds between throttled UI updates while streaming
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+POOL_MAXSIZE = 8                 # keep-alive connections per base URL (requests fallback)
+
+
+def default_cache_path() -> Path:
+    """MINIPCB_AI_CACHE if set, else ~/.minipcb_ai/response_cache.db."""
+    env = os.environ.get("MINIPCB_AI_CACHE", "").strip()
+    return Path(env) if env else DEFAULT_CACHE_DIR / CACHE_DB_NAME
+
+
+def make_key(model: str, params: Dict[str, Any], prompt: Any) -> str:
+    """SHA-256 over a canonical JSON of (model, params, prompt); prompt may be a str or message list."""
+    blob = json.dumps({"model": model, "params": params or {}, "prompt": prompt},
+                      sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache, safe to share between threads."""
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        self.path = Path(path) if path else default_cache_path()
+        self.max_bytes = int(max_bytes)
+        self.max_age_s = float(max_age_days) * 86400.0
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn: Optional["sqlite3.Connection"] = None
+
+    # ---- public API ----
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._db()
+            row = conn.execute("SELECT response, created FROM responses WHERE key=?;", (key,)).fetchone()
+            now = time.time()
+            if row is None or (self.max_age_s and now - row[1] > self.max_age_s):
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_used=?, hits=hits+1 WHERE key=?;", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        if not response:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.execute("""INSERT OR REPLACE INTO responses (key, model, created, last_used, size, hits, response)
+                            VALUES (?,?,?,?,?,0,?);""",
+                         (key, model, now, now, len(response.encode("utf-8")), response))
+            conn.commit()
+            self._puts += 1
+            if self._puts % EVICT_EVERY_PUTS == 0:
+                self._evict_locked()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under max_bytes."""
+        with self._lock:
+            return self._evict_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM responses;")
+            conn.commit()
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            n, size = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size),0) FROM responses;").fetchone()
+        return {"entries": int(n), "bytes": int(size), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ---- internals ----
+
+    def _db(self) -> "sqlite3.Connection":
+        if self._conn is None:
+            import sqlite3   # deferred so GUIs importing this module stay fast to start
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+              key TEXT PRIMARY KEY,
+              model TEXT,
+              created REAL NOT NULL,
+              last_used REAL NOT NULL,
+              size INTEGER NOT NULL,
+              hits INTEGER NOT NULL DEFAULT 0,
+              response TEXT NOT NULL
+            );""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);")
+            conn.commit()
+            self._conn = conn
+            self._evict_locked()
+        return self._conn
+
+    def _evict_locked(self) -> int:
+        conn = self._db()
+        removed = 0
+        if self.max_age_s:
+            removed += conn.execute("DELETE FROM responses WHERE created < ?;",
+                                    (time.time() - self.max_age_s,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size),0) FROM responses;").fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            drop, freed = [], 0
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC;"):
+                if total - freed <= self.max_bytes:
+                    break
+                drop.append((key,)); freed += size
+            conn.executemany("DELETE FROM responses WHERE key=?;", drop)
+            removed += len(drop)
+        conn.commit()
+        return removed
+
+
+def cached_call(cache: Optional[ResponseCache], mode: str, model: str, params: Dict[str, Any],
+                prompt: Any, call: Callable[[], str]) -> Tuple[str, bool]:
+    """
+    Return (text, from_cache). `call` performs the real request and returns its text;
+    it only runs on a miss (or in refresh mode). Empty answers are never stored.
+    """
+    if cache is None or mode == CACHE_OFF:
+        return call(), False
+    key = make_key(model, params, prompt)
+    if mode != CACHE_REFRESH:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit, True
+    text = call()
+    if text:
+        cache.put(key, model, text)
+    return text, False
+
+
+def resolve_base_url(base_url: Optional[str] = None) -> str:
+    """Explicit base URL, else OPENAI_BASE_URL, else the public API (no trailing slash)."""
+    return (base_url or os.environ.get("OPENAI_BASE_URL", "").strip() or DEFAULT_BASE_URL).rstrip("/")
+
+
+class ClientPool:
+    """Process-wide pooled AI clients, one keep-alive pool per base URL."""
+
+    def __init__(self, maxsize: int = POOL_MAXSIZE):
+        self.maxsize = int(maxsize)
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._sessions: Dict[str, Any] = {}
+        self._httpx: Dict[str, Dict[str, Any]] = {}   # base -> {"requests", "connections", "streams"}
+
+    def openai(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        """Shared openai.OpenAI client; api_key defaults to OPENAI_API_KEY."""
+        base = resolve_base_url(base_url)
+        key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        with self._lock:
+            client = self._clients.get((base, key))
+            if client is None:
+                import openai   # deferred: the GUIs probe for it lazily
+                counters = self._httpx.setdefault(base, {"requests": 0, "connections": 0, "streams": weakref.WeakSet()})
+                def on_response(response, counters=counters):
+                    # A connection is new when its network stream object has not been seen; the weak set
+                    # forgets closed connections without their id() being mistaken for a later one
+                    counters["requests"] += 1
+                    stream = response.extensions.get("network_stream")
+                    if stream is not None and stream not in counters["streams"]:
+                        counters["streams"].add(stream)
+                        counters["connections"] += 1
+                # The SDK's own httpx subclass keeps its default limits/timeouts; the hook only counts
+                http_client = openai.DefaultHttpxClient(event_hooks={"response": [on_response]})
+                client = openai.OpenAI(api_key=key, base_url=base, http_client=http_client)
+                self._clients[(base, key)] = client
+            return client
+
+    def session(self, base_url: Optional[str] = None):
+        """Shared requests.Session with a sized keep-alive adapter for the fallback path."""
+        base = resolve_base_url(base_url)
+        with self._lock:
+            sess = self._sessions.get(base)
+            if sess is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                sess = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.maxsize)
+                sess.mount("https://", adapter); sess.mount("http://", adapter)
+                self._sessions[base] = sess
+            return sess
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """{base_url: {"requests", "connections", "reused"}} across SDK and requests traffic."""
+        out: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for base, c in self._httpx.items():
+                ent = out.setdefault(base, {"requests": 0, "connections": 0})
+                ent["requests"] += c["requests"]; ent["connections"] += c["connections"]
+            for base, sess in self._sessions.items():
+                ent = out.setdefault(base, {"requests": 0, "connections": 0})
+                for adapter in set(sess.adapters.values()):
+                    pools = adapter.poolmanager.pools
+                    for pool in [pools[k] for k in pools.keys()]:
+                        ent["requests"] += getattr(pool, "num_requests", 0)
+                        ent["connections"] += getattr(pool, "num_connections", 0)
+        for ent in out.values():
+            ent["reused"] = max(0, ent["requests"] - ent["connections"])
+        return out
+
+    def summary(self) -> str:
+        parts = [f"{base}: {e['requests']} req / {e['connections']} conn ({e['reused']} reused)"
+                 for base, e in self.stats().items() if e["requests"]]
+        return "; ".join(parts) or "no requests"
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                _close_quietly(client)
+            for sess in self._sessions.values():
+                _close_quietly(sess)
+            self._clients.clear(); self._sessions.clear(); self._httpx.clear()
+
+
+_POOL: Optional[ClientPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def client_pool() -> ClientPool:
+    """The process-wide ClientPool (created on first use)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ClientPool()
+        return _POOL
+
+
+class StreamCancelled(Exception):
+    """Raised when a stream is cancelled; .partial holds the text received so far."""
+
+    def __init__(self, partial: str = ""):
+        super().__init__("Generation cancelled")
+        self.partial = partial
+
+
+class DeltaThrottle:
+    """
+    Coalesce stream deltas: push() buffers, and `emit` receives the joined
+    pieces at most every `interval` seconds (the first piece goes out at once).
+    Call flush() when the stream ends.
+    """
+
+    def __init__(self, emit: Callable[[str], None], interval: float = STREAM_EMIT_INTERVAL):
+        self.emit = emit
+        self.interval = float(interval)
+        self._buf: List[str] = []
+        self._last = 0.0
+
+    def push(self, piece: str) -> None:
+        if not piece:
+            return
+        self._buf.append(piece)
+        if time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buf:
+            text = "".join(self._buf)
+            self._buf = []
+            self._last = time.monotonic()
+            self.emit(text)
+
+
+def _check_cancel(cancel: Optional[threading.Event], parts: List[str]) -> None:
+    if cancel is not None and cancel.is_set():
+        raise StreamCancelled("".join(parts))
+
+
+def _close_quietly(obj: Any) -> None:
+    close = getattr(obj, "close", None)
+    if close:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def stream_chat(client, on_delta: Callable[[str], None], cancel: Optional[threading.Event] = None, **kwargs) -> str:
+    """Chat Completions with stream=True; returns the full text."""
+    # The SDK's Stream stops reading at [DONE] and closes the response before the chunked body ends,
+    # which makes httpx drop the connection instead of returning it to the pool. Reading the raw
+    # body to EOF here keeps chat streams on the keep-alive pool like Responses streams.
+    parts: List[str] = []
+    with client.chat.completions.with_streaming_response.create(stream=True, **kwargs) as response:
+        lines = response.iter_lines()
+        for payload in iter_sse(lines):
+            _check_cancel(cancel, parts)
+            piece = sse_text_delta(payload)
+            if piece:
+                parts.append(piece)
+                on_delta(piece)
+        for _ in lines:
+            pass
+    return "".join(parts)
+
+
+def stream_responses(client, on_delta: Callable[[str], None], cancel: Optional[threading.Event] = None, **kwargs) -> str:
+    """Responses API with stream=True; only output_text deltas are forwarded."""
+    parts: List[str] = []
+    stream = client.responses.create(stream=True, **kwargs)
+    try:
+        for event in stream:
+            _check_cancel(cancel, parts)
+            etype = getattr(event, "type", "")
+            if etype == "response.output_text.delta":
+                parts.append(event.delta)
+                on_delta(event.delta)
+            elif etype in ("error", "response.failed"):
+                err = getattr(event, "error", None) or getattr(getattr(event, "response", None), "error", None)
+                raise RuntimeError(getattr(err, "message", None) or str(err) or "Response stream failed")
+    finally:
+        _close_quietly(stream)
+    return "".join(parts)
+
+
+def endpoint_unsupported(exc: BaseException) -> bool:
+    """
+    True when a Responses call failed because the endpoint itself is missing
+    (404 / 405, a 400 about the endpoint or URL, or an SDK without
+    client.responses): the one case where the same request on Chat
+    Completions can succeed. Auth, rate-limit and server errors are False.
+    """
+    if isinstance(exc, AttributeError):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status in (404, 405):
+        return True
+    if status == 400:
+        msg = str(exc).lower()
+        return any(w in msg for w in ("endpoint", "/responses", "unrecognized request url", "not supported"))
+    return False
+
+
+def iter_sse(lines: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """Decode a server-sent-event body (one line per item) into JSON payloads; stops at [DONE]."""
+    data: List[str] = []
+    for raw in lines:
+        line = raw.decode("utf-8", "replace") if isinstance(raw, bytes) else (raw or "")
+        line = line.rstrip("\r")
+        if line.startswith("data:"):
+            data.append(line[5:].lstrip(" "))
+            continue
+        if line or not data:
+            continue              # comments, event:/id: fields, keep-alive blank lines
+        payload, data = "\n".join(data), []
+        if payload.strip() == "[DONE]":
+            return
+        yield json.loads(payload)
+    if data and "\n".join(data).strip() != "[DONE]":
+        yield json.loads("\n".join(data))
+
+
+def sse_text_delta(payload: Dict[str, Any]) -> str:
+    """Text carried by one chat.completion.chunk or Responses stream event."""
+    if payload.get("type") == "response.output_text.delta":
+        return payload.get("delta") or ""
+    if payload.get("type") in ("error", "response.failed"):
+        err = payload.get("error") or (payload.get("response") or {}).get("error") or {}
+        raise RuntimeError(err.get("message") if isinstance(err, dict) else str(err))
+    choices = payload.get("choices") or []
+    if choices:
+        return (choices[0].get("delta") or {}).get("content") or ""
+    return ""
+
+
+def stream_sse_post(http, url: str, headers: Dict[str, str], body: Dict[str, Any], on_delta: Callable[[str], None],
+                    cancel: Optional[threading.Event] = None, timeout: float = 120) -> str:
+    """
+    POST `body` with stream=true via `http` (the requests module or a Session)
+    and forward text deltas; works for /chat/completions and /responses.
+    """
+    parts: List[str] = []
+    r = http.post(url, headers=headers, data=json.dumps(dict(body, stream=True)), stream=True, timeout=timeout)
+    try:
+        r.raise_for_status()
+        for payload in iter_sse(r.iter_lines(decode_unicode=True)):
+            _check_cancel(cancel, parts)
+            piece = sse_text_delta(payload)
+            if piece:
+                parts.append(piece)
+                on_delta(piece)
+    finally:
+        r.close()
+    return "".join(parts)
+
+
+def add_cache_args(ap) -> None:
+    """Add --no-cache / --refresh to an argparse parser."""
+    g = ap.add_mutually_exclusive_group()
+    g.add_argument("--no-cache", action="store_true", help="Bypass the AI response cache")
+    g.add_argument("--refresh", action="store_true", help="Ignore cached responses but store fresh ones")
+
+
+def cache_mode_from_args(args) -> str:
+    if getattr(args, "no_cache", False):
+        return CACHE_OFF
+    if getattr(args, "refresh", False):
+        return CACHE_REFRESH
+    return CACHE_USE
+
+
+def cache_mode_from_argv(argv) -> str:
+    """Same flags for the GUIs, which do not use argparse."""
+    if "--no-cache" in argv:
+        return CACHE_OFF
+    if "--refresh" in argv:
+        return CACHE_REFRESH
+    return CACHE_USE
+
+
+__all__ = [
+    "CACHE_USE", "CACHE_REFRESH", "CACHE_OFF", "CACHE_MODES", "CACHE_DB_NAME",
+    "ResponseCache", "default_cache_path", "make_key", "cached_call",
+    "add_cache_args", "cache_mode_from_args", "cache_mode_from_argv",
+    "STREAM_EMIT_INTERVAL", "StreamCancelled", "DeltaThrottle", "stream_chat", "stream_responses",
+    "endpoint_unsupported", "iter_sse", "sse_text_delta", "stream_sse_post",
+    "DEFAULT_BASE_URL", "resolve_base_url", "ClientPool", "client_pool",
+]
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_ai_batch.py — bounded-concurrency batch runner for site-wide AI passes.
+
+Used by update_keywords_with_openai.py and gen_ai_overview.py.
+
+- Up to `concurrency` model calls are in flight at once; the blocking SDK call
+  runs in a worker thread (asyncio.to_thread), so the existing sync clients
+  and the response cache in minipcb_ai are reused as-is.
+- Two token buckets gate every call: requests per minute and (estimated)
+  tokens per minute. A bucket of 0 means "unlimited".
+- Results are handed to a single writer coroutine in arrival order, so page
+  writes never interleave, and each finished job is appended to a JSONL
+  checkpoint. Re-running with the same checkpoint skips jobs already done;
+  once a run finishes every job without a failure the checkpoint is deleted,
+  so the next run starts a fresh pass.
+- With a `predict` callable (e.g. minipcb_eta.EtaModel.predict), jobs start
+  shortest-first, so quick pages land early and long ones overlap at the end.
+
+Typical use:
+
+    jobs = [BatchJob(key=path, payload=prompt, est_tokens=estimate_tokens(prompt)) for ...]
+    runner = BatchRunner(call=lambda job: ask_model(job.payload),
+                         write=lambda job, text: save(job.key, text),
+                         concurrency=4, rpm=60, tpm=90000, checkpoint=Path("run.jsonl"))
+    summary = runner.run(jobs)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RPM = 60
+DEFAULT_TPM = 90_000
+
+
+def estimate_tokens(text: str, max_output: int = 0) -> int:
+    """Rough token estimate (chars/4) plus the expected output budget."""
+    return max(1, len(text or "") // 4) + int(max_output)
+
+
+@dataclass
+class BatchJob:
+    key: str                      # stable id (usually the file path); used for checkpointing
+    payload: Any = None           # whatever the call function needs (prompt, parsed data, ...)
+    est_tokens: int = 1
+
+
+@dataclass
+class BatchSummary:
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0              # already in the checkpoint
+    elapsed: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+class TokenBucket:
+    """Continuous-refill bucket: `per_minute` units, burst up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = float(per_minute) / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        amount = min(float(amount), self.capacity)   # one oversized job must not wait forever
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class Checkpoint:
+    """Append-only JSONL of finished job keys."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+
+    def load_done(self) -> Set[str]:
+        done: Set[str] = set()
+        if not self.path or not self.path.exists():
+            return done
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue          # torn last line after a crash
+            if rec.get("status") == "done":
+                done.add(rec.get("key"))
+        return done
+
+    def record(self, key: str, status: str, error: str = "") -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        rec = {"key": key, "status": status, "ts": time.strftime("%Y-%m-%d %H:%M:%S")}
+        if error:
+            rec["error"] = error
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def reset(self) -> None:
+        if self.path and self.path.exists():
+            self.path.unlink()
+
+
+class BatchRunner:
+    def __init__(self, call: Callable[[BatchJob], Any], write: Callable[[BatchJob, Any], None],
+                 concurrency: int = DEFAULT_CONCURRENCY, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM,
+                 checkpoint: Optional[Path] = None, log: Callable[[str], None] = print,
+                 predict: Optional[Callable[[BatchJob], Optional[float]]] = None):
+        self.call = call
+        self.write = write
+        self.concurrency = max(1, int(concurrency))
+        self.rpm = rpm
+        self.tpm = tpm
+        self.checkpoint = Checkpoint(checkpoint)
+        self.log = log
+        self.predict = predict
+
+    def run(self, jobs: Iterable[BatchJob]) -> BatchSummary:
+        return asyncio.run(self.run_async(list(jobs)))
+
+    async def run_async(self, jobs: List[BatchJob]) -> BatchSummary:
+        summary = BatchSummary()
+        start = time.monotonic()
+        done = self.checkpoint.load_done()
+        todo = [j for j in jobs if j.key not in done]
+        summary.skipped = len(jobs) - len(todo)
+        if self.predict is not None:
+            todo = self._shortest_first(todo)
+        if summary.skipped:
+            self.log(f"[batch] resuming: {summary.skipped} job(s) already done")
+
+        req_bucket, tok_bucket = TokenBucket(self.rpm), TokenBucket(self.tpm)
+        sem = asyncio.Semaphore(self.concurrency)
+        results: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue()
+
+        async def worker(job: BatchJob):
+            async with sem:
+                await req_bucket.acquire(1)
+                await tok_bucket.acquire(job.est_tokens)
+                try:
+                    out = await asyncio.to_thread(self.call, job)
+                    await results.put((job, out, None))
+                except Exception as e:
+                    await results.put((job, None, e))
+
+        async def writer():
+            # Single consumer: page writes and checkpoint lines happen one at a time
+            while True:
+                item = await results.get()
+                if item is None:
+                    return
+                job, out, err = item
+                if err is None:
+                    try:
+                        self.write(job, out)
+                    except Exception as e:
+                        err = e
+                if err is None:
+                    summary.done += 1
+                    self.checkpoint.record(job.key, "done")
+                else:
+                    summary.failed += 1
+                    summary.errors[job.key] = str(err)
+                    self.checkpoint.record(job.key, "failed", str(err))
+                    self.log(f"[batch] failed: {job.key}: {err}")
+
+        writer_task = asyncio.create_task(writer())
+        try:
+            await asyncio.gather(*(worker(j) for j in todo))
+        finally:
+            await results.put(None)
+            await writer_task
+        if not summary.failed and self.checkpoint.path and self.checkpoint.path.exists():
+            # Every job is finished: the next run is a new pass, not a resume of this one
+            self.checkpoint.reset()
+            self.log(f"[batch] all {len(jobs)} job(s) done; checkpoint {self.checkpoint.path} cleared")
+        summary.elapsed = time.monotonic() - start
+        return summary
+
+    def _shortest_first(self, jobs: List[BatchJob]) -> List[BatchJob]:
+        preds = {j.key: self.predict(j) for j in jobs}
+        known = [p for p in preds.values() if p is not None]
+        if known:
+            self.log(f"[batch] shortest-first: predicted {sum(known):.0f}s of model time for {len(known)} job(s)")
+        # Jobs without a prediction keep their token-estimate order, after the predicted ones
+        return sorted(jobs, key=lambda j: (preds[j.key] is None, preds[j.key] or j.est_tokens))
+
+
+def add_batch_args(ap, default_checkpoint: str) -> None:
+    """Shared CLI flags for batch tools."""
+    ap.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Model calls in flight at once")
+    ap.add_argument("--rpm", type=float, default=DEFAULT_RPM, help="Requests per minute (0 = unlimited)")
+    ap.add_argument("--tpm", type=float, default=DEFAULT_TPM, help="Estimated tokens per minute (0 = unlimited)")
+    ap.add_argument("--checkpoint", type=Path, default=Path(default_checkpoint),
+                    help="JSONL progress file; after an interrupted or partly failed run, finished files are skipped on the next one")
+    ap.add_argument("--fresh", action="store_true", help="Ignore (and reset) the checkpoint")
+
+
+__all__ = [
+    "BatchJob", "BatchSummary", "BatchRunner", "TokenBucket", "Checkpoint",
+    "estimate_tokens", "add_batch_args", "DEFAULT_CONCURRENCY", "DEFAULT_RPM", "DEFAULT_TPM",
+]
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_ai_bench.py — end-to-end throughput of batch AI generation under load.
+
+Runs N generation jobs through minipcb_ai_batch.BatchRunner at one or more
+concurrency levels, using the same shared keep-alive client (client_pool) and
+streaming helpers as the GUIs and batch tools. By default the requests go to
+an in-process minipcb_mock_ai server, so runs are repeatable and offline;
+--base-url points the benchmark at any other OpenAI-compatible endpoint.
+
+The response cache is bypassed (every job is a real round-trip). For each
+level it reports wall time, jobs/s, output tokens/s, p50/p95 job latency and
+how many TCP connections the pool opened.
+
+Usage:
+  python minipcb_ai_bench.py --jobs 40 --concurrency 1,4,8
+  python minipcb_ai_bench.py --api responses --no-stream --latency-ms 800 --tokens-per-sec 40
+  python minipcb_ai_bench.py --base-url http://127.0.0.1:8808/v1 --json bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from minipcb_ai import client_pool, stream_chat, stream_responses
+from minipcb_ai_batch import BatchJob, BatchRunner, estimate_tokens
+from minipcb_mock_ai import add_mock_args, server_from_args
+
+DEFAULT_JOBS = 24
+DEFAULT_LEVELS = "1,4,8"
+DEFAULT_PROMPT_CHARS = 2000
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def make_prompt(n: int, chars: int) -> str:
+    # Distinct per job so a replaying server cannot answer every job the same way
+    head = f"Job {n}: write the circuit description for board 04A-{n:03d}.\n"
+    return head + ("Netlist: GND: P1.1, C2.2, R7.1; V+: P1.2, U1.V+, C6.2. " * (chars // 60 + 1))[:chars]
+
+
+def run_level(base_url: str, api_key: str, model: str, api: str, stream: bool,
+              jobs: List[BatchJob], concurrency: int) -> Dict[str, Any]:
+    client = client_pool().openai(api_key, base_url)
+    latencies: List[float] = []
+    out_tokens = [0]
+    lock = threading.Lock()
+
+    def call(job: BatchJob) -> str:
+        t0 = time.perf_counter()
+        messages = [{"role": "user", "content": job.payload}]
+        if stream and api == "chat":
+            text = stream_chat(client, lambda _piece: None, None, model=model, messages=messages)
+        elif stream:
+            text = stream_responses(client, lambda _piece: None, None, model=model, input=messages)
+        elif api == "chat":
+            text = client.chat.completions.create(model=model, messages=messages).choices[0].message.content or ""
+        else:
+            text = client.responses.create(model=model, input=messages).output_text or ""
+        with lock:
+            latencies.append(time.perf_counter() - t0)
+            out_tokens[0] += estimate_tokens(text)
+        return text
+
+    before = client_pool().stats().get(base_url.rstrip("/"), {})
+    runner = BatchRunner(call=call, write=lambda job, text: None, concurrency=concurrency,
+                         rpm=0, tpm=0, checkpoint=None, log=lambda msg: None)
+    summary = runner.run(jobs)
+    after = client_pool().stats().get(base_url.rstrip("/"), {})
+    wall = summary.elapsed or 1e-9
+    return {
+        "concurrency": concurrency, "jobs": len(jobs), "done": summary.done, "failed": summary.failed,
+        "wall_s": round(wall, 3), "jobs_per_s": round(summary.done / wall, 2),
+        "out_tok_per_s": round(out_tokens[0] / wall, 1),
+        "p50_s": round(percentile(latencies, 0.50), 3), "p95_s": round(percentile(latencies, 0.95), 3),
+        "mean_s": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "new_connections": after.get("connections", 0) - before.get("connections", 0),
+        "errors": sorted(set(summary.errors.values()))[:3],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark batch AI generation throughput (mock server by default).")
+    ap.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Jobs per concurrency level")
+    ap.add_argument("--concurrency", default=DEFAULT_LEVELS, help="Comma-separated concurrency levels")
+    ap.add_argument("--api", choices=("chat", "responses"), default="chat")
+    ap.add_argument("--no-stream", action="store_true", help="Plain JSON responses instead of SSE streams")
+    ap.add_argument("--model", default="gpt-4o-mini")
+    ap.add_argument("--prompt-chars", type=int, default=DEFAULT_PROMPT_CHARS)
+    ap.add_argument("--base-url", default=None, help="Benchmark this endpoint instead of the in-process mock")
+    ap.add_argument("--json", type=Path, default=None, help="Also write the results as JSON")
+    add_mock_args(ap)
+    args = ap.parse_args()
+
+    server = None
+    if args.base_url:
+        base_url, api_key = args.base_url.rstrip("/"), os.environ.get("OPENAI_API_KEY", "").strip()
+    else:
+        server = server_from_args(args).start()
+        base_url, api_key = server.base_url, "mock"
+        print(f"[bench] mock server {base_url}: latency {args.latency_ms:g}ms ±{args.jitter_ms:g}, "
+              f"{args.tokens_per_sec:g} tok/s, fail-rate {args.fail_rate:g}")
+
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    jobs = [BatchJob(key=f"job-{n}", payload=make_prompt(n, args.prompt_chars),
+                     est_tokens=estimate_tokens(make_prompt(n, args.prompt_chars))) for n in range(args.jobs)]
+    stream = not args.no_stream
+    print(f"[bench] {args.jobs} job(s) × levels {levels} · api={args.api} stream={stream}")
+    print(f"{'conc':>5} {'wall s':>8} {'jobs/s':>8} {'tok/s':>9} {'p50 s':>7} {'p95 s':>7} {'conns':>6} {'fail':>5}")
+    results = []
+    try:
+        # Warm-up: the SDK builds its response models lazily, which would otherwise land on level one
+        run_level(base_url, api_key, args.model, args.api, stream, jobs[:1], 1)
+        for level in levels:
+            r = run_level(base_url, api_key, args.model, args.api, stream, jobs, level)
+            results.append(r)
+            print(f"{r['concurrency']:>5} {r['wall_s']:>8.2f} {r['jobs_per_s']:>8.2f} {r['out_tok_per_s']:>9.1f} "
+                  f"{r['p50_s']:>7.2f} {r['p95_s']:>7.2f} {r['new_connections']:>6} {r['failed']:>5}")
+            for err in r["errors"]:
+                print(f"      error: {err}")
+    finally:
+        if server is not None:
+            print(f"[bench] server counters: {json.dumps(server.stats())}")
+            server.stop()
+    if args.json:
+        args.json.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, "results": results},
+                                        indent=2), encoding="utf-8")
+        print(f"[bench] wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
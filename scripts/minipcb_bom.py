@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_bom.py — cross-board BOM rollup over the netlist graph index.
+
+Used by taza_bom_rollup.py.
+
+- Lines are (kind, normalised value, footprint). Kind is the refdes prefix;
+  values go through minipcb_netgraph.parse_value, so "4u7", "4.7u" and
+  "4u7F" are one line, shown as format_value(4.7e-6) == "4.7u". Values that
+  are not numbers (NPN, LF412) are grouped case-insensitively. Test points,
+  jumpers and connectors carry net/interface labels in "value", so they are
+  grouped by footprint only. Parts without a footprint (supply symbols) are
+  not placed and are left out.
+- build_quantities() turns EBL.json status and the Circuit Identification
+  "Pieces per Panel" into boards-to-build per board: panels x pieces for the
+  selected statuses, 0 otherwise. An EBL row matches on PN and rev, or on PN
+  alone when no revision of that PN matches exactly (the EBL often lags a rev);
+  the PN-only match goes to the latest revision in json/ (minipcb_netdiff
+  rev_key) and older ones are "superseded" and untracked, so a board with
+  several revisions is not counted once per revision.
+- rollup() is array work: one np.unique over packed (kind, value, footprint)
+  ids and one bincount for the line x board count matrix, so the corpus
+  aggregates in milliseconds; quantities are that matrix times the build vector.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from minipcb_md import try_load_md
+from minipcb_netdiff import rev_key
+from minipcb_netgraph import NetGraph, parse_value
+
+LABEL_VALUE_KINDS = {"TP", "J", "P"}            # "value" holds a net / interface label, not a part value
+BUILD_STATUSES = ("planned", "in-progress")
+UNTRACKED = "untracked"
+ENG_PREFIXES = ((1e9, "G"), (1e6, "M"), (1e3, "k"), (1.0, ""), (1e-3, "m"), (1e-6, "u"), (1e-9, "n"), (1e-12, "p"))
+
+
+def format_value(x: float) -> str:
+    """Engineering notation: 1e-7 -> "100n", 4.7e-6 -> "4.7u", 3300 -> "3.3k", 0 -> "0"."""
+    if not math.isfinite(x):
+        return ""
+    if x == 0:
+        return "0"
+    for scale, prefix in ENG_PREFIXES:
+        if abs(x) >= scale * 0.9995:
+            return f"{x / scale:.4g}{prefix}"
+    return f"{x / 1e-12:.4g}p"
+
+
+def normalise_value(raw: str) -> Tuple[str, float]:
+    """(grouping label, number or NaN) for one part value string."""
+    num = parse_value(raw)
+    if math.isfinite(num):
+        return format_value(num), num
+    return " ".join((raw or "").split()).upper(), float("nan")
+
+
+def load_ebl(path: Path) -> List[Dict[str, str]]:
+    try:
+        rows = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return [r for r in rows if isinstance(r, dict)] if isinstance(rows, list) else []
+
+
+def ebl_status(board_keys: Sequence[str], ebl: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+    """
+    (status, match) per "PN_REV" key; match is "exact", "pn" or "" (untracked).
+    A PN-only match applies to the PN's latest revision; earlier revisions get
+    (UNTRACKED, "superseded").
+    """
+    exact = {(r.get("board", ""), r.get("rev", "")): r.get("status", "") for r in ebl}
+    by_pn = {r.get("board", ""): r.get("status", "") for r in ebl}
+    split = [k.split("_", 1) + [""] for k in board_keys]
+    exact_pns = {pn for pn, rev, *_ in split if (pn, rev) in exact}
+    latest: Dict[str, str] = {}
+    for pn, rev, *_ in split:
+        if pn in by_pn and pn not in exact_pns and (pn not in latest or rev_key(rev) > rev_key(latest[pn])):
+            latest[pn] = rev
+    out = []
+    for pn, rev, *_ in split:
+        if (pn, rev) in exact:
+            out.append((exact[(pn, rev)], "exact"))
+        elif pn in latest:
+            out.append((by_pn[pn], "pn") if latest[pn] == rev else (UNTRACKED, "superseded"))
+        else:
+            out.append((UNTRACKED, ""))
+    return out
+
+
+def pieces_per_panel(board_keys: Sequence[str], md_dir: Path) -> List[Optional[int]]:
+    """Circuit Identification "Pieces per Panel" of md/<PN>_<REV>_sch.md (None when absent)."""
+    out: List[Optional[int]] = []
+    for key in board_keys:
+        doc = try_load_md(Path(md_dir) / f"{key}_sch.md")
+        text = (doc.identification().get("Pieces per Panel", "") if doc else "").strip()
+        out.append(int(text) if text.isdigit() and int(text) > 0 else None)
+    return out
+
+
+@dataclass
+class BuildPlan:
+    boards: List[str]
+    status: List[str]
+    match: List[str]
+    pieces: List[Optional[int]]
+    quantity: np.ndarray            # boards to build, per board row of the graph
+
+    def rows(self) -> List[Dict]:
+        return [{"board": b, "status": s, "ebl_match": m or None, "pieces_per_panel": p, "quantity": int(q)}
+                for b, s, m, p, q in zip(self.boards, self.status, self.match, self.pieces, self.quantity.tolist())]
+
+
+def build_quantities(g: NetGraph, ebl: List[Dict[str, str]], md_dir: Path, statuses: Optional[Sequence[str]],
+                     panels: int = 1, default_pieces: int = 1) -> BuildPlan:
+    """Boards to build per graph board: panels x pieces when the EBL status is selected (None = every board)."""
+    status = ebl_status(g.board_keys, ebl)
+    pieces = pieces_per_panel(g.board_keys, md_dir)
+    selected = np.array([statuses is None or s in statuses for s, _ in status], dtype=bool)
+    per_panel = np.array([p or default_pieces for p in pieces], dtype=np.int64)
+    return BuildPlan(list(g.board_keys), [s for s, _ in status], [m for _, m in status], pieces,
+                     np.where(selected, per_panel * panels, 0).astype(np.int64))
+
+
+@dataclass
+class Rollup:
+    kind: List[str]
+    value: List[str]
+    value_num: np.ndarray
+    footprint: List[str]
+    spellings: List[List[str]]      # raw values merged into each line
+    counts: np.ndarray              # line x board placements on one board
+    quantity: np.ndarray            # per line, counts @ build quantities
+    skipped: int                    # placements without a footprint
+
+    def lines(self, boards: Sequence[str]) -> List[Dict]:
+        out = []
+        for i in range(len(self.kind)):
+            used = np.flatnonzero(self.counts[i])
+            out.append({"kind": self.kind[i], "value": self.value[i],
+                        "value_num": None if math.isnan(self.value_num[i]) else float(self.value_num[i]),
+                        "footprint": self.footprint[i], "quantity": int(self.quantity[i]),
+                        "boards": len(used), "per_board": {boards[b]: int(self.counts[i, b]) for b in used.tolist()},
+                        "spellings": self.spellings[i]})
+        return out
+
+
+def rollup(g: NetGraph, quantity: np.ndarray) -> Rollup:
+    """Aggregate every placed component of the index; `quantity` is boards-to-build per board."""
+    labels, nums = zip(*[normalise_value(v) for v in g.tables["value"].strings]) if g.tables["value"].strings else ((), ())
+    norm_ids: Dict[str, int] = {"": 0}
+    value_norm = np.array([norm_ids.setdefault(l, len(norm_ids)) for l in labels], dtype=np.int64)
+    norm_num = np.full(len(norm_ids), np.nan)
+    norm_num[value_norm] = np.asarray(nums, dtype=np.float64)
+    label_kind = np.array([k in LABEL_VALUE_KINDS for k in g.tables["kind"].strings], dtype=bool)
+    fp_empty = np.array([not f.strip() for f in g.tables["footprint"].strings], dtype=bool)
+
+    placed = ~fp_empty[g.comp_footprint] if len(g.comp_footprint) else np.zeros(0, dtype=bool)
+    kind = g.comp_kind[placed].astype(np.int64)
+    fp = g.comp_footprint[placed].astype(np.int64)
+    raw = g.comp_value[placed].astype(np.int64)
+    val = np.where(label_kind[kind], 0, value_norm[raw]) if len(raw) else raw
+    board = g.comp_board[placed].astype(np.int64)
+
+    n_val, n_fp = len(norm_ids), max(1, len(g.tables["footprint"].strings))
+    packed = (kind * n_val + val) * n_fp + fp
+    keys, inverse = np.unique(packed, return_inverse=True)
+    n_lines, n_boards = len(keys), g.n_boards
+    counts = np.bincount(inverse * n_boards + board, minlength=n_lines * n_boards).reshape(n_lines, n_boards)
+    quantity = counts @ np.asarray(quantity, dtype=np.int64)
+
+    k_id, rest = np.divmod(keys, n_val * n_fp)
+    v_id, f_id = np.divmod(rest, n_fp)
+    norm_label = [""] * n_val
+    for l, i in norm_ids.items():
+        norm_label[i] = l
+    pairs = np.unique(inverse * len(g.tables["value"].strings) + raw)     # distinct (line, raw value)
+    spellings: List[List[str]] = [[] for _ in range(n_lines)]
+    label_line = label_kind[k_id]
+    for line, r in zip(*np.divmod(pairs, max(1, len(g.tables["value"].strings)))):
+        s = g.tables["value"].strings[r]
+        if s and not label_line[line]:
+            spellings[line].append(s)
+
+    r = Rollup([g.tables["kind"].strings[k] for k in k_id.tolist()], [norm_label[v] for v in v_id.tolist()],
+               norm_num[v_id], [g.tables["footprint"].strings[f] for f in f_id.tolist()], spellings,
+               counts.astype(np.int32), quantity, int((~placed).sum()))
+    order = np.lexsort((r.footprint, r.value, np.nan_to_num(r.value_num, nan=np.inf), r.kind))
+    return Rollup([r.kind[i] for i in order], [r.value[i] for i in order], r.value_num[order],
+                  [r.footprint[i] for i in order], [r.spellings[i] for i in order], r.counts[order],
+                  r.quantity[order], r.skipped)
+
+
+__all__ = [
+    "LABEL_VALUE_KINDS", "BUILD_STATUSES", "UNTRACKED", "format_value", "normalise_value", "load_ebl", "ebl_status",
+    "pieces_per_panel", "BuildPlan", "build_quantities", "Rollup", "rollup",
+]
@@ -13,27 +13,62 @@ miniPCB Catalog — PyQt5
 """
 
 from __future__ import annotations
-import sys, os, re, json, shutil, subprocess, datetime, platform, time
+import sys, os, re, json, shutil, subprocess, datetime, platform, time, threading, importlib, importlib.util
+import html as html_lib
 from pathlib import Path
 from typing import Optional, Tuple, List, Dict, Any
 from urllib.parse import urlparse, unquote
 
-# ---- HTML parsing
-try:
-    from bs4 import BeautifulSoup, Comment, NavigableString, Tag, Doctype
-    BS4_AVAILABLE = True
-except Exception:
-    BeautifulSoup = None; Comment = None; NavigableString = None; Tag = None; Doctype = None; BS4_AVAILABLE = False
+if "--startup-profile" in sys.argv:
+    import minipcb_startup; minipcb_startup.install()
+else:
+    minipcb_startup = None
+
+class _LazyImport:
+    """
+    Stand-in for a name from an optional module; the module is imported on first real use
+    (call, attribute access, or isinstance check), not when this script loads.
+    """
+    def __init__(self, module: str, name: str):
+        self._module = module; self._name = name; self._obj = None
+    def _resolve(self):
+        if self._obj is None:
+            self._obj = getattr(importlib.import_module(self._module), self._name)
+        return self._obj
+    def __call__(self, *args, **kwargs): return self._resolve()(*args, **kwargs)
+    def __getattr__(self, attr): return getattr(self._resolve(), attr)
+    def __instancecheck__(self, obj): return isinstance(obj, self._resolve())
+    def __repr__(self): return f"<lazy {self._module}.{self._name}>"
+
+# ---- HTML parsing (bs4 is probed here, imported on first parse)
+BS4_AVAILABLE = importlib.util.find_spec("bs4") is not None
+if BS4_AVAILABLE:
+    BeautifulSoup, Comment, NavigableString, Tag, Doctype = (
+        _LazyImport("bs4", n) for n in ("BeautifulSoup", "Comment", "NavigableString", "Tag", "Doctype"))
+else:
+    BeautifulSoup = None; Comment = None; NavigableString = None; Tag = None; Doctype = None
 
-# ---- OpenAI (optional)
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except Exception:
-    OpenAI = None; OPENAI_AVAILABLE = False
+# ---- OpenAI (optional; the shared client pool imports it on first AI call)
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+
+from minipcb_image_cache import ImagePyramidCache
+from minipcb_ai import (ResponseCache, cached_call, cache_mode_from_argv, DeltaThrottle, StreamCancelled, stream_chat,
+                        stream_responses, endpoint_unsupported, client_pool)
+from minipcb_usage import UsageLogger, USAGE_DIR_NAME, USAGE_DB_NAME, USAGE_JSONL_NAME
+from minipcb_eta import EtaModel
+from minipcb_resilience import Attempt, CallStats, RetryPolicy, resilient_call
+
+# ---- AI response cache (shared across windows; --no-cache / --refresh override)
+AI_CACHE_MODE = cache_mode_from_argv(sys.argv)
+_RESPONSE_CACHE: Optional[ResponseCache] = None
+
+def _response_cache() -> ResponseCache:
+    global _RESPONSE_CACHE
+    if _RESPONSE_CACHE is None: _RESPONSE_CACHE = ResponseCache()
+    return _RESPONSE_CACHE
 
 from PyQt5.QtCore import Qt, QSortFilterProxyModel, QModelIndex, QSettings, QTimer, QThread, pyqtSignal
-from PyQt5.QtGui import QKeySequence, QIcon, QPixmap, QPainter, QFont, QCursor
+from PyQt5.QtGui import QKeySequence, QIcon, QPixmap, QPainter, QFont, QCursor, QTextCursor
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QFileSystemModel, QTreeView, QToolBar, QAction, QFileDialog,
@@ -244,42 +279,93 @@ def minipcb_format_html(soup: BeautifulSoup) -> str:
 
 # ---------- AI Workers ----------
 class BaseAIWorker(QThread):
-    finished = pyqtSignal(dict)  # {ok,bundle/error,elapsed}
-    def __init__(self, api_key: str, model_name: str, sys_prompt: str, user_prompt: str, timeout: int = 120):
+    finished = pyqtSignal(dict)  # {ok,bundle/error,elapsed[,cancelled,attempts,wasted_tokens,latency]}
+    chunk = pyqtSignal(str)      # streamed text since the last emit (throttled)
+    def __init__(self, api_key: str, model_name: str, sys_prompt: str, user_prompt: str, timeout: int = 120,
+                 p95_s: Optional[float] = None):
         super().__init__()
         self.api_key = api_key; self.model = model_name
         self.sys_prompt = sys_prompt; self.user_prompt = user_prompt; self.timeout = timeout
+        # Retries/backoff always; deadline and hedging only once the ETA model has a p95 for this prompt
+        self.policy = RetryPolicy.from_prediction(p95_s, timeout)
+        self.call_stats = CallStats()
+        self._cancel = threading.Event()
+        self._throttle = DeltaThrottle(self.chunk.emit)
+    def cancel(self):
+        self._cancel.set()
+    def _attempt(self, messages: List[Dict[str, str]], attempt: Attempt) -> str:
+        # keep-alive connections shared by every worker; retrying is resilient_call's job, not the SDK's
+        client = client_pool().openai(self.api_key).with_options(max_retries=0)
+        sent = []
+        def on_delta(piece: str):
+            sent.append(piece); attempt.on_delta(piece)
+        try:
+            return stream_responses(client, on_delta, attempt.stop,
+                model=self.model,
+                input=messages,
+                timeout=attempt.timeout
+            )
+        except StreamCancelled:
+            raise
+        except Exception as e:
+            # Chat only when Responses is unsupported; 429/5xx go back to resilient_call's backoff, and a
+            # stream that broke midway would duplicate output
+            if sent or not endpoint_unsupported(e): raise
+            return stream_chat(client, on_delta, attempt.stop,
+                model=self.model,
+                messages=messages,
+                timeout=attempt.timeout
+            )
+    def _call(self, messages: List[Dict[str, str]]) -> str:
+        if not OPENAI_AVAILABLE: raise RuntimeError("OpenAI SDK not installed. pip install openai")
+        if not self.api_key: raise RuntimeError("OPENAI_API_KEY not set.")
+        self.call_stats = CallStats()
+        prompt_tokens = (len(self.sys_prompt) + len(self.user_prompt)) // 4
+        return resilient_call(lambda a: self._attempt(messages, a), self._throttle.push, self._cancel,
+                              self.policy, prompt_tokens, self.call_stats)
+    def _retry_info(self) -> Dict[str, Any]:
+        st = self.call_stats
+        return {"attempts": st.attempts, "wasted_tokens": st.wasted_tokens, "hedged": st.hedged, "latency": st.latency_s}
     def run(self):
         start = time.time()
         try:
-            if not OPENAI_AVAILABLE: raise RuntimeError("OpenAI SDK not installed. pip install openai")
-            if not self.api_key: raise RuntimeError("OPENAI_API_KEY not set.")
-            client = OpenAI(api_key=self.api_key)
-            out_text = ""
-            try:
-                resp = client.responses.create(
-                    model=self.model,
-                    input=[{"role":"system","content":self.sys_prompt},{"role":"user","content":self.user_prompt}],
-                    timeout=self.timeout
-                )
-                out_text = getattr(resp, "output_text", None) or ""
-                if not out_text:
-                    try: out_text = resp.output[0].content[0].text
-                    except Exception: out_text = ""
-            except Exception:
-                cc = client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role":"system","content":self.sys_prompt},{"role":"user","content":self.user_prompt}],
-                    timeout=self.timeout
-                )
-                out_text = cc.choices[0].message.content or ""
+            messages = [{"role":"system","content":self.sys_prompt},{"role":"user","content":self.user_prompt}]
+            out_text, cached = cached_call(_response_cache(), AI_CACHE_MODE, self.model, {"api": "responses"},
+                                           messages, lambda: self._call(messages))
+            if cached: self._throttle.push(out_text)
+            self._throttle.flush()
             if not out_text: raise RuntimeError("Model returned empty content.")
-            self.finished.emit({"ok": True, "bundle": out_text, "elapsed": time.time() - start})
+            self.finished.emit({"ok": True, "bundle": out_text, "elapsed": time.time() - start, "cached": cached,
+                                **self._retry_info()})
+        except StreamCancelled as e:
+            self._throttle.flush()
+            self.finished.emit({"ok": False, "cancelled": True, "bundle": e.partial, "error": "Cancelled",
+                                "elapsed": time.time() - start, **self._retry_info()})
         except Exception as e:
-            self.finished.emit({"ok": False, "error": str(e), "elapsed": time.time() - start})
+            n = self.call_stats.attempts
+            self.finished.emit({"ok": False, "error": str(e) + (f" (after {n} attempts)" if n > 1 else ""),
+                                "elapsed": time.time() - start, **self._retry_info()})
 
 # ---------- FS proxy ----------
+_TITLE_RX = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+
 class DescProxyModel(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent); self._titles: Dict[str, Tuple[int, str]] = {}
+    def _title_for(self, path: Path) -> str:
+        # Cheap regex read, cached by mtime: painting the tree must not parse every page with bs4
+        try: mtime = path.stat().st_mtime_ns
+        except OSError: return ""
+        hit = self._titles.get(str(path))
+        if hit and hit[0] == mtime: return hit[1]
+        try:
+            with path.open("r", encoding="utf-8", errors="ignore") as fh: head = fh.read(8192)
+            m = _TITLE_RX.search(head)
+            if not m: m = _TITLE_RX.search(path.read_text(encoding="utf-8", errors="ignore"))
+            title = html_lib.unescape(re.sub(r"<[^>]+>", "", m.group(1))).strip() if m else ""
+        except Exception: title = ""
+        self._titles[str(path)] = (mtime, title)
+        return title
     def filterAcceptsRow(self, source_row, source_parent):
         sm = self.sourceModel(); idx = sm.index(source_row, 0, source_parent)
         if not idx.isValid(): return False
@@ -291,15 +377,9 @@ class DescProxyModel(QSortFilterProxyModel):
         if not index.isValid(): return None
         if index.column() == 0: return super().data(index, role)
         if index.column() == 1 and role in (Qt.DisplayRole, Qt.ToolTipRole):
-            sidx = self.mapToSource(index.sibling(index.row(), 0)); path = Path(self.sourceModel().filePath(sidx))
-            try:
-                txt = path.read_text(encoding="utf-8", errors="ignore")
-                if BS4_AVAILABLE:
-                    soup = BeautifulSoup(txt, "html.parser")
-                    return (soup.title.string.strip() if soup.title and soup.title.string else "")
-                m = re.search(r"<title>(.*?)</title>", txt, re.I | re.S)
-                return (m.group(1).strip() if m else "")
-            except Exception: return ""
+            sidx = self.mapToSource(index.sibling(index.row(), 0))
+            if self.sourceModel().isDir(sidx): return ""
+            return self._title_for(Path(self.sourceModel().filePath(sidx)))
         if index.column() >= 2 and role == Qt.DisplayRole: return ""
         return super().data(index, role)
     def headerData(self, section, orientation, role=Qt.DisplayRole):
@@ -553,6 +633,7 @@ class CatalogWindow(QMainWindow):
         # AI timers
         self.ai_timer = QTimer(self); self.ai_timer.timeout.connect(self._tick_ai_ui)
         self._ai_start_ts: Optional[datetime.datetime] = None; self._ai_eta_sec: Optional[int] = None; self._ai_running = False
+        self._ai_stream_text = ""; self._ai_prev_html = ""
         self._ai_target: Optional[str] = None  # 'desc' | 'fmea' | 'test-dtp' | 'test-atp'
 
         # Seeds (dialog-managed)
@@ -580,13 +661,11 @@ class CatalogWindow(QMainWindow):
         tb.addSeparator()
         act_set_root = QAction("📁 Set Content Root…", self); act_set_root.triggered.connect(self.open_settings_dialog); tb.addAction(act_set_root)
 
-        # FS model + tree
+        # FS model + tree (the content root is attached once the event loop runs; see _attach_content_root)
         self.fs_model = QFileSystemModel(self); self.fs_model.setReadOnly(False)
-        self.fs_model.setRootPath(str(self.content_root))
         self.fs_model.setNameFilters(["*.html", "*.htm"]); self.fs_model.setNameFilterDisables(False)
         self.proxy = DescProxyModel(self); self.proxy.setSourceModel(self.fs_model)
         self.tree = QTreeView(self); self.tree.setModel(self.proxy)
-        self.tree.setRootIndex(self.proxy.mapFromSource(self.fs_model.index(str(self.content_root))))
         self.tree.setHeaderHidden(False); self.tree.setSortingEnabled(True); self.tree.sortByColumn(0, Qt.AscendingOrder)
         for col in range(2, self.proxy.columnCount(self.tree.rootIndex())): self.tree.setColumnHidden(col, True)
         self.tree.header().setSectionResizeMode(0, QHeaderView.ResizeToContents); self.tree.header().setSectionResizeMode(1, QHeaderView.Stretch)
@@ -685,9 +764,25 @@ class CatalogWindow(QMainWindow):
         self.apply_dark_styles(); apply_windows_dark_titlebar(self)
         self._set_dirty(False)
 
+        QTimer.singleShot(0, self._attach_content_root)
+
+    def _attach_content_root(self):
+        """Point the tree at the content root after the window is on screen."""
+        self.fs_model.setRootPath(str(self.content_root))
+        self.tree.setRootIndex(self.proxy.mapFromSource(self.fs_model.index(str(self.content_root))))
+        if minipcb_startup:
+            minipcb_startup.mark("content root attached")
+            self.fs_model.directoryLoaded.connect(self._startup_profile_done)
         if not BS4_AVAILABLE:
             self._info("BeautifulSoup not found", "Install with:\n\n  pip install beautifulsoup4")
 
+    def _startup_profile_done(self, _path: str):
+        self.fs_model.directoryLoaded.disconnect(self._startup_profile_done)
+        QApplication.processEvents()
+        minipcb_startup.mark("project tree populated")
+        minipcb_startup.report()
+        QApplication.quit()
+
     # --- Settings dialog ---
     def open_settings_dialog(self):
         settings = get_settings()
@@ -867,12 +962,14 @@ class CatalogWindow(QMainWindow):
         self.btn_desc_seed_edit.clicked.connect(self._open_desc_seed_dialog)
         self.btn_desc_generate = QPushButton("Generate")
         self.btn_desc_generate.clicked.connect(self._start_desc_ai)
+        self.btn_desc_cancel = QPushButton("Cancel"); self.btn_desc_cancel.clicked.connect(self._cancel_ai); self.btn_desc_cancel.hide()
 
         self.lbl_desc_ai = QLabel("AI: idle"); self.lbl_desc_ai.setStyleSheet("color:#C8E6C9;")
         self.pb_desc = QProgressBar(); self.pb_desc.setMaximum(0); self.pb_desc.setValue(0); self.pb_desc.hide()
 
         controls.addWidget(self.btn_desc_seed_edit)
         controls.addWidget(self.btn_desc_generate)
+        controls.addWidget(self.btn_desc_cancel)
         controls.addSpacing(12)
         controls.addWidget(self.lbl_desc_ai)
         controls.addStretch(1)
@@ -944,6 +1041,7 @@ class CatalogWindow(QMainWindow):
         # AI generation for FMEA table
         self.btn_fmea_generate = QPushButton("Generate FMEA with AI")
         self.btn_fmea_generate.clicked.connect(self._start_fmea_ai)
+        self.btn_fmea_cancel = QPushButton("Cancel"); self.btn_fmea_cancel.clicked.connect(self._cancel_ai); self.btn_fmea_cancel.hide()
         self.lbl_fmea_ai = QLabel("AI: idle"); self.lbl_fmea_ai.setStyleSheet("color:#C8E6C9;")
         self.pb_fmea = QProgressBar(); self.pb_fmea.setMaximum(0); self.pb_fmea.setValue(0); self.pb_fmea.hide()
 
@@ -952,6 +1050,7 @@ class CatalogWindow(QMainWindow):
         row_ai.addWidget(self.btn_seed_save_html)
         row_ai.addSpacing(16)
         row_ai.addWidget(self.btn_fmea_generate)
+        row_ai.addWidget(self.btn_fmea_cancel)
         row_ai.addSpacing(12)
         row_ai.addWidget(self.lbl_fmea_ai)
         row_ai.addStretch(1)
@@ -990,12 +1089,14 @@ class CatalogWindow(QMainWindow):
 
         self.btn_dtp_generate = QPushButton("Generate DTP")
         self.btn_dtp_generate.clicked.connect(lambda: self._start_test_ai("dtp"))
+        self.btn_dtp_cancel = QPushButton("Cancel"); self.btn_dtp_cancel.clicked.connect(self._cancel_ai); self.btn_dtp_cancel.hide()
 
         self.lbl_dtp_ai = QLabel("AI: idle"); self.lbl_dtp_ai.setStyleSheet("color:#C8E6C9;")
         self.pb_dtp = QProgressBar(); self.pb_dtp.setMaximum(0); self.pb_dtp.setValue(0); self.pb_dtp.hide()
 
         ctrl_dtp.addWidget(self.btn_dtp_seed)
         ctrl_dtp.addWidget(self.btn_dtp_generate)
+        ctrl_dtp.addWidget(self.btn_dtp_cancel)
         ctrl_dtp.addSpacing(12)
         ctrl_dtp.addWidget(self.lbl_dtp_ai)
         ctrl_dtp.addStretch(1)
@@ -1024,12 +1125,14 @@ class CatalogWindow(QMainWindow):
 
         self.btn_atp_generate = QPushButton("Generate ATP")
         self.btn_atp_generate.clicked.connect(lambda: self._start_test_ai("atp"))
+        self.btn_atp_cancel = QPushButton("Cancel"); self.btn_atp_cancel.clicked.connect(self._cancel_ai); self.btn_atp_cancel.hide()
 
         self.lbl_atp_ai = QLabel("AI: idle"); self.lbl_atp_ai.setStyleSheet("color:#C8E6C9;")
         self.pb_atp = QProgressBar(); self.pb_atp.setMaximum(0); self.pb_atp.setValue(0); self.pb_atp.hide()
 
         ctrl_atp.addWidget(self.btn_atp_seed)
         ctrl_atp.addWidget(self.btn_atp_generate)
+        ctrl_atp.addWidget(self.btn_atp_cancel)
         ctrl_atp.addSpacing(12)
         ctrl_atp.addWidget(self.lbl_atp_ai)
         ctrl_atp.addStretch(1)
@@ -1437,7 +1540,7 @@ class CatalogWindow(QMainWindow):
             src = self.lay_src.text().strip(); lbl = self.lay_preview
         path = self._resolve_img_path(src)
         if path and path.exists():
-            pm = QPixmap(str(path)); lbl.set_pixmap(pm if not pm.isNull() else None)
+            lbl.set_image_path(path, ImagePyramidCache.for_root(self.content_root))
         else:
             lbl.set_pixmap(None)
 
@@ -2658,40 +2761,92 @@ class CatalogWindow(QMainWindow):
         self._kick_ai(sys_prompt, user, target=f"test-{kind}")
 
     # ---------- AI orchestration (shared) ----------
+    def _ai_pane(self, target: str) -> Tuple[QTextEdit, QLabel, QProgressBar, QPushButton]:
+        """Output view, status label, spinner and cancel button for an AI target."""
+        return {
+            "desc": (self.desc_generated, self.lbl_desc_ai, self.pb_desc, self.btn_desc_cancel),
+            "fmea": (self.fmea_html, self.lbl_fmea_ai, self.pb_fmea, self.btn_fmea_cancel),
+            "dtp":  (self.dtp_generated, self.lbl_dtp_ai, self.pb_dtp, self.btn_dtp_cancel),
+            "atp":  (self.atp_generated, self.lbl_atp_ai, self.pb_atp, self.btn_atp_cancel),
+        }[target]
+
     def _kick_ai(self, sys_prompt: str, user_prompt: str, target: str):
-        self._ai_running = True; self._ai_start_ts = datetime.datetime.now(); self._ai_eta_sec = 75; self._ai_target = target
+        target = target[len("test-"):] if target.startswith("test-") else target   # "test-dtp" -> "dtp"
+        self._ai_prompt_text = sys_prompt + "\n" + user_prompt
+        eta_model = self._usage()[1]
+        eta = eta_model.predict(self.openai_model, len(self._ai_prompt_text) // 4)
+        p95 = eta_model.predict_p95(self.openai_model, len(self._ai_prompt_text) // 4)
+        self._ai_running = True; self._ai_start_ts = datetime.datetime.now(); self._ai_target = target
+        self._ai_eta_sec = int(round(eta)) if eta is not None else 75   # 75s until this root has latency history
 
         # show progress where appropriate
-        if target == "desc":
-            self.lbl_desc_ai.setText("AI: starting…"); self.pb_desc.show()
-        elif target == "fmea":
-            self.lbl_fmea_ai.setText("AI: starting…"); self.pb_fmea.show()
-        elif target == "test-dtp":
-            self.lbl_dtp_ai.setText("AI: starting…"); self.pb_dtp.show()
-        elif target == "test-atp":
-            self.lbl_atp_ai.setText("AI: starting…"); self.pb_atp.show()
+        view, lbl, pb, btn_cancel = self._ai_pane(target)
+        lbl.setText("AI: starting…"); pb.show(); btn_cancel.show()
+        self._ai_prev_html = view.toHtml(); self._ai_stream_text = ""
 
         self.ai_timer.start(250)
-        self._worker = BaseAIWorker(self.openai_key, self.openai_model, sys_prompt, user_prompt, timeout=240)
+        self._worker = BaseAIWorker(self.openai_key, self.openai_model, sys_prompt, user_prompt, timeout=240, p95_s=p95)
+        self._worker.chunk.connect(lambda text, tgt=target: self._on_ai_chunk(text, tgt))
         self._worker.finished.connect(lambda res, tgt=target: self._on_ai_finished(res, tgt))
         self._worker.start()
 
+    def _usage(self) -> Tuple[UsageLogger, EtaModel]:
+        """Usage log + ETA model for the current content root (the same files miniPCB Studio writes)."""
+        d = self.content_root / USAGE_DIR_NAME
+        if getattr(self, "_usage_dir", None) != d:
+            if getattr(self, "_usage_log", None): self._usage_log.close()
+            d.mkdir(exist_ok=True)
+            self._usage_log = UsageLogger(d / USAGE_DB_NAME, d / USAGE_JSONL_NAME)
+            self._usage_eta = EtaModel(d / USAGE_DB_NAME); self._usage_dir = d
+        return self._usage_log, self._usage_eta
+
+    def _cancel_ai(self):
+        w = getattr(self, "_worker", None)
+        if self._ai_running and w is not None and w.isRunning():
+            w.cancel()
+
+    def _on_ai_chunk(self, text: str, target: str):
+        # Render the partial answer as it arrives (HTML for desc/FMEA, Markdown source for test plans)
+        self._ai_stream_text += text
+        view = self._ai_pane(target)[0]
+        if target in ("dtp", "atp"): view.setPlainText(self._ai_stream_text)
+        else: view.setHtml(self._ai_stream_text)
+        view.moveCursor(QTextCursor.End); view.ensureCursorVisible()
+
     def _on_ai_finished(self, result: dict, target: str):
         elapsed = int(result.get("elapsed", 0))
         # keep ETA display consistent
-        self._update_ai_label(elapsed=elapsed, eta=self._ai_eta_sec, target=target if target in ("desc","fmea","dtp","atp") else "both", status="done")
-        self.ai_timer.stop(); self._ai_running = False
+        self._update_ai_label(elapsed=elapsed, eta=self._ai_eta_sec, target=target if target in ("desc","fmea","dtp","atp") else "both",
+                              status="cached" if result.get("cached") else "done")
+        self.ai_timer.stop(); self._ai_running = False; self._ai_stream_text = ""
 
         # Hide relevant spinners
-        if target == "desc": self.pb_desc.hide()
-        if target == "fmea": self.pb_fmea.hide()
-        if target == "dtp":  self.pb_dtp.hide()
-        if target == "atp":  self.pb_atp.hide()
+        view, lbl, pb, btn_cancel = self._ai_pane(target)
+        pb.hide(); btn_cancel.hide()
+        lbl.setToolTip(f"HTTP: {client_pool().summary()}")
 
+        if result.get("cancelled"):
+            view.setHtml(self._ai_prev_html)   # a cancelled draft never replaces the saved section
+            lbl.setText(f"AI: cancelled after {elapsed}s ({len(result.get('bundle') or '')} chars discarded)")
+            return
         if not result.get("ok", False):
+            view.setHtml(self._ai_prev_html)   # nor does the half-streamed draft of a failed call
+            if result.get("attempts"):
+                # Failed round-trips still cost tokens; keep them out of the ETA fit (not a "response")
+                self._usage()[0].log("failed", str(self.current_path or ""), result.get("error", ""), target,
+                                     self.openai_model, attempts=result["attempts"],
+                                     wasted_tokens=result.get("wasted_tokens"))
             self._error("AI Error", result.get("error","Unknown error")); return
 
         html = (result.get("bundle","") or "").strip()
+        if not result.get("cached"):
+            # Real API round-trips only: these rows are what the ETA model learns from
+            log, f = self._usage()[0], str(self.current_path or "")
+            latency = result.get("latency") or result.get("elapsed", 0)   # winning attempt, not the backoff waits
+            log.log("prompt", f, self._ai_prompt_text, target, self.openai_model)
+            log.log("response", f, html, target, self.openai_model, latency_ms=int(latency * 1000),
+                    prompt_tokens=len(self._ai_prompt_text) // 4, attempts=result.get("attempts"),
+                    wasted_tokens=result.get("wasted_tokens"))
 
         if target == "desc":
             clean_nodes = self._sanitize_ai_fragment(html, BeautifulSoup("<div></div>", "html.parser"))
@@ -2760,6 +2915,8 @@ class CatalogWindow(QMainWindow):
 
     def _set_ai_status_idle_all(self):
         self._ai_running = False; self._ai_start_ts = None; self._ai_eta_sec = None; self.ai_timer.stop()
+        for btn in ("btn_desc_cancel", "btn_fmea_cancel", "btn_dtp_cancel", "btn_atp_cancel"):
+            if hasattr(self, btn): getattr(self, btn).hide()
 
         # Description
         self.lbl_desc_ai.setText("AI: idle"); self.btn_desc_generate.setEnabled(True); self.pb_desc.hide()
@@ -2775,13 +2932,16 @@ class CatalogWindow(QMainWindow):
     def _tick_ai_ui(self):
         if not self._ai_running or not self._ai_start_ts: return
         elapsed = int((datetime.datetime.now() - self._ai_start_ts).total_seconds())
-        self._update_ai_label(elapsed=elapsed, eta=self._ai_eta_sec, target="both", status="running")
+        status = "streaming" if getattr(self, "_ai_stream_text", "") else "running"
+        self._update_ai_label(elapsed=elapsed, eta=self._ai_eta_sec, target="both", status=status)
 
     def _update_ai_label(self, elapsed: int, eta: Optional[int], target: str, status: str):
         def fmt(sec: Optional[int]) -> str:
             if sec is None: return "--:--"
             m, s = divmod(max(0, int(sec)), 60); return f"{m:02d}:{s:02d}"
         msg = f"AI: {fmt(elapsed)} / ETA ≈ {fmt(eta)}"
+        if status == "cached": msg += " · from cache"
+        if status == "streaming": msg = f"AI: {fmt(elapsed)} · streaming {len(self._ai_stream_text)} chars"
 
         # target can be 'desc', 'fmea', 'dtp', 'atp', or 'both' (broadcast)
         if target in ("desc","both") and hasattr(self, "lbl_desc_ai"):
@@ -3167,17 +3327,37 @@ class CatalogWindow(QMainWindow):
 class PreviewLabel(QLabel):
     def __init__(self, parent=None):
         super().__init__(parent); self._pix: Optional[QPixmap] = None
+        self._src: Optional[str] = None; self._cache: Optional[ImagePyramidCache] = None; self._level_w = 0
         self.setMinimumHeight(220); self.setAlignment(Qt.AlignCenter); self.setText("(no image)")
         self.setStyleSheet("QLabel { border:1px solid #3A3F44; border-radius:6px; padding:6px; }")
     def set_pixmap(self, pix: Optional[QPixmap]):
+        self._src = None; self._cache = None
         self._pix = pix; self._render()
+    def set_image_path(self, path: Optional[Path], cache: ImagePyramidCache):
+        """Show `path` via the thumbnail pyramid: only a level that covers the label is decoded."""
+        self._src = str(path) if path else None; self._cache = cache
+        self._pix = None; self._level_w = 0; self._render()
     def resizeEvent(self, e):
         super().resizeEvent(e); self._render()
+    def _load_level(self, w: int, h: int):
+        # Reload only when the label outgrows the current level (never downgrade on shrink)
+        dpr = self.devicePixelRatioF()
+        tw, th = int(w * dpr), int(h * dpr)
+        if self._pix is not None and not self._pix.isNull() and (self._level_w >= tw or self._pix.height() >= th):
+            return
+        img, _, info = self._cache.load(self._src, tw, th)
+        if img.isNull() or (self._pix is not None and img.width() <= self._level_w):
+            return
+        self._pix = QPixmap.fromImage(img); self._level_w = img.width()
     def _render(self):
+        w = max(64, self.width() - 12); h = max(64, self.height() - 12)
+        if self._src and self._cache is not None:
+            self._load_level(w, h)
         if not self._pix or self._pix.isNull():
             self.setText("(no image)"); self.setPixmap(QPixmap()); return
-        w = max(64, self.width() - 12); h = max(64, self.height() - 12)
-        scaled = self._pix.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        dpr = self.devicePixelRatioF()
+        scaled = self._pix.scaled(int(w * dpr), int(h * dpr), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        scaled.setDevicePixelRatio(dpr)
         self.setPixmap(scaled); self.setText("")
 
 # ---------- Boot ----------
@@ -3187,10 +3367,12 @@ def ensure_content_root() -> Path:
     root = default_content_root(); root.mkdir(parents=True, exist_ok=True); return root
 
 def main():
-    app = QApplication(sys.argv); app.setStyle(QStyleFactory.create("Fusion"))
+    app = QApplication(minipcb_startup.strip_flag() if minipcb_startup else sys.argv); app.setStyle(QStyleFactory.create("Fusion"))
+    if minipcb_startup: minipcb_startup.mark("QApplication created")
     icon = make_emoji_icon("💠", px=220); app.setWindowIcon(icon)
     root = ensure_content_root()
     win = CatalogWindow(root, icon); win.show(); apply_windows_dark_titlebar(win)
+    if minipcb_startup: minipcb_startup.mark("main window shown")
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
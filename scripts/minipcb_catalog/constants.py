@@ -38,6 +38,11 @@ IGNORE_GLOBS: Final[tuple[str, ...]] = (
     "**/.minipcb/**",   # runtime analytics / cache
 )
 
+# Persistent scan index (relative to the project root). Entries are reused
+# across sessions and a page is re-read only when its mtime/size change.
+INDEX_CACHE_PATH: Final[str] = ".minipcb/index_cache.json"
+INDEX_CACHE_VERSION: Final[int] = 1
+
 # Files matching this pattern should have all tabs disabled except Review
 # (Your prior rule: catlog_* pages are review-only)
 CATLOG_REVIEW_ONLY: Final[re.Pattern[str]] = re.compile(r"^catlog_", re.IGNORECASE)
@@ -137,6 +142,12 @@ RECENT_EDIT_DAYS: Final[int] = 90
 YEAR_RE: Final[re.Pattern[str]] = re.compile(r"(?:19|20)\d{2}")
 RANGE_SEP_CLASS: Final[str] = r"(?:\u2013|-|—|-)"  # en/em dashes and hyphen
 
+# ---- AI generation ---------------------------------------------------------
+
+AI_DEFAULT_MODEL: Final[str] = "gpt-4o-mini"     # overridden by $OPENAI_MODEL
+AI_TIMEOUT_S: Final[int] = 240
+AI_STREAM_EMIT_INTERVAL_S: Final[float] = 0.1    # min gap between streamed UI updates
+
 # ---- Defaults / settings scaffold -----------------------------------------
 
 DEFAULT_AUTOSAVE_SECONDS: Final[int] = 60
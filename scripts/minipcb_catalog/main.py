@@ -2,7 +2,7 @@
 """
 Entry point for the miniPCB Catalog (website editor).
 
-- Parses CLI flags (root, images-root, autosave, log level)
+- Parses CLI flags (root, images-root, autosave, log level, --no-cache / --refresh)
 - Builds AppContext (paths, logger, bus)
 - Loads/applies settings (SettingsService)
 - Applies dark theme + dark Windows titlebar (best-effort)
@@ -24,6 +24,7 @@ from .services.settings_service import SettingsService
 from .utils.win_dark_titlebar import enable_dark_titlebar
 from . import constants
 from .ui.main_window import MainWindow  # type: ignore
+from ..minipcb_ai import add_cache_args, cache_mode_from_args
 
 
 def _parse_args(argv: list[str]) -> argparse.Namespace:
@@ -37,6 +38,7 @@ def _parse_args(argv: list[str]) -> argparse.Namespace:
     p.add_argument("--log-level", type=str, default="INFO",
                    choices=["DEBUG", "INFO", "WARNING", "ERROR"],
                    help="Console log level.")
+    add_cache_args(p)
     return p.parse_args(argv)
 
 
@@ -84,6 +86,7 @@ def main(argv: list[str] | None = None) -> int:
 
     # Create and show the main window
     win = MainWindow(ctx=ctx, autosave_seconds=autosave_s)
+    win.ai.cache_mode = cache_mode_from_args(args)
     win.show()
 
     # Best-effort dark titlebar on Windows (no-op elsewhere)
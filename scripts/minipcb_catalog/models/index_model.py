@@ -4,12 +4,41 @@ Index model for miniPCB Catalog — stores scan results for the Explorer.
 
 - IndexItem: one HTML page with derived PN/Rev/Title/Status
 - IndexModel: a simple container with helpers for filtering/grouping
+
+Search keys (lowercased fields, a trigram inverted index and fuzzy PN keys)
+are built lazily on the first filter() and dropped whenever items change, so
+typing in the Explorer does not re-lowercase every item per keystroke.
 """
 
 from __future__ import annotations
+from bisect import bisect_left
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Iterable
+import re
+from typing import List, Dict, Iterable, Optional, Set, Tuple
+
+# Field order inside a search key; lower index ranks higher
+_KEY_FIELDS = ("pn", "rev", "title", "status", "relpath")
+_SEP = "\x1f"
+_PN_TOKEN_RX = re.compile(r"\d+|[a-z]+")
+_PN_TOKEN_SEP = "."
+
+
+def fuzzy_pn_key(text: str) -> str:
+    """
+    Loose PN form: the digit and letter groups as whole tokens, numbers
+    compared by value, so "04B-005", "4b-5" and "04b5" all become "4.b.5"
+    while "04B-050" stays "4.b.50".
+    """
+    return _PN_TOKEN_SEP.join(str(int(g)) if g.isdigit() else g for g in _PN_TOKEN_RX.findall(text.lower()))
+
+
+@dataclass(slots=True)
+class _SearchIndex:
+    keys: List[str]                          # per item: fields joined by _SEP
+    bounds: List[Tuple[int, ...]]            # per item: start offset of each field in its key
+    trigrams: Dict[str, Set[int]]            # trigram -> item positions
+    pn_keys: List[Tuple[str, int]]           # sorted (fuzzy PN key + separator, item position)
 
 
 @dataclass(slots=True)
@@ -25,21 +54,101 @@ class IndexItem:
 @dataclass(slots=True)
 class IndexModel:
     items: List[IndexItem] = field(default_factory=list)
+    _search: Optional[_SearchIndex] = field(default=None, init=False, repr=False, compare=False)
 
     def __len__(self) -> int:
         return len(self.items)
 
     def filter(self, text: str) -> "IndexModel":
+        """Items matching `text`, best matches first (see search())."""
         t = text.lower().strip()
         if not t:
             return IndexModel(self.items.copy())
-        out = [it for it in self.items
-               if t in it.pn.lower()
-               or t in it.rev.lower()
-               or t in it.title.lower()
-               or t in it.status.lower()
-               or t in it.relpath.lower()]
-        return IndexModel(out)
+        return IndexModel(self.search(t))
+
+    def search(self, text: str) -> List[IndexItem]:
+        """
+        Ranked substring search over PN/Rev/Title/Status/Path, plus fuzzy PN
+        matching ("04b5" finds "04B-005"). Queries of 3+ characters only visit
+        items sharing all of the query's trigrams.
+
+        Rank: exact PN, PN prefix, fuzzy PN (every token equal), then PNs
+        whose leading tokens equal the query's ("4b" finds 04B-*) level with a
+        PN containing the query, then by the first other field that contains
+        the query (Rev, Title, Status, Path) with word-start hits first. Ties
+        keep the model's (pn, rev) order.
+        """
+        t = text.lower().strip()
+        if not t:
+            return self.items.copy()
+        idx = self._index()
+
+        if len(t) >= 3:
+            cands: Optional[Set[int]] = None
+            for tg in sorted({t[i:i+3] for i in range(len(t) - 2)}, key=lambda g: len(idx.trigrams.get(g, ()))):
+                post = idx.trigrams.get(tg)
+                if not post:
+                    cands = set(); break
+                cands = set(post) if cands is None else cands & post
+                if not cands: break
+            positions: Iterable[int] = cands or ()
+        else:
+            positions = range(len(self.items))
+
+        ranked: Dict[int, Tuple[int, int]] = {}
+        for i in positions:
+            key = idx.keys[i]
+            at = key.find(t)
+            if at < 0:
+                continue
+            bounds = idx.bounds[i]
+            f = 0
+            while f + 1 < len(bounds) and bounds[f + 1] <= at:
+                f += 1
+            word_start = at == bounds[f] or not key[at - 1].isalnum()
+            if f == 0:
+                pn = self.items[i].pn.lower()
+                rank = 0 if pn == t else 1 if at == 0 else 3
+            else:
+                rank = 3 + 2 * f + (0 if word_start else 1)
+            ranked[i] = (rank, i)
+
+        fk = fuzzy_pn_key(t) + _PN_TOKEN_SEP if any(c.isdigit() for c in t) else ""
+        if fk:
+            # Keys end in the separator, so a prefix match is on whole tokens: "4.b.5." never matches "4.b.50."
+            j = bisect_left(idx.pn_keys, (fk, -1))
+            while j < len(idx.pn_keys) and idx.pn_keys[j][0].startswith(fk):
+                key, i = idx.pn_keys[j]
+                rank = 2 if key == fk else 3
+                if i not in ranked or ranked[i][0] > rank:
+                    ranked[i] = (rank, i)
+                j += 1
+
+        return [self.items[i] for _, i in sorted(ranked.values())]
+
+    def _index(self) -> _SearchIndex:
+        if self._search is None:
+            keys: List[str] = []; bounds: List[Tuple[int, ...]] = []
+            trigrams: Dict[str, Set[int]] = {}
+            pn_keys: List[Tuple[str, int]] = []
+            for i, it in enumerate(self.items):
+                parts = [getattr(it, f).lower() for f in _KEY_FIELDS]
+                starts, off = [], 0
+                for part in parts:
+                    starts.append(off); off += len(part) + 1
+                key = _SEP.join(parts)
+                keys.append(key); bounds.append(tuple(starts))
+                for part in parts:
+                    for k in range(len(part) - 2):
+                        trigrams.setdefault(part[k:k+3], set()).add(i)
+                if it.pn:
+                    pn_keys.append((fuzzy_pn_key(it.pn) + _PN_TOKEN_SEP, i))
+            pn_keys.sort()
+            self._search = _SearchIndex(keys, bounds, trigrams, pn_keys)
+        return self._search
+
+    def _invalidate(self) -> None:
+        self._search = None
 
     def group_by_pn(self) -> Dict[str, List[IndexItem]]:
         g: Dict[str, List[IndexItem]] = {}
@@ -51,9 +160,37 @@ class IndexModel:
 
     def add(self, item: IndexItem) -> None:
         self.items.append(item)
+        self._invalidate()
 
     def extend(self, items: Iterable[IndexItem]) -> None:
         self.items.extend(items)
+        self._invalidate()
+
+    def upsert(self, items: Iterable[IndexItem]) -> int:
+        """Insert or replace items by path; returns how many were new."""
+        pos = {it.path: i for i, it in enumerate(self.items)}
+        added = 0
+        for item in items:
+            i = pos.get(item.path)
+            if i is None:
+                pos[item.path] = len(self.items)
+                self.items.append(item)
+                added += 1
+            else:
+                self.items[i] = item
+        self._invalidate()
+        return added
+
+    def remove(self, paths: Iterable[Path]) -> int:
+        """Drop items whose path is in `paths`; returns how many were removed."""
+        drop = set(paths)
+        if not drop:
+            return 0
+        before = len(self.items)
+        self.items = [it for it in self.items if it.path not in drop]
+        self._invalidate()
+        return before - len(self.items)
 
     def sort(self) -> None:
         self.items.sort(key=lambda it: (it.pn, it.rev))
+        self._invalidate()
@@ -0,0 +1,227 @@
+# minipcb_catalog/services/ai_service.py
+"""
+AIService — streamed model calls for the Description / FMEA / DTP / ATP generators.
+
+- Each request runs in its own GenerationWorker (QThread). Text deltas are
+  coalesced by minipcb_ai.DeltaThrottle and emitted through `chunk` at most
+  every constants.AI_STREAM_EMIT_INTERVAL_S seconds, so the editor shows output
+  as it arrives without flooding the GUI thread.
+- Streaming uses the shared minipcb_ai helpers: stream_responses with the
+  OpenAI SDK, falling back to stream_chat only when the endpoint is
+  unsupported (endpoint_unsupported); without the SDK, stream_sse_post on the
+  pool's requests session. A failed stream raises the server's own message.
+- Each call runs under minipcb_resilience.resilient_call: transient errors
+  (429, 5xx, dropped connections) are retried with backoff while nothing has
+  been streamed yet.
+- Clients come from minipcb_ai.client_pool(), the same process-wide keep-alive
+  pool the other GUIs and batch tools use, and answers go through its shared
+  response cache (--no-cache / --refresh, see main.py). minipcb_ai and
+  minipcb_usage import only the stdlib, so PyQt5 stays the only hard dependency;
+  generating needs openai or requests.
+- Finished API calls are logged to <root>/.minipcb_ai/ai_usage.{db,jsonl}
+  (minipcb_usage), with the pool's connection counters, like miniPCB Studio.
+- estimate_seconds() asks minipcb_eta.EtaModel, fitted on that usage history,
+  for a latency prediction (None until there is enough of it); its p95 sets
+  the retry deadlines and hedging, as in the other GUIs.
+- cancel() stops the stream (or the backoff wait) at the next chunk;
+  `finished` then carries a GenerationResult with cancelled=True and the
+  partial text.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import datetime
+import importlib.util
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from ..app import AppContext
+from .. import constants
+# The package runs as scripts.minipcb_catalog, so the shared AI plumbing is one level up
+from ...minipcb_ai import (CACHE_USE, DeltaThrottle, ResponseCache, StreamCancelled, cached_call, client_pool,
+                           endpoint_unsupported, resolve_base_url, stream_chat, stream_responses, stream_sse_post)
+from ...minipcb_eta import EtaModel
+from ...minipcb_resilience import Attempt, CallStats, RetryPolicy, resilient_call
+from ...minipcb_usage import USAGE_DB_NAME, USAGE_DIR_NAME, USAGE_JSONL_NAME, UsageLogger
+
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+REQUESTS_AVAILABLE = importlib.util.find_spec("requests") is not None
+
+_cache: Optional[ResponseCache] = None
+
+
+def response_cache() -> ResponseCache:
+    """The response cache shared by every worker (opened on first use)."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+
+@dataclass(slots=True)
+class GenerationResult:
+    ok: bool
+    text: str = ""
+    error: str = ""
+    elapsed: float = 0.0
+    cancelled: bool = False
+    cached: bool = False
+    attempts: int = 0               # requests sent, retries and hedges included
+    wasted_tokens: int = 0          # spent on attempts that were thrown away
+    latency: Optional[float] = None  # the winning attempt alone
+
+
+class GenerationWorker(QThread):
+    chunk = pyqtSignal(str)         # text received since the previous emit
+    finished = pyqtSignal(object)   # GenerationResult
+
+    def __init__(self, api_key: str, model: str, sys_prompt: str, user_prompt: str,
+                 timeout: int = constants.AI_TIMEOUT_S, cache_mode: str = CACHE_USE, p95_s: Optional[float] = None):
+        super().__init__()
+        self.api_key = api_key
+        self.model = model
+        self.cache_mode = cache_mode
+        self.messages = [{"role": "system", "content": sys_prompt}, {"role": "user", "content": user_prompt}]
+        self.prompt_tokens = (len(sys_prompt) + len(user_prompt)) // 4
+        # Retries with backoff always; deadlines and hedging only once the ETA model has a p95 for this prompt
+        self.policy = RetryPolicy.from_prediction(p95_s, timeout)
+        self.call_stats = CallStats()
+        self._cancel = threading.Event()
+        self._throttle = DeltaThrottle(self.chunk.emit, constants.AI_STREAM_EMIT_INTERVAL_S)
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def run(self) -> None:
+        start = time.monotonic()
+        try:
+            text, cached = cached_call(response_cache(), self.cache_mode, self.model, {"api": "responses"},
+                                       self.messages, self._call)
+            if cached:
+                self._throttle.push(text)
+            self._throttle.flush()
+            if not text.strip():
+                raise RuntimeError("Model returned empty content.")
+            res = GenerationResult(ok=True, text=text, cached=cached)
+        except StreamCancelled as e:
+            self._throttle.flush()
+            res = GenerationResult(ok=False, text=e.partial, error="Cancelled", cancelled=True)
+        except Exception as e:
+            n = self.call_stats.attempts
+            res = GenerationResult(ok=False, error=str(e) + (f" (after {n} attempts)" if n > 1 else ""))
+        res.elapsed = time.monotonic() - start
+        st = self.call_stats
+        res.attempts, res.wasted_tokens, res.latency = st.attempts, st.wasted_tokens, st.latency_s
+        self.finished.emit(res)
+
+    # ---- internals ----
+
+    def _call(self) -> str:
+        """One generation under the retry policy (only reached on a cache miss)."""
+        self.call_stats = CallStats()
+        return resilient_call(self._attempt, self._throttle.push, self._cancel, self.policy,
+                              self.prompt_tokens, self.call_stats)
+
+    def _attempt(self, attempt: Attempt) -> str:
+        if not OPENAI_AVAILABLE:
+            base = resolve_base_url()
+            headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+            return stream_sse_post(client_pool().session(base), base + "/chat/completions", headers,
+                                   {"model": self.model, "messages": self.messages},
+                                   attempt.on_delta, attempt.stop, timeout=attempt.timeout)
+        # Retrying is resilient_call's job, not the SDK's
+        client = client_pool().openai(self.api_key).with_options(max_retries=0)
+        sent: List[str] = []
+
+        def on_delta(piece: str) -> None:
+            sent.append(piece)
+            attempt.on_delta(piece)
+
+        try:
+            return stream_responses(client, on_delta, attempt.stop, model=self.model, input=self.messages,
+                                    timeout=attempt.timeout)
+        except StreamCancelled:
+            raise
+        except Exception as e:
+            if sent or not endpoint_unsupported(e):
+                raise       # broke midway, or auth / rate limit / server error: Chat would fail or bill again
+        return stream_chat(client, on_delta, attempt.stop, model=self.model, messages=self.messages,
+                           timeout=attempt.timeout)
+
+
+class AIService(QObject):
+    def __init__(self, ctx: AppContext):
+        super().__init__()
+        self.ctx = ctx
+        self._workers: Set[GenerationWorker] = set()   # keep running threads referenced
+        self.eta = EtaModel(ctx.root / USAGE_DIR_NAME / USAGE_DB_NAME)
+        self.cache_mode = CACHE_USE                     # main.py applies --no-cache / --refresh
+        self._usage: Optional[UsageLogger] = None
+        self._conn_seen: Dict[str, Dict[str, int]] = {}   # pool counters already logged, per base URL
+
+    @property
+    def api_key(self) -> str:
+        return os.environ.get("OPENAI_API_KEY", "").strip()
+
+    @property
+    def model(self) -> str:
+        return os.environ.get("OPENAI_MODEL", "").strip() or constants.AI_DEFAULT_MODEL
+
+    def available(self) -> Optional[str]:
+        """None when generation can run, else a short reason for the UI."""
+        if not self.api_key:
+            return "OPENAI_API_KEY not set"
+        if not (OPENAI_AVAILABLE or REQUESTS_AVAILABLE):
+            return "install openai (or requests)"
+        return None
+
+    def estimate_seconds(self, sys_prompt: str, user_prompt: str) -> Optional[float]:
+        return self.eta.predict(self.model, (len(sys_prompt) + len(user_prompt)) // 4)
+
+    @property
+    def usage(self) -> UsageLogger:
+        """Usage log for the project root (the same files miniPCB Studio writes)."""
+        if self._usage is None:
+            d = self.ctx.root / USAGE_DIR_NAME
+            self._usage = UsageLogger(d / USAGE_DB_NAME, d / USAGE_JSONL_NAME)
+        return self._usage
+
+    def generate(self, sys_prompt: str, user_prompt: str, file: str = "", section: str = "") -> GenerationWorker:
+        """Create (not start) a worker; connect chunk/finished, then call start()."""
+        p95 = self.eta.predict_p95(self.model, (len(sys_prompt) + len(user_prompt)) // 4)
+        w = GenerationWorker(self.api_key, self.model, sys_prompt, user_prompt, cache_mode=self.cache_mode, p95_s=p95)
+        self._workers.add(w)
+        w.finished.connect(lambda res, w=w: self._on_finished(w, res, file, section))
+        return w
+
+    def _on_finished(self, w: GenerationWorker, res: GenerationResult, file: str, section: str) -> None:
+        self._workers.discard(w)
+        if res.cached or res.cancelled:
+            return
+        prompt = "\n\n".join(m["content"] for m in w.messages)
+        if res.ok:
+            # Real API round-trips only: these rows are what the ETA model learns from
+            self.usage.log("prompt", file, prompt, section, w.model)
+            self.usage.log("response", file, res.text, section, w.model,
+                           latency_ms=int((res.latency or res.elapsed) * 1000), prompt_tokens=w.prompt_tokens,
+                           attempts=res.attempts, wasted_tokens=res.wasted_tokens)
+        elif res.attempts:
+            # Failed round-trips still cost tokens; "failed" rows stay out of the ETA fit
+            self.usage.log("failed", file, res.error, section, w.model, attempts=res.attempts,
+                           wasted_tokens=res.wasted_tokens)
+        self._log_connections()
+
+    def _log_connections(self) -> None:
+        """Append the keep-alive counters accrued since the last call to the usage JSONL."""
+        for base, ent in client_pool().stats().items():
+            last = self._conn_seen.get(base, {})
+            delta = {k: v - last.get(k, 0) for k, v in ent.items()}
+            self._conn_seen[base] = dict(ent)
+            if delta.get("requests"):
+                self.usage.log_record({"ts": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                       "direction": "connections", "base_url": base, **delta})
@@ -8,14 +8,22 @@ Filename conventions supported (tweak as needed):
 If parsing fails, PN/Rev fall back to "" and "".
 
 Title and status are read from the document DOM using lightweight regex.
+
+Scanning is a single os.scandir walk: directories named by IGNORE_GLOBS
+("**/<dir>/**") are pruned before descending, and both HTML_GLOBS suffixes are
+collected in the same pass. Results persist in constants.INDEX_CACHE_PATH keyed
+by mtime/size, so reopening a project only re-reads pages that changed.
 """
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from pathlib import Path
-import re
 import fnmatch
-from typing import List
+import json
+import os
+import re
+from typing import Dict, Iterator, Optional, Tuple
 
 from ..app import AppContext
 from .. import constants
@@ -30,55 +38,160 @@ STATUS_RX = re.compile(
 PN_REV_UNDERSCORE = re.compile(r"(?P<pn>\d{2}[A-Z]-\d{3})_(?P<rev>[A-Za-z0-9-]+)\.html?$")
 PN_REV_DASH      = re.compile(r"(?P<pn>\d{2}[A-Z]-\d{3})-(?P<rev>[A-Za-z0-9-]+)\.html?$")
 
+# "**/.git/**" -> prune any directory named ".git"; other patterns are matched per file
+_DIR_GLOB_RX = re.compile(r"^\*\*/([^*/?\[\]]+)/\*\*$")
+HTML_SUFFIXES = frozenset("." + g.rsplit(".", 1)[-1].lower() for g in constants.HTML_GLOBS)
+
+
+@dataclass(slots=True)
+class IndexDelta:
+    """What an incremental refresh changed in an IndexModel."""
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    reread: int = 0        # files whose contents had to be read (new or changed)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
 
 class IndexService:
     def __init__(self, ctx: AppContext):
         self.ctx = ctx
+        self._prune_dirs, self._file_globs = self._split_ignore_globs()
+        # relpath -> (mtime_ns, size, pn, rev, title, status)
+        self._entries: Dict[str, Tuple[int, int, str, str, str, str]] = {}
+        self._loaded = False
 
     def build_index(self) -> IndexModel:
-        root = self.ctx.root.resolve()
-        paths: List[Path] = []
+        """Full model for the project, reusing persisted entries for unchanged files."""
+        model = IndexModel()
+        self.refresh(model)
+        return model
 
-        # Recursive scan using the globs from constants (respect ignore globs)
-        for g in constants.HTML_GLOBS:
-            for p in root.rglob(g.replace("**/", "")):
-                if self._is_ignored(p, root):
-                    continue
-                if p.suffix.lower() not in {".html", ".htm"}:
+    def refresh(self, model: IndexModel) -> IndexDelta:
+        """
+        Walk the tree once and bring `model` up to date in place: only new or
+        modified pages are re-read, deleted pages are dropped.
+        """
+        root = self.ctx.root.resolve()
+        self._load_cache(root)
+        delta = IndexDelta()
+        seen: Dict[str, Tuple[int, int, str, str, str, str]] = {}
+        fresh: Dict[str, IndexItem] = {}
+
+        for rel, path, st in self._walk(root):
+            key = (st.st_mtime_ns, st.st_size)
+            ent = self._entries.get(rel)
+            if ent is None or ent[:2] != key:
+                ent = self._read_entry(path, key)
+                if ent is None:
                     continue
-                paths.append(p)
-
-        items: List[IndexItem] = []
-        for p in sorted(set(paths)):
-            try:
-                text = p.read_text(encoding="utf-8", errors="ignore")
-            except Exception:
-                continue
-            title = self._extract(TITLE_RX, text) or p.stem
-            status = self._extract(STATUS_RX, text)
-            pn, rev = self._pn_rev_from_name(p.name)
-            rel = str(p.resolve().relative_to(root))
-            items.append(IndexItem(
-                path=p.resolve(),
-                relpath=rel,
-                pn=pn,
-                rev=rev,
-                title=title,
-                status=status or "",
-            ))
-        model = IndexModel(items)
-        model.sort()
-        return model
+                delta.reread += 1
+                fresh[rel] = self._item(root, rel, ent)
+            seen[rel] = ent
+
+        known = {it.relpath for it in model.items}
+        missing = [self._item(root, rel, ent) for rel, ent in seen.items() if rel not in known and rel not in fresh]
+        gone = [root / rel for rel in known if rel not in seen]
+
+        changed = list(fresh.values()) + missing
+        delta.added = model.upsert(changed)
+        delta.updated = len(changed) - delta.added
+        delta.removed = model.remove(gone)
+        if delta.changed:
+            model.sort()
+
+        if delta.reread or len(seen) != len(self._entries):
+            self._entries = seen
+            self._save_cache(root)
+        return delta
 
     # ---- internals ----
 
-    def _is_ignored(self, p: Path, root: Path) -> bool:
-        rel = str(p.resolve().relative_to(root))
+    def _split_ignore_globs(self) -> Tuple[frozenset, Tuple[str, ...]]:
+        dirs, files = set(), []
         for pat in constants.IGNORE_GLOBS:
-            # adapt "**/x/**" style to fnmatch against posix path
-            if fnmatch.fnmatch(rel.replace("\\", "/"), pat.replace("**/", "").replace("**", "*")):
-                return True
-        return False
+            m = _DIR_GLOB_RX.match(pat)
+            if m:
+                dirs.add(m.group(1))
+            else:
+                # adapt "**/x" style to fnmatch against posix path
+                files.append(pat.replace("**/", "").replace("**", "*"))
+        return frozenset(dirs), tuple(files)
+
+    def _walk(self, root: Path) -> Iterator[Tuple[str, Path, os.stat_result]]:
+        """Yield (posix relpath, path, stat) for every HTML page under root, pruning ignored dirs."""
+        stack = [(str(root), "")]
+        while stack:
+            top, rel_top = stack.pop()
+            try:
+                it = os.scandir(top)
+            except OSError:
+                continue
+            with it:
+                for de in it:
+                    rel = f"{rel_top}{de.name}"
+                    try:
+                        if de.is_dir(follow_symlinks=False):
+                            if de.name not in self._prune_dirs:
+                                stack.append((de.path, rel + "/"))
+                            continue
+                        if os.path.splitext(de.name)[1].lower() not in HTML_SUFFIXES:
+                            continue
+                        if self._file_globs and any(fnmatch.fnmatch(rel, pat) for pat in self._file_globs):
+                            continue
+                        yield rel, Path(de.path), de.stat()
+                    except OSError:
+                        continue
+
+    def _read_entry(self, p: Path, key: Tuple[int, int]) -> Optional[Tuple[int, int, str, str, str, str]]:
+        try:
+            text = p.read_text(encoding="utf-8", errors="ignore")
+        except Exception:
+            return None
+        title = self._extract(TITLE_RX, text) or p.stem
+        status = self._extract(STATUS_RX, text)
+        pn, rev = self._pn_rev_from_name(p.name)
+        return (key[0], key[1], pn, rev, title, status or "")
+
+    def _item(self, root: Path, rel: str, ent: Tuple[int, int, str, str, str, str]) -> IndexItem:
+        return IndexItem(
+            path=root / rel,
+            relpath=rel,
+            pn=ent[2],
+            rev=ent[3],
+            title=ent[4],
+            status=ent[5],
+        )
+
+    def _cache_path(self, root: Path) -> Path:
+        return root / constants.INDEX_CACHE_PATH
+
+    def _load_cache(self, root: Path) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            data = json.loads(self._cache_path(root).read_text(encoding="utf-8"))
+        except Exception:
+            return
+        if data.get("version") != constants.INDEX_CACHE_VERSION or data.get("root") != str(root):
+            return
+        self._entries = {rel: tuple(ent) for rel, ent in (data.get("entries") or {}).items()
+                         if isinstance(ent, list) and len(ent) == 6}
+
+    def _save_cache(self, root: Path) -> None:
+        path = self._cache_path(root)
+        data = {"version": constants.INDEX_CACHE_VERSION, "root": str(root), "entries": self._entries}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+        except Exception as e:
+            self.ctx.logger.warning("Could not write index cache %s: %s", path, e)
 
     def _extract(self, rx: re.Pattern[str], text: str) -> str:
         m = rx.search(text)
@@ -1,16 +1,14 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional, List, Tuple, Dict, Any, Callable
+from typing import Optional, List, Tuple, Dict, Any
 import re
 import json
 import datetime
 import os
 
-from PyQt5 import QtCore  # or PyQt5/PySide6 — match your project’s existing imports
-
 from PyQt5.QtCore import Qt, QDir, QTimer, QPoint
-from PyQt5.QtGui import QCloseEvent, QPixmap
+from PyQt5.QtGui import QCloseEvent, QPixmap, QTextCursor
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QSplitter, QTreeView, QFileSystemModel, QFileDialog,
     QTabWidget, QPlainTextEdit, QTextEdit, QLineEdit, QLabel,
@@ -28,6 +26,7 @@ from ..services.html_service import HTMLService
 from ..services.image_service import ImageService
 from ..services.index_service import IndexService
 from ..services.template_service import TemplateService
+from ..services.ai_service import AIService, GenerationResult
 
 # Qt / stdlib imports go here …
 
@@ -93,6 +92,7 @@ class MainWindow(QMainWindow):
         self.images = ImageService(ctx)
         self.index = IndexService(ctx)
         self.templates = TemplateService(ctx)
+        self.ai = AIService(ctx)
 
         # State
         self.current_path: Optional[Path] = None
@@ -102,6 +102,8 @@ class MainWindow(QMainWindow):
         self.autosave_seconds = max(5, int(autosave_seconds))
         self._countdown = self.autosave_seconds
         self._last_context_index = None
+        # AI generation: kind ("desc"/"fmea"/"dtp"/"atp") -> running job state
+        self._ai_jobs: Dict[str, Dict[str, Any]] = {}
 
         # UI
         self._build_menu()
@@ -804,38 +806,6 @@ class MainWindow(QMainWindow):
         out = [r for r in out if any(r.values())]
         return out
 
-    def _run_countdown(self, label, seconds: int, on_done):
-        t = getattr(self, "_ai_countdown_timer", None)
-        if t:
-            try: t.stop()
-            except Exception: pass
-
-        self._ai_countdown_remaining = max(0, int(seconds))
-
-        if not getattr(self, "_ai_countdown_timer", None):
-            self._ai_countdown_timer = QtCore.QTimer(self)
-            self._ai_countdown_timer.setInterval(1000)
-            self._ai_countdown_timer.timeout.connect(
-                lambda: self._on_ai_countdown_tick(label, on_done)
-            )
-
-        try: label.setText(f"Generating… {self._ai_countdown_remaining}s")
-        except Exception: pass
-        self._ai_countdown_timer.start()
-
-    def _on_ai_countdown_tick(self, label, on_done):
-        self._ai_countdown_remaining -= 1
-        if self._ai_countdown_remaining > 0:
-            try: label.setText(f"Generating… {self._ai_countdown_remaining}s")
-            except Exception: pass
-            return
-        self._ai_countdown_timer.stop()
-        try: label.setText("Generating… done")
-        except Exception: pass
-        try: on_done()
-        except Exception:
-            import traceback; traceback.print_exc()
-
     # ---------- Compose helpers
     def _compose_details_html(self) -> str:
         return sections_utils.compose_details_html(self)
@@ -1136,67 +1106,143 @@ class MainWindow(QMainWindow):
         self._maybe_refresh_image_preview(self.subtabs.tabText(self.subtabs.currentIndex()))
         self._on_dirty(True)
 
-    # ---------- Generation helpers (simple ETA countdown + stub results)
-    def _estimate_eta_seconds(self, seed_text: str, bonus_chars: int = 0) -> int:
+    # ---------- Generation (streamed into the section editors)
+    def _estimate_eta_seconds(self, seed_text: str, bonus_chars: int = 0,
+                              predicted: Optional[float] = None) -> int:
+        # Latency fitted on this project's usage history when there is enough of it
+        if predicted is not None:
+            return max(2, int(round(predicted)))
         # Heuristic: 2s base + ~1s per 80 chars, capped 60s; favor seeds and current size
         count = len(seed_text or "")
         approx = 2 + (count + bonus_chars) // 80
         return max(2, min(int(approx), 60))
 
-    def _countdown(self, label: QLabel, secs: int, done_cb: Callable[[], None]):
-        label.setText(f"ETA: {secs}s")
-        timer = QTimer(self)
-        timer.setInterval(1000)
-        state = {"remaining": secs}
-        def _tick():
-            state["remaining"] -= 1
-            if state["remaining"] <= 0:
-                timer.stop()
-                label.setText("AI: done")
-                done_cb()
+    def _page_context(self) -> str:
+        return json.dumps({
+            "Page Title": self.meta_title.text().strip(),
+            "Part No": self.det_part.text().strip(),
+            "Title": self.det_title.text().strip(),
+            "Pieces per Panel": self.det_pieces.text().strip(),
+            "Panel Size": self.det_panel.text().strip(),
+        }, ensure_ascii=False)
+
+    def _ai_widgets(self, kind: str) -> Tuple[QPushButton, QLabel, QTextEdit]:
+        return {
+            "desc": (self.btn_gen_desc, self.lbl_desc_ai, self.txt_desc_generated),
+            "fmea": (self.btn_gen_fmea, self.lbl_fmea_ai, self.txt_fmea_html),
+            "dtp": (self.btn_gen_dtp, self.lbl_dtp_ai, self.txt_dtp_out),
+            "atp": (self.btn_gen_atp, self.lbl_atp_ai, self.txt_atp_out),
+        }[kind]
+
+    def _start_generation(self, kind: str, seed: str, sys_prompt: str, user_prompt: str):
+        """Start a streamed generation for `kind`, or cancel it if one is already running."""
+        job = self._ai_jobs.get(kind)
+        if job:
+            job["worker"].cancel()
+            self._ai_widgets(kind)[1].setText("AI: cancelling…")
+            return
+        btn, label, view = self._ai_widgets(kind)
+        reason = self.ai.available()
+        if reason:
+            label.setText(f"AI: {reason}"); return
+
+        worker = self.ai.generate(sys_prompt, user_prompt, str(self.current_path or ""), kind)
+        self._ai_jobs[kind] = {
+            "worker": worker, "text": "", "prev_html": view.toHtml(), "btn_text": btn.text(),
+            "started": datetime.datetime.now(),
+            "eta": self._estimate_eta_seconds(seed, bonus_chars=len(view.toPlainText()),
+                                              predicted=self.ai.estimate_seconds(sys_prompt, user_prompt)),
+        }
+        worker.chunk.connect(lambda text, k=kind: self._on_ai_chunk(k, text))
+        worker.finished.connect(lambda res, k=kind: self._on_ai_finished(k, res))
+        btn.setText("Cancel")
+        if not getattr(self, "_ai_tick_timer", None):
+            self._ai_tick_timer = QTimer(self)
+            self._ai_tick_timer.setInterval(500)
+            self._ai_tick_timer.timeout.connect(self._on_ai_tick)
+        self._ai_tick_timer.start()
+        self._on_ai_tick()
+        worker.start()
+
+    def _on_ai_tick(self):
+        now = datetime.datetime.now()
+        for kind, job in self._ai_jobs.items():
+            elapsed = int((now - job["started"]).total_seconds())
+            if job["text"]:
+                msg = f"AI: {elapsed}s · {len(job['text'])} chars"
+            else:
+                msg = f"AI: waiting {elapsed}s (ETA ~{max(0, job['eta'] - elapsed)}s)"
+            self._ai_widgets(kind)[1].setText(msg)
+        if not self._ai_jobs:
+            self._ai_tick_timer.stop()
+
+    def _on_ai_chunk(self, kind: str, text: str):
+        job = self._ai_jobs.get(kind)
+        if not job: return
+        job["text"] += text
+        view = self._ai_widgets(kind)[2]
+        # DTP/ATP come back as Markdown; show the source until it is complete.
+        # Signals are blocked so the draft neither marks the page dirty nor starts the autosave countdown.
+        view.blockSignals(True)
+        if kind in ("dtp", "atp"): view.setPlainText(job["text"])
+        else: view.setHtml(job["text"])
+        view.blockSignals(False)
+        view.moveCursor(QTextCursor.End); view.ensureCursorVisible()
+
+    def _on_ai_finished(self, kind: str, res: GenerationResult):
+        job = self._ai_jobs.pop(kind, None)
+        if not job: return
+        btn, label, view = self._ai_widgets(kind)
+        btn.setText(job["btn_text"])
+        if res.cancelled or not res.ok:
+            view.blockSignals(True)
+            view.setHtml(job["prev_html"])   # a cancelled or failed draft never replaces the section
+            view.blockSignals(False)
+            if res.cancelled:
+                label.setText(f"AI: cancelled ({int(res.elapsed)}s)")
             else:
-                label.setText(f"ETA: {state['remaining']}s")
-        timer.timeout.connect(_tick)
-        timer.start()
+                label.setText("AI: error")
+                self._set_status(f"AI error: {res.error}")
+        else:
+            text = res.text.strip()
+            if kind in ("dtp", "atp"): view.setMarkdown(text)
+            else: view.setHtml(text)
+            label.setText(f"AI: done ({int(res.elapsed)}s)")
+            self._on_dirty(True)
 
     def _gen_description(self):
         seed = self._seed_desc.toPlainText().strip()
-        eta = self._estimate_eta_seconds(seed, bonus_chars=len(self.txt_desc_generated.toPlainText()))
-        self.lbl_desc_ai.setText(f"ETA: {eta}s")
-        def _done():
-            # Simple stub content using seed; real system would call out to a model
-            if seed:
-                self.txt_desc_generated.append(f"<p><em>Seed-based expansion ({_now_stamp()}):</em> {seed}</p>")
-            else:
-                self.txt_desc_generated.append(f"<p><em>Auto-generated ({_now_stamp()}):</em> Midband gain, biasing, and bandwidth trade-offs are explained with typical values.</p>")
-            self._on_dirty(True)
-        self._run_countdown(self.lbl_desc_ai, eta, _done)
+        sys_prompt = ("You are an expert technical copywriter for a hardware mini PCB catalog.\n"
+                      "Write crisp, accurate, helpful product descriptions. Return ONLY an HTML fragment (p/ul/li/h3 ok), no inline styles.")
+        user = (f"PAGE CONTEXT:\n{self._page_context()}\n\nSEED:\n{seed}\n\n"
+                "TASK:\n• 2-4 short paragraphs + (optional) one bullet list (3-6 items).\n"
+                "• 180-260 words; neutral, technical; no marketing fluff.\n"
+                "• Output ONLY an HTML fragment; no <html>/<body>; no inline styles.")
+        self._start_generation("desc", seed, sys_prompt, user)
 
     def _gen_fmea(self):
         seed = self._seed_fmea.toPlainText().strip()
-        eta = self._estimate_eta_seconds(seed, bonus_chars=len(self.txt_fmea_html.toPlainText()))
-        self.lbl_fmea_ai.setText(f"ETA: {eta}s")
-        def _done():
-            base = "<h3>FMEA</h3>"
-            body = f"<p>{seed}</p>" if seed else "<p>Generated FMEA notes placeholder.</p>"
-            self.txt_fmea_html.append(base + body)
-            self._on_dirty(True)
-        self._countdown(self.lbl_fmea_ai, eta, _done)
+        sys_prompt = (
+            "You are an expert test engineer. Generate a compact HTML <table> (no inline styles) for an FMEA.\n"
+            "Headers: ID | Item | Failure Mode | Effect | Detection (TP#…) | Test ID | Severity | Occurrence | Detectability | RPN.\n"
+            "Use concise sentences; numeric S/O/D 1-10; compute RPN = S*O*D. No extra text around the table."
+        )
+        user = (f"DETAILS:\n{self._page_context()}\n\nSEED:\n{seed}\n\n"
+                "TASK:\nReturn ONLY a single <table> element with the specified header. Use class=\"fmea-table\".")
+        self._start_generation("fmea", seed, sys_prompt, user)
+
+    def _gen_test_plan(self, kind: str, seed: str):
+        sys_prompt = (
+            "You are a hardware test engineer. Produce a concise Markdown checklist of tests.\n"
+            "- Each test as a bullet: **Test ID** - short name: 1-line purpose; Steps: 2-5 compact steps; Expected: one line.\n"
+            "- Keep it crisp and hardware-focused; avoid tables and code unless essential.\n"
+            f"Context: Generate a {'Developmental' if kind == 'dtp' else 'Production-Automated'} Test Plan."
+        )
+        user = f"DETAILS:\n{self._page_context()}\n\nSEED/NOTES:\n{seed}\n\nReturn ONLY the Markdown bullet list."
+        self._start_generation(kind, seed, sys_prompt, user)
 
     def _gen_dtp(self):
-        seed = self._seed_dtp.toPlainText().strip()
-        eta = self._estimate_eta_seconds(seed, bonus_chars=len(self.txt_dtp_out.toPlainText()))
-        self.lbl_dtp_ai.setText(f"ETA: {eta}s")
-        def _done():
-            self.txt_dtp_out.append(f"<p><strong>Update {_now_stamp()}:</strong> {seed or 'Generated DTP steps placeholder.'}</p>")
-            self._on_dirty(True)
-        self._countdown(self.lbl_dtp_ai, eta, _done)
+        self._gen_test_plan("dtp", self._seed_dtp.toPlainText().strip())
 
     def _gen_atp(self):
-        seed = self._seed_atp.toPlainText().strip()
-        eta = self._estimate_eta_seconds(seed, bonus_chars=len(self.txt_atp_out.toPlainText()))
-        self.lbl_atp_ai.setText(f"ETA: {eta}s")
-        def _done():
-            self.txt_atp_out.append(f"<p><strong>Update {_now_stamp()}:</strong> {seed or 'Generated ATP outline placeholder.'}</p>")
-            self._on_dirty(True)
-        self._countdown(self.lbl_atp_ai, eta, _done)
+        self._gen_test_plan("atp", self._seed_atp.toPlainText().strip())
@@ -9,15 +9,19 @@ can embed this later and listen to its signals.
 
 from __future__ import annotations
 
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem
 
 from ...services.index_service import IndexService
 from ...app import AppContext
-from ...models.index_model import IndexModel
+from ...models.index_model import IndexModel, IndexItem
+
+# Rows added per event-loop turn while (re)filling the list
+POPULATE_CHUNK = 250
 
 
 class ExplorerTab(QWidget):
@@ -27,6 +31,9 @@ class ExplorerTab(QWidget):
         super().__init__()
         self.ctx = ctx
         self.index = IndexModel()
+        self._svc = IndexService(ctx)
+        self._fill_gen = 0                       # bumps on every refill; stale chunks stop
+        self._fill_iter: Optional[Iterator[IndexItem]] = None
 
         self.search = QLineEdit(placeholderText="Filter by PN / Rev / Title / Status / Path…")
         self.listw = QListWidget()
@@ -39,19 +46,34 @@ class ExplorerTab(QWidget):
         self.setLayout(lay)
 
     def rescan(self):
-        svc = IndexService(self.ctx)
-        self.index = svc.build_index()
-        self._populate(self.index)
+        # Incremental: only new/changed pages are re-read; the list is rebuilt only if something changed
+        delta = self._svc.refresh(self.index)
+        if delta.changed or not self.listw.count():
+            self._apply_filter(self.search.text())
 
     # ---- internals ----
 
     def _populate(self, model: IndexModel):
+        # Fill in chunks so typing stays responsive on large catalogs; a newer
+        # filter supersedes any chunks still queued from the previous one.
+        self._fill_gen += 1
         self.listw.clear()
-        for it in model.items:
+        self._fill_iter = iter(model.items)
+        self._fill_chunk(self._fill_gen)
+
+    def _fill_chunk(self, gen: int):
+        if gen != self._fill_gen or self._fill_iter is None:
+            return
+        batch = list(islice(self._fill_iter, POPULATE_CHUNK))
+        for it in batch:
             item = QListWidgetItem(f"{it.pn or '(no PN)'} {it.rev or ''} — {it.title}")
             item.setData(Qt.UserRole, str(it.path))
             item.setToolTip(it.relpath)
             self.listw.addItem(item)
+        if len(batch) == POPULATE_CHUNK:
+            QTimer.singleShot(0, lambda: self._fill_chunk(gen))
+        else:
+            self._fill_iter = None
 
     def _apply_filter(self, text: str):
         sub = self.index.filter(text)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_erc.py — electrical-rule checks over the netlist graph index.
+
+Used by taza_erc.py.
+
+- A rule is a function BoardView -> iterable of Finding, registered with
+  @rule(name, severity, description) into RULES. Extra rules live in any
+  Python file that imports this module and decorates functions the same way;
+  load_plugin(path) imports such a file (taza_erc.py --plugin).
+- BoardView is one board of minipcb_netgraph as local numpy arrays (pin ->
+  component, pin -> net, pins per net / component) plus its strings, so rules
+  are a few array operations each.
+- Built-in rules: single_pin_net, unconnected_pin, supply_short (two rails
+  joined directly or through zero-ohm parts / jumpers), duplicate_refdes,
+  tp_missing (rails and INPUT / OUTPUT nets without a TP*).
+- RULESET_VERSION goes into the cache key of taza_erc.py; bump it when a
+  built-in rule changes what it reports.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from minipcb_fmea import is_interface_net
+from minipcb_netgraph import SUPPLY_NET_RE, NetGraph, parse_value
+
+RULESET_VERSION = 2
+SEVERITIES = ("error", "warning", "info")
+TWO_TERMINAL_KINDS = {"R", "C", "L", "D", "LED", "F"}
+ZERO_OHM_KINDS = {"JP", "SJ", "W"}
+ZERO_OHM_VALUES = {"JUMPER", "WIRE", "BRIDGE", "SHORT"}
+GROUND_RE = re.compile(r'^(A|D|P)?GND\d*$', re.IGNORECASE)
+
+
+@dataclass
+class Finding:
+    rule: str
+    severity: str
+    message: str
+    refdes: List[str] = field(default_factory=list)
+    nets: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class Rule:
+    name: str
+    severity: str
+    description: str
+    check: Callable[["BoardView"], Iterable[Finding]]
+
+
+RULES: Dict[str, Rule] = {}
+
+
+def rule(name: str, severity: str = "warning", description: str = ""):
+    """Decorator: register `fn(board) -> findings` as rule `name` (a later registration replaces it)."""
+    if severity not in SEVERITIES:
+        raise ValueError(f"rule {name}: severity must be one of {SEVERITIES}")
+
+    def wrap(fn):
+        RULES[name] = Rule(name, severity, description or (fn.__doc__ or "").strip().split("\n")[0], fn)
+        return fn
+    return wrap
+
+
+def load_plugin(path: Path) -> List[str]:
+    """Import a rule file; returns the rule names it added or replaced."""
+    before = {n: r.check for n, r in RULES.items()}
+    spec = importlib.util.spec_from_file_location(f"minipcb_erc_plugin_{Path(path).stem}", path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"cannot import rules from {path}")
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    return [n for n, r in RULES.items() if before.get(n) is not r.check]
+
+
+@dataclass
+class BoardView:
+    key: str
+    refdes: List[str]               # per local component row
+    kind: List[str]
+    value: List[str]
+    nets: List[str]                 # per local net row
+    pin_comp: np.ndarray            # per pin: local component row
+    pin_net: np.ndarray             # per pin: local net row
+    net_pins: np.ndarray            # pins per net
+    comp_pins: np.ndarray           # connected pins per component
+
+    def finding(self, name: str, message: str, refdes: Iterable[str] = (), nets: Iterable[str] = ()) -> Finding:
+        return Finding(name, RULES[name].severity if name in RULES else "warning", message, list(refdes), list(nets))
+
+
+def board_view(g: NetGraph, b: int) -> BoardView:
+    c0, c1 = int(g.board_comp_ptr[b]), int(g.board_comp_ptr[b + 1])
+    n0, n1 = int(g.board_net_ptr[b]), int(g.board_net_ptr[b + 1])
+    p0, p1 = int(g.board_pin_ptr[b]), int(g.board_pin_ptr[b + 1])
+    pin_comp = (g.pin_comp[p0:p1] - c0).astype(np.int64)
+    pin_net = (g.pin_net[p0:p1] - n0).astype(np.int64)
+    return BoardView(g.board_keys[b], g.strings("refdes", g.comp_refdes[c0:c1]), g.strings("kind", g.comp_kind[c0:c1]),
+                     g.strings("value", g.comp_value[c0:c1]), g.strings("net", g.net_name[n0:n1]), pin_comp, pin_net,
+                     np.bincount(pin_net, minlength=n1 - n0), np.bincount(pin_comp, minlength=c1 - c0))
+
+
+def run_rules(view: BoardView, names: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Findings of the selected rules (default: all registered) as dicts; a crashing rule reports itself."""
+    out: List[Dict] = []
+    for name in (names or list(RULES)):
+        r = RULES[name]
+        try:
+            out.extend(f.to_dict() for f in r.check(view))
+        except Exception as e:
+            out.append(Finding(name, "error", f"rule crashed: {type(e).__name__}: {e}").to_dict())
+    return out
+
+
+# ---------- built-in rules ----------
+
+@rule("single_pin_net", "warning", "Net connects a single pin")
+def single_pin_net(v: BoardView) -> Iterable[Finding]:
+    for n in np.flatnonzero(v.net_pins == 1).tolist():
+        ref = v.refdes[v.pin_comp[v.pin_net == n][0]]
+        yield v.finding("single_pin_net", f"net {v.nets[n] or '(unnamed)'} only reaches {ref}", [ref], [v.nets[n]])
+
+
+@rule("unconnected_pin", "warning", "Component with no connected pins, or a two-terminal part with one")
+def unconnected_pin(v: BoardView) -> Iterable[Finding]:
+    blank = np.array([not n.strip() for n in v.nets], dtype=bool)
+    on_blank = np.zeros(len(v.refdes), dtype=bool)
+    if len(v.pin_net):
+        on_blank[v.pin_comp[blank[v.pin_net]]] = True
+    two = np.array([k in TWO_TERMINAL_KINDS for k in v.kind], dtype=bool)
+    for c in np.flatnonzero((v.comp_pins == 0) | (two & (v.comp_pins == 1)) | on_blank).tolist():
+        if v.comp_pins[c] == 0:
+            msg = f"{v.refdes[c]} has no connected pins"
+        elif on_blank[c]:
+            msg = f"{v.refdes[c]} has a pin on an unnamed net"
+        else:
+            msg = f"{v.refdes[c]} is a two-terminal part with 1 connected pin"
+        yield v.finding("unconnected_pin", msg, [v.refdes[c]])
+
+
+def is_zero_ohm(kind: str, value: str) -> bool:
+    return kind in ZERO_OHM_KINDS or value.strip().upper() in ZERO_OHM_VALUES or parse_value(value) == 0.0
+
+
+def bridging_parts(part_nets: Dict[int, Set[int]], rails: Set[int]) -> List[int]:
+    """
+    Zero-ohm parts on a path between rails: dangling branches (a non-rail net
+    reached by only one part, e.g. EMITTERS tied to GND) are pruned until none are left.
+    """
+    parts = {c: set(ns) for c, ns in part_nets.items() if len(ns) >= 2}
+    while True:
+        uses: Dict[int, int] = {}
+        for ns in parts.values():
+            for n in ns:
+                uses[n] = uses.get(n, 0) + 1
+        dead = {n for n, k in uses.items() if k < 2 and n not in rails}
+        if not dead:
+            return sorted(parts)
+        parts = {c: ns - dead for c, ns in parts.items() if len(ns - dead) >= 2}
+
+
+@rule("supply_short", "error", "Two supply rails joined directly or through zero-ohm parts / jumpers")
+def supply_short(v: BoardView) -> Iterable[Finding]:
+    n_net = len(v.nets)
+    zero = np.array([is_zero_ohm(k, val) for k, val in zip(v.kind, v.value)], dtype=bool)
+    label = np.arange(n_net)
+    part_nets: Dict[int, Set[int]] = {}
+    if zero.any() and len(v.pin_net):
+        on_zero = zero[v.pin_comp]
+        comp, net = v.pin_comp[on_zero], v.pin_net[on_zero]
+        while True:                             # nets joined through the same zero-ohm part share a label
+            low = np.full(len(v.refdes), n_net)
+            np.minimum.at(low, comp, label[net])
+            new = label.copy()
+            np.minimum.at(new, net, low[comp])
+            new = new[new]
+            if np.array_equal(new, label):
+                break
+            label = new
+        for c, n in zip(comp.tolist(), net.tolist()):
+            part_nets.setdefault(c, set()).add(n)
+    rails = [i for i, n in enumerate(v.nets) if SUPPLY_NET_RE.match(n)]
+    groups: Dict[int, List[int]] = {}
+    for i in rails:
+        groups.setdefault(int(label[i]), []).append(i)
+    for members in groups.values():
+        names = [v.nets[i] for i in members]
+        grounds = {n.upper() for n in names if GROUND_RE.match(n)}
+        if len(members) < 2 or len(grounds) == len(names):
+            continue                            # a lone rail, or only grounds tied together (AGND/GND)
+        g = label[members[0]]
+        in_group = {c: ns for c, ns in part_nets.items() if label[next(iter(ns))] == g}
+        via = sorted(v.refdes[c] for c in bridging_parts(in_group, set(members)))
+        yield v.finding("supply_short", f"{' = '.join(names)} joined through {', '.join(via) or 'zero parts'}", via, names)
+
+
+@rule("duplicate_refdes", "error", "The same refdes is used by more than one component")
+def duplicate_refdes(v: BoardView) -> Iterable[Finding]:
+    refs, counts = np.unique(np.array(v.refdes, dtype=np.str_), return_counts=True) if v.refdes else ([], [])
+    for ref, k in zip(refs, counts):
+        if k > 1:
+            yield v.finding("duplicate_refdes", f"{ref} appears {k} times", [str(ref)])
+
+
+def is_important_net(net: str) -> bool:
+    return bool(SUPPLY_NET_RE.match(net)) or is_interface_net(net)
+
+
+@rule("tp_missing", "warning", "Supply rail or INPUT / OUTPUT net without a TP*")
+def tp_missing(v: BoardView) -> Iterable[Finding]:
+    is_tp = np.array([k == "TP" for k in v.kind], dtype=bool)
+    has_tp = np.zeros(len(v.nets), dtype=bool)
+    if len(v.pin_net):
+        has_tp[v.pin_net[is_tp[v.pin_comp]]] = True
+    for n in np.flatnonzero(~has_tp & (v.net_pins > 0)).tolist():
+        if is_important_net(v.nets[n]):
+            yield v.finding("tp_missing", f"net {v.nets[n]} has no test point", nets=[v.nets[n]])
+
+
+__all__ = [
+    "RULESET_VERSION", "SEVERITIES", "Finding", "Rule", "RULES", "rule", "load_plugin", "BoardView", "board_view",
+    "run_rules", "is_zero_ohm", "bridging_parts", "is_important_net",
+]
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_eta.py — AI latency predictor fitted on the local usage database.
+
+Used by minipcb_studio.py, minipcb_catalog.py, the minipcb_catalog package
+(services/ai_service.py) and the batch tools
+(update_keywords_with_openai.py, gen_ai_overview.py).
+
+- Reads the response rows minipcb_usage writes to .minipcb_ai/ai_usage.db
+  (model, latency_ms, prompt_tokens, est_tokens = output tokens).
+- Per model, fits  latency_s ≈ a + b·prompt_ktok + c·output_ktok  by least
+  squares (NumPy). Only the 3×3 normal-equation sums are kept, so refresh()
+  folds in just the rows added since the last call.
+- Models with too little history borrow the fit pooled over every model;
+  with no usable history predict() returns None and callers keep their own
+  heuristic. Without NumPy a single seconds-per-token rate is used instead.
+- predict_p95() adds 1.645 residual standard deviations to the prediction
+  (the fit's residual sum of squares falls out of the same running sums);
+  minipcb_resilience uses it for request deadlines and hedging.
+
+Typical use:
+
+    eta = EtaModel(root / ".minipcb_ai" / "ai_usage.db")
+    secs = eta.predict("gpt-4o-mini", prompt_tokens=900)   # refreshes lazily
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+# NumPy is imported on the first fit, not at module import (keeps GUI start-up fast)
+_HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+MIN_SAMPLES = 4              # per-model rows before its own fit is trusted
+MIN_ETA_S = 1.0
+Z_P95 = 1.645
+NO_NUMPY_P95_FACTOR = 1.5    # rate-only fallback has no residuals; assume a fat upper tail
+REFRESH_EVERY_S = 30.0       # predict() re-reads the database at most this often
+POOLED = "*"
+
+
+class _Fit:
+    """Running sums for one model's least-squares fit."""
+    __slots__ = ("n", "xtx", "xty", "sum_out", "sum_tok", "sum_lat", "sum_lat2", "coef")
+
+    def __init__(self):
+        self.n = 0
+        if _HAS_NUMPY:
+            import numpy as np
+            self.xtx, self.xty = np.zeros((3, 3)), np.zeros(3)
+        else:
+            self.xtx = self.xty = None
+        self.sum_out = 0.0; self.sum_tok = 0.0; self.sum_lat = 0.0; self.sum_lat2 = 0.0
+        self.coef = None
+
+    def add(self, prompt_tok: float, out_tok: float, latency_s: float) -> None:
+        self.n += 1
+        self.sum_out += out_tok; self.sum_tok += prompt_tok + out_tok; self.sum_lat += latency_s
+        self.sum_lat2 += latency_s * latency_s
+        if _HAS_NUMPY:
+            import numpy as np
+            x = np.array([1.0, prompt_tok / 1000.0, out_tok / 1000.0])
+            self.xtx += np.outer(x, x); self.xty += x * latency_s
+        self.coef = None
+
+    def _solve(self):
+        import numpy as np
+        if self.coef is None:
+            # A whisker of ridge keeps the solve stable when every prompt is the same size
+            self.coef = np.linalg.lstsq(self.xtx + 1e-6 * np.eye(3), self.xty, rcond=None)[0]
+        return self.coef
+
+    def predict(self, prompt_tok: float, out_tok: float) -> float:
+        if not _HAS_NUMPY:
+            rate = self.sum_lat / self.sum_tok if self.sum_tok else 0.0
+            return rate * (prompt_tok + out_tok)
+        import numpy as np
+        return float(self._solve() @ np.array([1.0, prompt_tok / 1000.0, out_tok / 1000.0]))
+
+    def residual_sd(self) -> Optional[float]:
+        """Standard deviation of the fit's residuals (None without NumPy)."""
+        if not _HAS_NUMPY:
+            return None
+        # For least squares, SSE = y·y − coef·(Xᵀy)
+        sse = max(0.0, self.sum_lat2 - float(self._solve() @ self.xty))
+        return (sse / max(1, self.n - 3)) ** 0.5
+
+
+class EtaModel:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._fits: Dict[str, _Fit] = {}
+        self._last_id = 0
+        self._refreshed = 0.0
+
+    def refresh(self) -> int:
+        """Fold in response rows added since the last refresh; returns how many."""
+        self._refreshed = time.monotonic()
+        if not self.db_path.exists():
+            return 0
+        import sqlite3
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=5)
+        except sqlite3.Error:
+            return 0
+        try:
+            rows = conn.execute(
+                """SELECT id, COALESCE(model, ''), COALESCE(prompt_tokens, 0), COALESCE(est_tokens, 0), latency_ms
+                   FROM events WHERE id > ? AND direction = 'response' AND latency_ms > 0
+                   ORDER BY id ASC;""", (self._last_id,)).fetchall()
+        except sqlite3.Error:
+            return 0    # no events table yet, or a database from before latency logging
+        finally:
+            conn.close()
+        for rid, model, p_tok, o_tok, lat_ms in rows:
+            for key in (model, POOLED):
+                self._fits.setdefault(key, _Fit()).add(float(p_tok), float(o_tok), lat_ms / 1000.0)
+            self._last_id = rid
+        return len(rows)
+
+    def _maybe_refresh(self) -> None:
+        if time.monotonic() - self._refreshed >= REFRESH_EVERY_S:
+            self.refresh()
+
+    def _fit_for(self, model: str) -> Optional[_Fit]:
+        fit = self._fits.get(model or "")
+        if fit is None or fit.n < MIN_SAMPLES:
+            fit = self._fits.get(POOLED)
+        return fit if fit is not None and fit.n >= MIN_SAMPLES else None
+
+    def samples(self, model: Optional[str] = None) -> int:
+        self._maybe_refresh()
+        fit = self._fits.get(POOLED if model is None else model)
+        return fit.n if fit else 0
+
+    def expected_output_tokens(self, model: str) -> Optional[float]:
+        """Mean output size seen for `model` (pooled if it has no history)."""
+        self._maybe_refresh()
+        fit = self._fits.get(model) or self._fits.get(POOLED)
+        return fit.sum_out / fit.n if fit and fit.n else None
+
+    def predict(self, model: str, prompt_tokens: float, output_tokens: Optional[float] = None) -> Optional[float]:
+        """Predicted seconds for one call, or None when there is not enough history."""
+        self._maybe_refresh()
+        fit = self._fit_for(model)
+        if fit is None:
+            return None
+        if output_tokens is None:
+            output_tokens = self.expected_output_tokens(model) or 0.0
+        return max(MIN_ETA_S, fit.predict(float(prompt_tokens), float(output_tokens)))
+
+    def predict_p95(self, model: str, prompt_tokens: float, output_tokens: Optional[float] = None) -> Optional[float]:
+        """Latency this call should beat 95% of the time, or None without enough history."""
+        mean = self.predict(model, prompt_tokens, output_tokens)
+        if mean is None:
+            return None
+        sd = self._fit_for(model).residual_sd()
+        return mean * NO_NUMPY_P95_FACTOR if sd is None else mean + Z_P95 * sd
+
+
+__all__ = ["EtaModel", "MIN_SAMPLES", "REFRESH_EVERY_S", "Z_P95"]
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_fmea.py — the engineering_analyzer.html FMEA engine (v0.2) over the netlist graph index.
+
+Used by taza_fmea.py, minipcb_erc.py (taza_erc.py) and minipcb_fmea_stats.py (taza_fmea_stats.py).
+
+- Rules, failure-mode catalog, occurrence table and severity/detection scoring
+  are the same as runFMEA() in engineering_analyzer.html, so a batch run writes
+  the json/fmea/analysis_<PN>_<REV>.json/.md files the page itself saves (and
+  loads from its Saved Analysis tab).
+- Per board, failure propagation is computed on the minipcb_netgraph arrays:
+  component -> nets -> components on those nets is one CSR gather plus a
+  first-occurrence dedupe, so affected_nets / affected_components keep the
+  page's ordering without per-component dict walks.
+- Per-board setups saved by the page (json/fmea/setup/analysis_fmea_setup_*.json)
+  are honoured: component_overrides (run/skip) and mode_knowledge_overrides.
+- covered_nets(test_plan) reads the same test-plan shapes as the page; without
+  a plan every row is "uncovered" (detection 8), as in the page.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from minipcb_netgraph import NetGraph, csr, csr_gather
+
+ENGINE_VERSION = "0.2"             # engineering_analyzer.html ENGINE_VERSION this port follows
+HIGH_RISK_RPN = 200
+DETECTION_COVERED = 3
+DETECTION_UNCOVERED = 8
+MARKDOWN_MAX_ROWS = 500
+
+FAILURE_MODES_BY_CLASS: Dict[str, List[str]] = {
+    "resistor": ["open", "short", "oot_high", "oot_low", "drift_high", "drift_low", "noise_excess"],
+    "capacitor": ["open", "short", "capacitance_low", "capacitance_high", "esr_high", "leakage_high"],
+    "transistor": ["gain_low", "gain_high", "be_short", "ce_short", "open_collector", "open_emitter", "leakage_high"],
+    "connector": ["open_contact", "intermittent_contact", "high_contact_resistance", "miswire"],
+    "test_point": ["measurement_error", "probe_slip", "open_test_node"],
+    "diode": ["open", "short", "leakage_high", "vf_shift"],
+    "inductor": ["open", "short", "inductance_low", "inductance_high", "core_saturation"],
+    "integrated_circuit": ["pin_open", "pin_short", "pin_short_to_adjecent_pin_up", "pin_short_to_adjecent_pin_down",
+                           "latchup", "timing_shift", "output_stuck_high", "output_stuck_low"],
+    "switch": ["stuck_open", "stuck_closed", "intermittent_contact", "high_contact_resistance"],
+    "fuse": ["nuisance_open", "fail_to_open", "high_resistance"],
+    "relay": ["coil_open", "contact_welded", "contact_bounce_excess", "contact_open"],
+    "transformer": ["primary_open", "secondary_open", "interwinding_short", "turns_ratio_shift"],
+    "crystal": ["start_fail", "freq_shift_high", "freq_shift_low", "high_esr"],
+    "sensor": ["offset_shift", "gain_shift", "stuck_output", "open_signal"],
+    "other": ["open", "short"],
+}
+
+# (description, propagation_1, propagation_2) by class and mode; anything missing gets default_knowledge()
+FAILURE_MODE_KNOWLEDGE: Dict[str, Dict[str, tuple]] = {
+    "resistor": {
+        "open": ("Conduction path opens and current flow drops to near zero.",
+                 "Direct branch current collapses and node bias shifts.",
+                 "Downstream gain/margin can collapse; detection often visible as static offset."),
+        "short": ("Terminals effectively short and branch resistance drops strongly.",
+                  "Branch current rises and neighboring node voltage compresses.",
+                  "Upstream supply loading rises; thermal stress can propagate to adjacent parts."),
+        "oot_high": ("Resistance drifts above nominal tolerance band.",
+                     "Current reduces and divider/bias point moves low.",
+                     "Stage gain and headroom reduce, increasing clipping or under-drive risk."),
+        "oot_low": ("Resistance drifts below nominal tolerance band.",
+                    "Current increases and divider/bias point moves high.",
+                    "Power dissipation rises and later-stage bias can overdrive."),
+    },
+    "capacitor": {
+        "open": ("Capacitive coupling/decoupling is lost.",
+                 "AC path opens or local filtering is removed.",
+                 "Noise and ripple propagation increase into dependent nodes."),
+        "short": ("Capacitor behaves like a low-impedance fault.",
+                  "Connected nets are forced together at low impedance.",
+                  "Bias collapse or supply loading may trigger multi-node failure signatures."),
+        "capacitance_low": ("Capacitance drops below expected value.",
+                            "Time constants shorten and filtering weakens.",
+                            "Dynamic stability margins degrade under transient loading."),
+        "esr_high": ("Equivalent series resistance rises beyond expected.",
+                     "Ripple attenuation and pulse-current support degrade.",
+                     "Thermal self-heating and cross-stage noise coupling increase."),
+    },
+    "transistor": {
+        "gain_low": ("Effective beta/transconductance is reduced.",
+                     "Stage gain drops and bias point may move off center.",
+                     "Signal chain compression/under-drive propagates to downstream nodes."),
+        "be_short": ("Base-emitter junction is effectively shorted.",
+                     "Bias network is heavily loaded and control action is lost.",
+                     "Collector/emitter operating point collapses and output behavior saturates."),
+        "ce_short": ("Collector-emitter path is shorted or near short.",
+                     "Load is forced toward supply/ground path unexpectedly.",
+                     "Branch overcurrent and thermal stress can propagate into supply network."),
+        "open_collector": ("Collector conduction path opens.",
+                           "Expected sink/source path disappears.",
+                           "Downstream node floats or rails, causing interface-level functional loss."),
+    },
+    "connector": {
+        "open_contact": ("One or more interface contacts are open.",
+                         "Signal or supply continuity is interrupted.",
+                         "External-system observability/control degrades and appears intermittent/static."),
+        "intermittent_contact": ("Contact intermittently opens under vibration or handling.",
+                                 "Momentary dropouts appear on interface nets.",
+                                 "Transient faults propagate as sporadic resets, spikes, or communication loss."),
+    },
+    "test_point": {
+        "measurement_error": ("Probe setup or instrument coupling introduces error.",
+                              "Observed value diverges from actual node condition.",
+                              "Diagnostic decisions propagate incorrect fault isolation paths."),
+        "probe_slip": ("Probe contact moves to wrong node or loses contact.",
+                       "Sampled signal is discontinuous or from unintended net.",
+                       "Root-cause localization propagates to false suspects."),
+        "open_test_node": ("Test access path is open or inaccessible.",
+                           "Required observability point is unavailable.",
+                           "Coverage gaps increase and detection score worsens for related failures."),
+    },
+    "integrated_circuit": {
+        "pin_short_to_adjecent_pin_up": (
+            "A pin is shorted to the physically adjacent higher-index pin, coupling two intendedly independent IC nodes.",
+            "The victim/source pins are electrically forced together, corrupting logic levels, bias points, or analog signal integrity at the package boundary.",
+            "Propagation extends into connected nets and downstream stages as contention, false switching, unstable bias, or overstress signatures that appear topology-consistent across both pin paths."),
+        "pin_short_to_adjecent_pin_down": (
+            "A pin is shorted to the physically adjacent lower-index pin, creating unintended bidirectional interaction between neighboring IC functions.",
+            "Both adjacent pin functions lose independence; expected drive/sense behavior degrades due to cross-loading, level collapse, or parasitic injection.",
+            "Secondary effects propagate as multi-net functional corruption, intermittent misbehavior under dynamic conditions, and misleading observability because both affected channels fail in a coupled pattern."),
+    },
+}
+
+OCCURRENCE_BY_CLASS = {
+    "resistor": 3, "capacitor": 4, "transistor": 5, "connector": 6, "test_point": 2, "diode": 4, "inductor": 4,
+    "integrated_circuit": 6, "switch": 5, "fuse": 3, "relay": 5, "transformer": 4, "crystal": 4, "sensor": 5, "other": 4,
+}
+
+# classifyComponent(): first matching refdes prefix wins (test points are checked before "T")
+CLASS_PREFIXES = (("R", "resistor"), ("C", "capacitor"), ("Q", "transistor"), ("D", "diode"), ("L", "inductor"),
+                  ("U", "integrated_circuit"), ("IC", "integrated_circuit"), ("S", "switch"), ("F", "fuse"),
+                  ("K", "relay"), ("T", "transformer"), ("X", "crystal"), ("B", "sensor"),
+                  ("J", "connector"), ("P", "connector"))
+
+
+def is_test_point(refdes: str) -> bool:
+    r = str(refdes or "").upper()
+    return r.startswith("TP") or "TEST" in r
+
+
+def classify_component(refdes: str) -> str:
+    r = str(refdes or "").upper()
+    if is_test_point(r):
+        return "test_point"
+    for prefix, cls in CLASS_PREFIXES:
+        if r.startswith(prefix):
+            return cls
+    return "other"
+
+
+def is_power_net(net: str) -> bool:
+    n = str(net or "").upper()
+    return n in ("V+", "VCC", "VBAT", "GND") or "POWER" in n
+
+
+def is_bias_net(net: str) -> bool:
+    n = str(net or "").upper()
+    return "BIAS" in n or "BASE" in n
+
+
+def is_interface_net(net: str) -> bool:
+    n = str(net or "").upper()
+    return "INPUT" in n or "OUTPUT" in n or "INTERFACE" in n or n.startswith("IO")
+
+
+def net_severity(net: str) -> int:
+    """computeSeverity() contribution of one net (a component scores the max over its nets, at least 4)."""
+    if is_interface_net(net):
+        return 9
+    if is_power_net(net):
+        return 8
+    if is_bias_net(net):
+        return 7
+    return 5
+
+
+def safe_file_part(v: Any) -> str:
+    return re.sub(r'[^a-z0-9_.-]', "_", str(v or "unknown"), flags=re.IGNORECASE)
+
+
+def analysis_stem(board_pn: str, board_rev: str) -> str:
+    """File stem the page saves under: analysis_<PN>_<REV> (.json / .md)."""
+    return f"analysis_{safe_file_part(board_pn)}_{safe_file_part(board_rev)}"
+
+
+def setup_stem(board_pn: str, board_rev: str) -> str:
+    return f"analysis_fmea_setup_{safe_file_part(board_pn)}_{safe_file_part(board_rev)}"
+
+
+def default_knowledge(component_class: str, mode: str) -> tuple:
+    mode_label = str(mode or "unknown").replace("_", " ")
+    type_label = str(component_class or "component").replace("_", " ")
+    return (f"Deterministic failure assumption for {type_label} mode '{mode_label}'.",
+            "Primary propagation: directly connected nets and bias points shift based on topology.",
+            "Secondary propagation: downstream interfaces, margins, and detection paths are impacted.")
+
+
+def _dedupe(xs: Iterable[Any]) -> List[Any]:
+    return list(dict.fromkeys(xs))
+
+
+class FmeaAssumptions:
+    """Failure modes and knowledge per component, with the overrides of a saved page setup."""
+
+    def __init__(self, setup: Optional[Dict[str, Any]] = None):
+        overrides = (setup or {}).get("overrides") or {}
+        self.component_overrides: Dict[str, Any] = overrides.get("component_overrides") or {}
+        self.knowledge_overrides: Dict[str, tuple] = {}
+        for key, d in (overrides.get("mode_knowledge_overrides") or {}).items():
+            if isinstance(d, dict):
+                self.knowledge_overrides[key] = (str(d.get("description") or ""), str(d.get("propagation_l1") or ""),
+                                                 str(d.get("propagation_l2") or ""))
+
+    def modes(self, component_class: str, refdes: str) -> List[str]:
+        """getFailureModeBucketsForComponent(...).run"""
+        defaults = FAILURE_MODES_BY_CLASS.get(component_class) or FAILURE_MODES_BY_CLASS["other"]
+        override = self.component_overrides.get(refdes)
+        if not override:
+            return list(defaults)
+        if isinstance(override, list):                       # older setups stored the run list only
+            return _dedupe(override)
+        run = _dedupe(override["run"] if isinstance(override.get("run"), list) else defaults)
+        skip = _dedupe(override["skip"] if isinstance(override.get("skip"), list) else [])
+        merged = set(run) | set(skip) | set(defaults)
+        return [m for m in run if m in merged]
+
+    def knowledge(self, component_class: str, mode: str) -> tuple:
+        key = f"{component_class}::{mode}"
+        if key in self.knowledge_overrides:
+            return self.knowledge_overrides[key]
+        known = FAILURE_MODE_KNOWLEDGE.get(component_class, {}).get(mode)
+        return known or default_knowledge(component_class, mode)
+
+
+def covered_nets(test_plan: Optional[Dict[str, Any]]) -> Set[str]:
+    """extractCoveredNets(): covered_nets[], nets[] and tests[].{nets,covered_nets,affected_nets}."""
+    out: Set[str] = set()
+    if not isinstance(test_plan, dict):
+        return out
+    for key in ("covered_nets", "nets"):
+        if isinstance(test_plan.get(key), list):
+            out.update(n for n in test_plan[key] if isinstance(n, str))
+    for test in test_plan.get("tests") or []:
+        if isinstance(test, dict):
+            for key in ("nets", "covered_nets", "affected_nets"):
+                out.update(n for n in (test.get(key) or []) if isinstance(n, str))
+    return out
+
+
+def _first_pairs(a: np.ndarray, b: np.ndarray, n_b: int) -> np.ndarray:
+    """Positions of the first occurrence of each distinct (a, b) pair, in original order."""
+    if not len(a):
+        return np.zeros(0, dtype=np.int64)
+    _, first = np.unique(a.astype(np.int64) * n_b + b, return_index=True)
+    return np.sort(first)
+
+
+def board_propagation(g: NetGraph, b: int) -> Dict[str, Any]:
+    """
+    Board `b` in local rows: each component's nets in pin order (cn_*), and the
+    components reached through those nets, in the page's order (ac_*), both CSR.
+    """
+    c0, c1 = int(g.board_comp_ptr[b]), int(g.board_comp_ptr[b + 1])
+    n0, n1 = int(g.board_net_ptr[b]), int(g.board_net_ptr[b + 1])
+    p0, p1 = int(g.board_pin_ptr[b]), int(g.board_pin_ptr[b + 1])
+    n_comp, n_net = c1 - c0, n1 - n0
+    pin_comp = (g.pin_comp[p0:p1] - c0).astype(np.int64)      # pins are stored component by component
+    pin_net = (g.pin_net[p0:p1] - n0).astype(np.int64)
+
+    keep = _first_pairs(pin_comp, pin_net, max(1, n_net))     # extractComponentNets(): distinct, pin order
+    cn_comp, cn_net = pin_comp[keep], pin_net[keep]
+    cn_ptr, _ = csr(cn_comp, n_comp)
+
+    order = np.lexsort((cn_comp, cn_net))                     # buildNetToRefsMap(): refs in component order
+    nc_ptr, _ = csr(cn_net, n_net)
+    nc_comp = cn_comp[order]
+
+    # component -> each of its nets -> every component on that net, minus itself, first occurrence kept
+    lens = nc_ptr[cn_net + 1] - nc_ptr[cn_net]
+    src = np.repeat(cn_comp, lens)
+    dst = csr_gather(nc_ptr, nc_comp, cn_net)
+    other = dst != src
+    src, dst = src[other], dst[other]
+    keep = _first_pairs(src, dst, max(1, n_comp))
+    ac_comp, ac_dst = src[keep], dst[keep]
+    ac_ptr, _ = csr(ac_comp, n_comp)
+    return {"comp": (c0, c1), "net": (n0, n1), "cn_ptr": cn_ptr, "cn_net": cn_net, "ac_ptr": ac_ptr, "ac_dst": ac_dst}
+
+
+def board_fmea(g: NetGraph, b: int, assumptions: Optional[FmeaAssumptions] = None,
+               covered: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """{"fmea": rows, "summary": {...}} for board `b`, as runFMEA() returns it."""
+    assumptions = assumptions or FmeaAssumptions()
+    covered = covered or set()
+    prop = board_propagation(g, b)
+    c0, c1 = prop["comp"]
+    n0, n1 = prop["net"]
+    cn_ptr, cn_net, ac_ptr, ac_dst = prop["cn_ptr"], prop["cn_net"], prop["ac_ptr"], prop["ac_dst"]
+
+    names = g.strings("net", g.net_name[n0:n1])
+    refs = g.strings("refdes", g.comp_refdes[c0:c1])
+    net_sev = np.array([net_severity(n) for n in names], dtype=np.int64)
+    net_cov = np.array([n in covered for n in names], dtype=bool)
+    net_iface = np.array([is_interface_net(n) for n in names], dtype=bool)
+    cn_comp = np.repeat(np.arange(c1 - c0), np.diff(cn_ptr))
+    severity = np.full(c1 - c0, 4, dtype=np.int64)
+    np.maximum.at(severity, cn_comp, net_sev[cn_net] if len(cn_net) else np.zeros(0, dtype=np.int64))
+    detected = np.zeros(c1 - c0, dtype=bool)
+    np.logical_or.at(detected, cn_comp, net_cov[cn_net] if len(cn_net) else np.zeros(0, dtype=bool))
+
+    rows: List[Dict[str, Any]] = []
+    for c, ref in enumerate(refs):
+        ref = ref or "UNASSIGNED"
+        cls = classify_component(ref)
+        nets = cn_net[cn_ptr[c]:cn_ptr[c + 1]]
+        affected_nets = [names[n] for n in nets.tolist()]
+        affected_components = [refs[d] for d in ac_dst[ac_ptr[c]:ac_ptr[c + 1]].tolist()]
+        interface = [names[n] for n in nets[net_iface[nets]].tolist()]
+        occurrence = OCCURRENCE_BY_CLASS.get(cls, OCCURRENCE_BY_CLASS["other"])
+        detection = DETECTION_COVERED if detected[c] else DETECTION_UNCOVERED
+        sev = int(severity[c])
+        for mode in assumptions.modes(cls, ref):
+            effect, p1, p2 = assumptions.knowledge(cls, mode)
+            rows.append({
+                "component": ref,
+                "failure_mode": mode,
+                "failure_effect": effect,
+                "propagation_1": p1,
+                "propagation_2": p2,
+                "affected_nets": affected_nets,
+                "affected_components": affected_components,
+                "affected_interface_pins": interface,
+                "severity": sev,
+                "occurrence": occurrence,
+                "detection": detection,
+                "RPN": sev * occurrence * detection,
+                "coverage_status": "covered" if detection == DETECTION_COVERED else "uncovered",
+            })
+    rows.sort(key=lambda r: (-r["RPN"], r["component"]))
+    average = round(sum(r["RPN"] for r in rows) / len(rows), 2) if rows else 0
+    summary = {"entries": len(rows), "high_risk_count": sum(1 for r in rows if r["RPN"] >= HIGH_RISK_RPN),
+               "average_rpn": int(average) if float(average).is_integer() else average}
+    return {"fmea": rows, "summary": summary}
+
+
+def iso_now() -> str:
+    """new Date().toISOString()"""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def fmea_report(identity: Dict[str, Any], result: Dict[str, Any], generated_on: str) -> Dict[str, Any]:
+    return {"analysis_engine_version": ENGINE_VERSION, "analysis_type": "fmea", "generated_on": generated_on,
+            "board_pn": (identity or {}).get("board_pn", "unknown_board"),
+            "board_rev": (identity or {}).get("board_rev", "unknown_rev"), **result}
+
+
+def fmea_markdown(result: Dict[str, Any], generated_on: str) -> str:
+    """buildMarkdown("FMEA", ...)"""
+    rows, summary = result["fmea"], result["summary"]
+    columns = ["component", "failure_mode", "severity", "occurrence", "detection", "RPN", "coverage_status"]
+    lines = ["# FMEA Report", "", f"Engine Version: {ENGINE_VERSION}", f"Generated On: {generated_on}", "", "## Summary"]
+    lines += [f"- {k}: {v}" for k, v in summary.items()]
+    lines += ["", "## Results"]
+    if not rows:
+        lines.append("No rows.")
+        return "\n".join(lines)
+    lines.append("| " + " | ".join(columns) + " |")
+    lines.append("| " + " | ".join("---" for _ in columns) + " |")
+    shown = rows[:MARKDOWN_MAX_ROWS]
+    for r in shown:
+        lines.append("| " + " | ".join(", ".join(map(str, r[c])) if isinstance(r[c], list) else str(r[c])
+                                       for c in columns) + " |")
+    lines += ["", "## Failure Effects", "| Component | Failure Mode | Failure Effect | Propagation 1 | Propagation 2 |",
+              "| --- | --- | --- | --- | --- |"]
+    esc = lambda s, default: str(s or default).replace("|", "\\|")
+    for r in shown:
+        lines.append(f"| {r['component'] or 'UNASSIGNED'} | {r['failure_mode'] or 'unknown_mode'} | "
+                     f"{esc(r['failure_effect'], '(none)')} | {esc(r['propagation_1'], '(none)')} | "
+                     f"{esc(r['propagation_2'], '(none)')} |")
+    return "\n".join(lines)
+
+
+def dump_report(report: Dict[str, Any]) -> str:
+    """JSON.stringify(report, null, 2): 2-space indent, no trailing newline."""
+    return json.dumps(report, indent=2, ensure_ascii=False)
+
+
+__all__ = [
+    "ENGINE_VERSION", "HIGH_RISK_RPN", "FAILURE_MODES_BY_CLASS", "FAILURE_MODE_KNOWLEDGE", "OCCURRENCE_BY_CLASS",
+    "classify_component", "is_test_point", "is_power_net", "is_bias_net", "is_interface_net", "net_severity",
+    "analysis_stem", "setup_stem", "FmeaAssumptions", "covered_nets", "board_propagation", "board_fmea",
+    "fmea_report", "fmea_markdown", "dump_report", "iso_now",
+]
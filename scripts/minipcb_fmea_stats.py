@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_fmea_stats.py — columnar snapshot and analytics of the saved FMEA reports.
+
+Used by taza_fmea_stats.py.
+
+- Every json/fmea/analysis_<PN>_<REV>.json (page auto-save or taza_fmea.py)
+  is one contiguous row range of flat arrays: severity, occurrence,
+  detection, rpn, and string ids for component, failure mode, component
+  class (minipcb_fmea.classify_component) and coverage status.
+- FmeaSnapshot.save()/load() persist the arrays as one .npz (no pickles);
+  load_or_build() re-reads only the reports whose (mtime, size) stamp
+  changed and restacks the rest, like minipcb_netgraph does for netlists.
+  Files that are not FMEA reports are kept in the snapshot with their stamp
+  and error, so an unchanged folder is a cache hit even when it has some.
+- The analytics are reductions over those arrays: RPN histogram and
+  percentiles (corpus and per board), top-N rows by RPN, uncovered failure
+  modes per component class, and per-PN trends across revisions (ordered
+  with minipcb_netdiff.rev_key).
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from minipcb_fmea import HIGH_RISK_RPN, classify_component
+from minipcb_netdiff import rev_key
+from minipcb_netgraph import StringTable
+
+SNAPSHOT_FORMAT = 2
+DEFAULT_SNAPSHOT = Path(".minipcb_cache") / "fmea_snapshot.npz"     # relative to the json/fmea folder
+RPN_BINS = (1, 50, 100, 150, HIGH_RISK_RPN, 300, 500, 1001)          # RPN is 1..1000
+TABLES = ("component", "mode", "class", "coverage")
+UNCOVERED = "uncovered"
+
+
+@dataclass
+class BoardRows:
+    """One report; string ids refer to the shared tables."""
+    key: str                       # "PN_REV"
+    file: str
+    stamp: Tuple[int, int]         # (mtime_ns, size) of the JSON
+    pn: str
+    rev: str
+    engine: str
+    generated_on: str
+    severity: np.ndarray
+    occurrence: np.ndarray
+    detection: np.ndarray
+    rpn: np.ndarray
+    component: np.ndarray
+    mode: np.ndarray
+    cls: np.ndarray
+    coverage: np.ndarray
+
+
+def report_files(fmea_dir: Path) -> List[Path]:
+    return sorted(Path(fmea_dir).glob("analysis_*.json"))
+
+
+def report_key(path: Path) -> str:
+    return path.stem[len("analysis_"):]
+
+
+def board_from_report(report: Dict[str, Any], key: str, file: str, stamp: Tuple[int, int],
+                      tables: Dict[str, StringTable]) -> BoardRows:
+    """Intern one saved FMEA report (analysis_type "fmea" with an fmea[] list)."""
+    if not (isinstance(report, dict) and report.get("analysis_type") == "fmea" and isinstance(report.get("fmea"), list)):
+        raise ValueError("not an FMEA report (needs analysis_type 'fmea' and fmea[])")
+    t_comp, t_mode, t_cls, t_cov = (tables[n] for n in TABLES)
+    cols: Dict[str, List[int]] = {c: [] for c in ("severity", "occurrence", "detection", "rpn",
+                                                   "component", "mode", "cls", "coverage")}
+    for r in report["fmea"]:
+        if not isinstance(r, dict):
+            continue
+        comp = str(r.get("component") or "")
+        cols["severity"].append(int(r.get("severity") or 0))
+        cols["occurrence"].append(int(r.get("occurrence") or 0))
+        cols["detection"].append(int(r.get("detection") or 0))
+        cols["rpn"].append(int(r.get("RPN") or 0))
+        cols["component"].append(t_comp.intern(comp))
+        cols["mode"].append(t_mode.intern(str(r.get("failure_mode") or "")))
+        cols["cls"].append(t_cls.intern(classify_component(comp)))
+        cols["coverage"].append(t_cov.intern(str(r.get("coverage_status") or "")))
+    pn, _, rev = key.partition("_")
+    i16 = lambda xs: np.asarray(xs, dtype=np.int16)
+    i32 = lambda xs: np.asarray(xs, dtype=np.int32)
+    return BoardRows(key, file, stamp, str(report.get("board_pn") or pn), str(report.get("board_rev") or rev),
+                     str(report.get("analysis_engine_version") or ""), str(report.get("generated_on") or ""),
+                     i16(cols["severity"]), i16(cols["occurrence"]), i16(cols["detection"]), i32(cols["rpn"]),
+                     i32(cols["component"]), i32(cols["mode"]), i32(cols["cls"]), i32(cols["coverage"]))
+
+
+class FmeaSnapshot:
+    """All reports stacked; rows of board b are board_ptr[b]:board_ptr[b+1]."""
+
+    ARRAYS = ("board_ptr", "board_stamp", "row_board", "severity", "occurrence", "detection", "rpn",
+              "component", "mode", "cls", "coverage", "skipped_stamp")
+    STRINGS = ("board_keys", "board_files", "board_pn", "board_rev", "board_engine", "board_generated",
+                     "skipped_files", "skipped_errors")
+
+    def __init__(self, boards: Sequence[BoardRows], tables: Dict[str, StringTable],
+                 skipped: Sequence[Tuple[str, Tuple[int, int], str]] = ()):
+        self.tables = tables
+        self.skipped_files = [f for f, _, _ in skipped]          # files that did not parse as reports
+        self.skipped_errors = [e for _, _, e in skipped]
+        self.skipped_stamp = np.array([st for _, st, _ in skipped], dtype=np.int64).reshape(-1, 2)
+        self.board_keys = [b.key for b in boards]
+        self.board_files = [b.file for b in boards]
+        self.board_pn = [b.pn for b in boards]
+        self.board_rev = [b.rev for b in boards]
+        self.board_engine = [b.engine for b in boards]
+        self.board_generated = [b.generated_on for b in boards]
+        self.board_stamp = np.array([b.stamp for b in boards], dtype=np.int64).reshape(-1, 2)
+        sizes = np.array([len(b.rpn) for b in boards], dtype=np.int64)
+        self.board_ptr = np.zeros(len(boards) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.board_ptr[1:])
+        self.row_board = np.repeat(np.arange(len(boards), dtype=np.int32), sizes)
+        for name, dtype in (("severity", np.int16), ("occurrence", np.int16), ("detection", np.int16),
+                            ("rpn", np.int32), ("component", np.int32), ("mode", np.int32), ("cls", np.int32),
+                            ("coverage", np.int32)):
+            parts = [getattr(b, name) for b in boards]
+            setattr(self, name, np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype))
+
+    # ---------- persistence ----------
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays.update({f"str_{n}": self.tables[n].array() for n in TABLES})
+        arrays.update({name: np.array(getattr(self, name), dtype=np.str_) for name in self.STRINGS})
+        arrays["format"] = np.array([SNAPSHOT_FORMAT], dtype=np.int32)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "FmeaSnapshot":
+        with np.load(path, allow_pickle=False) as z:
+            if int(z["format"][0]) != SNAPSHOT_FORMAT:
+                raise ValueError(f"{path}: snapshot format {int(z['format'][0])}, expected {SNAPSHOT_FORMAT}")
+            s = cls.__new__(cls)
+            s.tables = {n: StringTable(z[f"str_{n}"].tolist()) for n in TABLES}
+            for name in cls.STRINGS:
+                setattr(s, name, z[name].tolist())
+            for name in cls.ARRAYS:
+                setattr(s, name, z[name])
+        return s
+
+    def board_rows(self, b: int) -> BoardRows:
+        """Board `b` as its own row block again (for restacking unchanged reports)."""
+        r0, r1 = self.board_ptr[b], self.board_ptr[b + 1]
+        return BoardRows(self.board_keys[b], self.board_files[b], tuple(int(x) for x in self.board_stamp[b]),
+                         self.board_pn[b], self.board_rev[b], self.board_engine[b], self.board_generated[b],
+                         self.severity[r0:r1], self.occurrence[r0:r1], self.detection[r0:r1], self.rpn[r0:r1],
+                         self.component[r0:r1], self.mode[r0:r1], self.cls[r0:r1], self.coverage[r0:r1])
+
+    # ---------- lookups ----------
+    def stamps(self) -> Dict[str, Tuple[int, int]]:
+        """(mtime_ns, size) of every file the snapshot was built from, reports and skipped files alike."""
+        out = {f: tuple(int(x) for x in self.board_stamp[i]) for i, f in enumerate(self.board_files)}
+        out.update((f, tuple(int(x) for x in self.skipped_stamp[i])) for i, f in enumerate(self.skipped_files))
+        return out
+
+    def skipped(self) -> List[Tuple[Path, str]]:
+        return [(Path(f), e) for f, e in zip(self.skipped_files, self.skipped_errors)]
+
+    @property
+    def n_boards(self) -> int:
+        return len(self.board_keys)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.rpn)
+
+    def strings(self, table: str, ids: np.ndarray) -> List[str]:
+        strs = self.tables[table].strings
+        return [strs[i] for i in np.asarray(ids).tolist()]
+
+    def uncovered(self) -> np.ndarray:
+        """Row mask of coverage_status == "uncovered"."""
+        return self.coverage == self.tables["coverage"].get(UNCOVERED)
+
+
+def build(files: Sequence[Path], previous: Optional[FmeaSnapshot] = None) -> Tuple[FmeaSnapshot, int, List[Tuple[Path, str]]]:
+    """
+    Snapshot of `files`, reusing unchanged reports from `previous`; returns (snapshot, read, skipped).
+    Unchanged files that `previous` already skipped are skipped again without being re-read.
+    """
+    tables = previous.tables if previous is not None else {n: StringTable() for n in TABLES}
+    old = {previous.board_files[i]: i for i in range(previous.n_boards)} if previous is not None else {}
+    old_skipped = {f: i for i, f in enumerate(previous.skipped_files)} if previous is not None else {}
+    boards: List[BoardRows] = []
+    skipped: List[Tuple[str, Tuple[int, int], str]] = []
+    read = 0
+    for f in files:
+        st = f.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        i = old.get(str(f))
+        if i is not None and tuple(int(x) for x in previous.board_stamp[i]) == stamp:
+            boards.append(previous.board_rows(i))
+            continue
+        i = old_skipped.get(str(f))
+        if i is not None and tuple(int(x) for x in previous.skipped_stamp[i]) == stamp:
+            skipped.append((str(f), stamp, previous.skipped_errors[i]))
+            continue
+        read += 1
+        try:
+            boards.append(board_from_report(json.loads(f.read_text(encoding="utf-8")), report_key(f), str(f), stamp, tables))
+        except (OSError, ValueError, TypeError) as e:
+            skipped.append((str(f), stamp, f"{type(e).__name__}: {e}"))
+    snap = FmeaSnapshot(boards, tables, skipped)
+    return snap, read, snap.skipped()
+
+
+def load_or_build(fmea_dir: Path = Path("json/fmea"), snapshot_path: Optional[Path] = None,
+                  force: bool = False) -> Tuple[FmeaSnapshot, int, List[Tuple[Path, str]]]:
+    """The saved snapshot, brought up to date with fmea_dir (saved again if anything changed)."""
+    fmea_dir = Path(fmea_dir)
+    snapshot_path = Path(snapshot_path) if snapshot_path else fmea_dir / DEFAULT_SNAPSHOT
+    files = report_files(fmea_dir)
+    previous = None
+    if not force and snapshot_path.exists():
+        try:
+            previous = FmeaSnapshot.load(snapshot_path)
+        except (OSError, ValueError, KeyError):
+            previous = None
+    if previous is not None and previous.stamps() == {str(f): (f.stat().st_mtime_ns, f.stat().st_size) for f in files}:
+        return previous, 0, previous.skipped()
+    snap, read, skipped = build(files, previous)
+    try:
+        snap.save(snapshot_path)
+    except OSError:
+        pass                # read-only tree: the in-memory snapshot still works
+    return snap, read, skipped
+
+
+# ---------- analytics ----------
+
+def _stats(x: np.ndarray) -> Dict[str, Any]:
+    if not len(x):
+        return {"rows": 0, "mean": None, "p50": None, "p90": None, "p99": None, "max": None}
+    p50, p90, p99 = np.percentile(x, (50, 90, 99)).tolist()
+    return {"rows": int(len(x)), "mean": round(float(x.mean()), 2), "p50": p50, "p90": p90, "p99": p99,
+            "max": int(x.max())}
+
+
+def rpn_distribution(s: FmeaSnapshot, bins: Sequence[int] = RPN_BINS) -> Dict[str, Any]:
+    """Histogram and percentiles of RPN for the corpus, plus count / mean / median / max / high risk per board."""
+    counts, edges = np.histogram(s.rpn, bins=np.asarray(bins))
+    n = np.diff(s.board_ptr)
+    nz = n > 0
+    total = np.bincount(s.row_board, weights=s.rpn, minlength=s.n_boards)
+    high = np.bincount(s.row_board, weights=s.rpn >= HIGH_RISK_RPN, minlength=s.n_boards).astype(np.int64)
+    top = np.zeros(s.n_boards, dtype=np.int64)
+    np.maximum.at(top, s.row_board, s.rpn)
+    ordered = s.rpn[np.lexsort((s.rpn, s.row_board))]           # rows stay in their board's range
+    lo = np.minimum(s.board_ptr[:-1] + (n - 1) // 2, max(0, s.n_rows - 1))
+    hi = np.minimum(s.board_ptr[:-1] + n // 2, max(0, s.n_rows - 1))
+    median = (ordered[lo] + ordered[hi]) / 2 if s.n_rows else np.zeros(s.n_boards)
+    mean = np.divide(total, n, out=np.zeros(s.n_boards), where=nz)
+    boards = [{"board": s.board_keys[b], "rows": int(n[b]), "mean": round(float(mean[b]), 2) if nz[b] else None,
+               "median": float(median[b]) if nz[b] else None, "max": int(top[b]) if nz[b] else None,
+               "high_risk": int(high[b])} for b in range(s.n_boards)]
+    return {"bins": [{"from": int(a), "to": int(b) - 1, "rows": int(c)} for a, b, c in zip(edges, edges[1:], counts)],
+            "corpus": {**_stats(s.rpn), "high_risk": int((s.rpn >= HIGH_RISK_RPN).sum())}, "boards": boards}
+
+
+def top_risks(s: FmeaSnapshot, n: int = 20) -> List[Dict[str, Any]]:
+    """The n highest-RPN rows of the catalog (ties: severity, then board and row order)."""
+    order = np.lexsort((np.arange(s.n_rows), s.row_board, -s.severity.astype(np.int32), -s.rpn))[:n]
+    return [{"board": s.board_keys[s.row_board[i]], "component": s.tables["component"].strings[s.component[i]],
+             "class": s.tables["class"].strings[s.cls[i]], "failure_mode": s.tables["mode"].strings[s.mode[i]],
+             "severity": int(s.severity[i]), "occurrence": int(s.occurrence[i]), "detection": int(s.detection[i]),
+             "RPN": int(s.rpn[i]), "coverage_status": s.tables["coverage"].strings[s.coverage[i]]}
+            for i in order.tolist()]
+
+
+def uncovered_by_class(s: FmeaSnapshot) -> List[Dict[str, Any]]:
+    """Per component class: rows, uncovered rows and their RPN, and uncovered rows per failure mode."""
+    n_cls, n_mode = len(s.tables["class"].strings), max(1, len(s.tables["mode"].strings))
+    unc = s.uncovered()
+    rows = np.bincount(s.cls, minlength=n_cls)
+    un_rows = np.bincount(s.cls[unc], minlength=n_cls)
+    un_rpn = np.bincount(s.cls[unc], weights=s.rpn[unc], minlength=n_cls)
+    by_mode = np.bincount(s.cls[unc].astype(np.int64) * n_mode + s.mode[unc], minlength=n_cls * n_mode).reshape(n_cls, n_mode)
+    boards = np.zeros(n_cls, dtype=np.int64)
+    if unc.any():
+        pairs = np.unique(s.cls[unc].astype(np.int64) * max(1, s.n_boards) + s.row_board[unc])
+        boards = np.bincount(pairs // max(1, s.n_boards), minlength=n_cls)
+    out = []
+    for c in np.argsort(-un_rows, kind="stable").tolist():
+        if not rows[c]:
+            continue
+        modes = np.flatnonzero(by_mode[c])
+        modes = modes[np.argsort(-by_mode[c, modes], kind="stable")]
+        out.append({"class": s.tables["class"].strings[c], "rows": int(rows[c]), "uncovered": int(un_rows[c]),
+                    "uncovered_share": round(float(un_rows[c] / rows[c]), 3),
+                    "uncovered_mean_rpn": round(float(un_rpn[c] / un_rows[c]), 2) if un_rows[c] else None,
+                    "boards": int(boards[c]),
+                    "modes": {s.tables["mode"].strings[m]: int(by_mode[c, m]) for m in modes.tolist()}})
+    return out
+
+
+def revision_trends(s: FmeaSnapshot) -> List[Dict[str, Any]]:
+    """Per PN, its revisions in order with rows, mean / max RPN, high-risk and uncovered counts and deltas."""
+    n = np.diff(s.board_ptr)
+    total = np.bincount(s.row_board, weights=s.rpn, minlength=s.n_boards)
+    high = np.bincount(s.row_board, weights=s.rpn >= HIGH_RISK_RPN, minlength=s.n_boards)
+    unc = np.bincount(s.row_board, weights=s.uncovered(), minlength=s.n_boards)
+    top = np.zeros(s.n_boards, dtype=np.int64)
+    np.maximum.at(top, s.row_board, s.rpn)
+    by_pn: Dict[str, List[int]] = {}
+    for b, pn in enumerate(s.board_pn):
+        by_pn.setdefault(pn, []).append(b)
+    out = []
+    for pn in sorted(by_pn):
+        revs, prev = [], None
+        for b in sorted(by_pn[pn], key=lambda b: rev_key(s.board_rev[b])):
+            mean = round(float(total[b] / n[b]), 2) if n[b] else None
+            row = {"rev": s.board_rev[b], "rows": int(n[b]), "mean_rpn": mean, "max_rpn": int(top[b]),
+                   "high_risk": int(high[b]), "uncovered": int(unc[b]), "generated_on": s.board_generated[b]}
+            if prev is not None:
+                row["delta_mean_rpn"] = None if mean is None or prev["mean_rpn"] is None else round(mean - prev["mean_rpn"], 2)
+                row["delta_high_risk"] = row["high_risk"] - prev["high_risk"]
+                row["delta_uncovered"] = row["uncovered"] - prev["uncovered"]
+            revs.append(row)
+            prev = row
+        out.append({"board": pn, "revisions": revs})
+    return out
+
+
+def stats_report(s: FmeaSnapshot, top: int = 20) -> Dict[str, Any]:
+    return {"reports": s.n_boards, "rows": s.n_rows, "high_risk_rpn": HIGH_RISK_RPN,
+            "engine_versions": sorted(set(s.board_engine)), "rpn": rpn_distribution(s), "top_risks": top_risks(s, top),
+            "uncovered_by_class": uncovered_by_class(s), "trends": revision_trends(s)}
+
+
+def stats_markdown(report: Dict[str, Any], modes_per_class: int = 5) -> str:
+    fmt = lambda x: "-" if x is None or (isinstance(x, float) and math.isnan(x)) else f"{x:g}" if isinstance(x, float) else str(x)
+    c = report["rpn"]["corpus"]
+    lines = ["# FMEA Analytics", "",
+             f"{report['reports']} report(s), {report['rows']} row(s); RPN mean {fmt(c['mean'])}, p50 {fmt(c['p50'])}, "
+             f"p90 {fmt(c['p90'])}, max {fmt(c['max'])}; {c['high_risk']} high risk (RPN >= {report['high_risk_rpn']})",
+             "", "## RPN Distribution", "", "| RPN | Rows |", "| --- | --- |"]
+    lines += [f"| {b['from']}-{b['to']} | {b['rows']} |" for b in report["rpn"]["bins"]]
+    lines += ["", "| Board | Rows | Mean | Median | Max | High Risk |", "| --- | --- | --- | --- | --- | --- |"]
+    lines += [f"| {b['board']} | {b['rows']} | {fmt(b['mean'])} | {fmt(b['median'])} | {fmt(b['max'])} | {b['high_risk']} |"
+              for b in sorted(report["rpn"]["boards"], key=lambda b: -(b["mean"] or 0))]
+    lines += ["", "## Top Risks", "", "| Board | Component | Failure Mode | S | O | D | RPN |",
+              "| --- | --- | --- | --- | --- | --- | --- |"]
+    lines += [f"| {r['board']} | {r['component']} | {r['failure_mode']} | {r['severity']} | {r['occurrence']} | "
+              f"{r['detection']} | {r['RPN']} |" for r in report["top_risks"]]
+    lines += ["", "## Uncovered Failure Modes by Class", "", "| Class | Rows | Uncovered | Mean RPN | Boards | Top Modes |",
+              "| --- | --- | --- | --- | --- | --- |"]
+    for r in report["uncovered_by_class"]:
+        modes = ", ".join(f"{m} ({k})" for m, k in list(r["modes"].items())[:modes_per_class])
+        lines.append(f"| {r['class']} | {r['rows']} | {r['uncovered']} ({r['uncovered_share']:.0%}) | "
+                     f"{fmt(r['uncovered_mean_rpn'])} | {r['boards']} | {modes or '-'} |")
+    multi = [t for t in report["trends"] if len(t["revisions"]) > 1]
+    lines += ["", "## Revision Trends", ""]
+    if not multi:
+        lines.append("No board has reports for more than one revision.")
+    else:
+        lines += ["| Board | Rev | Rows | Mean RPN | Δ Mean | High Risk | Δ High | Uncovered |",
+                  "| --- | --- | --- | --- | --- | --- | --- | --- |"]
+        for t in multi:
+            for r in t["revisions"]:
+                lines.append(f"| {t['board']} | {r['rev']} | {r['rows']} | {fmt(r['mean_rpn'])} | "
+                             f"{fmt(r.get('delta_mean_rpn'))} | {r['high_risk']} | {fmt(r.get('delta_high_risk'))} | "
+                             f"{r['uncovered']} |")
+    return "\n".join(lines) + "\n"
+
+
+__all__ = [
+    "SNAPSHOT_FORMAT", "DEFAULT_SNAPSHOT", "RPN_BINS", "FmeaSnapshot", "BoardRows", "board_from_report", "build",
+    "load_or_build", "report_files", "report_key", "rpn_distribution", "top_risks", "uncovered_by_class",
+    "revision_trends", "stats_report", "stats_markdown",
+]
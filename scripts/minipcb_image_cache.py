@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_image_cache.py — multi-resolution thumbnail cache for schematic/layout previews.
+
+Shared by minipcb_studio.py (FitImageView) and minipcb_catalog.py (PreviewLabel).
+
+- Each source image gets a pyramid of power-of-two downscaled "levels"
+  (level 0 = full resolution, level k = 1/2**k), stored as PNG under
+  <root>/.minipcb_cache/thumbs/ and keyed by the SHA-1 of the source bytes.
+- Levels are decoded with QImageReader.setScaledSize, so a preview never has to
+  keep the full-resolution pixmap around just to paint a small label.
+- Source hashes are remembered per (path, size, mtime) in index.json, so an
+  unchanged image is hashed once, not every time a page is opened.
+- A small in-memory LRU keeps recently used levels hot across tab switches.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QImage, QImageIOHandler, QImageReader
+
+CACHE_DIR_NAME = ".minipcb_cache"
+THUMBS_SUBDIR = "thumbs"
+INDEX_NAME = "index.json"
+MIN_LEVEL_PX = 128        # never build levels whose long edge is smaller than this
+MEM_LRU_SIZE = 24         # decoded levels kept in memory
+
+
+@dataclass(frozen=True)
+class SourceInfo:
+    path: str
+    sha1: str
+    width: int            # oriented (EXIF-applied) size of the full image
+    height: int
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        f = 1 << level
+        return max(1, self.width // f), max(1, self.height // f)
+
+    @property
+    def max_level(self) -> int:
+        lvl = 0
+        while max(self.width, self.height) >> (lvl + 1) >= MIN_LEVEL_PX:
+            lvl += 1
+        return lvl
+
+
+class ImagePyramidCache:
+    """Disk + memory cache of downscaled image levels under <root>/.minipcb_cache/thumbs."""
+
+    _instances: Dict[str, "ImagePyramidCache"] = {}
+
+    @classmethod
+    def for_root(cls, root: Path) -> "ImagePyramidCache":
+        """One cache per project root, so every view shares the same index and LRU."""
+        key = str(Path(root).resolve())
+        inst = cls._instances.get(key)
+        if inst is None:
+            inst = cls._instances[key] = cls(Path(key))
+        return inst
+
+    def __init__(self, root: Path):
+        self.dir = Path(root) / CACHE_DIR_NAME / THUMBS_SUBDIR
+        self._index_path = self.dir / INDEX_NAME
+        self._index: Dict[str, dict] = {}
+        self._mem: "OrderedDict[Tuple[str, int], QImage]" = OrderedDict()
+        self._load_index()
+
+    # ---- public API ----
+
+    def source_info(self, path: str) -> Optional[SourceInfo]:
+        """Hash + oriented size of a source image; cheap for files seen before."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = os.path.abspath(path)
+        ent = self._index.get(key)
+        if ent and ent.get("size") == st.st_size and ent.get("mtime_ns") == st.st_mtime_ns:
+            return SourceInfo(key, ent["sha1"], ent["w"], ent["h"])
+
+        sha1 = self._hash_file(key)
+        if not sha1:
+            return None
+        rdr = QImageReader(key)
+        rdr.setAutoTransform(True)
+        size = rdr.size()
+        if not size.isValid():
+            return None
+        w, h = size.width(), size.height()
+        if rdr.transformation() & QImageIOHandler.TransformationRotate90:
+            w, h = h, w
+        self._index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": sha1, "w": w, "h": h}
+        self._save_index()
+        return SourceInfo(key, sha1, w, h)
+
+    def level_for(self, info: SourceInfo, target_w: int, target_h: int) -> int:
+        """Smallest level (highest index) that still covers target_w x target_h device pixels."""
+        if target_w <= 0 or target_h <= 0:
+            return info.max_level
+        lvl = 0
+        while lvl < info.max_level:
+            w, h = info.level_size(lvl + 1)
+            if w < target_w and h < target_h:
+                break
+            lvl += 1
+        return lvl
+
+    def load_level(self, info: SourceInfo, level: int) -> QImage:
+        """Decode one pyramid level, building and persisting it on first use."""
+        level = max(0, min(level, info.max_level))
+        mkey = (info.sha1, level)
+        img = self._mem.get(mkey)
+        if img is not None:
+            self._mem.move_to_end(mkey)
+            return img
+
+        if level == 0:
+            img = self._read(info.path, None)
+        else:
+            cached = self.dir / f"{info.sha1}_{level}.png"
+            img = self._read(str(cached), None) if cached.exists() else QImage()
+            if img.isNull():
+                img = self._read(info.path, QSize(*info.level_size(level)))
+                if not img.isNull():
+                    self._write_png(cached, img)
+
+        if not img.isNull():
+            self._mem[mkey] = img
+            while len(self._mem) > MEM_LRU_SIZE:
+                self._mem.popitem(last=False)
+        return img
+
+    def load(self, path: str, target_w: int, target_h: int) -> Tuple[QImage, float, Optional[SourceInfo]]:
+        """
+        Load the smallest level of `path` that covers the target size (device px).
+        Returns (image, scale, info) where scale = full-res px per level px.
+        """
+        info = self.source_info(path)
+        if info is None:
+            return QImage(), 1.0, None
+        level = self.level_for(info, target_w, target_h)
+        img = self.load_level(info, level)
+        if img.isNull():
+            return img, 1.0, info
+        return img, info.width / float(img.width()), info
+
+    # ---- internals ----
+
+    def _read(self, path: str, scaled: Optional[QSize]) -> QImage:
+        rdr = QImageReader(path)
+        rdr.setAutoTransform(True)
+        if scaled is not None:
+            # setScaledSize applies before the EXIF transform, so hand it the stored orientation
+            if rdr.transformation() & QImageIOHandler.TransformationRotate90:
+                scaled = QSize(scaled.height(), scaled.width())
+            rdr.setScaledSize(scaled)
+        return rdr.read()
+
+    def _write_png(self, dest: Path, img: QImage) -> None:
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".png", dir=str(self.dir))
+            os.close(fd)
+            if img.save(tmp, "PNG"):
+                os.replace(tmp, str(dest))
+            else:
+                os.unlink(tmp)
+        except Exception:
+            pass
+
+    def _hash_file(self, path: str) -> str:
+        h = hashlib.sha1()
+        try:
+            with open(path, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            return ""
+        return h.hexdigest()
+
+    def _load_index(self) -> None:
+        try:
+            if self._index_path.exists():
+                self._index = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except Exception:
+            self._index = {}
+
+    def _save_index(self) -> None:
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._index_path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(self._index), encoding="utf-8")
+            os.replace(str(tmp), str(self._index_path))
+        except Exception:
+            pass
+
+
+__all__ = ["ImagePyramidCache", "SourceInfo", "CACHE_DIR_NAME"]
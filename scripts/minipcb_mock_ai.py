@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_mock_ai.py — local OpenAI-compatible stand-in for benchmarking and replay.
+
+Serves POST /v1/chat/completions and POST /v1/responses (plain JSON or
+stream=true server-sent events) plus GET /v1/models and GET /stats, so every
+AI path in the repo (minipcb_studio AiService, minipcb_catalog BaseAIWorker,
+the package AIService, taza_evaluate_datasheet, the batch tools) can run
+without network access. Point a client at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8808/v1  OPENAI_API_KEY=mock
+
+Answers are deterministic:
+1. --fixtures FILE.jsonl: lines like {"match": "FMEA", "text": "<table>…"};
+   the first fixture whose "match" occurs in the prompt wins (a fixture
+   without "match" is the default). Optional "model" restricts a fixture.
+2. --from-cache DB: replay answers recorded in a minipcb_ai ResponseCache; the
+   request is keyed exactly as cached_call keys it (model, api + sampling
+   params present in the body, messages/input).
+3. Otherwise a synthetic answer of --default-tokens tokens, seeded by the
+   prompt hash (same prompt, same text).
+
+Timing is shaped by --latency-ms (time to first token, ± --jitter-ms) and
+--tokens-per-sec (output rate, 0 = instant). --fail-rate answers a fraction
+of requests with --fail-status (default 429, with Retry-After) to exercise
+retry paths. Streams use chunked transfer encoding, so keep-alive
+connections are reused just as they are against the real API.
+
+Usage:
+  python minipcb_mock_ai.py --port 8808 --latency-ms 400 --tokens-per-sec 60
+  python minipcb_mock_ai.py --fixtures fixtures.jsonl --from-cache ~/.minipcb_ai/response_cache.db
+
+From Python (benchmarks, offline batch runs):
+    with MockAIServer(latency_ms=200, tokens_per_sec=100) as srv:
+        os.environ["OPENAI_BASE_URL"] = srv.base_url
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from minipcb_ai import make_key
+
+DEFAULT_PORT = 8808
+DEFAULT_LATENCY_MS = 300
+DEFAULT_TOKENS_PER_SEC = 80.0
+DEFAULT_TOKENS = 200
+_LOREM = ("the board amplifies the input signal while the reference divider sets the bias point and "
+          "each test point exposes a node for the acceptance procedure under worst case supply").split()
+_PIECE_RX = re.compile(r"\s*\S+")
+
+
+def load_fixtures(path: Path) -> List[Dict[str, Any]]:
+    fixtures = []
+    for n, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            fx = json.loads(line)
+        except ValueError as e:
+            raise SystemExit(f"{path}:{n}: bad fixture JSON: {e}")
+        if "text" not in fx:
+            raise SystemExit(f"{path}:{n}: fixture needs a 'text' field")
+        fixtures.append(fx)
+    return fixtures
+
+
+def prompt_text(body: Dict[str, Any]) -> str:
+    """Flatten chat `messages` or responses `input` (string or message list) to text."""
+    src = body.get("messages") if "messages" in body else body.get("input", "")
+    if isinstance(src, str):
+        return src
+    parts = []
+    for m in src or []:
+        content = m.get("content", "") if isinstance(m, dict) else ""
+        if isinstance(content, list):
+            content = " ".join(c.get("text", "") for c in content if isinstance(c, dict))
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+def synthetic_text(prompt: str, tokens: int) -> str:
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    words, size = [], 0
+    while size < tokens * 4:
+        w = rng.choice(_LOREM); words.append(w); size += len(w) + 1
+    return "<p>" + " ".join(words).capitalize() + ".</p>"
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass    # clients dropping keep-alive sockets or cancelling streams is normal here
+
+
+class MockAIServer:
+    """Threaded stand-in server; use as a context manager or start()/stop()."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fixtures: Optional[List[Dict[str, Any]]] = None,
+                 cache_db: Optional[Path] = None, latency_ms: float = DEFAULT_LATENCY_MS, jitter_ms: float = 0.0,
+                 tokens_per_sec: float = DEFAULT_TOKENS_PER_SEC, default_tokens: int = DEFAULT_TOKENS,
+                 fail_rate: float = 0.0, fail_status: int = 429, seed: int = 0):
+        self.fixtures = fixtures or []
+        self.cache = None
+        if cache_db:
+            from minipcb_ai import ResponseCache
+            self.cache = ResponseCache(Path(cache_db), max_age_days=0)   # replay everything recorded
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.default_tokens = default_tokens
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "streams": 0, "failed": 0, "fixture": 0, "cache": 0,
+                         "synthetic": 0, "connections": 0, "out_tokens": 0}
+        self.httpd = _QuietServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="minipcb-mock-ai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown(); self.httpd.server_close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self) -> "MockAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+    # ---- behaviour ----
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def answer(self, api: str, body: Dict[str, Any]) -> str:
+        prompt = prompt_text(body)
+        model = body.get("model", "")
+        usable = [fx for fx in self.fixtures if not fx.get("model") or fx["model"] == model]
+        for fx in [f for f in usable if f.get("match")] + [f for f in usable if not f.get("match")]:
+            if fx.get("match", "") in prompt:
+                self._count("fixture")
+                return fx["text"]
+        if self.cache is not None:
+            params = {"api": api}
+            for k in ("temperature", "max_tokens", "max_output_tokens"):
+                if k in body:
+                    params[k] = body[k]
+            hit = self.cache.get(make_key(model, params, body.get("messages") if api == "chat" else body.get("input")))
+            if hit is not None:
+                self._count("cache")
+                return hit
+        self._count("synthetic")
+        return synthetic_text(prompt, self.default_tokens)
+
+    def first_token_delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def should_fail(self) -> bool:
+        if self.fail_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.fail_rate
+
+    def pieces(self, text: str) -> Iterator[str]:
+        """Word-sized deltas, paced at tokens_per_sec (≈4 chars per token)."""
+        for piece in _PIECE_RX.findall(text) or [text]:
+            if self.tokens_per_sec > 0:
+                time.sleep(max(1, len(piece) // 4) / self.tokens_per_sec)
+            yield piece
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"     # keep-alive, like the real API
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup(); server._count("connections")
+                # Many tiny SSE writes: without NODELAY, Nagle + delayed ACK adds ~40ms per delta
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def _json(self, status: int, obj: Any, headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers(); self.wfile.write(data)
+
+            def _chunk(self, data: bytes) -> None:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data)); self.wfile.flush()
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "minipcb"}]})
+                elif self.path.rstrip("/") == "/stats":
+                    self._json(200, server.stats())
+                else:
+                    self._json(404, {"error": {"message": f"no route {self.path}", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                except ValueError:
+                    self._json(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}}); return
+                path = self.path.rstrip("/")
+                if path.endswith("/chat/completions"):
+                    api = "chat"
+                elif path.endswith("/responses"):
+                    api = "responses"
+                else:
+                    self._json(404, {"error": {"message": f"no route {self.path}", "type": "invalid_request_error"}}); return
+                server._count("requests")
+                time.sleep(server.first_token_delay())
+                if server.should_fail():
+                    server._count("failed")
+                    self._json(server.fail_status, {"error": {"message": "mock: injected failure",
+                                                              "type": "rate_limit_error"}}, {"Retry-After": "1"})
+                    return
+                text = server.answer(api, body)
+                model = body.get("model", "mock")
+                usage_in, usage_out = len(prompt_text(body)) // 4, max(1, len(text) // 4)
+                server._count("out_tokens", usage_out)
+                if body.get("stream"):
+                    server._count("streams")
+                    self._stream(api, model, text, usage_in, usage_out)
+                else:
+                    for _ in server.pieces(text):   # same pacing as a stream, delivered at once
+                        pass
+                    self._json(200, self._final(api, model, text, usage_in, usage_out))
+
+            def _final(self, api: str, model: str, text: str, usage_in: int, usage_out: int) -> Dict[str, Any]:
+                if api == "chat":
+                    return {"id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": text}}],
+                            "usage": {"prompt_tokens": usage_in, "completion_tokens": usage_out,
+                                      "total_tokens": usage_in + usage_out}}
+                return {"id": "resp-mock", "object": "response", "created_at": int(time.time()), "model": model,
+                        "status": "completed", "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+                        "output": [{"type": "message", "id": "msg-mock", "role": "assistant", "status": "completed",
+                                    "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+                        "usage": {"input_tokens": usage_in, "output_tokens": usage_out,
+                                  "total_tokens": usage_in + usage_out}}
+
+            def _stream(self, api: str, model: str, text: str, usage_in: int, usage_out: int) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for seq, piece in enumerate(server.pieces(text)):
+                        if api == "chat":
+                            ev = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": model,
+                                  "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                            self._chunk(f"data: {json.dumps(ev)}\n\n".encode("utf-8"))
+                        else:
+                            ev = {"type": "response.output_text.delta", "item_id": "msg-mock", "output_index": 0,
+                                  "content_index": 0, "delta": piece, "sequence_number": seq, "logprobs": []}
+                            self._chunk(f"event: {ev['type']}\ndata: {json.dumps(ev)}\n\n".encode("utf-8"))
+                    if api == "chat":
+                        last = b"data: [DONE]\n\n"
+                    else:
+                        ev = {"type": "response.completed", "sequence_number": 1 << 20,
+                              "response": self._final(api, model, text, usage_in, usage_out)}
+                        last = f"event: response.completed\ndata: {json.dumps(ev)}\n\n".encode("utf-8")
+                    # Final event and chunked terminator in one write: clients that stop reading at
+                    # [DONE] then still see a complete body and return the connection to their pool
+                    self.wfile.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(last), last)); self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True    # client cancelled mid-stream
+
+        return Handler
+
+
+def add_mock_args(ap) -> None:
+    """Server shaping flags, shared with minipcb_ai_bench.py."""
+    ap.add_argument("--fixtures", type=Path, action="append", default=[], help="JSONL fixtures (repeatable)")
+    ap.add_argument("--from-cache", type=Path, default=None, help="Replay answers from a minipcb_ai response cache DB")
+    ap.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS, help="Time to first token")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="± uniform jitter on the latency")
+    ap.add_argument("--tokens-per-sec", type=float, default=DEFAULT_TOKENS_PER_SEC, help="Output rate (0 = instant)")
+    ap.add_argument("--default-tokens", type=int, default=DEFAULT_TOKENS, help="Length of synthetic answers")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with --fail-status")
+    ap.add_argument("--fail-status", type=int, default=429)
+    ap.add_argument("--seed", type=int, default=0, help="Seed for jitter and failure injection")
+
+
+def server_from_args(args, host: str = "127.0.0.1", port: int = 0) -> MockAIServer:
+    fixtures: List[Dict[str, Any]] = []
+    for f in args.fixtures:
+        fixtures += load_fixtures(f)
+    return MockAIServer(host, port, fixtures=fixtures, cache_db=args.from_cache, latency_ms=args.latency_ms,
+                        jitter_ms=args.jitter_ms, tokens_per_sec=args.tokens_per_sec,
+                        default_tokens=args.default_tokens, fail_rate=args.fail_rate,
+                        fail_status=args.fail_status, seed=args.seed)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local OpenAI-compatible mock server for miniPCB AI tools.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_mock_args(ap)
+    args = ap.parse_args()
+    srv = server_from_args(args, args.host, args.port)
+    print(f"[mock-ai] listening on {srv.base_url} "
+          f"({len(srv.fixtures)} fixture(s), cache replay {'on' if srv.cache else 'off'}, "
+          f"latency {args.latency_ms:g}ms, {args.tokens_per_sec:g} tok/s)")
+    print(f"[mock-ai] export OPENAI_BASE_URL={srv.base_url} OPENAI_API_KEY=mock")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[mock-ai] {json.dumps(srv.stats())}")
+        srv.httpd.server_close()
+
+
+__all__ = ["MockAIServer", "load_fixtures", "prompt_text", "synthetic_text", "add_mock_args", "server_from_args"]
+
+
+if __name__ == "__main__":
+    main()
+
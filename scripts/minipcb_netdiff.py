@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_netdiff.py — structural diff between two revisions of a board's netlist.
+
+Used by taza_netlist_diff.py, minipcb_fmea_stats.py (taza_fmea_stats.py) and
+minipcb_bom.py (rev_key, for the EBL PN fallback).
+
+- Inputs are netlist dicts (json/*_sch.json layout); load_revision() also
+  accepts md/*_sch.md exports, converted in memory by minipcb_netlist.
+- Components are compared by refdes (added / removed / value and footprint
+  changes). Nets are compared by membership, the set of (refdes, pin) they
+  connect: every member hashes to 64 bits and a net's signature is the sum of
+  its members' hashes, so identical memberships under a new name pair up in
+  one dict lookup. Nets still unpaired are matched through a member -> net
+  inverted index by Jaccard similarity (greedy, best first, >= RENAME_MIN).
+  Everything is linear in the number of pins apart from that small residue.
+- Same-name nets with disjoint memberships (auto names such as N$3 reused for
+  another node, or a name left in nets[] with no pins) are not paired by
+  name; they go through the rename matching.
+- A pin "moves" when its net in the new revision is not the counterpart of its
+  old net, so renamed nets do not show up as moves.
+- diff_markdown() renders a report; ecl_change() the one-line text for an ECL.json draft.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from minipcb_md import load_md
+from minipcb_netlist import SCH_MD_RE, load_netlist, netlist_from_md, refdes_key
+
+RENAME_MIN = 0.5                    # Jaccard similarity for a rename between unpaired nets
+REV_RE = re.compile(r'^(?P<letter>[A-Z]+)(?P<maj>\d+)-(?P<min>\d+)$', re.IGNORECASE)
+SCH_JSON_RE = re.compile(r'^(?P<pn>[^_/\\]+)_(?P<rev>[^_/\\]+)_sch\.json$', re.IGNORECASE)
+MASK64 = (1 << 64) - 1
+
+Member = Tuple[str, str]            # (refdes, pin)
+
+
+def rev_key(rev: str) -> Tuple[str, int, int, str]:
+    """Sort key for revisions: A1-02 < A1-10 < B1-01; unknown forms sort last, by text."""
+    m = REV_RE.match(rev or "")
+    if not m:
+        return ("~", 0, 0, rev or "")
+    return (m.group("letter").upper(), int(m.group("maj")), int(m.group("min")), "")
+
+
+def parse_source_name(path: Path) -> Optional[Tuple[str, str]]:
+    """(pn, rev) of a PN_REV_sch.json / PN_REV_sch.md file name."""
+    m = SCH_JSON_RE.match(path.name) or SCH_MD_RE.match(path.name)
+    return (m.group("pn"), m.group("rev")) if m else None
+
+
+def load_revision(path: Path) -> Dict[str, Any]:
+    """Netlist dict from a *_sch.json file or a *_sch.md export."""
+    path = Path(path)
+    if path.suffix.lower() == ".md":
+        pn, rev = parse_source_name(path) or ("", "")
+        return netlist_from_md(load_md(path), pn, rev)
+    nl = load_netlist(path)
+    if nl is None:
+        raise ValueError(f"{path}: not readable JSON")
+    return nl
+
+
+def member_hash(m: Member) -> int:
+    """64-bit member hash; only compared within one process, so the salted built-in hash is enough."""
+    return hash(m) & MASK64
+
+
+def signature(members: Iterable[Member]) -> int:
+    """Order-independent membership hash."""
+    return sum(member_hash(m) for m in members) & MASK64
+
+
+def jaccard(a: Set[Member], b: Set[Member]) -> float:
+    if not a and not b:
+        return 1.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def _view(nl: Dict[str, Any]):
+    """(components {refdes: component}, pin -> net, net -> members) from the components' pins."""
+    comps: Dict[str, Dict[str, Any]] = {}
+    pin_net: Dict[Member, str] = {}
+    nets: Dict[str, Set[Member]] = {}
+    for c in nl.get("components", []):
+        ref = c.get("refdes", "")
+        comps[ref] = c
+        for p in c.get("pins", []):
+            net = p.get("net")
+            if isinstance(net, str):
+                member = (ref, str(p.get("pin_number", "")))
+                pin_net[member] = net
+                nets.setdefault(net, set()).add(member)
+    for n in nl.get("nets", []):                # nets listed without any component pin
+        nets.setdefault(n.get("name", ""), set())
+    return comps, pin_net, nets
+
+
+def match_nets(old: Dict[str, Set[Member]], new: Dict[str, Set[Member]],
+               rename_min: float = RENAME_MIN) -> Tuple[Dict[str, str], Dict[str, float]]:
+    """({old name: new name}, {old name: similarity} for the renamed ones)."""
+    pairs: Dict[str, str] = {}
+    for name in old.keys() & new.keys():
+        if (not old[name] and not new[name]) or old[name] & new[name]:
+            pairs[name] = name
+    free_old = [n for n in old if n not in pairs]
+    taken = set(pairs.values())
+    free_new = [n for n in new if n not in taken]
+    renamed: Dict[str, float] = {}
+
+    by_sig: Dict[int, List[str]] = {}
+    for n in free_new:
+        if new[n]:
+            by_sig.setdefault(signature(new[n]), []).append(n)
+    rest = []
+    for o in free_old:
+        cands = by_sig.get(signature(old[o]), []) if old[o] else []
+        hit = next((n for n in cands if new[n] == old[o]), None)
+        if hit is None:
+            rest.append(o)
+            continue
+        cands.remove(hit)
+        pairs[o], renamed[o] = hit, 1.0
+        taken.add(hit)
+
+    index: Dict[Member, List[str]] = {}
+    for n in free_new:
+        if n not in taken:
+            for m in new[n]:
+                index.setdefault(m, []).append(n)
+    scored = []
+    for o in rest:
+        shared: Dict[str, int] = {}
+        for m in old[o]:
+            for n in index.get(m, ()):
+                shared[n] = shared.get(n, 0) + 1
+        for n, k in shared.items():
+            sim = k / (len(old[o]) + len(new[n]) - k)
+            if sim >= rename_min:
+                scored.append((-sim, o, n))
+    used_old: Set[str] = set()
+    for neg, o, n in sorted(scored):
+        if o in used_old or n in taken:
+            continue
+        pairs[o], renamed[o] = n, round(-neg, 3)
+        used_old.add(o)
+        taken.add(n)
+    return pairs, renamed
+
+
+def _members(ms: Iterable[Member]) -> List[str]:
+    return [f"{r}.{p}" for r, p in sorted(ms, key=lambda m: (refdes_key(m[0]), m[1]))]
+
+
+def netlist_diff(old: Dict[str, Any], new: Dict[str, Any], rename_min: float = RENAME_MIN) -> Dict[str, Any]:
+    """Structured differences from `old` to `new` (see the module docstring)."""
+    oc, opins, onets = _view(old)
+    nc, npins, nnets = _view(new)
+
+    added = [{"refdes": r, "value": nc[r].get("value", ""), "footprint": nc[r].get("footprint", "")}
+             for r in sorted(nc.keys() - oc.keys(), key=refdes_key)]
+    removed = [{"refdes": r, "value": oc[r].get("value", ""), "footprint": oc[r].get("footprint", "")}
+               for r in sorted(oc.keys() - nc.keys(), key=refdes_key)]
+    changed = []
+    for r in sorted(oc.keys() & nc.keys(), key=refdes_key):
+        for field in ("value", "footprint"):
+            a, b = oc[r].get(field, ""), nc[r].get(field, "")
+            if a != b:
+                changed.append({"refdes": r, "field": field, "from": a, "to": b})
+
+    pairs, renamed = match_nets(onets, nnets, rename_min)
+    matched_new = set(pairs.values())
+    net_changes = []
+    for o, n in sorted(pairs.items(), key=lambda kv: kv[1]):
+        gone, new_m = onets[o] - nnets[n], nnets[n] - onets[o]
+        if gone or new_m:
+            net_changes.append({"net": n, "removed": _members(gone), "added": _members(new_m)})
+
+    moved = []
+    for member in sorted(opins.keys() & npins.keys(), key=lambda m: (refdes_key(m[0]), m[1])):
+        was, now = opins[member], npins[member]
+        if pairs.get(was) != now:
+            moved.append({"refdes": member[0], "pin": member[1], "from": was, "to": now})
+
+    nets = {
+        "added": sorted(n for n in nnets if n not in matched_new),
+        "removed": sorted(o for o in onets if o not in pairs),
+        "renamed": [{"from": o, "to": pairs[o], "similarity": s} for o, s in sorted(renamed.items())],
+        "changed": net_changes,
+    }
+    summary = {
+        "components_added": len(added), "components_removed": len(removed),
+        "value_changes": sum(1 for c in changed if c["field"] == "value"),
+        "footprint_changes": sum(1 for c in changed if c["field"] == "footprint"),
+        "nets_added": len(nets["added"]), "nets_removed": len(nets["removed"]),
+        "nets_renamed": len(nets["renamed"]), "nets_changed": len(net_changes), "pins_moved": len(moved),
+    }
+    ident = lambda nl: (nl.get("identity") or {})
+    return {
+        "board": ident(new).get("board_pn") or ident(old).get("board_pn", ""),
+        "from_rev": ident(old).get("board_rev", ""), "to_rev": ident(new).get("board_rev", ""),
+        "identical": not any(summary.values()),
+        "summary": summary,
+        "components": {"added": added, "removed": removed, "changed": changed},
+        "nets": nets,
+        "pins_moved": moved,
+    }
+
+
+def _plural(n: int, word: str) -> str:
+    return f"{n} {word}{'' if n == 1 else 's'}"
+
+
+def ecl_change(diff: Dict[str, Any], limit: int = 3) -> str:
+    """One-line change description for an ECL.json entry."""
+    if diff["identical"]:
+        return f"{diff['from_rev']} -> {diff['to_rev']}: no netlist change"
+    c, n = diff["components"], diff["nets"]
+    some = lambda xs: ", ".join(xs[:limit]) + (", ..." if len(xs) > limit else "")
+    parts = []
+    if c["added"]:
+        parts.append(f"added {some([a['refdes'] for a in c['added']])}")
+    if c["removed"]:
+        parts.append(f"removed {some([r['refdes'] for r in c['removed']])}")
+    values = [f"{x['refdes']} {x['from'] or '-'}->{x['to'] or '-'}" for x in c["changed"] if x["field"] == "value"]
+    if values:
+        parts.append(f"values {some(values)}")
+    fps = [x["refdes"] for x in c["changed"] if x["field"] == "footprint"]
+    if fps:
+        parts.append(f"footprint {some(fps)}")
+    if n["renamed"]:
+        parts.append(f"renamed {some([r['from'] + '->' + r['to'] for r in n['renamed']])}")
+    if diff["pins_moved"]:
+        parts.append(_plural(len(diff["pins_moved"]), "pin") + " rewired")
+    if n["added"] or n["removed"]:
+        parts.append(f"nets +{len(n['added'])}/-{len(n['removed'])}")
+    return f"{diff['from_rev']} -> {diff['to_rev']}: " + "; ".join(parts)
+
+
+def diff_markdown(diff: Dict[str, Any]) -> str:
+    s, c, n = diff["summary"], diff["components"], diff["nets"]
+    esc = lambda v: str(v).replace("|", "\\|")
+    lines = [f"# Netlist diff: {diff['board']} {diff['from_rev']} → {diff['to_rev']}", ""]
+    if diff["identical"]:
+        return "\n".join(lines + ["No netlist differences.", ""])
+    lines += ["## Summary", ""] + [f"- {k.replace('_', ' ')}: {v}" for k, v in s.items() if v] + [""]
+    if c["added"] or c["removed"] or c["changed"]:
+        lines += ["## Components", "", "| Change | RefDes | Detail |", "| --- | --- | --- |"]
+        lines += [f"| added | {a['refdes']} | {esc(a['value'])} {esc(a['footprint'])} |" for a in c["added"]]
+        lines += [f"| removed | {r['refdes']} | {esc(r['value'])} {esc(r['footprint'])} |" for r in c["removed"]]
+        lines += [f"| {x['field']} | {x['refdes']} | {esc(x['from'])} → {esc(x['to'])} |" for x in c["changed"]]
+        lines.append("")
+    if n["renamed"]:
+        lines += ["## Renamed nets", "", "| From | To | Similarity |", "| --- | --- | --- |"]
+        lines += [f"| {esc(r['from'])} | {esc(r['to'])} | {r['similarity']:.2f} |" for r in n["renamed"]]
+        lines.append("")
+    if n["added"] or n["removed"]:
+        lines += ["## Added / removed nets", ""]
+        lines += [f"- added: {esc(x)}" for x in n["added"]] + [f"- removed: {esc(x)}" for x in n["removed"]] + [""]
+    if diff["pins_moved"]:
+        lines += ["## Pins moved", "", "| Pin | From net | To net |", "| --- | --- | --- |"]
+        lines += [f"| {m['refdes']}.{m['pin']} | {esc(m['from'])} | {esc(m['to'])} |" for m in diff["pins_moved"]]
+        lines.append("")
+    if n["changed"]:
+        lines += ["## Net membership changes", "", "| Net | Removed | Added |", "| --- | --- | --- |"]
+        lines += [f"| {esc(x['net'])} | {', '.join(x['removed'])} | {', '.join(x['added'])} |" for x in n["changed"]]
+        lines.append("")
+    return "\n".join(lines)
+
+
+__all__ = [
+    "RENAME_MIN", "rev_key", "parse_source_name", "load_revision", "signature", "jaccard", "match_nets",
+    "netlist_diff", "ecl_change", "diff_markdown",
+]
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_netgraph.py — array-backed connectivity index over every json/*_sch.json netlist.
+
+Used by taza_netgraph.py, minipcb_fmea.py (taza_fmea.py), minipcb_bom.py (taza_bom_rollup.py)
+and minipcb_erc.py (taza_erc.py).
+
+- Net names, refdes, values, footprints, pin labels and component kinds
+  (refdes prefix: C, R, TP, ...) are interned into string tables; every
+  component, net and pin of the corpus is one row in flat int32 arrays
+  (comp_*, net_*, pin_*), boards being contiguous row ranges.
+- Connectivity is stored CSR-style: net_ptr/net_pins list the pin rows of
+  each net, comp_ptr/comp_pins the pin rows of each component, so "nets of
+  Q1", fan-out or reachability are array lookups instead of dict walks.
+- value_num holds the parsed value of each value string (parse_value:
+  "4u7" -> 4.7e-6, "100n" -> 1e-7, "3k3" -> 3300; NaN when not a number).
+- NetGraph.save()/load() persist the index as one .npz (no pickles);
+  load_or_build() rebuilds only the boards whose JSON changed since the
+  stored (mtime, size) stamps and restacks the rest from the old arrays.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INDEX_FORMAT = 1
+DEFAULT_INDEX = Path(".minipcb_cache") / "netgraph.npz"          # relative to the json/ folder
+SUPPLY_NET_RE = re.compile(r'^(A?GND|V[+-]|VCC|VDD|VSS|VEE|[+-]?\d+(?:\.\d+)?V)$', re.IGNORECASE)
+
+SI_PREFIX = {"p": 1e-12, "n": 1e-9, "u": 1e-6, "µ": 1e-6, "μ": 1e-6, "m": 1e-3,
+             "R": 1.0, "r": 1.0, "k": 1e3, "K": 1e3, "M": 1e6, "meg": 1e6, "G": 1e9}
+VALUE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(meg|[pnuµμmRrkKMG])?(\d+)?\s*(?:F|H|V|A|Ω|[Oo]hms?)?\s*$')
+REFDES_KIND_RE = re.compile(r'^([A-Za-z]+)')
+
+
+def parse_value(text: str) -> float:
+    """Engineering value of a part value string ("4u7", "100nF", "3k3", "4R7"); NaN if not numeric."""
+    m = VALUE_RE.match(text or "")
+    if not m:
+        return float("nan")
+    whole, prefix, frac = m.groups()
+    if frac and "." in whole:
+        return float("nan")                 # "1.5k2" is not a value
+    number = float(f"{whole}.{frac}" if frac else whole)
+    return number * SI_PREFIX.get(prefix or "", 1.0)
+
+
+def refdes_kind(refdes: str) -> str:
+    m = REFDES_KIND_RE.match(refdes)
+    return m.group(1).upper() if m else ""
+
+
+class StringTable:
+    """Append-only str <-> int32 id mapping."""
+
+    def __init__(self, strings: Iterable[str] = ()):
+        self.strings: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for s in strings:
+            self.intern(s)
+
+    def intern(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def get(self, s: str) -> int:
+        """Id of `s`, or -1 when it never occurs (matches nothing in the id arrays)."""
+        return self.ids.get(s, -1)
+
+    def array(self) -> np.ndarray:
+        return np.array(self.strings, dtype=np.str_) if self.strings else np.zeros(0, dtype="<U1")
+
+
+TABLES = ("refdes", "value", "kind", "footprint", "net", "pin")
+
+
+@dataclass
+class BoardArrays:
+    """One board with local row numbers; string ids refer to the shared tables."""
+    key: str                       # "PN_REV"
+    file: str
+    stamp: Tuple[int, int]         # (mtime_ns, size) of the JSON
+    comp_refdes: np.ndarray
+    comp_value: np.ndarray
+    comp_kind: np.ndarray
+    comp_footprint: np.ndarray
+    net_name: np.ndarray
+    pin_comp: np.ndarray           # local component row
+    pin_net: np.ndarray            # local net row
+    pin_label: np.ndarray
+
+
+def board_from_json(nl: Dict, key: str, file: str, stamp: Tuple[int, int],
+                    tables: Dict[str, StringTable]) -> BoardArrays:
+    """Intern one netlist dict (components[].pins is the connectivity; nets[] adds pin-less nets)."""
+    t_ref, t_val, t_kind, t_fp, t_net, t_pin = (tables[n] for n in TABLES)
+    net_row: Dict[str, int] = {}
+    net_name: List[int] = []
+
+    def net_of(name: str) -> int:
+        row = net_row.get(name)
+        if row is None:
+            row = net_row[name] = len(net_name)
+            net_name.append(t_net.intern(name))
+        return row
+
+    for n in nl.get("nets", []):
+        net_of(n.get("name", ""))
+    c_ref, c_val, c_kind, c_fp, p_comp, p_net, p_label = [], [], [], [], [], [], []
+    for row, c in enumerate(nl.get("components", [])):
+        ref = c.get("refdes", "")
+        c_ref.append(t_ref.intern(ref))
+        c_val.append(t_val.intern(c.get("value", "") or ""))
+        c_kind.append(t_kind.intern(refdes_kind(ref)))
+        c_fp.append(t_fp.intern(c.get("footprint", "") or ""))
+        for p in c.get("pins", []):
+            if not isinstance(p, dict) or not isinstance(p.get("net"), str):
+                continue                    # unconnected pin
+            p_comp.append(row)
+            p_net.append(net_of(p["net"]))
+            p_label.append(t_pin.intern(str(p.get("pin_number", ""))))
+    i32 = lambda xs: np.asarray(xs, dtype=np.int32)
+    return BoardArrays(key, file, stamp, i32(c_ref), i32(c_val), i32(c_kind), i32(c_fp), i32(net_name),
+                       i32(p_comp), i32(p_net), i32(p_label))
+
+
+def csr(keys: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(ptr, rows): rows[ptr[k]:ptr[k+1]] are the positions i with keys[i] == k, in original order."""
+    rows = np.argsort(keys, kind="stable").astype(np.int32)
+    ptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(keys, minlength=n), out=ptr[1:])
+    return ptr, rows
+
+
+def csr_gather(ptr: np.ndarray, rows: np.ndarray, which: np.ndarray) -> np.ndarray:
+    """Concatenated rows[ptr[k]:ptr[k+1]] for every k in `which`, without a Python loop."""
+    which = np.asarray(which, dtype=np.int64)
+    starts, lens = ptr[which], ptr[which + 1] - ptr[which]
+    total = int(lens.sum())
+    if not total:
+        return np.zeros(0, dtype=rows.dtype)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lens) - lens, lens)
+    return rows[np.repeat(starts, lens) + offsets]
+
+
+class NetGraph:
+    """The stacked corpus index; see the module docstring for the array layout."""
+
+    ARRAYS = ("board_comp_ptr", "board_net_ptr", "board_pin_ptr", "board_stamp",
+              "comp_board", "comp_refdes", "comp_value", "comp_kind", "comp_footprint",
+              "net_board", "net_name", "pin_comp", "pin_net", "pin_label",
+              "net_ptr", "net_pins", "comp_ptr", "comp_pins", "value_num")
+
+    def __init__(self, boards: Sequence[BoardArrays], tables: Dict[str, StringTable]):
+        self.tables = tables
+        self.board_keys = [b.key for b in boards]
+        self.board_files = [b.file for b in boards]
+        n_comp = np.array([len(b.comp_refdes) for b in boards], dtype=np.int32)
+        n_net = np.array([len(b.net_name) for b in boards], dtype=np.int32)
+        n_pin = np.array([len(b.pin_comp) for b in boards], dtype=np.int32)
+        ptr = lambda n: np.concatenate([[0], np.cumsum(n)]).astype(np.int32)
+        self.board_comp_ptr, self.board_net_ptr, self.board_pin_ptr = ptr(n_comp), ptr(n_net), ptr(n_pin)
+        self.board_stamp = np.array([b.stamp for b in boards], dtype=np.int64).reshape(-1, 2)
+        cat = lambda name: (np.concatenate([getattr(b, name) for b in boards]).astype(np.int32)
+                            if boards else np.zeros(0, dtype=np.int32))
+        self.comp_board = np.repeat(np.arange(len(boards), dtype=np.int32), n_comp)
+        self.net_board = np.repeat(np.arange(len(boards), dtype=np.int32), n_net)
+        self.comp_refdes, self.comp_value = cat("comp_refdes"), cat("comp_value")
+        self.comp_kind, self.comp_footprint, self.net_name = cat("comp_kind"), cat("comp_footprint"), cat("net_name")
+        self.pin_label = cat("pin_label")
+        # local -> global rows
+        self.pin_comp = cat("pin_comp") + np.repeat(self.board_comp_ptr[:-1], n_pin)
+        self.pin_net = cat("pin_net") + np.repeat(self.board_net_ptr[:-1], n_pin)
+        self._finish()
+
+    def _finish(self) -> None:
+        self.net_ptr, self.net_pins = csr(self.pin_net, len(self.net_name))
+        self.comp_ptr, self.comp_pins = csr(self.pin_comp, len(self.comp_refdes))
+        self.value_num = np.array([parse_value(v) for v in self.tables["value"].strings], dtype=np.float64)
+        self._board_index = {k: i for i, k in enumerate(self.board_keys)}
+
+    # ---------- persistence ----------
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays.update({f"str_{n}": self.tables[n].array() for n in TABLES})
+        arrays["board_keys"] = np.array(self.board_keys, dtype=np.str_)
+        arrays["board_files"] = np.array(self.board_files, dtype=np.str_)
+        arrays["format"] = np.array([INDEX_FORMAT], dtype=np.int32)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "NetGraph":
+        with np.load(path, allow_pickle=False) as z:
+            if int(z["format"][0]) != INDEX_FORMAT:
+                raise ValueError(f"{path}: index format {int(z['format'][0])}, expected {INDEX_FORMAT}")
+            g = cls.__new__(cls)
+            g.tables = {n: StringTable(z[f"str_{n}"].tolist()) for n in TABLES}
+            g.board_keys, g.board_files = z["board_keys"].tolist(), z["board_files"].tolist()
+            for name in cls.ARRAYS:
+                setattr(g, name, z[name])
+        g._board_index = {k: i for i, k in enumerate(g.board_keys)}
+        return g
+
+    def board_arrays(self, b: int) -> BoardArrays:
+        """Board `b` with local rows again (for restacking unchanged boards)."""
+        c0, c1 = self.board_comp_ptr[b], self.board_comp_ptr[b + 1]
+        n0, n1 = self.board_net_ptr[b], self.board_net_ptr[b + 1]
+        p0, p1 = self.board_pin_ptr[b], self.board_pin_ptr[b + 1]
+        return BoardArrays(self.board_keys[b], self.board_files[b], tuple(int(x) for x in self.board_stamp[b]),
+                           self.comp_refdes[c0:c1], self.comp_value[c0:c1], self.comp_kind[c0:c1],
+                           self.comp_footprint[c0:c1], self.net_name[n0:n1],
+                           self.pin_comp[p0:p1] - c0, self.pin_net[p0:p1] - n0, self.pin_label[p0:p1])
+
+    # ---------- lookups ----------
+    @property
+    def n_boards(self) -> int:
+        return len(self.board_keys)
+
+    def board(self, key: str) -> int:
+        try:
+            return self._board_index[key]
+        except KeyError:
+            raise KeyError(f"board not in index: {key}") from None
+
+    def strings(self, table: str, ids: np.ndarray) -> List[str]:
+        strs = self.tables[table].strings
+        return [strs[i] for i in np.asarray(ids).tolist()]
+
+    def components(self, refdes: str, board: Optional[str] = None) -> np.ndarray:
+        """Global component rows named `refdes` (on one board, or on every board)."""
+        mask = self.comp_refdes == self.tables["refdes"].get(refdes)
+        if board is not None:
+            b = self.board(board)
+            mask &= self.comp_board == b
+        return np.flatnonzero(mask)
+
+    def nets_of_components(self, comps: np.ndarray) -> np.ndarray:
+        """Distinct global net rows touched by the pins of `comps`."""
+        return np.unique(self.pin_net[csr_gather(self.comp_ptr, self.comp_pins, comps)])
+
+    def components_on_nets(self, nets: np.ndarray) -> np.ndarray:
+        return np.unique(self.pin_comp[csr_gather(self.net_ptr, self.net_pins, nets)])
+
+    def fanout(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(pins per net, distinct components per net) for every global net row."""
+        pins = np.diff(self.net_ptr)
+        pairs = np.unique(self.pin_net.astype(np.int64) * max(1, len(self.comp_refdes)) + self.pin_comp)
+        comps = np.bincount((pairs // max(1, len(self.comp_refdes))).astype(np.int64), minlength=len(self.net_name))
+        return pins, comps
+
+    def supply_nets(self) -> np.ndarray:
+        """Boolean mask of nets whose name looks like a rail (GND, V+, VDD, +5V, ...)."""
+        is_supply = np.array([bool(SUPPLY_NET_RE.match(s)) for s in self.tables["net"].strings], dtype=bool)
+        return is_supply[self.net_name] if len(is_supply) else np.zeros(0, dtype=bool)
+
+    def reach(self, start_nets: np.ndarray, hops: int = 0, through_supplies: bool = False) -> np.ndarray:
+        """
+        Boolean component mask: parts on `start_nets`, plus parts reached by
+        crossing up to `hops` further components. Rails are not crossed unless
+        `through_supplies` (every part touches GND).
+        """
+        nets = np.zeros(len(self.net_name), dtype=bool)
+        nets[start_nets] = True
+        blocked = np.zeros_like(nets) if through_supplies else self.supply_nets()
+        comps = np.zeros(len(self.comp_refdes), dtype=bool)
+        for step in range(hops + 1):
+            on = nets[self.pin_net]
+            new_comps = np.zeros_like(comps)
+            new_comps[self.pin_comp[on]] = True
+            new_comps &= ~comps
+            comps |= new_comps
+            if step == hops or not new_comps.any():
+                break
+            nxt = np.zeros_like(nets)
+            nxt[self.pin_net[new_comps[self.pin_comp]]] = True
+            nets |= nxt & ~blocked
+        return comps
+
+    def boards_where(self, net: str, kind: Optional[str] = None, value: Optional[str] = None,
+                     hops: int = 0, rel_tol: float = 1e-6) -> Dict[str, List[str]]:
+        """{board: [refdes, ...]} of `kind` parts with `value` reachable from every net named `net`."""
+        start = np.flatnonzero(self.net_name == self.tables["net"].get(net))
+        hit = self.reach(start, hops)
+        if kind:
+            hit &= self.comp_kind == self.tables["kind"].get(kind.upper())
+        if value:
+            want = parse_value(value)
+            if np.isnan(want):
+                hit &= self.comp_value == self.tables["value"].get(value)
+            else:
+                hit &= np.isclose(self.value_num[self.comp_value], want, rtol=rel_tol, atol=0.0)
+        out: Dict[str, List[str]] = {}
+        for c in np.flatnonzero(hit).tolist():
+            out.setdefault(self.board_keys[self.comp_board[c]], []).append(self.tables["refdes"].strings[self.comp_refdes[c]])
+        return out
+
+
+def netlist_files(json_dir: Path) -> List[Path]:
+    return sorted(Path(json_dir).glob("*_sch.json"))
+
+
+def board_key(path: Path) -> str:
+    return path.name[:-len("_sch.json")]
+
+
+def build(files: Sequence[Path], previous: Optional[NetGraph] = None) -> Tuple[NetGraph, int]:
+    """Index for `files`, reusing unchanged boards from `previous`; returns (graph, boards parsed)."""
+    tables = previous.tables if previous is not None else {n: StringTable() for n in TABLES}
+    old = {}
+    if previous is not None:
+        old = {previous.board_files[i]: i for i in range(previous.n_boards)}
+    boards: List[BoardArrays] = []
+    parsed = 0
+    for f in files:
+        st = f.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        i = old.get(str(f))
+        if i is not None and tuple(int(x) for x in previous.board_stamp[i]) == stamp:
+            boards.append(previous.board_arrays(i))
+            continue
+        nl = json.loads(f.read_text(encoding="utf-8"))
+        boards.append(board_from_json(nl, board_key(f), str(f), stamp, tables))
+        parsed += 1
+    return NetGraph(boards, tables), parsed
+
+
+def load_or_build(json_dir: Path = Path("json"), index_path: Optional[Path] = None,
+                  force: bool = False) -> Tuple[NetGraph, int]:
+    """The saved index, brought up to date with json_dir (saved again if anything changed)."""
+    json_dir = Path(json_dir)
+    index_path = Path(index_path) if index_path else json_dir / DEFAULT_INDEX
+    files = netlist_files(json_dir)
+    previous = None
+    if not force and index_path.exists():
+        try:
+            previous = NetGraph.load(index_path)
+        except (OSError, ValueError, KeyError):
+            previous = None
+    if previous is not None and previous.board_files == [str(f) for f in files] and all(
+            tuple(int(x) for x in previous.board_stamp[i]) == (f.stat().st_mtime_ns, f.stat().st_size)
+            for i, f in enumerate(files)):
+        return previous, 0
+    graph, parsed = build(files, previous)
+    try:
+        graph.save(index_path)
+    except OSError:
+        pass                # read-only tree: the in-memory index still works
+    return graph, parsed
+
+
+__all__ = [
+    "NetGraph", "BoardArrays", "StringTable", "parse_value", "refdes_kind", "csr", "csr_gather",
+    "board_from_json", "build", "load_or_build", "netlist_files", "board_key", "DEFAULT_INDEX", "SUPPLY_NET_RE",
+]
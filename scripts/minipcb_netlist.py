@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_netlist.py — netlist JSON (json/schema/netlist.schema.json, v1.1) from the schematic exports.
+
+Used by taza_md_to_netlist.py.
+
+- netlist_from_md(doc, previous) builds identity / metadata / components / nets
+  (plus the auto test_integration block and analysis counts) from the Circuit
+  Identification, Netlist and Partlist tables of a minipcb_md parse. Keys the
+  markdown cannot supply (footprints, placement, source_tool, net types, ...)
+  are carried over from `previous`, the JSON already on disk.
+- metadata.source_sha256 / converter_version record what a file was built
+  from, so bulk runs can skip boards whose export did not change.
+- netlist_drift(existing, fresh) lists the differences in the markdown-derived
+  content only (identity, title, values, pin→net, net membership).
+- dump_netlist() writes the json/ layout: 2-space indent, one-line
+  {refdes, pin} connection objects, trailing newline.
+- validate_netlist() checks against the schema through the compiled
+  validator of minipcb_jsonschema.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from minipcb_jsonschema import compile_schema, instance_errors
+from minipcb_md import MdDoc
+
+SCHEMA_VERSION = "1.1"
+CONVERTER_VERSION = 1                    # bump when the output changes so every board is rebuilt
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "json" / "schema" / "netlist.schema.json"
+
+SCH_MD_RE = re.compile(r'^(?P<pn>[^_/\\]+)_(?P<rev>[^_/\\]+)_(?:sch|shc)\.md$', re.IGNORECASE)
+REFDES_RE = re.compile(r'^([A-Z]+)(\d+)$')
+CONNECTION_RE = re.compile(r'\{\n\s+"refdes": ("(?:[^"\\]|\\.)*"),\n\s+"pin": ("(?:[^"\\]|\\.)*")\n\s+\}')
+
+# Keys netlist_from_md owns; everything else in an existing file is preserved
+OWNED_TOP = {"schema_version", "identity", "metadata", "components", "nets", "test_integration", "analysis"}
+OWNED_META = {"project_name", "revision", "pcb_dimensions", "pieces_per_panel",
+              "source_file", "source_sha256", "converter_version"}
+OWNED_COMPONENT = {"refdes", "value", "description", "pins"}
+OWNED_NET = {"name", "connections"}
+
+
+def refdes_key(refdes: str) -> Tuple[str, int, str]:
+    """Natural sort key: C2 < C10 < J1."""
+    m = REFDES_RE.match(refdes)
+    return (m.group(1), int(m.group(2)), "") if m else (refdes, 0, refdes)
+
+
+def source_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_current(existing: Optional[Dict[str, Any]], sha: str) -> bool:
+    """True when `existing` was converted from markdown with this hash by this converter version."""
+    meta = (existing or {}).get("metadata") or {}
+    return meta.get("source_sha256") == sha and meta.get("converter_version") == CONVERTER_VERSION
+
+
+def _carry(old: Optional[Dict[str, Any]], owned: set) -> Dict[str, Any]:
+    return {k: v for k, v in (old or {}).items() if k not in owned}
+
+
+def netlist_from_md(doc: MdDoc, pn: str, rev: str, previous: Optional[Dict[str, Any]] = None,
+                    source_name: str = "", sha: str = "") -> Dict[str, Any]:
+    """Schema v1.1 netlist dict for one schematic export."""
+    ident = doc.identification()
+    netlist = doc.table("netlist", prefix=True)
+    partlist = doc.table("partlist", prefix=True)
+    previous = previous or {}
+
+    pins: Dict[str, List[Dict[str, str]]] = {}
+    nets: Dict[str, List[Dict[str, str]]] = {}
+    if netlist is not None:
+        i_net, i_part, i_pad = netlist.col("Net"), netlist.col("Part"), netlist.col("Pad")
+        if i_pad is None:
+            i_pad = netlist.col("Pin")
+        cell = lambda row, i: row[i].strip() if i is not None and i < len(row) else ""
+        for row in netlist.rows:
+            net, part, pad = cell(row, i_net), cell(row, i_part), cell(row, i_pad)
+            if not net or not part:
+                continue
+            pins.setdefault(part, []).append({"pin_number": pad, "net": net})
+            nets.setdefault(net, []).append({"refdes": part, "pin": pad})
+
+    parts: Dict[str, Tuple[str, str]] = {}
+    if partlist is not None:
+        for rec in partlist.records():
+            ref = (rec.get("REF DES") or "").strip()
+            if ref:
+                parts[ref] = ((rec.get("VALUE / DESCRIPTION") or "").strip(), (rec.get("PART TYPE") or "").strip())
+
+    old_components = {c.get("refdes"): c for c in previous.get("components", []) if isinstance(c, dict)}
+    components: List[Dict[str, Any]] = []
+    for ref in sorted(set(parts) | set(pins), key=refdes_key):
+        value, kind = parts.get(ref, ("", ""))
+        comp: Dict[str, Any] = {"refdes": ref, "value": value}
+        comp.update(_carry(old_components.get(ref), OWNED_COMPONENT))
+        if kind:
+            comp["description"] = kind
+        comp["pins"] = pins.get(ref, [])
+        components.append(comp)
+
+    old_nets = {n.get("name"): n for n in previous.get("nets", []) if isinstance(n, dict)}
+    net_list = []
+    for name, conns in nets.items():
+        net: Dict[str, Any] = {"name": name}
+        net.update(_carry(old_nets.get(name), OWNED_NET))
+        net["connections"] = conns
+        net_list.append(net)
+
+    meta: Dict[str, Any] = {"project_name": ident.get("Title", ""), "revision": ident.get("Revision") or rev}
+    meta.update(_carry(previous.get("metadata"), OWNED_META))
+    if ident.get("PCB Dimensions"):
+        meta["pcb_dimensions"] = ident["PCB Dimensions"]
+    ppp = ident.get("Pieces per Panel", "").strip()
+    if ppp:
+        meta["pieces_per_panel"] = int(ppp) if ppp.isdigit() else ppp
+    if source_name:
+        meta["source_file"] = source_name
+    if sha:
+        meta["source_sha256"] = sha
+        meta["converter_version"] = CONVERTER_VERSION
+
+    out: Dict[str, Any] = {
+        "schema_version": SCHEMA_VERSION,
+        "identity": {"board_pn": ident.get("Part Number") or pn, "board_rev": ident.get("Revision") or rev,
+                     "board_type": (previous.get("identity") or {}).get("board_type", "schematic")},
+        "metadata": meta,
+        "components": components,
+        "nets": net_list,
+    }
+    old_ti = previous.get("test_integration")
+    if isinstance(old_ti, dict) and old_ti.get("auto_generated") is False:
+        out["test_integration"] = old_ti            # hand-written coverage data wins
+    else:
+        tps = [{"refdes": c["refdes"], "net": c["pins"][0]["net"], "measurement_type": "voltage"}
+               for c in components if c["refdes"].startswith("TP") and c["pins"]]
+        if tps:
+            out["test_integration"] = {"coverage_status": "partial", "auto_generated": True, "test_points": tps}
+    analysis = dict(previous.get("analysis") or {})
+    analysis.update(component_count=len(components), net_count=len(net_list))
+    out["analysis"] = analysis
+    out.update(_carry(previous, OWNED_TOP))
+    return out
+
+
+def netlist_view(nl: Dict[str, Any]) -> Dict[str, Any]:
+    """The markdown-derived content of a netlist, order-insensitive, for drift checks."""
+    ident = nl.get("identity") or {}
+    meta = nl.get("metadata") or {}
+    return {
+        "identity": (ident.get("board_pn", ""), ident.get("board_rev", "")),
+        "project_name": meta.get("project_name", ""),
+        "revision": meta.get("revision", ""),
+        "components": {c.get("refdes", ""): (c.get("value", ""),
+                                             sorted((p.get("pin_number", ""), p.get("net", "")) for p in c.get("pins", [])))
+                       for c in nl.get("components", [])},
+        "nets": {n.get("name", ""): sorted((c.get("refdes", ""), c.get("pin", "")) for c in n.get("connections", []))
+                 for n in nl.get("nets", [])},
+    }
+
+
+def netlist_drift(existing: Dict[str, Any], fresh: Dict[str, Any]) -> List[str]:
+    """Human-readable differences from `existing` (on disk) to `fresh` (from markdown); empty when in sync."""
+    a, b = netlist_view(existing), netlist_view(fresh)
+    out: List[str] = []
+    for key in ("identity", "project_name", "revision"):
+        if a[key] != b[key]:
+            out.append(f"{key}: {a[key]!r} -> {b[key]!r}")
+    ca, cb = a["components"], b["components"]
+    for ref in sorted(set(ca) - set(cb), key=refdes_key):
+        out.append(f"component {ref}: only in JSON")
+    for ref in sorted(set(cb) - set(ca), key=refdes_key):
+        out.append(f"component {ref}: only in markdown")
+    for ref in sorted(set(ca) & set(cb), key=refdes_key):
+        (va, pa), (vb, pb) = ca[ref], cb[ref]
+        if va != vb:
+            out.append(f"component {ref}: value {va!r} -> {vb!r}")
+        if pa != pb:
+            gone = [f"{p}@{n}" for p, n in pa if (p, n) not in pb]
+            new = [f"{p}@{n}" for p, n in pb if (p, n) not in pa]
+            out.append(f"component {ref}: pins -[{', '.join(gone)}] +[{', '.join(new)}]")
+    na, nb = a["nets"], b["nets"]
+    for name in sorted(set(na) - set(nb)):
+        out.append(f"net {name}: only in JSON")
+    for name in sorted(set(nb) - set(na)):
+        out.append(f"net {name}: only in markdown")
+    for name in sorted(set(na) & set(nb)):
+        if na[name] != nb[name]:
+            gone = [f"{r}.{p}" for r, p in na[name] if (r, p) not in nb[name]]
+            new = [f"{r}.{p}" for r, p in nb[name] if (r, p) not in na[name]]
+            out.append(f"net {name}: -[{', '.join(gone)}] +[{', '.join(new)}]")
+    return out
+
+
+def dump_netlist(nl: Dict[str, Any]) -> str:
+    """Serialise in the json/ house style (byte-compatible with the hand-made files)."""
+    text = json.dumps(nl, indent=2, ensure_ascii=False)
+    return CONNECTION_RE.sub(r'{ "refdes": \1, "pin": \2 }', text) + "\n"
+
+
+def load_netlist(path: Path) -> Optional[Dict[str, Any]]:
+    """Parsed JSON, or None when missing or unreadable."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def validate_netlist(nl: Dict[str, Any], schema_path: Path = SCHEMA_PATH) -> List[str]:
+    """Schema errors as "/json/pointer: message" (empty when valid, or when the schema cannot be compiled here)."""
+    try:
+        validator = compile_schema(schema_path)
+    except RuntimeError:
+        return []           # needs jsonschema, which is not installed
+    return [f"{e['pointer']}: {e['message']}" for e in instance_errors(validator, nl)]
+
+
+__all__ = [
+    "SCHEMA_VERSION", "CONVERTER_VERSION", "SCHEMA_PATH", "SCH_MD_RE",
+    "refdes_key", "source_sha256", "is_current", "netlist_from_md", "netlist_view", "netlist_drift",
+    "dump_netlist", "load_netlist", "validate_netlist",
+]
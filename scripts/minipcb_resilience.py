@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_resilience.py — retries, deadlines and hedged requests for AI calls.
+
+Used by minipcb_studio.py (AiService), minipcb_catalog.py (BaseAIWorker) and the
+minipcb_catalog package (services/ai_service.py).
+
+- resilient_call(fn, ...) runs fn(attempt) until one attempt succeeds. A
+  failed attempt is retried when the error is transient (408/409/425/429,
+  5xx, dropped connections, timeouts) and none of its output has reached the
+  caller yet; once text is on screen a retry would duplicate it.
+- Waits use exponential backoff with full jitter, uniform in
+  [0, min(cap, base·2^n)]. A Retry-After / retry-after-ms header sets the
+  minimum wait. Cancelling ends the wait at once.
+- RetryPolicy.from_prediction() derives the deadlines from the p95 latency
+  that minipcb_eta predicts for this prompt. Without history the caller's
+  fixed timeout applies. An attempt that has produced nothing by its
+  deadline is abandoned and retried. A streaming attempt is left to finish,
+  and the client read timeout still catches a stalled stream.
+- Hedging: if an attempt is still silent at the p95, one identical request
+  is started next to it. The first attempt to stream a delta (or to finish)
+  owns the output and the other is cancelled, so only one answer ever
+  reaches on_delta.
+- CallStats counts the attempts (hedges included) and the tokens spent on
+  discarded attempts: the re-sent prompt plus any partial output. Callers
+  write these to the usage log.
+
+Typical use (inside a worker thread):
+
+    stats = CallStats()
+    policy = RetryPolicy.from_prediction(eta.predict_p95(model, prompt_tokens), timeout_s=120)
+    text = resilient_call(lambda a: stream_chat(client, a.on_delta, a.stop, timeout=a.timeout, **kw),
+                          throttle.push, cancel, policy, prompt_tokens, stats)
+"""
+
+from __future__ import annotations
+
+import email.utils
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+if __package__:
+    from .minipcb_ai import StreamCancelled     # imported as scripts.minipcb_resilience (minipcb_catalog package)
+else:
+    from minipcb_ai import StreamCancelled
+
+RETRY_STATUS = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+# Matched by class name so neither openai, httpx nor requests has to be imported here
+TRANSIENT_ERRORS = frozenset({
+    "APIConnectionError", "APITimeoutError", "ConnectionError", "ConnectionResetError", "TimeoutError",
+    "Timeout", "ReadTimeout", "ConnectTimeout", "ReadError", "RemoteProtocolError", "ChunkedEncodingError",
+})
+DEFAULT_ATTEMPTS = 4
+BACKOFF_BASE_S = 1.0
+BACKOFF_CAP_S = 30.0
+RETRY_AFTER_MAX_S = 120.0        # ignore absurd server hints
+DEADLINE_FACTOR = 3.0            # deadline for first output = factor × predicted p95 ...
+DEADLINE_FLOOR_S = 30.0          # ... but never less than this
+BUDGET_FACTOR = 2.5              # every attempt and wait together: factor × deadline
+CANCEL_POLL_S = 0.2
+
+
+class DeadlineExceeded(Exception):
+    """An attempt produced no output before its deadline."""
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = DEFAULT_ATTEMPTS
+    timeout_s: float = 120.0                  # client timeout per attempt
+    deadline_s: Optional[float] = None        # abandon an attempt still silent after this long
+    budget_s: Optional[float] = None          # no new attempt once this much wall time has passed
+    hedge_after_s: Optional[float] = None     # start a second request if still silent this long
+    base_s: float = BACKOFF_BASE_S
+    cap_s: float = BACKOFF_CAP_S
+
+    @classmethod
+    def from_prediction(cls, p95_s: Optional[float], timeout_s: float = 120.0,
+                        attempts: int = DEFAULT_ATTEMPTS, hedge: bool = True) -> "RetryPolicy":
+        """Deadlines from the predicted p95 latency; just the fixed timeout when there is no prediction."""
+        if p95_s is None:
+            return cls(attempts=attempts, timeout_s=timeout_s, budget_s=BUDGET_FACTOR * timeout_s)
+        deadline = min(timeout_s, max(DEADLINE_FLOOR_S, DEADLINE_FACTOR * p95_s))
+        return cls(attempts=attempts, timeout_s=timeout_s, deadline_s=deadline,
+                   budget_s=BUDGET_FACTOR * deadline, hedge_after_s=p95_s if hedge else None)
+
+
+@dataclass
+class CallStats:
+    attempts: int = 0                # requests sent, hedges included
+    hedged: bool = False
+    wasted_tokens: int = 0           # prompt re-sends + partial output of discarded attempts
+    latency_s: Optional[float] = None  # the winning attempt alone (what the ETA model should learn)
+    errors: List[str] = field(default_factory=list)
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK / requests / legacy-SDK error, if any."""
+    code = getattr(exc, "status_code", None) or getattr(exc, "http_status", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_s(exc: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (retry-after-ms, or Retry-After as seconds or an HTTP date)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms:
+            return min(RETRY_AFTER_MAX_S, max(0.0, float(ms) / 1000.0))
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            secs = float(value)
+        except ValueError:
+            secs = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        return min(RETRY_AFTER_MAX_S, max(0.0, secs))
+    except Exception:
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, StreamCancelled):
+        return False
+    if isinstance(exc, DeadlineExceeded):
+        return True
+    code = status_of(exc)
+    if code is not None:
+        return code in RETRY_STATUS
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+
+def backoff_s(retry: int, policy: RetryPolicy, rng: Any = random) -> float:
+    """Full jitter: uniform in [0, min(cap, base·2^retry)]."""
+    return rng.uniform(0.0, min(policy.cap_s, policy.base_s * (2 ** retry)))
+
+
+def describe(exc: BaseException) -> str:
+    code = status_of(exc)
+    msg = str(exc).strip().splitlines()[0][:160] if str(exc).strip() else type(exc).__name__
+    return f"HTTP {code}: {msg}" if code else f"{type(exc).__name__}: {msg}"
+
+
+class _Stop:
+    """Cancel flag for one attempt: user cancel, a lost hedge race or an abandoned attempt."""
+    __slots__ = ("attempt", "user")
+
+    def __init__(self, attempt: "Attempt", user: Optional[threading.Event]):
+        self.attempt = attempt
+        self.user = user
+
+    def is_set(self) -> bool:
+        return self.attempt.dropped or (self.user is not None and self.user.is_set())
+
+
+class Attempt:
+    """
+    One request. Pass `stop` as the stream's cancel event, `timeout` to the
+    client and every text delta to on_delta().
+    """
+
+    def __init__(self, n: int, owner: "_Call", timeout: float, user_cancel: Optional[threading.Event]):
+        self.n = n
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.chars = 0
+        self.dropped = False            # lost a hedge race or passed its deadline
+        self.stop = _Stop(self, user_cancel)
+        self._owner = owner
+
+    def on_delta(self, piece: str) -> None:
+        if piece:
+            self._owner.delta(self, piece)
+
+
+class _Call:
+    def __init__(self, fn: Callable[[Attempt], str], on_delta: Callable[[str], None],
+                 cancel: Optional[threading.Event], policy: RetryPolicy, prompt_tokens: int,
+                 stats: CallStats, log: Callable[[str], None]):
+        self.fn = fn
+        self.on_delta = on_delta
+        self.cancel = cancel
+        self.policy = policy
+        self.prompt_tokens = int(prompt_tokens)
+        self.stats = stats
+        self.log = log
+        self.lock = threading.Lock()
+        self.owner: Optional[Attempt] = None     # the attempt whose output reaches on_delta
+        self.sent: List[str] = []
+        self.live: List[Attempt] = []            # attempts still in the running for the answer
+        self.results: "queue.Queue[Tuple[Attempt, Optional[str], Optional[BaseException]]]" = queue.Queue()
+
+    # ---- attempt threads ----
+
+    def delta(self, attempt: Attempt, piece: str) -> None:
+        with self.lock:
+            attempt.chars += len(piece)
+            if self.owner is None and not attempt.dropped:
+                self.owner = attempt
+                self._drop_others(attempt)
+            mine = self.owner is attempt
+        if mine:
+            self.sent.append(piece)
+            self.on_delta(piece)
+
+    def _launch(self) -> None:
+        self.stats.attempts += 1
+        a = Attempt(self.stats.attempts, self, self.policy.timeout_s, self.cancel)
+        with self.lock:
+            self.live.append(a)
+
+        def run():
+            try:
+                self.results.put((a, self.fn(a), None))
+            except BaseException as e:
+                self.results.put((a, None, e))
+        threading.Thread(target=run, name=f"minipcb-ai-attempt-{a.n}", daemon=True).start()
+
+    # ---- bookkeeping (call with self.lock held) ----
+
+    def _discard(self, a: Attempt) -> None:
+        a.dropped = True
+        if a in self.live:
+            self.live.remove(a)
+        self.stats.wasted_tokens += self.prompt_tokens + a.chars // 4
+
+    def _drop_others(self, keep: Attempt) -> None:
+        for other in list(self.live):
+            if other is not keep:
+                self._discard(other)
+
+    # ---- caller thread ----
+
+    def _hedge_at(self) -> Optional[float]:
+        if self.policy.hedge_after_s is None or self.stats.hedged or self.owner is not None or len(self.live) != 1:
+            return None
+        return self.live[0].started + self.policy.hedge_after_s
+
+    def _next(self) -> Tuple[Attempt, Optional[str], Optional[BaseException]]:
+        """Next outcome of a live attempt; also fires hedges, deadlines and user cancel."""
+        while True:
+            if self.cancel is not None and self.cancel.is_set():
+                raise StreamCancelled("".join(self.sent))
+            now = time.monotonic()
+            with self.lock:
+                silent = [a for a in self.live if a.chars == 0]
+            wake = [now + CANCEL_POLL_S] if self.cancel is not None else []
+            if self.policy.deadline_s is not None:
+                wake += [a.started + self.policy.deadline_s for a in silent]
+            hedge_at = self._hedge_at()
+            if hedge_at is not None:
+                wake.append(hedge_at)
+            try:
+                a, text, err = self.results.get(timeout=max(0.0, min(wake) - now) if wake else None)
+                if a in self.live:
+                    return a, text, err
+                continue                     # a dropped attempt finishing late
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            if self.policy.deadline_s is not None:
+                for a in silent:
+                    if a.chars == 0 and now >= a.started + self.policy.deadline_s and a in self.live:
+                        return a, None, DeadlineExceeded(f"no output within {self.policy.deadline_s:.0f}s")
+            hedge_at = self._hedge_at()
+            if hedge_at is not None and now >= hedge_at:
+                self.stats.hedged = True
+                self.log(f"[ai] attempt {self.live[0].n} silent for {self.policy.hedge_after_s:.1f}s; hedging")
+                self._launch()
+
+    def run(self) -> str:
+        start = time.monotonic()
+        retries = 0
+        self._launch()
+        while True:
+            try:
+                a, text, err = self._next()
+            except StreamCancelled:
+                with self.lock:
+                    for other in list(self.live):
+                        other.dropped = True
+                raise
+            with self.lock:
+                if err is None and (self.owner is None or self.owner is a):
+                    self.live.remove(a)
+                    self.owner = a
+                    self._drop_others(a)
+                    self.stats.latency_s = time.monotonic() - a.started
+                    return text
+                self._discard(a)
+                self.stats.errors.append(f"attempt {a.n}: {describe(err) if err else 'superseded'}")
+                if err is None or self.live:
+                    continue                 # the other request of a hedged pair is still running
+                forwarded = self.owner is a
+            if forwarded or not is_retryable(err) or self.stats.attempts >= self.policy.attempts:
+                raise err
+            delay = max(retry_after_s(err) or 0.0, backoff_s(retries, self.policy))
+            if self.policy.budget_s is not None and time.monotonic() - start + delay > self.policy.budget_s:
+                raise err
+            self.log(f"[ai] attempt {a.n} failed ({describe(err)}); retrying in {delay:.1f}s")
+            if self.cancel is not None:
+                if self.cancel.wait(delay):
+                    raise StreamCancelled("")
+            else:
+                time.sleep(delay)
+            retries += 1
+            self._launch()
+
+
+def resilient_call(fn: Callable[[Attempt], str], on_delta: Callable[[str], None] = lambda piece: None,
+                   cancel: Optional[threading.Event] = None, policy: Optional[RetryPolicy] = None,
+                   prompt_tokens: int = 0, stats: Optional[CallStats] = None,
+                   log: Callable[[str], None] = lambda msg: None) -> str:
+    """
+    Run fn(attempt) under `policy` and return the winning attempt's text.
+    Raises StreamCancelled (with the text already forwarded) on cancel, else
+    the last attempt's error once retries are exhausted. `stats` is filled in
+    either way.
+    """
+    return _Call(fn, on_delta, cancel, policy or RetryPolicy(), prompt_tokens, stats or CallStats(), log).run()
+
+
+__all__ = [
+    "resilient_call", "RetryPolicy", "CallStats", "Attempt", "DeadlineExceeded",
+    "is_retryable", "retry_after_s", "status_of", "backoff_s", "describe",
+    "RETRY_STATUS", "DEFAULT_ATTEMPTS",
+]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_startup.py — startup profiling for the miniPCB GUIs (--startup-profile).
+
+Shared by minipcb_studio.py and minipcb_catalog.py.
+
+- install() wraps builtins.__import__ so every module loaded from then on is
+  timed, and report() prints the timings in the same layout as
+  `python -X importtime` (self / cumulative microseconds, nested by depth).
+- mark(name) records a startup phase (QApplication created, window shown,
+  project tree populated, ...). Phases are printed as offsets from install().
+- Only active when a GUI is started with --startup-profile; otherwise nothing
+  in this module runs.
+
+Typical use in a GUI script, right after the stdlib imports:
+
+    if "--startup-profile" in sys.argv:
+        import minipcb_startup; minipcb_startup.install()
+"""
+
+from __future__ import annotations
+
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+FLAG = "--startup-profile"
+
+_orig_import = None
+_main_ident = threading.get_ident()   # only the GUI thread is timed
+_t0: float = 0.0
+_depth = 0
+_child_us: List[int] = []                      # running child total per open import frame
+_imports: List[Tuple[int, int, int, str]] = []  # (depth, self_us, cumulative_us, name)
+_marks: List[Tuple[float, str]] = []
+
+
+def enabled() -> bool:
+    return _orig_import is not None
+
+
+def _abs_name(name: str, globals_, level: int) -> str:
+    if not level:
+        return name
+    pkg = (globals_ or {}).get("__package__") or ""
+    try:
+        return importlib.util.resolve_name("." * level + name, pkg)
+    except Exception:
+        return name
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _depth
+    before = len(sys.modules)
+    absname = _abs_name(name, globals, level)
+    fresh = absname not in sys.modules
+    if (not fresh and not fromlist) or threading.get_ident() != _main_ident:
+        return _orig_import(name, globals, locals, fromlist, level)
+
+    _child_us.append(0); _depth += 1
+    t = time.perf_counter()
+    try:
+        return _orig_import(name, globals, locals, fromlist, level)
+    finally:
+        cum = int((time.perf_counter() - t) * 1e6)
+        _depth -= 1; children = _child_us.pop()
+        if len(sys.modules) > before:
+            label = absname
+            if not fresh:
+                # "from pkg import sub" loading a new submodule
+                subs = [f"{absname}.{f}" for f in (fromlist or ()) if isinstance(f, str)]
+                subs = [s for s in subs if s in sys.modules]
+                label = ", ".join(subs) or absname
+            _imports.append((_depth, cum - children, cum, label))
+            if _child_us:
+                _child_us[-1] += cum
+
+
+def install() -> None:
+    """Start timing imports and phases; safe to call more than once."""
+    global _orig_import, _t0
+    if _orig_import is not None:
+        return
+    _t0 = time.perf_counter()
+    _orig_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def mark(name: str) -> None:
+    """Record a named startup phase (no-op unless install() was called)."""
+    if _orig_import is not None:
+        _marks.append((time.perf_counter(), name))
+
+
+def report(stream=None, min_us: int = 0) -> None:
+    """Print import timings (-X importtime layout) and phase offsets."""
+    out = stream or sys.stderr
+    if _orig_import is None:
+        return
+    print("import time: self [us] | cumulative | imported package", file=out)
+    # Imports finish child-first, which is the order -X importtime prints too
+    for depth, self_us, cum_us, name in _imports:
+        if cum_us < min_us:
+            continue
+        print(f"import time: {self_us:>9} | {cum_us:>10} | {'  ' * depth}{name}", file=out)
+    top = sorted((e for e in _imports if e[0] == 0), key=lambda e: -e[2])[:10]
+    if top:
+        print("\nslowest top-level imports:", file=out)
+        for _, _, cum_us, name in top:
+            print(f"  {cum_us / 1000.0:8.1f} ms  {name}", file=out)
+    if _marks:
+        print("\nstartup phases:", file=out)
+        prev = _t0
+        for t, name in _marks:
+            print(f"  {(t - _t0) * 1000.0:8.1f} ms  (+{(t - prev) * 1000.0:7.1f})  {name}", file=out)
+            prev = t
+    out.flush()
+
+
+def strip_flag(argv: Optional[List[str]] = None) -> List[str]:
+    """argv without --startup-profile, for handing to QApplication."""
+    return [a for a in (argv if argv is not None else sys.argv) if a != FLAG]
+
+
+__all__ = ["FLAG", "install", "enabled", "mark", "report", "strip_flag"]
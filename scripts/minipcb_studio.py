@@ -9,45 +9,75 @@ miniPCB Website Studio — single-file PyQt5 app (AI Seeds JSON integrated)
 - Preserves ai-seeds JSON block and adds a large "Edit AI Seeds…" dialog.
 """
 
-import os, sys, re, json, math, shutil, sqlite3, tempfile, datetime, threading, webbrowser
+import os, sys, re, json, math, shutil, tempfile, datetime, time, threading, webbrowser, importlib.util
 from pathlib import Path
 from typing import Optional, Tuple, Dict, List
 import html as html_lib
 
+if "--startup-profile" in sys.argv:
+    import minipcb_startup; minipcb_startup.install()
+else:
+    minipcb_startup = None
+
 from PyQt5 import QtCore, QtGui, QtWidgets
-try:
-    from PyQt5 import QtWebEngineWidgets
-    _HAS_WEBENGINE = True
-except Exception:
-    _HAS_WEBENGINE = False
 
 from PyQt5.QtCore import Qt, QRectF
 from PyQt5.QtGui import QImageReader, QPainter, QTransform, QPixmap
 from PyQt5.QtWidgets import (QGraphicsView, QGraphicsScene, QGraphicsPixmapItem )
 
-# ---------- Optional deps ----------
-_OPENAI_MODE = "none"   # "v1" | "v0" | "none"
-try:
-    from openai import OpenAI           # 1.x
-    _OPENAI_MODE = "v1"
-except Exception:
+from minipcb_image_cache import ImagePyramidCache
+from minipcb_usage import UsageLogger
+from minipcb_eta import EtaModel
+from minipcb_md import MdDoc, load_md
+from minipcb_resilience import Attempt, CallStats, RetryPolicy, resilient_call
+from minipcb_ai import (ResponseCache, CACHE_DB_NAME, CACHE_USE, CACHE_REFRESH, CACHE_OFF, cached_call, cache_mode_from_argv,
+                        DeltaThrottle, StreamCancelled, stream_chat, stream_sse_post, client_pool, resolve_base_url)
+
+# ---------- Optional deps (probed here, imported on first use) ----------
+_HAS_WEBENGINE = importlib.util.find_spec("PyQt5.QtWebEngineWidgets") is not None
+_HAS_REQUESTS = importlib.util.find_spec("requests") is not None
+_OPENAI_MODE: Optional[str] = None   # "v1" | "v0" | "none"; resolved by _openai_mode()
+openai = None
+
+def _openai_mode() -> str:
+    """Import the openai SDK on the first AI call and report which API it speaks (1.x or 0.x)."""
+    global _OPENAI_MODE, openai
+    if _OPENAI_MODE is None:
+        _OPENAI_MODE = "none"
+        try:
+            import openai as _sdk
+            openai = _sdk
+            _OPENAI_MODE = "v1" if hasattr(_sdk, "OpenAI") else "v0"
+        except Exception:
+            pass
+    return _OPENAI_MODE
+
+def _webengine():
+    """
+    QtWebEngineWidgets, imported when the first PDF/HTML preview opens.
+    main() sets AA_ShareOpenGLContexts before QApplication so the late import is allowed.
+    """
+    global _HAS_WEBENGINE
+    if not _HAS_WEBENGINE: return None
     try:
-        import openai                   # 0.x
-        _OPENAI_MODE = "v0"
+        from PyQt5 import QtWebEngineWidgets
+        return QtWebEngineWidgets
     except Exception:
-        pass
-
-try:
-    import requests
-    _HAS_REQUESTS = True
-except Exception:
-    _HAS_REQUESTS = False
+        _HAS_WEBENGINE = False
+        return None
 
 APP_NAME = "miniPCB Website Studio"
 CONFIG_NAME = ".minipcb_studio.json"
 AI_DIR_NAME = ".minipcb_ai"
 DB_NAME = "ai_usage.db"
 JSONL_NAME = "ai_usage.jsonl"
+USAGE_EXPORTS = {   # export dialog filter -> aggregate view (None = every event)
+    "All events (*.csv)": None,
+    "Tokens per day (*.csv)": "v_tokens_per_day",
+    "Tokens per file (*.csv)": "v_tokens_per_file",
+    "Tokens per section (*.csv)": "v_tokens_per_section",
+    "Retries per day (*.csv)": "v_retries_per_day",
+}
 
 DARK_QSS = """
 * { color: #E6E6E6; }
@@ -82,7 +112,8 @@ DEFAULT_CONFIG = {
     "last_project": "",
     "images_dir": "images",
     "pdf_dir": "pdf",
-    "ai": {"provider": "openai", "model": "gpt-4o-mini", "max_tokens": 1200, "temperature": 0.2},
+    "ai": {"provider": "openai", "model": "gpt-4o-mini", "max_tokens": 1200, "temperature": 0.2, "cache": "use",
+           "max_attempts": 4, "hedge": True},
     "regex_counters": [],
     "board_rules": {"detect_by_filename": True}
 }
@@ -312,69 +343,40 @@ class ConfigService:
     def set(self, key, value): self.data[key] = value
 
 class StatsService:
+    """Session counters for the status bar; rows go through a background UsageLogger."""
     def __init__(self, project_root: Path, regexes: List[str]):
         self.regexes = regexes or []
         self.ai_dir = project_root / AI_DIR_NAME; self.ai_dir.mkdir(exist_ok=True)
         self.db_path = self.ai_dir / DB_NAME
         self.jsonl_path = self.ai_dir / JSONL_NAME
-        self._init_db()
+        self.logger = UsageLogger(self.db_path, self.jsonl_path, self.regexes)
+        self.eta = EtaModel(self.db_path)   # latency fit over past responses in this project
         self.session_in = 0; self.session_out = 0; self.session_events = 0
-    def _init_db(self):
-        conn = sqlite3.connect(str(self.db_path))
-        try:
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              ts TEXT NOT NULL,
-              file TEXT,
-              direction TEXT NOT NULL,
-              raw_bytes INTEGER,
-              chars INTEGER, words INTEGER, sentences INTEGER, loc INTEGER,
-              est_tokens INTEGER, regex_json TEXT
-            );""")
-            conn.commit()
-        finally:
-            conn.close()
-    def _count(self, text: str):
-        chars = len(text)
-        words = len(re.findall(r"\b[\w'-]+\b", text))
-        sentences = len(re.findall(r"[\.!?]+(?:\s|$)", text)) or (1 if text.strip() else 0)
-        loc = text.count("\n") + (1 if text else 0)
-        est_tokens = int(max(0, round(chars/4)))
-        return {"chars":chars,"words":words,"sentences":sentences,"loc":loc,"est_tokens":est_tokens}
-    def log_text(self, direction: str, file: Optional[Path], text: str):
-        stats = self._count(text)
+        self._conn_seen: Dict[str, Dict[str, int]] = {}   # pool counters already logged, per base URL
+    def log_text(self, direction: str, file: Optional[Path], text: str, section: str = "", model: str = "",
+                 latency_ms: Optional[int] = None, prompt_tokens: Optional[int] = None,
+                 attempts: Optional[int] = None, wasted_tokens: Optional[int] = None):
+        # Only the byte count happens here; word/sentence/regex stats run on the logger thread
         raw_bytes = len(text.encode("utf-8"))
-        row = {"ts": human_dt(), "file": str(file) if file else "", "direction": direction,
-               "raw_bytes": raw_bytes, **stats, "regex_json": "{}"}
-        conn = sqlite3.connect(str(self.db_path))
-        try:
-            conn.execute("""INSERT INTO events (ts,file,direction,raw_bytes,chars,words,sentences,loc,est_tokens,regex_json)
-                            VALUES (?,?,?,?,?,?,?,?,?,?);""",
-                         (row["ts"],row["file"],row["direction"],row["raw_bytes"],row["chars"],
-                          row["words"],row["sentences"],row["loc"],row["est_tokens"],row["regex_json"]))
-            conn.commit()
-        finally:
-            conn.close()
-        try:
-            with self.jsonl_path.open("a", encoding="utf-8") as fh:
-                fh.write(json.dumps(row) + "\n")
-        except Exception: pass
+        self.logger.log(direction, str(file) if file else "", text, section, model, latency_ms, prompt_tokens,
+                        attempts, wasted_tokens)
         if direction=="prompt": self.session_in += raw_bytes
-        else: self.session_out += raw_bytes
+        elif direction=="response": self.session_out += raw_bytes
         self.session_events += 1
-    def export_csv(self, out_path: Path):
-        import csv
-        conn = sqlite3.connect(str(self.db_path))
-        try:
-            rows = conn.execute("""SELECT ts,file,direction,raw_bytes,chars,words,sentences,loc,est_tokens,regex_json
-                                   FROM events ORDER BY id ASC;""").fetchall()
-        finally:
-            conn.close()
-        with out_path.open("w", newline="", encoding="utf-8") as fh:
-            w = csv.writer(fh)
-            w.writerow(["ts","file","direction","raw_bytes","chars","words","sentences","loc","est_tokens","regex_json"])
-            for r in rows: w.writerow(r)
+    def log_connections(self, pool_stats: Dict[str, Dict[str, int]]):
+        """Append the HTTP keep-alive counters (per base URL) accrued since the last call to the usage JSONL,
+        so rows can be summed; the pool's own counters are cumulative."""
+        for base, ent in pool_stats.items():
+            last = self._conn_seen.get(base, {})
+            delta = {k: v - last.get(k, 0) for k, v in ent.items()}
+            self._conn_seen[base] = dict(ent)
+            if delta.get("requests"):
+                self.logger.log_record({"ts": human_dt(), "direction": "connections", "base_url": base, **delta})
+    def export_csv(self, out_path: Path, view: Optional[str] = None) -> int:
+        """All events, or one aggregate view (see USAGE_EXPORTS), streamed to CSV."""
+        return self.logger.export_csv(out_path, view)
+    def close(self):
+        self.logger.close()
 
 class FileService(QtCore.QObject):
     tree_changed = QtCore.pyqtSignal()
@@ -446,60 +448,97 @@ class HtmlService:
 class AiService(QtCore.QObject):
     finished = QtCore.pyqtSignal(str, str)  # section, html
     failed = QtCore.pyqtSignal(str)
-    def __init__(self, cfg: ConfigService, stats: StatsService):
+    chunk = QtCore.pyqtSignal(str, str)     # section, streamed text since the last emit (throttled)
+    cancelled = QtCore.pyqtSignal(str, str) # section, partial text
+    def __init__(self, cfg: ConfigService, stats: StatsService, cache: Optional[ResponseCache] = None, cache_mode: str = CACHE_USE):
         super().__init__(); self.cfg=cfg; self.stats=stats
+        self.cache = cache; self.cache_mode = cache_mode
+        self.last_from_cache = False
+        self._cancel = threading.Event()
     def generate_async(self, section: str, title: str, keywords: str, maturity: int, context: str, file_for_stats: Optional[Path]):
-        t=threading.Thread(target=self._run, args=(section,title,keywords,maturity,context,file_for_stats), daemon=True)
+        self._cancel = threading.Event()
+        t=threading.Thread(target=self._run, args=(section,title,keywords,maturity,context,file_for_stats,self._cancel), daemon=True)
         t.start()
-    def _run(self, section: str, title: str, keywords: str, maturity: int, context: str, file_for_stats: Optional[Path]):
+    def cancel(self):
+        self._cancel.set()
+    def _run(self, section: str, title: str, keywords: str, maturity: int, context: str, file_for_stats: Optional[Path], cancel: threading.Event):
         prompt = AI_PROMPT_TPL.format(section=section, title=title or "PLACEHOLDER", keywords=keywords or "PLACEHOLDER", maturity=maturity, context=context or "PLACEHOLDER")
-        try: self.stats.log_text("prompt", file_for_stats, prompt)
-        except Exception: pass
         model = self.cfg.get("ai",{}).get("model","gpt-4o-mini")
         temperature = float(self.cfg.get("ai",{}).get("temperature",0.2))
         max_tokens = int(self.cfg.get("ai",{}).get("max_tokens",1200))
         api_key = os.environ.get("OPENAI_API_KEY","").strip()
         base_url = os.environ.get("OPENAI_BASE_URL","").strip() or None
-        try:
-            text=""
-            if _OPENAI_MODE == "v1" and api_key:
-                client = OpenAI(api_key=api_key, base_url=base_url) if base_url else OpenAI(api_key=api_key)
-                resp = client.chat.completions.create(
+        messages = [
+            {"role":"system","content":"You are a helpful engineering writing assistant."},
+            {"role":"user","content": prompt}
+        ]
+        throttle = DeltaThrottle(lambda text: self.chunk.emit(section, text))
+        def attempt(a: Attempt) -> str:
+            mode = _openai_mode()
+            if mode == "v1" and api_key:
+                # Retries happen in resilient_call; the SDK's own would multiply them
+                return stream_chat(client_pool().openai(api_key, base_url).with_options(max_retries=0), a.on_delta, a.stop,
                     model=model,
-                    messages=[
-                        {"role":"system","content":"You are a helpful engineering writing assistant."},
-                        {"role":"user","content": prompt}
-                    ],
+                    messages=messages,
                     temperature=temperature,
                     max_tokens=max_tokens,
-                    timeout=120
+                    timeout=a.timeout
                 )
-                text = (resp.choices[0].message.content or "").strip()
-            elif _OPENAI_MODE == "v0" and api_key:
+            elif mode == "v0" and api_key:
                 openai.api_key = api_key
                 if base_url: openai.api_base = base_url
                 resp = openai.ChatCompletion.create(
                     model=model,
-                    messages=[
-                        {"role":"system","content":"You are a helpful engineering writing assistant."},
-                        {"role":"user","content": prompt}
-                    ],
+                    messages=messages,
                     temperature=temperature,
-                    max_tokens=max_tokens
+                    max_tokens=max_tokens,
+                    request_timeout=a.timeout
                 )
-                text = resp["choices"][0]["message"]["content"].strip()
+                text = resp["choices"][0]["message"]["content"]
+                a.on_delta(text); return text
             elif _HAS_REQUESTS and api_key:
-                url = (base_url.rstrip("/") if base_url else "https://api.openai.com") + "/v1/chat/completions"
+                # Same URL convention as the SDK: OPENAI_BASE_URL includes the /v1 prefix
+                url = resolve_base_url(base_url) + "/chat/completions"
                 headers={"Authorization": f"Bearer {api_key}", "Content-Type":"application/json"}
-                body={"model":model,"messages":[
-                    {"role":"system","content":"You are a helpful engineering writing assistant."},
-                    {"role":"user","content":prompt}], "temperature":temperature, "max_tokens":max_tokens}
-                r=requests.post(url, headers=headers, data=json.dumps(body), timeout=120)
-                r.raise_for_status(); j=r.json(); text=j["choices"][0]["message"]["content"].strip()
+                body={"model":model,"messages":messages, "temperature":temperature, "max_tokens":max_tokens}
+                return stream_sse_post(client_pool().session(base_url), url, headers, body, a.on_delta, a.stop, timeout=a.timeout)
             else:
                 raise RuntimeError("No OpenAI client available. Install 'openai' (>=1.0) and set OPENAI_API_KEY, or ensure 'requests' is installed.")
-            self.stats.log_text("response", file_for_stats, text)
+        def call() -> str:
+            # Only reached on a cache miss; usage stats record real API traffic
+            try: self.stats.log_text("prompt", file_for_stats, prompt, section, model)
+            except Exception: pass
+            t0 = time.monotonic(); ptok = len(prompt)//4
+            p95 = self.stats.eta.predict_p95(model, ptok)
+            policy = RetryPolicy.from_prediction(p95, timeout_s=120, attempts=int(self.cfg.get("ai",{}).get("max_attempts",4)),
+                                                 hedge=bool(self.cfg.get("ai",{}).get("hedge",True)))
+            calls = CallStats()
+            try:
+                text = resilient_call(attempt, throttle.push, cancel, policy, ptok, calls).strip()
+            except StreamCancelled:
+                raise
+            except Exception as e:
+                # Failed round-trips still cost tokens; "failed" rows stay out of the ETA fit
+                if calls.attempts:
+                    self.stats.log_text("failed", file_for_stats, str(e), section, model,
+                                        attempts=calls.attempts, wasted_tokens=calls.wasted_tokens)
+                if calls.attempts > 1: raise RuntimeError(f"{e} (after {calls.attempts} attempts)") from e
+                raise
+            # The winning attempt's own latency (not the backoff waits) is what the ETA model learns from
+            self.stats.log_text("response", file_for_stats, text, section, model,
+                                latency_ms=int((calls.latency_s or time.monotonic()-t0)*1000), prompt_tokens=ptok,
+                                attempts=calls.attempts, wasted_tokens=calls.wasted_tokens)
+            self.stats.log_connections(client_pool().stats())
+            return text
+        try:
+            params = {"api": "chat", "temperature": temperature, "max_tokens": max_tokens}
+            text, self.last_from_cache = cached_call(self.cache, self.cache_mode, model, params, messages, call)
+            if self.last_from_cache: throttle.push(text)
+            throttle.flush()
             self.finished.emit(section, text)
+        except StreamCancelled as e:
+            throttle.flush()
+            self.cancelled.emit(section, e.partial)
         except Exception as e:
             self.failed.emit(str(e))
 
@@ -512,8 +551,9 @@ class PdfViewerTab(QtWidgets.QWidget):
         self.open_external=QtWidgets.QPushButton("Open Externally")
         top.addWidget(self.zoom_out); top.addWidget(self.zoom_in); top.addStretch(1); top.addWidget(self.open_external)
         v.addLayout(top)
-        if _HAS_WEBENGINE:
-            self.view = QtWebEngineWidgets.QWebEngineView()
+        web = _webengine()
+        if web:
+            self.view = web.QWebEngineView()
             self.view.setZoomFactor(self._zoom); self.view.load(QtCore.QUrl.fromLocalFile(str(self.path)))
             v.addWidget(self.view,1)
             self.zoom_in.clicked.connect(lambda: self._zoom_by(+0.1))
@@ -532,14 +572,21 @@ class FitImageView(QGraphicsView):
     """
     Crisp at 1:1, smooth when scaling; no cropping; no zoom creep; EXIF-aware.
     Adds: pixel-scale snap to avoid fractional blur on HiDPI screens.
+    With an ImagePyramidCache, only the smallest cached level that covers the
+    viewport is decoded; full resolution is loaded on zoom-to-actual-pixels
+    (or when wheel zoom needs more pixels than the current level has).
+    Scene coordinates are always full-resolution image pixels.
     """
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, cache: Optional[ImagePyramidCache] = None):
         super().__init__(parent)
         self._img = None
         self._pix = None
         self._fit = True
         self._min_scale = 0.05
         self._max_scale = 20.0
+        self._cache = cache
+        self._src = None          # SourceInfo of the image loaded through the cache
+        self._level = 0           # pyramid level currently shown (0 = full resolution)
 
         scene = QGraphicsScene(self)
         self.setScene(scene)
@@ -554,19 +601,34 @@ class FitImageView(QGraphicsView):
         self.setDragMode(QGraphicsView.ScrollHandDrag)
         self.setViewportUpdateMode(QGraphicsView.MinimalViewportUpdate)
 
-    def load_image(self, path: str) -> None:
-        rdr = QImageReader(path)
-        rdr.setAutoTransform(True)
-        img = rdr.read()
-        if img.isNull():
-            self.clear_image(); return
+    def load_image(self, path: str) -> bool:
+        if self._cache is None:
+            rdr = QImageReader(path)
+            rdr.setAutoTransform(True)
+            img = rdr.read()
+            if img.isNull():
+                self.clear_image(); return False
+            self._src = None; self._level = 0
+            self._img = img
+            self._pix = QPixmap.fromImage(img)
+            self._apply_pixmap()
+            return True
+        dpr = self._device_px_ratio()
+        vp = self.viewport().size()
+        img, _, info = self._cache.load(path, int(vp.width() * dpr), int(vp.height() * dpr))
+        if img.isNull() or info is None:
+            self.clear_image(); return False
+        self._src = info
+        self._level = self._level_of(img)
         self._img = img
         self._pix = QPixmap.fromImage(img)
         self._apply_pixmap()
+        return True
 
     def set_pixmap(self, pix: QPixmap) -> None:
         if not pix or pix.isNull():
             self.clear_image(); return
+        self._src = None; self._level = 0
         self._pix = pix
         self._img = pix.toImage()
         self._apply_pixmap()
@@ -574,7 +636,9 @@ class FitImageView(QGraphicsView):
     def clear_image(self) -> None:
         self._img = None
         self._pix = None
+        self._src = None; self._level = 0
         self.item.setPixmap(QPixmap())
+        self.item.setScale(1.0)
         self.scene().setSceneRect(QRectF())
         self.resetTransform()
 
@@ -589,13 +653,16 @@ class FitImageView(QGraphicsView):
 
     def zoom_to_actual_pixels(self) -> None:
         self._fit = False
+        if self._src is not None and self._level > 0:
+            self._show_level(0)
         self._set_abs_scale(1.0)
         self._update_sampling_hint()
 
     def _apply_pixmap(self) -> None:
         self.item.setPixmap(self._pix)
         self.item.setOffset(0, 0)
-        self.scene().setSceneRect(self.item.boundingRect())
+        self.item.setScale(self._level_scale())
+        self.scene().setSceneRect(self.item.sceneBoundingRect())
         self.resetTransform()
         if self._fit:
             self._refit()
@@ -603,12 +670,44 @@ class FitImageView(QGraphicsView):
 
     def _refit(self) -> None:
         self.resetTransform()
-        r = self.item.boundingRect()
+        r = self.item.sceneBoundingRect()
         if not r.isEmpty():
             self.fitInView(r, Qt.KeepAspectRatio)
             self._snap_scale_to_crisp_steps()
+            self._ensure_level()
         self._update_sampling_hint()
 
+    # ---- pyramid levels
+    def _level_scale(self) -> float:
+        if self._src is None or not self._pix or self._pix.isNull():
+            return 1.0
+        return self._src.width / float(self._pix.width())
+
+    def _level_of(self, img) -> int:
+        lvl = 0
+        while lvl < self._src.max_level and self._src.level_size(lvl)[0] > img.width():
+            lvl += 1
+        return lvl
+
+    def _ensure_level(self) -> None:
+        """Swap in a sharper level if the current zoom needs more pixels than are loaded."""
+        if self._src is None or self._cache is None or self._level == 0:
+            return
+        s = self._current_scale() * self._device_px_ratio()
+        need = self._cache.level_for(self._src, int(self._src.width * s + 0.5), int(self._src.height * s + 0.5))
+        if need < self._level:
+            self._show_level(need)
+
+    def _show_level(self, level: int) -> None:
+        img = self._cache.load_level(self._src, level)
+        if img.isNull():
+            return
+        self._level = level
+        self._img = img
+        self._pix = QPixmap.fromImage(img)
+        self.item.setPixmap(self._pix)
+        self.item.setScale(self._level_scale())
+
     def _device_px_ratio(self) -> float:
         try:
             return float(self.window().devicePixelRatioF())
@@ -641,6 +740,7 @@ class FitImageView(QGraphicsView):
         new_scale = max(self._min_scale, min(self._current_scale() * factor, self._max_scale))
         self._set_abs_scale(new_scale)
         self._snap_scale_to_crisp_steps()
+        self._ensure_level()
         self._update_sampling_hint()
         e.accept()
 
@@ -652,7 +752,7 @@ class FitImageView(QGraphicsView):
     def _update_sampling_hint(self) -> None:
         s = self._current_scale()
         dpr = self._device_px_ratio()
-        if abs(s - dpr) <= 0.06 * dpr:
+        if self._level == 0 and abs(s - dpr) <= 0.06 * dpr:
             self.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
             self.item.setTransformationMode(Qt.FastTransformation)
         else:
@@ -660,41 +760,86 @@ class FitImageView(QGraphicsView):
             self.item.setTransformationMode(Qt.SmoothTransformation)
 
 class ImageViewerTab(QtWidgets.QWidget):
-    def __init__(self, path: Path):
+    def __init__(self, path: Path, project_root: Optional[Path] = None):
         super().__init__(); self.path=path
         v=QtWidgets.QVBoxLayout(self); v.setContentsMargins(6,6,6,6)
-        self.view = FitImageView()
+        self.view = FitImageView(cache=ImagePyramidCache.for_root(project_root or path.parent))
         v.addWidget(self.view,1)
-        pix = QtGui.QPixmap(str(self.path))
-        if pix.isNull():
+        if not self.view.load_image(str(self.path)):
             lbl=QtWidgets.QLabel("Failed to load image."); lbl.setAlignment(QtCore.Qt.AlignCenter)
             v.addWidget(lbl,1)
-        else:
-            self.view.set_pixmap(pix)
 
 # ---------- Fixed WebEngine preview ----------
-if _HAS_WEBENGINE:
-    class FixedWebView(QtWebEngineWidgets.QWebEngineView):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            super().setZoomFactor(1.0)
-        def setZoomFactor(self, f: float):
-            super().setZoomFactor(1.0)
-        def wheelEvent(self, e: QtGui.QWheelEvent):
-            if e.modifiers() & QtCore.Qt.ControlModifier:
-                e.ignore(); return
-            super().wheelEvent(e)
-        def keyPressEvent(self, e: QtGui.QKeyEvent):
-            if e.modifiers() & QtCore.Qt.ControlModifier and e.key() in (QtCore.Qt.Key_Plus, QtCore.Qt.Key_Minus, QtCore.Qt.Key_0):
-                e.ignore(); return
-            super().keyPressEvent(e)
+_FIXED_WEB_VIEW = None
+def _fixed_web_view_class():
+    """QWebEngineView pinned to 100% zoom; the class is built with the lazy WebEngine import."""
+    global _FIXED_WEB_VIEW
+    if _FIXED_WEB_VIEW is None:
+        web = _webengine()
+        if web is None: return None
+        class FixedWebView(web.QWebEngineView):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                super().setZoomFactor(1.0)
+            def setZoomFactor(self, f: float):
+                super().setZoomFactor(1.0)
+            def wheelEvent(self, e: QtGui.QWheelEvent):
+                if e.modifiers() & QtCore.Qt.ControlModifier:
+                    e.ignore(); return
+                super().wheelEvent(e)
+            def keyPressEvent(self, e: QtGui.QKeyEvent):
+                if e.modifiers() & QtCore.Qt.ControlModifier and e.key() in (QtCore.Qt.Key_Plus, QtCore.Qt.Key_Minus, QtCore.Qt.Key_0):
+                    e.ignore(); return
+                super().keyPressEvent(e)
+        _FIXED_WEB_VIEW = FixedWebView
+    return _FIXED_WEB_VIEW
 
 # ---------- HTML editor + preview ----------
+_HEAD_CLOSE_RX = re.compile(r'(?is)</head>')
+_SRC_HREF_RX = re.compile(r'\b(src|href)\s*=\s*"([^"]+)"')
+_URL_SCHEME_RX = re.compile(r'^[a-zA-Z]+:')
+_DIV_TAG_RX = re.compile(r'<(/?)div\b([^>]*)>', re.I)
+_ID_ATTR_RX = re.compile(r'\bid\s*=\s*"([^"]+)"', re.I)
+_TAB_CLASS_RX = re.compile(r'\bclass\s*=\s*"[^"]*\btab-content\b', re.I)
+
+def _split_tab_sections(html: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Split a board page into (skeleton, {tab id: inner HTML}) for each
+    <div id=".." class="tab-content"> block. The skeleton keeps the opening and
+    closing tags and replaces only the inner HTML with a placeholder, so two
+    versions with equal skeletons differ only inside tab bodies.
+    """
+    tags = list(_DIV_TAG_RX.finditer(html))
+    sections: Dict[str, str] = {}; out: List[str] = []; pos = 0; i = 0
+    while i < len(tags):
+        m = tags[i]
+        if m.group(1) or not _TAB_CLASS_RX.search(m.group(2)):
+            i += 1; continue
+        idm = _ID_ATTR_RX.search(m.group(2))
+        depth = 1; j = i + 1
+        while j < len(tags) and depth:
+            depth += -1 if tags[j].group(1) else 1
+            j += 1
+        if depth or not idm or idm.group(1) in sections:
+            i += 1; continue   # unbalanced or anonymous: leave it in the skeleton
+        sid = idm.group(1); close = tags[j-1]
+        sections[sid] = html[m.end():close.start()]
+        out.append(html[pos:m.end()]); out.append(f"\x00{sid}\x00")
+        pos = close.start(); i = j
+    out.append(html[pos:])
+    return "".join(out), sections
+
 class HtmlEditorTab(QtWidgets.QWidget):
     content_changed = QtCore.pyqtSignal()
     def __init__(self, path: Path, project_root: Optional[Path] = None):
         super().__init__(); self.path=path; self.project_root = project_root
         self._debounce = QtCore.QTimer(self); self._debounce.setSingleShot(True); self._debounce.setInterval(350)
+        # Preview caches: injected <head> block, resolved root-relative URLs, and what the page currently shows
+        self._head_inject: Optional[str] = None
+        self._abs_url_cache: Dict[str, str] = {}
+        self._page_ready = False
+        self._shown_skeleton: Optional[str] = None
+        self._shown_sections: Dict[str, str] = {}
 
         lay=QtWidgets.QVBoxLayout(self); lay.setContentsMargins(6,6,6,6)
 
@@ -711,13 +856,16 @@ class HtmlEditorTab(QtWidgets.QWidget):
         self.edit.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
         self.inner.addTab(self.edit, "Editor")
 
-        if _HAS_WEBENGINE:
-            self.preview = FixedWebView()
+        web_view_cls = _fixed_web_view_class()
+        if web_view_cls:
+            self.preview = web_view_cls()
             self._use_webengine = True
         else:
             self.preview = QtWidgets.QTextBrowser()
             self._use_webengine = False
         self.inner.addTab(self.preview, "Preview")
+        if self._use_webengine:
+            self.preview.loadFinished.connect(self._on_load_finished)
 
         txt=self.path.read_text(encoding="utf-8")
         self.edit.setPlainText(txt)
@@ -725,7 +873,7 @@ class HtmlEditorTab(QtWidgets.QWidget):
 
         self.edit.textChanged.connect(self._on_text_changed)
         self._debounce.timeout.connect(self._render_preview)
-        self.btn_refresh.clicked.connect(self._render_preview)
+        self.btn_refresh.clicked.connect(lambda: self._render_preview(force=True))
         self.btn_external.clicked.connect(lambda: webbrowser.open(str(self.path)))
 
     def set_panel_visible(self, visible: bool):
@@ -741,7 +889,9 @@ class HtmlEditorTab(QtWidgets.QWidget):
         self.content_changed.emit()
         self._debounce.start()
 
-    def _wrap_for_preview(self, html: str) -> str:
+    def _head_injection(self) -> str:
+        if self._head_inject is not None:
+            return self._head_inject
         base_href = ""
         if self.project_root:
             base_dir = self.path.parent.resolve()
@@ -778,80 +928,74 @@ class HtmlEditorTab(QtWidgets.QWidget):
   })();
 </script>
 """
-        head_inject = base_href + css
-        if re.search(r'(?is)</head>', html):
-            return re.sub(r'(?is)</head>', head_inject + "</head>", html, count=1)
+        self._head_inject = base_href + css
+        return self._head_inject
+
+    def _wrap_for_preview(self, html: str) -> str:
+        head_inject = self._head_injection()
+        m = _HEAD_CLOSE_RX.search(html)
+        if m:
+            return html[:m.start()] + head_inject + html[m.start():]
         return f"<!doctype html><html><head>{head_inject}</head><body>{html}</body></html>"
 
     def _rewrite_abs_paths(self, html: str) -> str:
         if not self.project_root: return html
         root = self.project_root.resolve()
+        cache = self._abs_url_cache
         def repl_attr(m):
             attr = m.group(1); url = m.group(2)
-            if re.match(r'^[a-zA-Z]+:', url):
+            if _URL_SCHEME_RX.match(url):
                 return m.group(0)
             if not url.startswith('/'):
                 return m.group(0)
-            local = (root / url.lstrip('/')).resolve()
-            return f'{attr}="file:///{str(local).replace("\\\\","/")}"'
-        return re.sub(r'\b(src|href)\s*=\s*"([^"]+)"', repl_attr, html)
-
-    def _render_preview(self):
-        html = self.text()
-        html = self._rewrite_abs_paths(html)
-        wrapped = self._wrap_for_preview(html)
-        if self._use_webengine:
-            try:
-                self.preview.setZoomFactor(1.0)
-            except Exception:
-                pass
-            base = QtCore.QUrl.fromLocalFile(str(self.path.parent.resolve()))
-            self.preview.setHtml(wrapped, base)
-        else:
-            self.preview.setHtml(wrapped)
+            uri = cache.get(url)
+            if uri is None:
+                uri = cache[url] = (root / url.lstrip('/')).resolve().as_uri()
+            return f'{attr}="{uri}"'
+        return _SRC_HREF_RX.sub(repl_attr, html)
+
+    def _render_preview(self, force: bool = False):
+        html = self._rewrite_abs_paths(self.text())
+        if not self._use_webengine:
+            self.preview.setHtml(self._wrap_for_preview(html))
+            return
+        skeleton, sections = _split_tab_sections(html)
+        if not force and self._page_ready and sections and skeleton == self._shown_skeleton:
+            changed = {k: v for k, v in sections.items() if self._shown_sections.get(k) != v}
+            self._shown_sections = sections
+            if changed:
+                self._patch_sections(changed)
+            return
+        self._shown_skeleton, self._shown_sections = skeleton, sections
+        self._page_ready = False
+        try:
+            self.preview.setZoomFactor(1.0)
+        except Exception:
+            pass
+        base = QtCore.QUrl.fromLocalFile(str(self.path.parent.resolve()))
+        self.preview.setHtml(self._wrap_for_preview(html), base)
+
+    def _patch_sections(self, changed: Dict[str, str]):
+        """Swap the inner HTML of the edited tab bodies in place; fall back to a full reload."""
+        js = ("(function(s){for(var id in s){var e=document.getElementById(id);"
+              "if(!e) return false; e.innerHTML=s[id];} return true;})(" + json.dumps(changed) + ")")
+        self.preview.page().runJavaScript(js, self._on_patch_done)
+
+    def _on_patch_done(self, ok):
+        if not ok:
+            self._render_preview(force=True)
+
+    def _on_load_finished(self, ok: bool):
+        self._page_ready = bool(ok)
 
 # ---------- Markdown helpers ----------
-def _split_md_sections(md: str) -> Dict[str, str]:
-    lines = md.splitlines()
-    sections: Dict[str, List[str]] = {}
-    current = "_start"; sections[current]=[]
-    for ln in lines:
-        m = re.match(r"^\s{0,3}(#{1,6})\s+(.+?)\s*$", ln)
-        if m:
-            current = m.group(2).strip()
-            sections[current]=[]
-        else:
-            sections.setdefault(current, []).append(ln)
-    return {k.lower(): "\n".join(v).strip() for k,v in sections.items() if k!="_start"}
-
-def _parse_circuit_identification(md: str) -> Dict[str, str]:
-    sections = _split_md_sections(md)
-    cid=None
-    for key in sections:
-        if key.strip().lower().startswith("circuit identification"): cid=sections[key]; break
-    out: Dict[str,str]={}
-    if not cid: return out
-    rows = [r.strip() for r in cid.splitlines() if r.strip().startswith("|")]
-    for r in rows:
-        if re.match(r"^\|\s*-{2,}\s*\|", r): continue
-        parts = [p.strip() for p in r.strip("|").split("|")]
-        if len(parts) >= 2:
-            out[parts[0]] = parts[1]
-    return out
-
-def _extract_table_after_heading(md: str, heading_startswith: str) -> str:
-    sections = _split_md_sections(md)
-    for title, body in sections.items():
-        if title.lower().startswith(heading_startswith.lower()):
-            return body.strip()
-    return ""
-
-def _extract_all_pinout_tables(md: str) -> str:
-    sections = _split_md_sections(md)
-    blocks=[]
-    for title, body in sections.items():
-        if title.lower().startswith("pinout description table"):
-            blocks.append(f"# {title}\n{body.strip()}")
+# Schematic exports are parsed once per file (and mtime) by minipcb_md; these read the shared parse
+def _extract_table_after_heading(doc: MdDoc, heading_startswith: str) -> str:
+    sec = doc.section(heading_startswith)
+    return "\n".join(sec.body).strip() if sec else ""
+
+def _extract_all_pinout_tables(doc: MdDoc) -> str:
+    blocks = [f"# {sec.key}\n" + "\n".join(sec.body).strip() for sec in doc.find("pinout description table")]
     return "\n\n".join(blocks).strip()
 
 def _sanitize_rev(text: str) -> str:
@@ -986,17 +1130,6 @@ class FmeaTableWidget(QtWidgets.QTableWidget):
         if not m:
             return
         table_html = m.group(0)
-        header = []
-        hm = re.search(r'(?is)<thead\b[^>]*>(.*?)</thead>', table_html)
-        head_body = hm.group(1) if hm else ""
-        if head_body:
-            cells = re.findall(r'(?is)<t[hd][^>]*>(.*?)</t[hd]>', head_body)
-            header = [re.sub(r"<[^>]+>","", c).strip() for c in cells]
-        else:
-            first_tr = re.search(r'(?is)<tr\b[^>]*>(.*?)</tr>', table_html)
-            if first_tr:
-                cells = re.findall(r'(?is)<t[hd][^>]*>(.*?)</t[hd]>', first_tr.group(1))
-                header = [re.sub(r"<[^>]+>","", c).strip() for c in cells]
         body_html = re.sub(r'(?is).*?<tbody\b[^>]*>(.*?)</tbody>.*', r'\1', table_html) if "<tbody" in table_html.lower() else \
                     re.sub(r'(?is)<table\b[^>]*>(.*?)</table>', r'\1', table_html)
         rows = re.findall(r'(?is)<tr\b[^>]*>(.*?)</tr>', body_html)
@@ -1192,7 +1325,7 @@ class BoardForms(QtWidgets.QTabWidget):
         self.s_img = QtWidgets.QLineEdit()
         self.s_alt = QtWidgets.QLineEdit(); self.s_alt.setText("Schematic (PLACEHOLDER)")
         self.s_browse = QtWidgets.QPushButton("Browse image…")
-        self.s_view = FitImageView(); self.s_view.setMinimumHeight(160)
+        self.s_view = FitImageView(cache=ImagePyramidCache.for_root(self.root)); self.s_view.setMinimumHeight(160)
         h = QtWidgets.QHBoxLayout(); h.addWidget(self.s_img); h.addWidget(self.s_browse)
         w = QtWidgets.QWidget(); w.setLayout(h)
         slay.addRow("Image filename (in images/)", w)
@@ -1204,7 +1337,7 @@ class BoardForms(QtWidgets.QTabWidget):
         self.l_img = QtWidgets.QLineEdit()
         self.l_alt = QtWidgets.QLineEdit(); self.l_alt.setText("Top view of miniPCB")
         self.l_browse = QtWidgets.QPushButton("Browse image…")
-        self.l_view = FitImageView(); self.l_view.setMinimumHeight(160)
+        self.l_view = FitImageView(cache=ImagePyramidCache.for_root(self.root)); self.l_view.setMinimumHeight(160)
         h2 = QtWidgets.QHBoxLayout(); h2.addWidget(self.l_img); h2.addWidget(self.l_browse)
         w2 = QtWidgets.QWidget(); w2.setLayout(h2)
         lform.addRow("Image filename (in images/)", w2)
@@ -1470,11 +1603,11 @@ class BoardForms(QtWidgets.QTabWidget):
             cands += sorted(md_dir.glob(f"*{pn}*.md"), key=lambda p: p.stat().st_mtime, reverse=True)
             for c in cands:
                 try:
-                    md = c.read_text(encoding="utf-8")
-                    idinfo = _parse_circuit_identification(md)
+                    doc = load_md(c)
+                    idinfo = doc.identification()
                     rev2 = idinfo.get("Revision","").strip()
-                    if md:
-                        self._fill_md_fields(md, c)
+                    if doc.text:
+                        self._fill_md_fields(doc, c)
                         if not self.m_rev_current.text().strip() and rev2:
                             self.m_rev_current.setText(rev2)
                         self.md_path_label.setText(c.name)
@@ -1488,15 +1621,15 @@ class BoardForms(QtWidgets.QTabWidget):
         for cand in _md_guess_paths(md_dir, pn, rev):
             if cand.exists():
                 try:
-                    md = cand.read_text(encoding="utf-8")
-                    idinfo = _parse_circuit_identification(md)
+                    doc = load_md(cand)
+                    idinfo = doc.identification()
                     pn_md = idinfo.get("Part Number","").strip()
                     rev_md = idinfo.get("Revision","").strip()
                     if explicit and pn_md and pn_md != pn:
                         QtWidgets.QMessageBox.warning(self,"PN mismatch", f"MD PN '{pn_md}' != form PN '{pn}'. Proceeding anyway.")
                     if explicit and rev_md and rev_md != rev:
                         QtWidgets.QMessageBox.warning(self,"REV mismatch", f"MD REV '{rev_md}' != rev '{rev}'. Proceeding anyway.")
-                    self._fill_md_fields(md, cand)
+                    self._fill_md_fields(doc, cand)
                     if not self.m_rev_current.text().strip() and rev_md:
                         self.m_rev_current.setText(rev_md)
                     self.md_path_label.setText(cand.name)
@@ -1505,10 +1638,10 @@ class BoardForms(QtWidgets.QTabWidget):
                     continue
         return False
 
-    def _fill_md_fields(self, md: str, src_path: Path):
-        net = _extract_table_after_heading(md, "Netlist")
-        part = _extract_table_after_heading(md, "Partlist")
-        pin = _extract_all_pinout_tables(md)
+    def _fill_md_fields(self, doc: MdDoc, src_path: Path):
+        net = _extract_table_after_heading(doc, "Netlist")
+        part = _extract_table_after_heading(doc, "Partlist")
+        pin = _extract_all_pinout_tables(doc)
         self.m_netlist.setPlainText(net or "PLACEHOLDER")
         self.m_partlist.setPlainText(part or "PLACEHOLDER")
         self.m_pinifc.setPlainText(pin or "PLACEHOLDER")
@@ -1989,6 +2122,7 @@ class StudioWindow(QtWidgets.QMainWindow):
         self._ai_started_at = None
         self._ai_eta_secs = None
         self._ai_activity = ""
+        self._ai_streamed = 0          # chars received for the running generation
 
         self._last_edit_at: Optional[datetime.datetime] = None
 
@@ -1996,6 +2130,10 @@ class StudioWindow(QtWidgets.QMainWindow):
         self._apply_theme()
         self._attach_default_tree_model()
 
+        # Show the window first; the project (tree model, services, forms) loads once the event loop runs
+        QtCore.QTimer.singleShot(0, self._open_initial_project)
+
+    def _open_initial_project(self):
         last = self.gset.get("last_project", "")
         if last and Path(last).exists():
             self._open_project(Path(last))
@@ -2005,6 +2143,9 @@ class StudioWindow(QtWidgets.QMainWindow):
                 self._open_project(last_guess)
             else:
                 self.open_project_dialog(initial=Path.home())
+        if minipcb_startup:
+            minipcb_startup.mark("project opened")
+            QtCore.QTimer.singleShot(0, _finish_startup_profile)
 
     def _build_ui(self):
         menubar=self.menuBar()
@@ -2029,10 +2170,11 @@ class StudioWindow(QtWidgets.QMainWindow):
         self.ai_section_combo=QtWidgets.QComboBox(); self.ai_section_combo.addItems(["DESCRIPTION","THEORY","ANALYSIS","FMEA","WCCA","EPSA","VIDEOS","RESOURCES","TESTING"])
         self.ai_context_act=QtWidgets.QAction("Generate Selected Section…", self)
         self.ai_edit_seeds_act=QtWidgets.QAction("Edit AI Seeds…", self)
+        self.ai_cancel_act=QtWidgets.QAction("Cancel Generation", self); self.ai_cancel_act.setEnabled(False)
         aiw=QtWidgets.QWidget(); hl=QtWidgets.QHBoxLayout(aiw); hl.setContentsMargins(6,2,6,2)
         hl.addWidget(QtWidgets.QLabel("Section:")); hl.addWidget(self.ai_section_combo)
         corner=QtWidgets.QWidgetAction(self); corner.setDefaultWidget(aiw)
-        aim.addAction(self.ai_context_act); aim.addAction(corner); aim.addSeparator(); aim.addAction(self.ai_edit_seeds_act)
+        aim.addAction(self.ai_context_act); aim.addAction(corner); aim.addAction(self.ai_cancel_act); aim.addSeparator(); aim.addAction(self.ai_edit_seeds_act)
         aim.addSeparator()
         self.ai_monitor_act = QtWidgets.QAction("Show Usage Monitor", self, checkable=True)
         aim.addAction(self.ai_monitor_act)
@@ -2071,6 +2213,13 @@ class StudioWindow(QtWidgets.QMainWindow):
         self.ai_monitor_act.toggled.connect(lambda on: self.ai_monitor_dock.setVisible(on))
         self.ai_monitor_dock.visibilityChanged.connect(self.ai_monitor_act.setChecked)
 
+        # AI Output dock: live stream for sections that are merged into the page when complete
+        self.ai_stream_dock = QtWidgets.QDockWidget("AI Output", self)
+        self.ai_stream_view = QtWidgets.QPlainTextEdit(); self.ai_stream_view.setReadOnly(True)
+        self.ai_stream_dock.setWidget(self.ai_stream_view)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.ai_stream_dock)
+        self.ai_stream_dock.hide()
+
         # Splitter
         self.split=QtWidgets.QSplitter(); self.split.addWidget(self.tree); self.split.addWidget(self.tabs)
         self.split.setStretchFactor(0,0); self.split.setStretchFactor(1,1); self.split.setSizes([360, 1080])
@@ -2080,10 +2229,14 @@ class StudioWindow(QtWidgets.QMainWindow):
         self.status=self.statusBar()
         self.saved_label = QtWidgets.QLabel("✓ Saved")
         self.ai_status_label = QtWidgets.QLabel("AI: idle")
+        self.ai_cache_label = QtWidgets.QLabel("")
         self.ai_progress = QtWidgets.QProgressBar(); self.ai_progress.setRange(0, 0); self.ai_progress.setFixedWidth(120); self.ai_progress.setVisible(False)
+        self.ai_cancel_btn = QtWidgets.QToolButton(); self.ai_cancel_btn.setText("Cancel"); self.ai_cancel_btn.setVisible(False)
         self.status.addPermanentWidget(self.saved_label)
         self.status.addPermanentWidget(self.ai_status_label)
+        self.status.addPermanentWidget(self.ai_cache_label)
         self.status.addPermanentWidget(self.ai_progress)
+        self.status.addPermanentWidget(self.ai_cancel_btn)
 
         # timers
         self._ai_timer = QtCore.QTimer(self); self._ai_timer.setInterval(200); self._ai_timer.timeout.connect(self._ai_tick)
@@ -2097,6 +2250,8 @@ class StudioWindow(QtWidgets.QMainWindow):
         self.new_board_act.triggered.connect(self._new_board)
         self.new_collection_act.triggered.connect(self._new_collection)
         self.ai_context_act.triggered.connect(self._ai_generate_menu)
+        self.ai_cancel_act.triggered.connect(self._ai_cancel)
+        self.ai_cancel_btn.clicked.connect(self._ai_cancel)
         self.ai_edit_seeds_act.triggered.connect(lambda: self.forms and self.forms._open_ai_seeds_dialog())
         self.view_html_panel_act.toggled.connect(self._set_show_html_panel)
 
@@ -2129,10 +2284,14 @@ class StudioWindow(QtWidgets.QMainWindow):
     def _open_project(self, root: Path):
         self.project_root=root
         self.cfg=ConfigService(root); self.cfg.set("last_project", str(root)); self.cfg.save()
+        if self.stats: self.stats.close()
         self.stats=StatsService(root, self.cfg.get("regex_counters",[]))
         self.htmlsvc=HtmlService(self.cfg); self.tpl=TemplateService(self.cfg); self.filesvc=FileService(root)
         self.filesvc.tree_changed.connect(self._refresh_tree)
-        self.ai=AiService(self.cfg, self.stats)
+        cache_mode = cache_mode_from_argv(sys.argv)   # --no-cache / --refresh override the project setting
+        if cache_mode == CACHE_USE: cache_mode = self.cfg.get("ai",{}).get("cache", CACHE_USE)
+        self.ai=AiService(self.cfg, self.stats, ResponseCache(root / AI_DIR_NAME / CACHE_DB_NAME), cache_mode)
+        self._update_cache_label()
 
         model=QtWidgets.QFileSystemModel(); model.setRootPath(str(root))
         model.setNameFilters(["*.html","*.md","*.pdf","*.png","*.jpg","*.jpeg","*.svg","*.css","*.js"])
@@ -2148,6 +2307,8 @@ class StudioWindow(QtWidgets.QMainWindow):
 
         self.ai.finished.connect(self._ai_finished)
         self.ai.failed.connect(self._ai_failed)
+        self.ai.chunk.connect(self._ai_chunk)
+        self.ai.cancelled.connect(self._ai_cancelled)
 
         self.gset.set("last_project", str(root)); self.gset.save()
 
@@ -2197,7 +2358,7 @@ class StudioWindow(QtWidgets.QMainWindow):
         if p.suffix.lower()==".pdf":
             tab=PdfViewerTab(p); self.tabs.addTab(tab, f"PDF: {p.name}"); self.tabs.setCurrentWidget(tab); return
         if p.suffix.lower() in (".png",".jpg",".jpeg",".svg"):
-            tab=ImageViewerTab(p); self.tabs.addTab(tab, f"IMG: {p.name}"); self.tabs.setCurrentWidget(tab); return
+            tab=ImageViewerTab(p, project_root=self.project_root); self.tabs.addTab(tab, f"IMG: {p.name}"); self.tabs.setCurrentWidget(tab); return
         if p.suffix.lower()==".html":
             tab=HtmlEditorTab(p, project_root=self.project_root)
             tab.content_changed.connect(lambda: self._on_tab_edited(tab))
@@ -2322,13 +2483,37 @@ class StudioWindow(QtWidgets.QMainWindow):
         maturity = self.forms.d_maturity.currentIndex() if self.forms else 1
         seed = self.forms.get_seed_for_section(section) if self.forms else "PLACEHOLDER"
         prompt_preview = AI_PROMPT_TPL.format(section=section, title=title or "PLACEHOLDER", keywords=keywords or "PLACEHOLDER", maturity=maturity, context=seed or "PLACEHOLDER")
-        self._ai_start(f"generate {section}", prompt_chars=len(prompt_preview))
+        if self._ai_started_at: return   # one generation at a time; Cancel stops the running one
+        model = self.cfg.get("ai",{}).get("model","gpt-4o-mini")
+        eta = self.stats.eta.predict(model, len(prompt_preview)//4) if self.stats else None
+        self._ai_start(f"generate {section}", prompt_chars=len(prompt_preview), eta_secs=eta)
         self.ai.generate_async(section, title, keywords, maturity, seed, Path(tab.path))
 
+    def _ai_chunk(self, section: str, text: str):
+        # Every section streams into the AI Output dock; the page (and the forms, whose edits apply live
+        # and mark the tab dirty) only change in _ai_finished, so cancel / error leave the page untouched
+        w = self.ai_stream_view
+        if not self._ai_streamed:
+            w.clear()
+            self.ai_stream_dock.setWindowTitle(f"AI Output — {section}"); self.ai_stream_dock.show()
+        self._ai_streamed += len(text)
+        cur = w.textCursor(); cur.movePosition(QtGui.QTextCursor.End); cur.insertText(text)
+        w.setTextCursor(cur); w.ensureCursorVisible()
+
+    def _ai_cancel(self):
+        if self.ai and self._ai_started_at:
+            self.ai.cancel(); self.ai_status_label.setText(f"AI: cancelling {self._ai_activity}…")
+
+    def _ai_cancelled(self, section: str, partial: str):
+        # Partial output stays visible in the AI Output dock but is not merged into the page
+        self._ai_done(False, extra=f"{len(partial)} chars kept in the output pane", status="cancelled")
+
     def _ai_tick(self):
         if not self._ai_started_at: return
         elapsed = (datetime.datetime.now() - self._ai_started_at).total_seconds()
-        if self._ai_eta_secs:
+        if self._ai_streamed:
+            eta_txt = f" · {self._ai_streamed} chars"   # output is arriving; the guess is moot
+        elif self._ai_eta_secs:
             remaining = max(0.0, self._ai_eta_secs - elapsed)
             eta_txt = f" ~{int(remaining)}s"
         else:
@@ -2339,12 +2524,25 @@ class StudioWindow(QtWidgets.QMainWindow):
         self._ai_activity = activity
         self._ai_started_at = datetime.datetime.now()
         self._ai_eta_secs = eta_secs if eta_secs is not None else max(5.0, (prompt_chars//4)/40.0)
+        self._ai_streamed = 0
         self.ai_progress.setVisible(True); self._ai_timer.start()
+        self.ai_cancel_btn.setVisible(True); self.ai_cancel_act.setEnabled(True)
         self.ai_status_label.setText(f"AI: {activity}…")
 
-    def _ai_done(self, ok: bool, extra: str = ""):
+    def _update_cache_label(self):
+        if not self.ai: return
+        c = self.ai.cache
+        if c is None or self.ai.cache_mode == CACHE_OFF:
+            self.ai_cache_label.setText("cache: off"); return
+        mode = " (refresh)" if self.ai.cache_mode == CACHE_REFRESH else ""
+        self.ai_cache_label.setText(f"cache: {c.hits} hit / {c.misses} miss{mode}")
+
+    def _ai_done(self, ok: bool, extra: str = "", status: Optional[str] = None):
         self._ai_timer.stop(); self.ai_progress.setVisible(False)
-        status = "done" if ok else "error"
+        self.ai_cancel_btn.setVisible(False); self.ai_cancel_act.setEnabled(False)
+        self._update_cache_label()
+        if status is None: status = ("done (cached)" if self.ai and self.ai.last_from_cache else "done") if ok else "error"
+        self.ai_monitor.append(f"{human_dt()}  {self._ai_activity}: {status} · http {client_pool().summary()}")
         self.ai_status_label.setText(f"AI: {self._ai_activity} {status}. {extra}")
         self._ai_started_at = None; self._ai_eta_secs = None; self._ai_activity = ""
 
@@ -2398,9 +2596,9 @@ class StudioWindow(QtWidgets.QMainWindow):
     # ---- Stats
     def _export_stats(self):
         if not self.stats: return
-        out, _ = QtWidgets.QFileDialog.getSaveFileName(self,"Export AI Usage CSV", str((self.project_root or Path.home())/"ai_usage.csv"), "CSV (*.csv)")
+        out, flt = QtWidgets.QFileDialog.getSaveFileName(self,"Export AI Usage CSV", str((self.project_root or Path.home())/"ai_usage.csv"), ";;".join(USAGE_EXPORTS))
         if not out: return
-        self.stats.export_csv(Path(out)); self.status.showMessage(f"Exported stats to {out}", 4000)
+        n = self.stats.export_csv(Path(out), USAGE_EXPORTS.get(flt)); self.status.showMessage(f"Exported {n} row(s) to {out}", 4000)
 
     def _fmt_bytes(self, n:int)->str:
         for unit in ["B","KB","MB","GB","TB"]:
@@ -2409,16 +2607,28 @@ class StudioWindow(QtWidgets.QMainWindow):
         return f"{n:.1f} PB"
 
 # ---------- Entry ----------
+def _finish_startup_profile():
+    # Runs one event-loop turn after the project opened, so the tree model has painted once
+    QtWidgets.qApp.processEvents()
+    minipcb_startup.mark("project tree populated")
+    minipcb_startup.report()
+    QtWidgets.qApp.quit()
+
 def main():
     try:
         QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_EnableHighDpiScaling, True)
         QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps, True)
+        # Required for importing QtWebEngineWidgets after the QApplication exists
+        QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_ShareOpenGLContexts, True)
     except Exception:
         pass
-    app=QtWidgets.QApplication(sys.argv)
+    argv = minipcb_startup.strip_flag() if minipcb_startup else sys.argv
+    app=QtWidgets.QApplication(argv)
     QtWidgets.qApp.setStyle("Fusion")
     QtWidgets.qApp.setStyleSheet(DARK_QSS)
+    if minipcb_startup: minipcb_startup.mark("QApplication created")
     win=StudioWindow(); win.show()
+    if minipcb_startup: minipcb_startup.mark("main window shown")
     sys.exit(app.exec_())
 
 if __name__=="__main__":
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+minipcb_usage.py — AI usage logging (ai_usage.db + ai_usage.jsonl) off the GUI thread.
+
+Used by minipcb_studio.py (StatsService delegates here).
+
+- log() only enqueues the raw text; a single background thread owns one
+  long-lived WAL-mode SQLite connection, computes the text statistics
+  (chars/words/sentences/loc/tokens plus the configured regex counters) and
+  inserts rows in batches, appending the matching JSONL lines in one write.
+- events is indexed on ts, file, direction and section, and three views
+  aggregate it: v_tokens_per_day, v_tokens_per_file, v_tokens_per_section.
+- export_csv() streams rows with fetchmany instead of loading the table;
+  pass a view name to export an aggregate instead of every event.
+- Response rows can carry the model, the request latency and the prompt's
+  token estimate; minipcb_eta fits its ETA predictor on those columns.
+  They also record how many attempts the call took (retries and hedges, see
+  minipcb_resilience) and the tokens spent on attempts that were thrown away;
+  calls that failed for good are logged with direction "failed".
+  v_retries_per_day sums both per day and model.
+- flush() waits until everything queued so far is on disk; close() (also run
+  at interpreter exit) flushes and stops the thread.
+- If the database cannot be opened or written (locked, read-only folder, bad
+  path) the first error is printed once and kept in db_error; rows still go
+  to the JSONL file, and flush() still returns promptly.
+"""
+
+from __future__ import annotations
+
+import atexit
+import datetime
+import json
+import queue
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+USAGE_DIR_NAME = ".minipcb_ai"     # per project/content root, next to the studio's other AI files
+USAGE_DB_NAME = "ai_usage.db"
+USAGE_JSONL_NAME = "ai_usage.jsonl"
+
+BATCH_MAX = 200              # rows per transaction
+BATCH_WAIT_S = 0.25          # linger for more rows before committing a partial batch
+EXPORT_CHUNK = 5000
+
+WORD_RX = re.compile(r"\b[\w'-]+\b")
+SENTENCE_RX = re.compile(r"[\.!?]+(?:\s|$)")
+
+VIEWS = {
+    "v_tokens_per_day": """
+        SELECT substr(ts, 1, 10) AS day, direction, COUNT(*) AS events,
+               SUM(est_tokens) AS est_tokens, SUM(raw_bytes) AS raw_bytes
+        FROM events GROUP BY day, direction""",
+    "v_tokens_per_file": """
+        SELECT file, direction, COUNT(*) AS events,
+               SUM(est_tokens) AS est_tokens, SUM(raw_bytes) AS raw_bytes, MAX(ts) AS last_ts
+        FROM events GROUP BY file, direction""",
+    "v_tokens_per_section": """
+        SELECT COALESCE(section, '') AS section, direction, COUNT(*) AS events,
+               SUM(est_tokens) AS est_tokens, SUM(raw_bytes) AS raw_bytes
+        FROM events GROUP BY section, direction""",
+    "v_retries_per_day": """
+        SELECT substr(ts, 1, 10) AS day, COALESCE(model, '') AS model,
+               SUM(direction = 'response') AS responses, SUM(direction = 'failed') AS failed,
+               SUM(COALESCE(attempts, 1) - 1) AS extra_attempts, SUM(COALESCE(wasted_tokens, 0)) AS wasted_tokens
+        FROM events WHERE direction IN ('response', 'failed') GROUP BY day, model""",
+}
+
+EVENT_COLUMNS = ("ts", "file", "section", "direction", "raw_bytes", "chars", "words", "sentences",
+                 "loc", "est_tokens", "regex_json", "model", "latency_ms", "prompt_tokens",
+                 "attempts", "wasted_tokens")
+# Columns added after the original table; created in place on older databases
+ADDED_COLUMNS = {"section": "TEXT", "model": "TEXT", "latency_ms": "INTEGER", "prompt_tokens": "INTEGER",
+                 "attempts": "INTEGER", "wasted_tokens": "INTEGER"}
+
+
+def text_stats(text: str, regexes: Sequence["re.Pattern[str]"] = ()) -> Dict[str, Any]:
+    """Counts stored per event; est_tokens is the usual chars/4 estimate."""
+    chars = len(text)
+    sentences = len(SENTENCE_RX.findall(text)) or (1 if text.strip() else 0)
+    counters = {rx.pattern: len(rx.findall(text)) for rx in regexes}
+    return {
+        "raw_bytes": len(text.encode("utf-8")),
+        "chars": chars,
+        "words": len(WORD_RX.findall(text)),
+        "sentences": sentences,
+        "loc": text.count("\n") + (1 if text else 0),
+        "est_tokens": int(max(0, round(chars / 4))),
+        "regex_json": json.dumps(counters) if counters else "{}",
+    }
+
+
+class UsageLogger:
+    """Background, batched writer for AI usage events."""
+
+    def __init__(self, db_path: Path, jsonl_path: Optional[Path] = None, regexes: Sequence[str] = ()):
+        self.db_path = Path(db_path)
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.regexes = []
+        for pat in regexes or ():
+            try:
+                self.regexes.append(re.compile(pat))
+            except re.error:
+                pass
+        self._q: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+        self.db_error: Optional[str] = None    # why ai_usage.db is not being written (None while it is)
+        self._thread = threading.Thread(target=self._worker, name="minipcb-usage", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---- public API (any thread) ----
+
+    def log(self, direction: str, file: str, text: str, section: str = "", model: str = "",
+            latency_ms: Optional[int] = None, prompt_tokens: Optional[int] = None,
+            attempts: Optional[int] = None, wasted_tokens: Optional[int] = None) -> None:
+        """Queue one prompt/response; statistics are computed on the logger thread."""
+        if not self._closed:
+            ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            extra = {"model": model or None, "latency_ms": latency_ms, "prompt_tokens": prompt_tokens,
+                     "attempts": attempts, "wasted_tokens": wasted_tokens}
+            self._q.put(("event", ts, file, section, direction, text, extra))
+
+    def log_record(self, record: Dict[str, Any]) -> None:
+        """Queue a JSONL-only record (e.g. connection-pool counters)."""
+        if not self._closed:
+            self._q.put(("record", record))
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._q.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._q.put(None)
+        self._thread.join(timeout=10.0)
+
+    def export_csv(self, out_path: Path, view: Optional[str] = None) -> int:
+        """Write all events (or one aggregate view) to CSV; returns the row count."""
+        import csv, sqlite3
+        if view is not None and view not in VIEWS:
+            raise ValueError(f"unknown usage view: {view}")
+        self.flush()
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        n = 0
+        try:
+            sql = f"SELECT * FROM {view};" if view else \
+                  f"SELECT {','.join(EVENT_COLUMNS)} FROM events ORDER BY id ASC;"
+            cur = conn.execute(sql)
+            with Path(out_path).open("w", newline="", encoding="utf-8") as fh:
+                w = csv.writer(fh)
+                w.writerow([d[0] for d in cur.description])
+                while True:
+                    rows = cur.fetchmany(EXPORT_CHUNK)
+                    if not rows:
+                        break
+                    w.writerows(rows); n += len(rows)
+        finally:
+            conn.close()
+        return n
+
+    # ---- logger thread ----
+
+    def _connect(self):
+        import sqlite3
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          ts TEXT NOT NULL,
+          file TEXT,
+          direction TEXT NOT NULL,
+          raw_bytes INTEGER,
+          chars INTEGER, words INTEGER, sentences INTEGER, loc INTEGER,
+          est_tokens INTEGER, regex_json TEXT
+        );""")
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(events);")}
+        for col, decl in ADDED_COLUMNS.items():
+            if col not in cols:
+                conn.execute(f"ALTER TABLE events ADD COLUMN {col} {decl};")
+        for col in ("ts", "file", "direction", "section"):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_events_{col} ON events({col});")
+        for name, sql in VIEWS.items():
+            conn.execute(f"CREATE VIEW IF NOT EXISTS {name} AS {sql};")
+        conn.commit()
+        return conn
+
+    def _report(self, msg: str) -> None:
+        if self.db_error is None:
+            self.db_error = msg
+            print(f"⚠️  AI usage log: {msg}", file=sys.stderr)
+
+    def _worker(self) -> None:
+        try:
+            conn = self._connect()
+        except Exception as e:
+            # Keep draining the queue (flush() must not hang) and keep the JSONL trail if there is one
+            conn = None
+            self._report(f"cannot open {self.db_path} ({type(e).__name__}: {e}); "
+                         + (f"rows go to {self.jsonl_path} only" if self.jsonl_path else "rows are dropped"))
+        try:
+            stop = False
+            while not stop:
+                batch: List[Any] = [self._q.get()]
+                # Linger briefly so a prompt and its response usually share one commit
+                try:
+                    while len(batch) < BATCH_MAX:
+                        batch.append(self._q.get(timeout=BATCH_WAIT_S))
+                        if batch[-1] is None or batch[-1][0] == "flush":
+                            break
+                except queue.Empty:
+                    pass
+                stop = self._write(conn, batch)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _write(self, conn, batch: List[Any]) -> bool:
+        rows, lines, waiters, stop = [], [], [], False
+        for item in batch:
+            if item is None:
+                stop = True
+            elif item[0] == "flush":
+                waiters.append(item[1])
+            elif item[0] == "record":
+                lines.append(json.dumps(item[1]))
+            else:
+                _, ts, file, section, direction, text, extra = item
+                row = {"ts": ts, "file": file, "section": section, "direction": direction,
+                       **text_stats(text, self.regexes), **extra}
+                rows.append(tuple(row[c] for c in EVENT_COLUMNS))
+                lines.append(json.dumps(row))
+        if rows and conn is not None:
+            try:
+                conn.executemany(f"INSERT INTO events ({','.join(EVENT_COLUMNS)}) "
+                                 f"VALUES ({','.join('?' * len(EVENT_COLUMNS))});", rows)
+                conn.commit()
+            except Exception as e:
+                self._report(f"writing {self.db_path} failed ({type(e).__name__}: {e})")
+        if lines and self.jsonl_path:
+            try:
+                self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.jsonl_path.open("a", encoding="utf-8") as fh:
+                    fh.write("\n".join(lines) + "\n")
+            except Exception as e:
+                self._report(f"writing {self.jsonl_path} failed ({type(e).__name__}: {e})")
+        for w in waiters:
+            w.set()
+        return stop
+
+
+__all__ = ["UsageLogger", "text_stats", "VIEWS", "EVENT_COLUMNS", "ADDED_COLUMNS",
+           "USAGE_DIR_NAME", "USAGE_DB_NAME", "USAGE_JSONL_NAME"]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Roll up the parts of every board into one procurement BOM
+
+taza_bom_rollup.py
+
+Groups every placed component of json/*_sch.json by (kind, normalised value,
+footprint) — "4u7" and "4.7u" are one line — and multiplies each board by what
+is to be built: boards whose EBL.json status is selected (default: planned,
+in-progress) count panels x "Pieces per Panel" from their md/ Circuit
+Identification table. Aggregation runs on the cached netlist graph index
+(minipcb_netgraph / minipcb_bom), so only changed boards are re-read.
+
+Examples
+--------
+python taza_bom_rollup.py                              # top lines for planned + in-progress boards
+python taza_bom_rollup.py --panels 3 --csv bom.csv     # three panels of each, as CSV
+python taza_bom_rollup.py --status all --json bom.json # one panel of every board
+python taza_bom_rollup.py --status complete,planned --kind C
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+from minipcb_bom import BUILD_STATUSES, build_quantities, load_ebl, rollup
+from minipcb_netgraph import load_or_build
+
+CSV_FIELDS = ["kind", "value", "value_num", "footprint", "quantity", "boards", "per_board", "spellings"]
+
+
+def write_csv(path: Path, lines) -> None:
+    with path.open("w", encoding="utf-8", newline="") as fh:
+        w = csv.DictWriter(fh, fieldnames=CSV_FIELDS)
+        w.writeheader()
+        for ln in lines:
+            w.writerow({**ln, "value_num": "" if ln["value_num"] is None else f"{ln['value_num']:g}",
+                        "per_board": " ".join(f"{b}x{n}" for b, n in ln["per_board"].items()),
+                        "spellings": " ".join(ln["spellings"])})
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cross-board BOM rollup of json/*_sch.json, weighted by EBL status and panelisation.")
+    ap.add_argument("--json-dir", type=Path, default=Path("json"), help="Folder with the *_sch.json files")
+    ap.add_argument("--md-dir", type=Path, default=Path("md"), help="Folder with the *_sch.md exports (Pieces per Panel)")
+    ap.add_argument("--ebl", type=Path, default=Path("EBL.json"), help="Engineering Build Log")
+    ap.add_argument("--status", default=",".join(BUILD_STATUSES),
+                    help="Comma-separated EBL statuses to build, or 'all' (default: planned,in-progress)")
+    ap.add_argument("--panels", type=int, default=1, help="Panels built per selected board")
+    ap.add_argument("--default-pieces", type=int, default=1, help="Pieces per panel when the md export has none")
+    ap.add_argument("--kind", default=None, help="Only lines of these kinds (comma-separated refdes prefixes)")
+    ap.add_argument("--csv", type=Path, default=None, help="Write the rolled-up BOM as CSV")
+    ap.add_argument("--json", type=Path, default=None, help="Write the rolled-up BOM and build plan as JSON")
+    ap.add_argument("--top", type=int, default=25, help="Lines printed (0 = all)")
+    args = ap.parse_args()
+
+    if not args.json_dir.is_dir():
+        ap.error(f"not a folder: {args.json_dir}")
+    statuses = None if args.status.strip().lower() == "all" else [s.strip() for s in args.status.split(",") if s.strip()]
+    t0 = time.perf_counter()
+    g, parsed = load_or_build(args.json_dir)
+    ebl = load_ebl(args.ebl)
+    if not ebl:
+        print(f"⚠️  No EBL rows in {args.ebl}; every board is untracked")
+    plan = build_quantities(g, ebl, args.md_dir, statuses, args.panels, args.default_pieces)
+    t1 = time.perf_counter()
+    bom = rollup(g, plan.quantity)
+    t_agg = time.perf_counter() - t1
+    lines = bom.lines(g.board_keys)
+    if args.kind:
+        kinds = {k.strip().upper() for k in args.kind.split(",")}
+        lines = [ln for ln in lines if ln["kind"] in kinds]
+    needed = [ln for ln in lines if ln["quantity"]]
+
+    for ln in sorted(needed, key=lambda ln: -ln["quantity"])[:args.top or None]:
+        print(f"{ln['quantity']:7d}  {ln['kind']:<4} {ln['value'] or '-':<10} {ln['footprint']:<34} on {ln['boards']} board(s)")
+    building = [r for r in plan.rows() if r["quantity"]]
+    no_pieces = [r["board"] for r in building if r["pieces_per_panel"] is None]
+    untracked = [r["board"] for r in plan.rows() if r["status"] == "untracked" and r["ebl_match"] != "superseded"]
+    superseded = [r["board"] for r in plan.rows() if r["ebl_match"] == "superseded"]
+    if no_pieces:
+        print(f"⚠️  No Pieces per Panel for {', '.join(no_pieces)} (counted as {args.default_pieces})")
+    if untracked:
+        print(f"⚠️  Not in the EBL: {', '.join(untracked)}")
+    if superseded:
+        print(f"ℹ️  EBL rev not found; status applied to the latest revision only, not built: {', '.join(superseded)}")
+
+    if args.csv:
+        write_csv(args.csv, lines)
+        print(f"CSV: {args.csv}")
+    if args.json:
+        report = {"build": {"statuses": statuses or "all", "panels": args.panels, "boards": plan.rows()},
+                  "summary": {"lines": len(lines), "lines_needed": len(needed),
+                              "parts": sum(ln["quantity"] for ln in lines), "unplaced_skipped": bom.skipped},
+                  "lines": lines}
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"JSON: {args.json}")
+    print(f"BOM summary: {len(needed)} of {len(lines)} line(s) needed, {sum(ln['quantity'] for ln in lines)} parts "
+          f"for {sum(r['quantity'] for r in building)} board(s) from {len(building)} design(s); "
+          f"{bom.skipped} unplaced symbol(s) skipped · aggregated in {t_agg*1000:.1f} ms "
+          f"({time.perf_counter() - t0:.2f}s total, {parsed} board(s) re-indexed)")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
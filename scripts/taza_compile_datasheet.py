@@ -33,20 +33,36 @@ python taza_compile_datasheet.py path/to/04C-25_A1-01_sch.md \
 # Show the active preset JSON
 python taza_compile_datasheet.py path/to/04C-25_A1-01_sch.md --show-preset
 
+# Build every sch/man pair under md/, recompiling only what changed since the last run
+# (input hashes + preset are kept in md/.minipcb_cache/compile_manifest.json)
+python taza_compile_datasheet.py --all md -j 8
+
 """
 
 import argparse
+import hashlib
 import json
+import os
 import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+from minipcb_md import MdDoc, load_md
+
 HEADING_RE = re.compile(r'^(?P<hash>#{1,6})\s+(?P<title>.+?)\s*$', re.UNICODE)
 SCH_RE = re.compile(r'^(?P<pn>[^_/\\]+)_(?P<rev>[^_/\\]+)_(?:sch|shc)\.md$', re.IGNORECASE)
 MAN_RE = re.compile(r'^(?P<pn>[^_/\\]+)_(?P<rev>[^_/\\]+)_man\.md$', re.IGNORECASE)
 
+# --all build manifest; bump COMPILER_VERSION when the output format changes so every datasheet rebuilds
+COMPILER_VERSION = 1
+MANIFEST_DIR = ".minipcb_cache"
+MANIFEST_NAME = "compile_manifest.json"
+MANIFEST_FORMAT = 1
+
 # ---------- Built-in presets ----------
 PRESETS: Dict[str, Dict] = {
     "default": {
@@ -91,25 +107,15 @@ class Section:
         self.key = norm(self.title)
         self.fqkey = f"{self.src}:{self.key}"
 
-def parse_markdown_sections(text: str, src: str) -> List[Section]:
-    lines = text.splitlines()
+def markdown_sections(doc: MdDoc, src: str) -> List[Section]:
+    """Compiler sections from the shared parse (minipcb_md); text before the first heading becomes '# _preamble'."""
     secs: List[Section] = []
-    cur: Optional[Section] = None
-    for line in lines:
-        m = HEADING_RE.match(line)
-        if m:
-            if cur is not None:
-                secs.append(cur)
-            level = len(m.group('hash'))
-            title = m.group('title').strip()
-            cur = Section(src=src, level=level, title=title, lines=[line])
+    for s in doc.sections:
+        if s.level == 0:
+            # synthetic preamble
+            secs.append(Section(src=src, level=1, title="_preamble", lines=["# _preamble"] + s.lines))
         else:
-            if cur is None:
-                # synthetic preamble
-                cur = Section(src=src, level=1, title="_preamble", lines=["# _preamble"])
-            cur.lines.append(line)
-    if cur is not None:
-        secs.append(cur)
+            secs.append(Section(src=src, level=s.level, title=s.title, lines=list(s.lines)))
     return secs
 
 def derive_paths(input_path: Path) -> Tuple[Path, Path, str, str]:
@@ -132,9 +138,9 @@ def derive_paths(input_path: Path) -> Tuple[Path, Path, str, str]:
         raise FileNotFoundError(f"Manual file not found: {man}")
     return sch, man, pn, rev
 
-def load_text(path: Path) -> str:
+def load_doc(path: Path) -> MdDoc:
     try:
-        return path.read_text(encoding='utf-8')
+        return load_md(path)
     except Exception as e:
         raise RuntimeError(f"Failed to read {path}: {e}")
 
@@ -273,55 +279,36 @@ def compile_sections(sch_secs: List[Section], man_secs: List[Section], order: st
             s.used = True; arranged.append(s)
     return arranged
 
-def main():
-    ap = argparse.ArgumentParser(description="Compile a datasheet-style Markdown from *_sch.md and *_man.md with include/exclude/reorder/rename controls. No AI calls.")
-    ap.add_argument("path", type=Path, help="Path to either *_sch.md or *_man.md")
-    ap.add_argument("-o", "--out", type=Path, default=None, help="Output markdown path (default: PN_REV.md next to inputs)")
-    ap.add_argument("--include", action="append", default=[], help="Sections to include (comma-separated or repeat). Tokens can be 'src:title' or 'title'")
-    ap.add_argument("--exclude", action="append", default=[], help="Sections to exclude (comma-separated or repeat). Tokens can be 'src:title' or 'title'")
-    ap.add_argument("--order", type=str, default="", help="Order DSL, e.g., 'man:Revision History, sch:Circuit Identification, *' (overrides preset order)")
-    ap.add_argument("--preset", type=str, default="default", help=f"Built-in preset to apply first (available: {', '.join(PRESETS.keys())})")
-    ap.add_argument("--no-preset", action="store_true", help="Disable presets entirely")
-    ap.add_argument("--show-preset", action="store_true", help="Print the active preset JSON and exit")
-    ap.add_argument("--dump-headings", action="store_true", help="Print detected headings (source:level title) and exit")
-    ap.add_argument("--force", action="store_true", help="Overwrite output if it exists")
-    args = ap.parse_args()
-
-    sch_path, man_path, pn, rev = derive_paths(args.path)
-
-    sch_text = load_text(sch_path)
-    man_text = load_text(man_path)
-
-    sch_secs = parse_markdown_sections(sch_text, 'sch')
-    man_secs = parse_markdown_sections(man_text, 'man')
-
-    if args.dump_headings:
-        for line in dump_headings(sch_secs + man_secs):
-            print(line)
-        return
-
-    # Active preset
+# ---------- Compile one PN/REV ----------
+def resolve_config(args) -> Dict:
+    """Preset + CLI filters/order as one plain dict (also what --all hashes into the build manifest)."""
     preset_cfg = {} if args.no_preset else PRESETS.get(args.preset or "", PRESETS["default"])
+    return {
+        "preset": preset_cfg,
+        "include": (preset_cfg.get("include", []) if preset_cfg else []) + parse_list_arg(args.include),
+        "exclude": (preset_cfg.get("exclude", []) if preset_cfg else []) + parse_list_arg(args.exclude),
+        "order": args.order or "",
+    }
 
-    if args.show_preset:
-        print(json.dumps(preset_cfg, indent=2, ensure_ascii=False))
-        return
+def compile_datasheet(sch_path: Path, man_path: Path, pn: str, rev: str, cfg: Dict) -> str:
+    """Compiled datasheet markdown for one sch/man pair under the resolved config."""
+    preset_cfg = cfg["preset"]
+    sch_secs = markdown_sections(load_doc(sch_path), 'sch')
+    man_secs = markdown_sections(load_doc(man_path), 'man')
 
     # Compose filters and transforms from preset + CLI
     order_json = preset_cfg.get("order") if preset_cfg else None
     rename_map: Dict[str,str] = {norm(k): v for k, v in (preset_cfg.get("rename", {}) if preset_cfg else {}).items()}
     level_shift: Dict[str,int] = {norm(k): int(v) for k, v in (preset_cfg.get("level_shift", {}) if preset_cfg else {}).items()}
-    include = (preset_cfg.get("include", []) if preset_cfg else []) + parse_list_arg(args.include)
-    exclude = (preset_cfg.get("exclude", []) if preset_cfg else []) + parse_list_arg(args.exclude)
 
     # Apply include/exclude filters
-    sch_secs, man_secs = filter_include_exclude(sch_secs, man_secs, include, exclude)
+    sch_secs, man_secs = filter_include_exclude(sch_secs, man_secs, cfg["include"], cfg["exclude"])
 
     # Apply renames and level shifts from preset
     apply_renames_and_level_shifts(sch_secs + man_secs, rename_map, level_shift)
 
     # If user provided --order, it overrides preset order. Otherwise use preset order (if any).
-    arranged = compile_sections(sch_secs, man_secs, args.order, order_json)
+    arranged = compile_sections(sch_secs, man_secs, cfg["order"], order_json)
 
     # Build output
     header = f"# {pn} {rev} — Compiled Datasheet\n\n" \
@@ -330,10 +317,212 @@ def main():
     for s in arranged:
         out_lines.append("\n".join(s.lines).rstrip())
         out_lines.append("")
+    return "\n".join(out_lines).rstrip() + "\n"
 
-    out_text = "\n".join(out_lines).rstrip() + "\n"
-    out_path = args.out if args.out else sch_path.with_name(f"{pn}_{rev}.md")
+# ---------- --all: incremental build over a folder ----------
+@dataclass
+class BuildTarget:
+    sch: Path
+    man: Path
+    pn: str
+    rev: str
+
+    @property
+    def out(self) -> Path:
+        return self.sch.with_name(f"{self.pn}_{self.rev}.md")
+
+def discover_targets(root: Path) -> List[BuildTarget]:
+    """Every PN/REV under `root` that has both a schematic and a manual export, in path order."""
+    targets: List[BuildTarget] = []
+    for p in sorted(root.rglob("*.md")):
+        m = SCH_RE.match(p.name)
+        if not m or MANIFEST_DIR in p.parts:
+            continue
+        man = p.with_name(f"{m.group('pn')}_{m.group('rev')}_man.md")
+        if man.exists():
+            targets.append(BuildTarget(p, man, m.group('pn'), m.group('rev')))
+    return targets
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def config_hash(cfg: Dict) -> str:
+    blob = json.dumps({"compiler": COMPILER_VERSION, **cfg}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class BuildManifest:
+    """
+    <root>/.minipcb_cache/compile_manifest.json: per output (relative path), the
+    inputs' (mtime_ns, size, sha256), the config hash and the output stamp.
+    An input whose stamp changed is re-hashed before it counts as changed, so
+    a touch or a checkout of identical content does not trigger a rebuild.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.path = root / MANIFEST_DIR / MANIFEST_NAME
+        self.entries: Dict[str, Dict] = {}
+        try:
+            blob = json.loads(self.path.read_text(encoding="utf-8"))
+            if blob.get("format") == MANIFEST_FORMAT:
+                self.entries = blob.get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def rel(self, p: Path) -> str:
+        try:
+            return p.relative_to(self.root).as_posix()
+        except ValueError:
+            return p.as_posix()
+
+    @staticmethod
+    def stamp(p: Path) -> List[int]:
+        st = p.stat()
+        return [st.st_mtime_ns, st.st_size]
+
+    def _input_same(self, rec: Optional[List], p: Path) -> bool:
+        """rec = [mtime_ns, size, sha256]; refreshes the stamp when only the stamp moved."""
+        if not rec:
+            return False
+        stamp = self.stamp(p)
+        if rec[:2] == stamp:
+            return True
+        if rec[1] != stamp[1] or rec[2] != file_sha256(p):
+            return False
+        rec[:2] = stamp
+        return True
+
+    def up_to_date(self, t: BuildTarget, cfg_hash: str) -> bool:
+        ent = self.entries.get(self.rel(t.out))
+        if not ent or ent.get("config") != cfg_hash or not t.out.exists():
+            return False
+        if ent.get("out") != self.stamp(t.out):
+            return False            # output edited or replaced by hand
+        return self._input_same(ent.get("sch"), t.sch) and self._input_same(ent.get("man"), t.man)
+
+    def record(self, t: BuildTarget, cfg_hash: str, seconds: float) -> None:
+        self.entries[self.rel(t.out)] = {
+            "sch": self.stamp(t.sch) + [file_sha256(t.sch)],
+            "man": self.stamp(t.man) + [file_sha256(t.man)],
+            "config": cfg_hash,
+            "out": self.stamp(t.out),
+            "seconds": round(seconds, 4),
+        }
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"format": MANIFEST_FORMAT, "entries": self.entries}, indent=1, sort_keys=True),
+                           encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write build manifest {self.path}: {e}", file=sys.stderr)
+
+def build_one(t: BuildTarget, cfg: Dict) -> float:
+    """Worker: compile and write one datasheet; returns the seconds spent."""
+    t0 = time.perf_counter()
+    text = compile_datasheet(t.sch, t.man, t.pn, t.rev, cfg)
+    t.out.write_text(text, encoding='utf-8')
+    return time.perf_counter() - t0
+
+def build_all(root: Path, cfg: Dict, force: bool = False, jobs: int = 0) -> int:
+    """Recompile every stale datasheet under `root` in parallel; returns the number of failures."""
+    t0 = time.perf_counter()
+    root = root.resolve()
+    targets = discover_targets(root)
+    manifest = BuildManifest(root)
+    cfg_hash = config_hash(cfg)
+    stale = [t for t in targets if force or not manifest.up_to_date(t, cfg_hash)]
+    fresh = len(targets) - len(stale)
+    failed: List[Tuple[BuildTarget, str]] = []
+    built: List[Tuple[BuildTarget, float]] = []
+
+    if stale:
+        workers = max(1, min(jobs or os.cpu_count() or 1, len(stale)))
+        if workers == 1:
+            results = []
+            for t in stale:
+                try:
+                    results.append((t, build_one(t, cfg), None))
+                except Exception as e:
+                    results.append((t, 0.0, e))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futs = {pool.submit(build_one, t, cfg): t for t in stale}
+                results = []
+                for fut in as_completed(futs):
+                    try:
+                        results.append((futs[fut], fut.result(), None))
+                    except Exception as e:
+                        results.append((futs[fut], 0.0, e))
+        for t, secs, err in sorted(results, key=lambda r: str(r[0].out)):
+            if err is None:
+                manifest.record(t, cfg_hash, secs)
+                built.append((t, secs))
+                print(f"✅ {manifest.rel(t.out)}  ({secs*1000:.0f} ms)")
+            else:
+                manifest.entries.pop(manifest.rel(t.out), None)
+                failed.append((t, f"{type(err).__name__}: {err}"))
+                print(f"❌ {manifest.rel(t.out)}: {type(err).__name__}: {err}", file=sys.stderr)
+
+    # Drop entries whose sources are gone
+    live = {manifest.rel(t.out) for t in targets}
+    for k in [k for k in manifest.entries if k not in live]:
+        del manifest.entries[k]
+    manifest.save()
+
+    wall = time.perf_counter() - t0
+    cpu = sum(s for _, s in built)
+    print(f"Build summary: {len(built)} rebuilt, {fresh} up to date, {len(failed)} failed "
+          f"({len(targets)} datasheet(s) under {root}) in {wall:.2f}s"
+          + (f" · compile time {cpu:.2f}s" if built else ""))
+    return len(failed)
+
+def main():
+    ap = argparse.ArgumentParser(description="Compile a datasheet-style Markdown from *_sch.md and *_man.md with include/exclude/reorder/rename controls. No AI calls.")
+    ap.add_argument("path", type=Path, nargs="?", default=None,
+                    help="Path to either *_sch.md or *_man.md (with --all: root folder, default md/)")
+    ap.add_argument("-o", "--out", type=Path, default=None, help="Output markdown path (default: PN_REV.md next to inputs)")
+    ap.add_argument("--include", action="append", default=[], help="Sections to include (comma-separated or repeat). Tokens can be 'src:title' or 'title'")
+    ap.add_argument("--exclude", action="append", default=[], help="Sections to exclude (comma-separated or repeat). Tokens can be 'src:title' or 'title'")
+    ap.add_argument("--order", type=str, default="", help="Order DSL, e.g., 'man:Revision History, sch:Circuit Identification, *' (overrides preset order)")
+    ap.add_argument("--preset", type=str, default="default", help=f"Built-in preset to apply first (available: {', '.join(PRESETS.keys())})")
+    ap.add_argument("--no-preset", action="store_true", help="Disable presets entirely")
+    ap.add_argument("--show-preset", action="store_true", help="Print the active preset JSON and exit")
+    ap.add_argument("--dump-headings", action="store_true", help="Print detected headings (source:level title) and exit")
+    ap.add_argument("--force", action="store_true", help="Overwrite output if it exists (with --all: rebuild everything)")
+    ap.add_argument("--all", action="store_true",
+                    help="Build every PN/REV pair under the folder, recompiling only those whose sources or preset changed")
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="Parallel workers for --all (default: CPU count)")
+    args = ap.parse_args()
+
+    cfg = resolve_config(args)
+
+    if args.show_preset:
+        print(json.dumps(cfg["preset"], indent=2, ensure_ascii=False))
+        return
+
+    if args.all:
+        if args.out:
+            ap.error("-o/--out cannot be combined with --all (outputs go next to each sch/man pair)")
+        root = args.path or Path("md")
+        if not root.is_dir():
+            ap.error(f"--all needs a folder: {root}")
+        sys.exit(1 if build_all(root, cfg, force=args.force, jobs=args.jobs) else 0)
+    if args.path is None:
+        ap.error("path is required (or use --all)")
+
+    sch_path, man_path, pn, rev = derive_paths(args.path)
+
+    if args.dump_headings:
+        sch_secs = markdown_sections(load_doc(sch_path), 'sch')
+        man_secs = markdown_sections(load_doc(man_path), 'man')
+        for line in dump_headings(sch_secs + man_secs):
+            print(line)
+        return
 
+    out_text = compile_datasheet(sch_path, man_path, pn, rev, cfg)
     out_path = args.out if args.out else sch_path.with_name(f"{pn}_{rev}.md")
     # Always overwrite
     out_path.write_text(out_text, encoding='utf-8')
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Electrical-rule check of every netlist in json/
+
+taza_erc.py
+
+Runs the minipcb_erc rules (single-pin nets, unconnected pins, rails shorted
+through zero-ohm parts or jumpers, duplicate refdes, rails / INPUT / OUTPUT
+nets without a TP*) on json/*_sch.json through the netlist graph index
+(minipcb_netgraph). Extra rules come from --plugin files that use
+@minipcb_erc.rule. Findings are printed per board; --json and --md write the
+per-board report plus a corpus summary.
+
+json/.minipcb_cache/erc_cache.json keeps each board's findings next to its
+file stamp and the rule set they came from, so a run after one export only
+checks that board. Large batches are split across a process pool.
+
+Exit status is 1 when any error-severity finding is reported (with --strict,
+any warning too).
+
+Examples
+--------
+python taza_erc.py                                  # every board
+python taza_erc.py 04B-005_A1-04 --json erc.json    # one board, JSON report
+python taza_erc.py --disable tp_missing --md erc.md
+python taza_erc.py --plugin my_rules.py --list-rules
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from minipcb_erc import RULES, RULESET_VERSION, SEVERITIES, board_view, load_plugin, run_rules
+from minipcb_netgraph import board_key, load_or_build, netlist_files
+
+CACHE_DIR = ".minipcb_cache"
+CACHE_NAME = "erc_cache.json"
+CACHE_FORMAT = 1
+PARALLEL_MIN = 200          # below this many boards the pool start-up costs more than it saves
+
+_graph = None
+_rules: List[str] = []
+
+
+def _init_worker(json_dir: str, index: Optional[str], plugins: Sequence[str], rules: Sequence[str]) -> None:
+    """Pool initializer: load the graph index and plugin rules once per worker."""
+    global _graph, _rules
+    for p in plugins:
+        load_plugin(Path(p))
+    _graph, _ = load_or_build(Path(json_dir), Path(index) if index else None)
+    _rules = list(rules)
+
+
+def check_boards(keys: Sequence[str]) -> List[List[Dict[str, Any]]]:
+    """Worker: findings of each board key, in order."""
+    return [run_rules(board_view(_graph, _graph.board(k)), _rules) for k in keys]
+
+
+def ruleset_digest(rules: Sequence[str], plugins: Sequence[Path]) -> str:
+    """Changes when the selected rules, RULESET_VERSION or a plugin file change."""
+    h = hashlib.sha256(f"{RULESET_VERSION}|{','.join(rules)}".encode())
+    for p in plugins:
+        st = p.stat()
+        h.update(f"|{p.resolve()}:{st.st_mtime_ns}:{st.st_size}".encode())
+    return h.hexdigest()
+
+
+class ErcCache:
+    """{board key: {stamp, rules, findings}}; findings are reused while stamp and rule digest still match."""
+
+    def __init__(self, json_dir: Path, digest: str):
+        self.path = json_dir / CACHE_DIR / CACHE_NAME
+        self.digest = digest
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            blob = json.loads(self.path.read_text(encoding="utf-8"))
+            if blob.get("format") == CACHE_FORMAT:
+                self.entries = blob.get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def get(self, key: str, stamp: List[int]) -> Optional[List[Dict[str, Any]]]:
+        ent = self.entries.get(key)
+        if ent and ent.get("stamp") == stamp and ent.get("rules") == self.digest:
+            return ent.get("findings", [])
+        return None
+
+    def put(self, key: str, stamp: List[int], findings: List[Dict[str, Any]]) -> None:
+        self.entries[key] = {"stamp": stamp, "rules": self.digest, "findings": findings}
+
+    def save(self, keep: Sequence[str]) -> None:
+        self.entries = {k: v for k, v in self.entries.items() if k in set(keep)}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"format": CACHE_FORMAT, "entries": self.entries}, separators=(",", ":")),
+                           encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write ERC cache {self.path}: {e}", file=sys.stderr)
+
+
+def run_all(keys: List[str], json_dir: Path, index: Optional[Path], plugins: List[Path], rules: List[str],
+            workers: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Findings per board key, serially or in chunks across a process pool."""
+    initargs = (str(json_dir), str(index) if index else None, [str(p) for p in plugins], rules)
+    if workers <= 1 or len(keys) < PARALLEL_MIN:
+        _init_worker(*initargs[:2], [], rules)          # plugins are already loaded in this process
+        return dict(zip(keys, check_boards(keys)))
+    size = -(-len(keys) // (workers * 4))
+    chunks = [keys[i:i + size] for i in range(0, len(keys), size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk, found in zip(chunks, pool.map(check_boards, chunks)):
+            out.update(zip(chunk, found))
+    return out
+
+
+def corpus_summary(findings: Dict[str, List[Dict[str, Any]]], rules: List[str]) -> Dict[str, Any]:
+    by_rule = Counter(f["rule"] for fs in findings.values() for f in fs)
+    boards_by_rule = Counter(r for fs in findings.values() for r in {f["rule"] for f in fs})
+    by_sev = Counter(f["severity"] for fs in findings.values() for f in fs)
+    return {"boards": len(findings), "clean_boards": sum(1 for fs in findings.values() if not fs),
+            "findings": sum(by_rule.values()), "by_severity": {s: by_sev.get(s, 0) for s in SEVERITIES},
+            "by_rule": {r: {"severity": RULES[r].severity, "findings": by_rule.get(r, 0),
+                            "boards": boards_by_rule.get(r, 0)} for r in rules},
+            "boards_with_errors": sorted(k for k, fs in findings.items() if any(f["severity"] == "error" for f in fs))}
+
+
+def erc_markdown(summary: Dict[str, Any], findings: Dict[str, List[Dict[str, Any]]]) -> str:
+    lines = ["# ERC report", "",
+             f"{summary['boards']} board(s), {summary['clean_boards']} clean, {summary['findings']} finding(s) "
+             f"(" + ", ".join(f"{n} {s}" for s, n in summary["by_severity"].items()) + ")", "",
+             "| Rule | Severity | Findings | Boards | Description |", "|---|---|---|---|---|"]
+    for name, row in summary["by_rule"].items():
+        lines.append(f"| {name} | {row['severity']} | {row['findings']} | {row['boards']} | {RULES[name].description} |")
+    for key, fs in findings.items():
+        if not fs:
+            continue
+        lines += ["", f"## {key}", ""]
+        lines += [f"- **{f['severity']}** `{f['rule']}`: {f['message']}" for f in fs]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Electrical-rule check of json/*_sch.json over the netlist graph index.")
+    ap.add_argument("boards", nargs="*", help="Boards to check, as PN_REV or *_sch.json names (default: all)")
+    ap.add_argument("--json-dir", type=Path, default=Path("json"), help="Folder with the *_sch.json files")
+    ap.add_argument("--index", type=Path, default=None, help="Graph index file (default: <json-dir>/.minipcb_cache/netgraph.npz)")
+    ap.add_argument("--plugin", type=Path, action="append", default=[], help="Python file with extra @rule checks (repeatable)")
+    ap.add_argument("--rules", default=None, help="Only these rules (comma-separated)")
+    ap.add_argument("--disable", default=None, help="Skip these rules (comma-separated)")
+    ap.add_argument("--list-rules", action="store_true", help="List the available rules and exit")
+    ap.add_argument("--json", type=Path, default=None, help="Write per-board findings and the corpus summary as JSON")
+    ap.add_argument("--md", type=Path, default=None, help="Write the report as markdown")
+    ap.add_argument("--strict", action="store_true", help="Exit 1 on warnings as well as errors")
+    ap.add_argument("--quiet", action="store_true", help="Only print the summary")
+    ap.add_argument("--force", action="store_true", help="Re-check boards even when cached findings are current")
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="Parallel workers (default: CPU count)")
+    args = ap.parse_args()
+
+    for p in args.plugin:
+        try:
+            added = load_plugin(p)
+        except Exception as e:
+            ap.error(f"plugin {p}: {type(e).__name__}: {e}")
+        if not added:
+            print(f"⚠️  Plugin {p} registered no rules")
+    if args.list_rules:
+        for r in RULES.values():
+            print(f"{r.name:<18} {r.severity:<8} {r.description}")
+        sys.exit(0)
+    split = lambda s: [x.strip() for x in (s or "").split(",") if x.strip()]
+    rules = split(args.rules) or list(RULES)
+    unknown = [r for r in rules + split(args.disable) if r not in RULES]
+    if unknown:
+        ap.error("unknown rule(s): " + ", ".join(unknown) + " (see --list-rules)")
+    rules = [r for r in rules if r not in set(split(args.disable))]
+    if not args.json_dir.is_dir():
+        ap.error(f"not a folder: {args.json_dir}")
+    t0 = time.perf_counter()
+
+    files = {board_key(f) for f in netlist_files(args.json_dir)}
+    wanted = [b[:-len("_sch.json")] if b.endswith("_sch.json") else b for b in (Path(b).name for b in args.boards)]
+    missing = [b for b in wanted if b not in files]
+    if missing:
+        ap.error("no netlist for: " + ", ".join(missing))
+    graph, parsed = load_or_build(args.json_dir, args.index)
+    keys = wanted or list(graph.board_keys)
+
+    cache = ErcCache(args.json_dir, ruleset_digest(rules, args.plugin))
+    stamps = {k: [int(x) for x in graph.board_stamp[graph.board(k)]] for k in keys}
+    findings: Dict[str, List[Dict[str, Any]]] = {}
+    stale = []
+    for k in keys:
+        hit = None if args.force else cache.get(k, stamps[k])
+        if hit is None:
+            stale.append(k)
+        else:
+            findings[k] = hit
+    t1 = time.perf_counter()
+    if stale:
+        workers = max(1, min(args.jobs or os.cpu_count() or 1, len(stale)))
+        for k, fs in run_all(stale, args.json_dir, args.index, args.plugin, rules, workers).items():
+            findings[k] = fs
+            cache.put(k, stamps[k], fs)
+    t_check = time.perf_counter() - t1
+    cache.save(graph.board_keys)
+    findings = {k: findings[k] for k in keys}
+
+    if not args.quiet:
+        icon = {"error": "❌", "warning": "⚠️ ", "info": "ℹ️ "}
+        for k, fs in findings.items():
+            for f in fs:
+                print(f"{icon.get(f['severity'], '')} {k}: [{f['severity']}] {f['rule']}: {f['message']}")
+    summary = corpus_summary(findings, rules)
+    summary["rules"] = rules
+    if args.json:
+        args.json.write_text(json.dumps({"summary": summary, "boards": findings}, indent=2, ensure_ascii=False) + "\n",
+                             encoding="utf-8")
+        print(f"JSON: {args.json}")
+    if args.md:
+        args.md.write_text(erc_markdown(summary, findings), encoding="utf-8")
+        print(f"Markdown: {args.md}")
+
+    sev = summary["by_severity"]
+    print(f"ERC summary: {summary['boards']} board(s), {summary['clean_boards']} clean, {sev['error']} error(s), "
+          f"{sev['warning']} warning(s), {sev['info']} info · {len(stale)} checked in {t_check*1000:.1f} ms, "
+          f"{len(keys) - len(stale)} cached ({time.perf_counter() - t0:.2f}s total, {parsed} board(s) re-indexed)")
+    sys.exit(1 if sev["error"] or (args.strict and sev["warning"]) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,24 +9,47 @@ Evaluate PN_REV.md and generate PN_REV_feedback.md using an LLM.
 - Always overwrites output (no --force needed).
 - Robust result extraction from OpenAI Responses or Chat API objects.
 - Verbose mode (--verbose) and also print to stdout (--stdout).
+- Identical requests are answered from the shared AI response cache
+  (--no-cache to bypass, --refresh to force a new answer).
+
+Batch mode (every PN/REV bundle under a folder, provider batch JSONL format):
+- prepare: discover bundles, build every prompt up front and write one
+  request line per board ({"custom_id", "method", "url", "body"}).
+- submit / status: upload the request file to the Batch API / poll it and
+  download the results file once the batch has completed.
+- run:     execute the request file directly (bounded concurrency) against
+  OPENAI_BASE_URL, or an in-process minipcb_mock_ai server with --mock,
+  and write a results file in the same format the Batch API returns.
+- ingest:  turn a results file into PN_REV_feedback.md files and seed the
+  response cache, so later single-board runs of the same prompt are free.
 
 Usage:
   python taza_evaluate.py path/to/PN_REV.md
   python taza_evaluate.py path/to/PN_REV_sch.md --verbose --stdout
+  python taza_evaluate.py md/ --batch prepare
+  python taza_evaluate.py --batch run --mock          # offline, against the local stand-in
+  python taza_evaluate.py --batch submit              # then: --batch status --batch-id batch_...
+  python taza_evaluate.py md/ --batch ingest
 """
 
 import argparse
+import hashlib
+import importlib.util
+import json
 import re
 import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
-try:
-    from openai import OpenAI  # pip install openai
-except ImportError:
+if importlib.util.find_spec("openai") is None:   # the client itself comes from the shared pool
     print("Missing dependency: pip install openai", file=sys.stderr)
     sys.exit(1)
 
+from minipcb_ai import ResponseCache, add_cache_args, cache_mode_from_args, cached_call, client_pool, make_key
+from minipcb_md import MdDoc, try_load_md
+from minipcb_ai_batch import BatchJob, BatchRunner, add_batch_args, estimate_tokens
+
 # Approved REF DES prefixes
 APPROVED_REF_PREFIXES = [
     "A","AR","AT","B","BT","C","CB","CP","CR","D","DC","DL","DS","E","EQ","F","FL","G","H",
@@ -45,6 +68,12 @@ SCH_RE = re.compile(r'^(?P<pn>[^_/\\]+)_(?P<rev>[^_/\\]+)_(?:sch|shc)\.md$', re.
 MAN_RE = re.compile(r'^(?P<pn>[^_/\\]+)_(?P<rev>[^_/\\]+)_man\.md$', re.IGNORECASE)
 DS_RE  = re.compile(r'^(?P<pn>[^_/\\]+)_(?P<rev>[^_/\\]+)\.md$', re.IGNORECASE)
 
+BATCH_MODES = ("prepare", "submit", "status", "run", "ingest")
+DEFAULT_REQUESTS = Path(".minipcb_ai/eval_batch_requests.jsonl")
+DEFAULT_RESULTS = Path(".minipcb_ai/eval_batch_results.jsonl")
+BATCH_ENDPOINT = "/v1/responses"
+RETRYABLE_STATUS = (408, 409, 429)      # plus 5xx and connection errors: worth another attempt
+
 def read_text(p: Optional[Path]) -> str:
     if not p:
         return ""
@@ -65,6 +94,12 @@ def extract_identifiers(*texts: str) -> Tuple[Set[str], Set[str]]:
             nets.add(m.group(0))
     return refdes, nets
 
+def doc_identifiers(doc: MdDoc) -> Tuple[Set[str], Set[str]]:
+    """extract_identifiers over a parsed schematic export's headings and table cells (prose notes are skipped)."""
+    texts = [s.title for s in doc.sections]
+    texts += [" ".join(cell for row in [t.header] + t.rows for cell in row) for s in doc.sections for t in s.tables]
+    return extract_identifiers(*texts)
+
 def derive_bundle(input_path: Path):
     name = input_path.name
     m_ds = DS_RE.match(name)
@@ -94,6 +129,54 @@ def derive_bundle(input_path: Path):
 
     raise ValueError(f"Could not parse PN/REV from filename: {name}")
 
+@dataclass
+class Bundle:
+    pn: str
+    rev: str
+    ds: Optional[Path] = None
+    sch: Optional[Path] = None
+    man: Optional[Path] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.pn}_{self.rev}"
+
+def discover_bundles(root: Path) -> List[Bundle]:
+    """Every PN/REV under `root` with at least one of datasheet/sch/man, in path order."""
+    bundles: Dict[Tuple[Path, str, str], Bundle] = {}
+    for p in sorted(root.rglob("*.md")):
+        for rx, slot in ((SCH_RE, "sch"), (MAN_RE, "man"), (DS_RE, "ds")):
+            m = rx.match(p.name)
+            if m:
+                b = bundles.setdefault((p.parent, m.group("pn"), m.group("rev")), Bundle(m.group("pn"), m.group("rev")))
+                setattr(b, slot, p)
+                break
+    return list(bundles.values())
+
+def bundle_identifiers(sch: Optional[MdDoc], datasheet_md: str,
+                       memo: Dict[str, Tuple[Set[str], Set[str]]]) -> Tuple[Set[str], Set[str]]:
+    """Identifiers from the schematic parse, else the datasheet text; memoised by content (shared across a batch)."""
+    key = hashlib.sha1(((sch.text if sch else "") + "\0" + datasheet_md).encode("utf-8")).hexdigest()
+    if key not in memo:
+        refdes, nets = doc_identifiers(sch) if sch else (set(), set())
+        if not refdes:
+            refdes, _ = extract_identifiers(datasheet_md)
+        memo[key] = (refdes, nets)
+    return memo[key]
+
+def bundle_prompt(b: Bundle, memo: Dict[str, Tuple[Set[str], Set[str]]]) -> str:
+    sch = try_load_md(b.sch)
+    datasheet_md, man_md = read_text(b.ds), read_text(b.man)
+    refdes_allowed, nets_allowed = bundle_identifiers(sch, datasheet_md, memo)
+    return build_prompt(b.pn, b.rev, datasheet_md, sch.text if sch else "", man_md, refdes_allowed, nets_allowed)
+
+def feedback_path(ds_path: Path) -> Path:
+    return ds_path.with_name(ds_path.name.replace(".md", "_feedback.md"))
+
+def response_params(args) -> Dict:
+    """Cache-key params; must match what the request body sends."""
+    return {"api": "responses", "temperature": args.temperature, "max_output_tokens": args.max_tokens}
+
 def build_prompt(pn, rev, datasheet_md, sch_md, man_md, refdes_allowed, nets_allowed):
     refdes_list = ", ".join(sorted(refdes_allowed)) or "(none)"
     nets_list = ", ".join(sorted(nets_allowed)) or "(none)"
@@ -161,9 +244,159 @@ def get_output_text(resp) -> str:
         pass
     return ""
 
+def output_text_from_body(body: Dict) -> str:
+    """Text of a Responses (or Chat Completions) JSON body, as found in batch result lines."""
+    if body.get("output_text"):
+        return body["output_text"]
+    for item in body.get("output") or []:
+        for block in item.get("content") or []:
+            if block.get("type") in ("text", "output_text") and block.get("text"):
+                return block["text"]
+    choices = body.get("choices") or []
+    if choices:
+        return (choices[0].get("message") or {}).get("content") or ""
+    return ""
+
+def read_jsonl(path: Path) -> List[Dict]:
+    rows = []
+    for n, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if line.strip():
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                print(f"WARNING: {path}:{n}: unreadable line skipped", file=sys.stderr)
+    return rows
+
+def batch_prepare(args) -> None:
+    root = args.path or Path("md")
+    bundles = discover_bundles(root)
+    memo: Dict[str, Tuple[Set[str], Set[str]]] = {}
+    lines, missing = [], []
+    for b in bundles:
+        if not b.ds:
+            missing.append(b.key); continue
+        body = {"model": args.model, "input": bundle_prompt(b, memo),
+                "temperature": args.temperature, "max_output_tokens": args.max_tokens}
+        lines.append(json.dumps({"custom_id": b.key, "method": "POST", "url": BATCH_ENDPOINT, "body": body},
+                                ensure_ascii=False))
+    args.requests.parent.mkdir(parents=True, exist_ok=True)
+    args.requests.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+    tokens = sum(estimate_tokens(json.loads(l)["body"]["input"], args.max_tokens) for l in lines)
+    print(f"[batch] {len(bundles)} bundle(s) under {root}: {len(lines)} request(s), ~{tokens:,} tokens "
+          f"({len(memo)} distinct identifier set(s)) -> {args.requests}")
+    if missing:
+        print(f"[batch] no compiled datasheet (run taza_compile_datasheet.py first): {', '.join(missing)}")
+
+def batch_submit(args) -> None:
+    client = client_pool().openai()
+    with args.requests.open("rb") as fh:
+        upload = client.files.create(file=fh, purpose="batch")
+    batch = client.batches.create(input_file_id=upload.id, endpoint=BATCH_ENDPOINT, completion_window="24h")
+    print(f"[batch] submitted {batch.id} ({batch.status}); poll with: --batch status --batch-id {batch.id}")
+
+def batch_status(args) -> None:
+    if not args.batch_id:
+        print("ERROR: --batch status needs --batch-id", file=sys.stderr); sys.exit(2)
+    client = client_pool().openai()
+    batch = client.batches.retrieve(args.batch_id)
+    counts = getattr(batch, "request_counts", None)
+    print(f"[batch] {batch.id}: {batch.status}" + (f" ({counts.completed}/{counts.total} done, {counts.failed} failed)"
+                                                   if counts else ""))
+    if batch.status == "completed" and batch.output_file_id:
+        args.results.parent.mkdir(parents=True, exist_ok=True)
+        args.results.write_bytes(client.files.content(batch.output_file_id).read())
+        print(f"[batch] results -> {args.results}; next: --batch ingest")
+
+def batch_run(args) -> None:
+    """Execute a request file ourselves and write Batch-API-shaped result lines (resumable)."""
+    requests = read_jsonl(args.requests)
+    server = None
+    if args.mock:
+        from minipcb_mock_ai import MockAIServer
+        server = MockAIServer(latency_ms=200, tokens_per_sec=200).start()
+        print(f"[batch] local stand-in at {server.base_url}")
+    client = client_pool().openai("mock" if server else None, server.base_url if server else None)
+
+    def call(job: BatchJob) -> Dict:
+        body = dict(job.payload["body"])
+        try:
+            resp = client.responses.create(**body, timeout=args.timeout)
+            return {"status_code": 200, "request_id": resp.id, "body": resp.to_dict()}
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if status is None or status in RETRYABLE_STATUS or status >= 500:
+                raise       # transient: the runner records it as failed, so the next run retries it
+            # a request the API rejects (400, 401, 404, ...) fails the same way every time: keep it as a result
+            return {"status_code": status, "request_id": None, "body": {"error": {"message": str(e)}}}
+
+    failures = []
+    def write(job: BatchJob, response: Dict) -> None:
+        line = {"id": f"local-{job.key}", "custom_id": job.key, "response": response, "error": None}
+        if response["status_code"] != 200:
+            failures.append(job.key)
+        with args.results.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    runner = BatchRunner(call=call, write=write, concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm,
+                         checkpoint=args.checkpoint)
+    if args.fresh:
+        runner.checkpoint.reset()
+        if args.results.exists():
+            args.results.unlink()
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+    jobs = [BatchJob(key=r["custom_id"], payload=r, est_tokens=estimate_tokens(r["body"].get("input", ""),
+                                                                               r["body"].get("max_output_tokens", 0)))
+            for r in requests]
+    try:
+        summary = runner.run(jobs)
+    finally:
+        if server is not None:
+            server.stop()
+    print(f"[batch] {summary.done} answered ({len(failures)} with errors), {summary.failed} failed (retried on "
+          f"the next run), {summary.skipped} already done in {summary.elapsed:.1f}s -> {args.results}")
+    print(f"[batch] HTTP pool: {client_pool().summary()}")
+
+def batch_ingest(args) -> None:
+    root = args.path or Path("md")
+    by_key = {b.key: b for b in discover_bundles(root) if b.ds}
+    cache = None if cache_mode_from_args(args) == "off" else ResponseCache()
+    memo: Dict[str, Tuple[Set[str], Set[str]]] = {}
+    # Cache keys come from the request as sent: the results only carry the resolved model snapshot
+    # (gpt-4o-mini-2024-07-18), which a later single-board run asking for the alias would never look up
+    sent = {r.get("custom_id"): r.get("body") or {} for r in read_jsonl(args.requests)} if args.requests.exists() else {}
+    wrote, failed, unknown = 0, [], []
+    for line in read_jsonl(args.results):
+        b = by_key.get(line.get("custom_id", ""))
+        if b is None:
+            unknown.append(line.get("custom_id", "?")); continue
+        resp = line.get("response") or {}
+        body = resp.get("body") or {}
+        text = output_text_from_body(body).strip() if resp.get("status_code") == 200 else ""
+        if not text:
+            err = line.get("error") or body.get("error") or {}
+            failed.append(f"{b.key} ({err.get('message', 'empty output') if isinstance(err, dict) else err})")
+            continue
+        feedback_path(b.ds).write_text(text, encoding="utf-8")
+        wrote += 1
+        if cache is not None:
+            req = sent.get(b.key)
+            if req:
+                model = req.get("model") or args.model
+                params = {"api": "responses", "temperature": req.get("temperature"),
+                          "max_output_tokens": req.get("max_output_tokens")}
+                cache.put(make_key(model, params, req.get("input", "")), model, text)
+            else:
+                cache.put(make_key(args.model, response_params(args), bundle_prompt(b, memo)), args.model, text)
+    print(f"[batch] wrote {wrote} feedback file(s) under {root}")
+    for f in failed:
+        print(f"[batch] failed: {f}")
+    if unknown:
+        print(f"[batch] no bundle for: {', '.join(unknown)}")
+
 def main():
     ap = argparse.ArgumentParser(description="Evaluate PN_REV.md and generate PN_REV_feedback.md using an LLM.")
-    ap.add_argument("path", type=Path, help="Path to PN_REV.md or PN_REV_sch.md / PN_REV_man.md")
+    ap.add_argument("path", type=Path, nargs="?", default=None,
+                    help="Path to PN_REV.md or PN_REV_sch.md / PN_REV_man.md (batch prepare/ingest: folder, default md/)")
     ap.add_argument("--datasheet", type=Path, default=None, help="Explicit path to datasheet markdown")
     ap.add_argument("--sch", type=Path, default=None, help="Explicit path to schematic markdown")
     ap.add_argument("--man", type=Path, default=None, help="Explicit path to manual markdown")
@@ -174,8 +407,22 @@ def main():
     ap.add_argument("--retries", type=int, default=3)
     ap.add_argument("--stdout", action="store_true", help="Also print feedback to stdout")
     ap.add_argument("--verbose", action="store_true", help="Verbose logging")
+    add_cache_args(ap)
+    ap.add_argument("--batch", choices=BATCH_MODES, default=None, help="Batch mode step (see module docstring)")
+    ap.add_argument("--requests", type=Path, default=DEFAULT_REQUESTS, help="Batch request JSONL")
+    ap.add_argument("--results", type=Path, default=DEFAULT_RESULTS, help="Batch results JSONL")
+    ap.add_argument("--batch-id", default=None, help="Batch id for --batch status")
+    ap.add_argument("--mock", action="store_true", help="--batch run against an in-process minipcb_mock_ai server")
+    add_batch_args(ap, default_checkpoint=".minipcb_ai/eval_batch_checkpoint.jsonl")
     args = ap.parse_args()
 
+    if args.batch:
+        {"prepare": batch_prepare, "submit": batch_submit, "status": batch_status,
+         "run": batch_run, "ingest": batch_ingest}[args.batch](args)
+        return
+    if args.path is None and not args.datasheet:
+        ap.error("a path (or --datasheet) is required outside --batch mode")
+
     # Resolve explicit or inferred bundle
     if args.datasheet:
         ds_path = args.datasheet
@@ -193,13 +440,12 @@ def main():
         print(f"ERROR: Datasheet not found: {ds_path}", file=sys.stderr)
         sys.exit(2)
 
+    sch = try_load_md(sch_path)
     datasheet_md = read_text(ds_path)
-    sch_md = read_text(sch_path)
+    sch_md = sch.text if sch else ""
     man_md = read_text(man_path)
 
-    refdes_allowed, nets_allowed = extract_identifiers(sch_md)
-    if not refdes_allowed:
-        refdes_allowed, _ = extract_identifiers(datasheet_md)
+    refdes_allowed, nets_allowed = bundle_identifiers(sch, datasheet_md, {})
 
     if args.verbose:
         print(f"[VERBOSE] PN={pn} REV={rev}")
@@ -210,31 +456,41 @@ def main():
 
     prompt = build_prompt(pn, rev, datasheet_md, sch_md, man_md, refdes_allowed, nets_allowed)
 
-    client = OpenAI()
-    feedback_md = ""
     last_err = None
-    for _ in range(max(1, args.retries)):
-        try:
-            resp = client.responses.create(
-                model=args.model,
-                input=prompt,
-                temperature=args.temperature,
-                max_output_tokens=args.max_tokens,
-                timeout=args.timeout,
-            )
-            feedback_md = get_output_text(resp).strip()
-            if feedback_md:
-                break
-            last_err = RuntimeError("Empty response")
-        except Exception as e:
-            last_err = e
-            continue
+
+    def generate() -> str:
+        nonlocal last_err
+        client = client_pool().openai()
+        for _ in range(max(1, args.retries)):
+            try:
+                resp = client.responses.create(
+                    model=args.model,
+                    input=prompt,
+                    temperature=args.temperature,
+                    max_output_tokens=args.max_tokens,
+                    timeout=args.timeout,
+                )
+                text = get_output_text(resp).strip()
+                if text:
+                    return text
+                last_err = RuntimeError("Empty response")
+            except Exception as e:
+                last_err = e
+                continue
+        return ""
+
+    params = response_params(args)
+    cache = ResponseCache()
+    feedback_md, from_cache = cached_call(cache, cache_mode_from_args(args), args.model, params, prompt, generate)
+    if args.verbose:
+        print(f"[VERBOSE] Response cache: {'hit' if from_cache else 'miss'} ({cache.path})")
+        print(f"[VERBOSE] HTTP pool: {client_pool().summary()}")
 
     if not feedback_md:
         print(f"ERROR: generation failed or empty output: {last_err}", file=sys.stderr)
         sys.exit(3)
 
-    out_path = ds_path.with_name(ds_path.name.replace(".md", "_feedback.md"))
+    out_path = feedback_path(ds_path)
     out_path.write_text(feedback_md, encoding='utf-8')
     if args.stdout:
         print(feedback_md)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch FMEA for every netlist in json/ (engineering_analyzer.html engine v0.2)
+
+taza_fmea.py
+
+Runs the page's FMEA rules (minipcb_fmea) on json/*_sch.json through the
+netlist graph index (minipcb_netgraph) and writes json/fmea/analysis_<PN>_<REV>.json
+and .md exactly as the page's auto-save does, so the Saved Analysis tab and
+the FMEA analytics read them unchanged. A board's saved page setup
+(json/fmea/setup/analysis_fmea_setup_<PN>_<REV>.json) supplies its failure-mode
+overrides unless --no-setup is given.
+
+json/fmea/.minipcb_cache/fmea_manifest.json remembers the netlist and setup
+each report was computed from; unchanged boards are skipped and the rest run
+across a process pool.
+
+Examples
+--------
+python taza_fmea.py                         # every board, only what changed
+python taza_fmea.py 04B-005_A1-04 --force   # one board, regenerated
+python taza_fmea.py --no-setup              # page defaults, ignoring saved setups
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from minipcb_fmea import (ENGINE_VERSION, FmeaAssumptions, analysis_stem, board_fmea, dump_report,
+                          fmea_markdown, fmea_report, iso_now, setup_stem)
+from minipcb_netgraph import board_key, load_or_build, netlist_files
+
+MANIFEST_DIR = ".minipcb_cache"
+MANIFEST_NAME = "fmea_manifest.json"
+MANIFEST_FORMAT = 1
+
+Job = Tuple[str, Path, Optional[Path]]          # (board key, *_sch.json, setup file or None)
+
+_graph = None
+
+
+def file_sha256(p: Path) -> str:
+    return hashlib.sha256(p.read_bytes()).hexdigest()
+
+
+def _init_worker(json_dir: str, index: Optional[str]) -> None:
+    """Pool initializer: load the graph index once per worker (the parent has just refreshed it)."""
+    global _graph
+    _graph, _ = load_or_build(Path(json_dir), Path(index) if index else None)
+
+
+def run_board(job: Job, out_dir: str) -> Dict[str, Any]:
+    """Worker: FMEA for one board, written as <out_dir>/analysis_<PN>_<REV>.json/.md."""
+    key, sch, setup = job
+    t0 = time.perf_counter()
+    netlist = json.loads(sch.read_text(encoding="utf-8"))
+    if not (isinstance(netlist, dict) and netlist.get("schema_version") and netlist.get("identity")
+            and isinstance(netlist.get("components"), list)):
+        raise ValueError("not a netlist (needs schema_version, identity and components[])")
+    identity = netlist["identity"]
+    assumptions = FmeaAssumptions(json.loads(setup.read_text(encoding="utf-8")) if setup else None)
+    result = board_fmea(_graph, _graph.board(key), assumptions)
+    generated_on = iso_now()
+    stem = Path(out_dir) / analysis_stem(identity.get("board_pn", "unknown_board"), identity.get("board_rev", "unknown_rev"))
+    stem.parent.mkdir(parents=True, exist_ok=True)
+    stem.with_suffix(".json").write_text(dump_report(fmea_report(identity, result, generated_on)), encoding="utf-8")
+    stem.with_suffix(".md").write_text(fmea_markdown(result, generated_on), encoding="utf-8")
+    return {"out": str(stem.with_suffix(".json")), "summary": result["summary"], "seconds": time.perf_counter() - t0}
+
+
+class FmeaManifest:
+    """{board key: {sch, setup: sha256, config, out}}; a board is current when all four still match."""
+
+    def __init__(self, out_dir: Path, config: str):
+        self.path = out_dir / MANIFEST_DIR / MANIFEST_NAME
+        self.config = config
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            blob = json.loads(self.path.read_text(encoding="utf-8"))
+            if blob.get("format") == MANIFEST_FORMAT:
+                self.entries = blob.get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    @staticmethod
+    def inputs(job: Job) -> Dict[str, Optional[str]]:
+        _, sch, setup = job
+        return {"sch": file_sha256(sch), "setup": file_sha256(setup) if setup else None}
+
+    def up_to_date(self, job: Job) -> bool:
+        ent = self.entries.get(job[0])
+        if not ent or ent.get("config") != self.config or not Path(ent.get("out", "")).exists():
+            return False
+        return {"sch": ent.get("sch"), "setup": ent.get("setup")} == self.inputs(job)
+
+    def record(self, job: Job, out: str) -> None:
+        self.entries[job[0]] = {**self.inputs(job), "config": self.config, "out": out}
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"format": MANIFEST_FORMAT, "entries": self.entries}, indent=1, sort_keys=True),
+                           encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write FMEA manifest {self.path}: {e}", file=sys.stderr)
+
+
+def run_all(jobs: List[Job], json_dir: Path, index: Optional[Path], out_dir: Path, workers: int):
+    """(job, result, error) per job, serially or across a process pool."""
+    results = []
+    if workers <= 1:
+        _init_worker(str(json_dir), str(index) if index else None)
+        for job in jobs:
+            try:
+                results.append((job, run_board(job, str(out_dir)), None))
+            except Exception as e:
+                results.append((job, None, f"{type(e).__name__}: {e}"))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(str(json_dir), str(index) if index else None)) as pool:
+            futs = {pool.submit(run_board, job, str(out_dir)): job for job in jobs}
+            for fut in as_completed(futs):
+                try:
+                    results.append((futs[fut], fut.result(), None))
+                except Exception as e:
+                    results.append((futs[fut], None, f"{type(e).__name__}: {e}"))
+    return sorted(results, key=lambda r: r[0][0])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=f"Batch FMEA (engineering analyzer engine v{ENGINE_VERSION}) over json/*_sch.json.")
+    ap.add_argument("boards", nargs="*", help="Boards to run, as PN_REV or *_sch.json names (default: all)")
+    ap.add_argument("--json-dir", type=Path, default=Path("json"), help="Folder with the *_sch.json files")
+    ap.add_argument("--out-dir", type=Path, default=None, help="Report folder (default: <json-dir>/fmea)")
+    ap.add_argument("--setup-dir", type=Path, default=None, help="Saved page setups (default: <out-dir>/setup)")
+    ap.add_argument("--no-setup", action="store_true", help="Ignore saved setups; use the page's default failure modes")
+    ap.add_argument("--index", type=Path, default=None, help="Graph index file (default: <json-dir>/.minipcb_cache/netgraph.npz)")
+    ap.add_argument("--force", action="store_true", help="Regenerate even when inputs are unchanged")
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="Parallel workers (default: CPU count)")
+    args = ap.parse_args()
+
+    if not args.json_dir.is_dir():
+        ap.error(f"not a folder: {args.json_dir}")
+    out_dir = args.out_dir or args.json_dir / "fmea"
+    setup_dir = args.setup_dir or out_dir / "setup"
+    t0 = time.perf_counter()
+
+    files = {board_key(f): f for f in netlist_files(args.json_dir)}
+    wanted = [b[:-len("_sch.json")] if b.endswith("_sch.json") else b for b in (Path(b).name for b in args.boards)]
+    unknown = [b for b in wanted if b not in files]
+    if unknown:
+        ap.error("no netlist for: " + ", ".join(unknown))
+    graph, parsed = load_or_build(args.json_dir, args.index)
+
+    jobs: List[Job] = []
+    for key in wanted or sorted(files):
+        setup = None
+        if not args.no_setup:
+            pn, _, rev = key.partition("_")
+            cand = setup_dir / f"{setup_stem(pn, rev)}.json"
+            setup = cand if cand.exists() else None
+        jobs.append((key, files[key], setup))
+
+    manifest = FmeaManifest(out_dir, f"engine {ENGINE_VERSION}")
+    stale = [j for j in jobs if args.force or not manifest.up_to_date(j)]
+    workers = max(1, min(args.jobs or os.cpu_count() or 1, len(stale)))
+    results = run_all(stale, args.json_dir, args.index, out_dir, workers) if stale else []
+
+    failed = 0
+    for job, res, err in results:
+        if err:
+            failed += 1
+            print(f"❌ {job[0]}: {err}", file=sys.stderr)
+            continue
+        manifest.record(job, res["out"])
+        s = res["summary"]
+        print(f"✅ {res['out']}  {s['entries']} rows, {s['high_risk_count']} high risk, avg RPN {s['average_rpn']}"
+              f"{' (setup)' if job[2] else ''}  ({res['seconds']*1000:.0f} ms)")
+    manifest.save()
+    print(f"FMEA summary: {len(results) - failed} written, {len(jobs) - len(stale)} up to date, {failed} failed "
+          f"({len(jobs)} board(s), {parsed} re-indexed) in {time.perf_counter() - t0:.2f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Catalog-wide analytics of the saved FMEA reports
+
+taza_fmea_stats.py
+
+Loads every json/fmea/analysis_<PN>_<REV>.json into a columnar snapshot
+(minipcb_fmea_stats) and reports the RPN distribution (corpus and per board),
+the top-N risks across the catalog, uncovered failure modes per component
+class and, for boards with several analysed revisions, how mean RPN,
+high-risk and uncovered counts move from rev to rev.
+
+The snapshot is kept in json/fmea/.minipcb_cache/fmea_snapshot.npz; a run
+re-reads only the reports written since the last one.
+
+Examples
+--------
+python taza_fmea_stats.py                         # summary and top 10 on stdout
+python taza_fmea_stats.py --top 50 --md fmea_stats.md --json fmea_stats.json
+python taza_fmea_stats.py --fmea-dir /tmp/fmea --force
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from minipcb_fmea_stats import load_or_build, stats_markdown, stats_report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="RPN distribution, top risks, uncovered modes and revision trends of json/fmea/*.json.")
+    ap.add_argument("--fmea-dir", type=Path, default=Path("json/fmea"), help="Folder with the analysis_*.json reports")
+    ap.add_argument("--snapshot", type=Path, default=None,
+                    help="Snapshot file (default: <fmea-dir>/.minipcb_cache/fmea_snapshot.npz)")
+    ap.add_argument("--force", action="store_true", help="Re-read every report instead of updating the snapshot")
+    ap.add_argument("--top", type=int, default=10, help="Top risks to report")
+    ap.add_argument("--json", type=Path, default=None, help="Write the full report as JSON")
+    ap.add_argument("--md", type=Path, default=None, help="Write the report as markdown")
+    args = ap.parse_args()
+
+    if not args.fmea_dir.is_dir():
+        ap.error(f"not a folder: {args.fmea_dir}")
+    t0 = time.perf_counter()
+    snap, read, skipped = load_or_build(args.fmea_dir, args.snapshot, args.force)
+    for path, err in skipped:
+        print(f"⚠️  Skipped {path}: {err}", file=sys.stderr)
+    t1 = time.perf_counter()
+    report = stats_report(snap, args.top)
+    t_stats = time.perf_counter() - t1
+
+    c = report["rpn"]["corpus"]
+    if snap.n_rows:
+        print(f"RPN: mean {c['mean']}, p50 {c['p50']:g}, p90 {c['p90']:g}, p99 {c['p99']:g}, max {c['max']}; "
+              f"{c['high_risk']} high risk (>= {report['high_risk_rpn']})")
+        print("  " + "  ".join(f"{b['from']}-{b['to']}: {b['rows']}" for b in report["rpn"]["bins"]))
+    for r in report["top_risks"]:
+        print(f"{r['RPN']:5d}  {r['board']:<16} {r['component']:<6} {r['failure_mode']:<28} "
+              f"S{r['severity']} O{r['occurrence']} D{r['detection']}")
+    for r in report["uncovered_by_class"]:
+        top_mode = next(iter(r["modes"]), "-")
+        print(f"  {r['class']:<18} {r['uncovered']:5d}/{r['rows']:<5d} uncovered on {r['boards']} board(s), "
+              f"most often {top_mode}")
+    for t in report["trends"]:
+        if len(t["revisions"]) > 1:
+            print(f"  {t['board']}: " + " -> ".join(f"{r['rev']} {r['mean_rpn']} ({r['high_risk']} high)"
+                                                     for r in t["revisions"]))
+    if len(report["engine_versions"]) > 1:
+        print(f"⚠️  Reports come from engine versions {', '.join(report['engine_versions'])}")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"JSON: {args.json}")
+    if args.md:
+        args.md.write_text(stats_markdown(report), encoding="utf-8")
+        print(f"Markdown: {args.md}")
+    multi = sum(1 for t in report["trends"] if len(t["revisions"]) > 1)
+    print(f"FMEA stats summary: {report['reports']} report(s), {report['rows']} row(s), {multi} board(s) with "
+          f"revision history · computed in {t_stats*1000:.1f} ms ({time.perf_counter() - t0:.2f}s total, "
+          f"{read} report(s) re-read, {len(skipped)} skipped)")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
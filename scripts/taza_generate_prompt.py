@@ -14,6 +14,12 @@ Key behavior:
 - To avoid duplication, Quick-Scan summary tables are OMITTED by default when
   the corresponding full source is embedded.
 - Use --summary to include Quick-Scan tables (still deduplicated if requested).
+- Embedded sources are COMPACTED by default: netlist tables become one line
+  per net ("NET: PART.PIN, ..."), table padding is squeezed, and a table that
+  repeats one already shown is replaced by a reference. --token-budget then
+  keeps sections in --priority order until the budget is spent. Bytes and
+  estimated tokens before/after are reported on stderr. --verbatim restores
+  the old byte-for-byte embedding.
 
 USAGE:
   python tava_generate_prompt.py path/to/PN_REV_sch.md
@@ -31,6 +37,10 @@ OPTIONS:
   --no-full-sch            Do NOT embed full _sch.md content
   --no-man                 Do NOT embed _man.md content
   --man PATH               Explicit path to manual commentary markdown (overrides auto-detect)
+  --verbatim               Embed sources byte-for-byte (no compaction, no budget)
+  --token-budget N         Max estimated tokens for embedded sources (default: 0 = unlimited)
+  --priority LIST          Comma-separated section order kept under the budget
+                           (default: circuit identification,netlist,pinout,partlist,manual commentary)
 
 CONVENTIONS:
   - Input filename: PN_REV_sch.md (also accepts *_shc.md)
@@ -41,14 +51,20 @@ import os
 import re
 import sys
 import glob
-from typing import Dict, List, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from minipcb_ai_batch import estimate_tokens
+from minipcb_md import MdDoc, MdSection, MdTable, load_md, split_row, try_load_md
 
-HEADING_RE = re.compile(r'^(#+)\s+(.*)\s*$', re.IGNORECASE)
-PIPE_TABLE_LINE_RE = re.compile(r'^\s*\|.*\|\s*$', re.IGNORECASE)
 MD_CODE_FENCE = "```"
 
 DEFAULT_MAX_NETLIST = -1
 DEFAULT_MAX_PARTLIST = -1
+DEFAULT_TOKEN_BUDGET = 0
+# Substrings of (lower-cased) section headings; sections matching none rank last
+DEFAULT_PRIORITY = ("circuit identification", "netlist", "pinout", "partlist", "manual commentary")
+MAN_PREFIX = "manual commentary / "
 
 TESTBASE_TEST_TEMPLATE_JSON = """{
   "test_name": "Short, human-friendly title (e.g., “Op-amp offset vs. temperature”).",
@@ -64,56 +80,12 @@ TESTBASE_TEST_TEMPLATE_JSON = """{
   "conclusion": "Result summary (Pass/Fail) and brief rationale; note anomalies or follow-ups."
 }"""
 
-def read_text(path: str) -> str:
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
-
-def try_read_text(path: str) -> str:
-    try:
-        return read_text(path)
-    except Exception:
-        return ""
-
 def write_text(path: str, text: str, force: bool = False) -> None:
     if os.path.exists(path) and not force:
         raise FileExistsError(f"Refusing to overwrite existing file: {path} (rerun without --no-clobber)")
     with open(path, "w", encoding="utf-8") as f:
         f.write(text)
 
-def split_sections(md: str) -> Dict[str, List[str]]:
-    """
-    Split markdown into sections keyed by normalized heading text.
-    Returns dict: { "circuit identification": [lines...], ... }
-    """
-    lines = md.splitlines()
-    sections: Dict[str, List[str]] = {}
-    current_key = "_preamble"
-    sections[current_key] = []
-    for line in lines:
-        m = HEADING_RE.match(line)
-        if m:
-            heading_text = m.group(2).strip().lower()
-            current_key = heading_text
-            sections.setdefault(current_key, [])
-        sections[current_key].append(line)
-    return sections
-
-def extract_table_lines(section_lines: List[str]) -> List[str]:
-    """
-    Extract contiguous markdown pipe-table lines from a section.
-    Returns a list of pipe-table lines (including header separator), preserving order.
-    """
-    tables: List[str] = []
-    started = False
-    for line in section_lines:
-        if PIPE_TABLE_LINE_RE.match(line):
-            tables.append(line.rstrip())
-            started = True
-        else:
-            if started:
-                break
-    return tables
-
 def is_separator_row(row: str) -> bool:
     r = row.replace(' ', '')
     # Typical separator like: |-----|:----:|---|
@@ -191,13 +163,10 @@ def derive_pn_rev_from_filename(path: str) -> Tuple[str, str]:
     rev = parts[-1]
     return pn, rev
 
-def find_first_table_under_heading(sections: Dict[str, List[str]], heading_candidates: List[str]) -> List[str]:
-    for h in heading_candidates:
-        if h in sections:
-            t = extract_table_lines(sections[h])
-            if t:
-                return t
-    return []
+def find_first_table_under_heading(doc: MdDoc, heading_candidates: List[str]) -> List[str]:
+    """Raw lines of the first table under the first candidate heading that has one (exact, case-insensitive)."""
+    t = doc.table(*heading_candidates)
+    return list(t.lines) if t else []
 
 def safe_join(lines: List[str]) -> str:
     return "\n".join(lines).rstrip() + ("\n" if lines else "")
@@ -224,6 +193,148 @@ def md_collapsible_verbatim(title: str, body_md: str) -> str:
 </details>
 """
 
+# ---------------- Compaction (adjacency netlists, table dedupe, token budget) ----------------
+
+def table_cells(row: str) -> List[str]:
+    return split_row(row)
+
+def netlist_member(part: str, pad: str, pin: str) -> str:
+    """PART.PAD, with the pin name added only when it says more than the pad number."""
+    name = re.sub(r"\s*\(\s*%s\s*\)$" % re.escape(pad), "", pin) if pad else pin
+    if not pad:
+        return f"{part}.{name}"
+    if not name or name == pad:
+        return f"{part}.{pad}"
+    return f"{part}.{pad}({name})"
+
+def netlist_adjacency(table: MdTable) -> Optional[List[str]]:
+    """
+    Rewrite a 'Net | Part | Pad | Pin | Sheet' table as one line per net:
+        GND: P1.1(GND), C2.2, C4.2
+    Sheet numbers are kept (as @N) only when the netlist spans several sheets.
+    Tables without Net and Part columns give None.
+    """
+    if not table.rows:
+        return None
+    head = [c.lower() for c in table.header]
+    if "net" not in head or "part" not in head:
+        return None
+    col = {name: head.index(name) for name in ("net", "part", "pad", "pin", "sheet") if name in head}
+    rows = table.rows
+    get = lambda r, k: r[col[k]] if k in col and col[k] < len(r) else ""
+    multi_sheet = len({get(r, "sheet") for r in rows}) > 1
+
+    nets: Dict[str, List[str]] = {}
+    for r in rows:
+        net, part = get(r, "net"), get(r, "part")
+        if not net or not part:
+            continue
+        member = netlist_member(part, get(r, "pad"), get(r, "pin"))
+        if multi_sheet and get(r, "sheet"):
+            member += f"@{get(r, 'sheet')}"
+        members = nets.setdefault(net, [])
+        if member not in members:
+            members.append(member)
+    out = ["Netlist adjacency — `NET: PART.PAD(pin name)`, one net per line:", ""]
+    out += [f"- {net}: {', '.join(members)}" for net, members in nets.items()]
+    return out
+
+def squeeze_table(table_lines: List[str]) -> List[str]:
+    """Drop cell padding and duplicate data rows; the table still renders the same."""
+    out = []
+    for row in dedupe_table_lines(table_lines):
+        if is_separator_row(row):
+            out.append("|" + "|".join("-" for _ in table_cells(row)) + "|")
+        else:
+            out.append("|" + "|".join(table_cells(row)) + "|")
+    return out
+
+def split_ordered_sections(doc: MdDoc, prefix: str = "") -> List[Tuple[str, MdSection]]:
+    """Sections in document order (repeated headings kept apart), keyed by lower-cased heading."""
+    return [(prefix + s.key, s) for s in doc.sections if any(l.strip() for l in s.lines)]
+
+def compact_section(section: MdSection, heading: str, seen_tables: Dict[str, str]) -> List[str]:
+    """Compact every pipe table in a section; blank-line runs collapse to one."""
+    out: List[str] = []
+    tables = {t.start - section.start: t for t in section.tables}
+    lines = section.lines
+    i = 0
+    while i < len(lines):
+        t = tables.get(i)
+        if t is None:
+            if lines[i].strip() or (out and out[-1].strip()):
+                out.append(lines[i].rstrip())
+            i += 1
+            continue
+        table = netlist_adjacency(t) or squeeze_table(t.lines)
+        key = "\n".join(table)
+        if key in seen_tables:
+            table = [f"_(Same table as under “{seen_tables[key]}”.)_"]
+        else:
+            seen_tables[key] = heading
+        out.extend(table)
+        i += len(t.lines)
+    return out
+
+def section_rank(key: str, priority: Sequence[str]) -> int:
+    return next((n for n, p in enumerate(priority) if p and p in key), len(priority))
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Keep whole leading lines worth about `tokens` tokens."""
+    kept, size = [], 0
+    lines = text.splitlines()
+    for line in lines:
+        size += len(line) + 1
+        if size // 4 > tokens:
+            break
+        kept.append(line)
+    if len(kept) < len(lines):
+        kept.append(f"_(… {len(lines) - len(kept)} more line(s) omitted to fit the token budget.)_")
+    return "\n".join(kept)
+
+def apply_token_budget(units: List[Tuple[str, str]], budget: int,
+                       priority: Sequence[str]) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Keep sections in priority order while they fit `budget` estimated tokens;
+    the first one that does not fit is truncated, later ones are dropped.
+    Kept sections stay in document order. Returns (kept units, dropped names).
+    """
+    if budget <= 0:
+        return units, []
+    order = sorted(range(len(units)), key=lambda n: (section_rank(units[n][0], priority), n))
+    kept: Dict[int, str] = {}
+    dropped: List[str] = []
+    left = budget
+    for n in order:
+        name, text = units[n]
+        cost = estimate_tokens(text)
+        if cost <= left:
+            kept[n] = text; left -= cost
+        elif left >= 64:    # worth a partial section
+            kept[n] = truncate_to_tokens(text, left); left = 0
+        else:
+            dropped.append(name)
+    return [(units[n][0], kept[n]) for n in sorted(kept)], dropped
+
+def compact_sources(sch_doc: Optional[MdDoc], man_doc: Optional[MdDoc], budget: int,
+                    priority: Sequence[str]) -> Tuple[str, str, List[str]]:
+    """Compacted (schematic, manual) markdown plus the names of sections dropped for the budget."""
+    seen_tables: Dict[str, str] = {}
+    units: List[Tuple[str, str]] = []
+    for doc, prefix in ((sch_doc, ""), (man_doc, MAN_PREFIX)):
+        if doc is None:
+            continue
+        for key, section in split_ordered_sections(doc, prefix):
+            heading = key[len(prefix):] if prefix else key
+            units.append((key, "\n".join(compact_section(section, heading, seen_tables)).strip()))
+    kept, dropped = apply_token_budget(units, budget, priority)
+    sch = "\n\n".join(t for k, t in kept if not k.startswith(MAN_PREFIX))
+    man = "\n\n".join(t for k, t in kept if k.startswith(MAN_PREFIX))
+    return sch, man, [d.replace("_preamble", "preamble") for d in dropped]
+
+def size_report(label: str, text: str) -> str:
+    return f"{label}: {len(text.encode('utf-8')):,} B, ~{estimate_tokens(text):,} tok"
+
 def build_prompt_md(
     pn: str,
     rev: str,
@@ -237,7 +348,9 @@ def build_prompt_md(
     full_sch_md: str,
     full_man_md: str,
     include_full_sch: bool,
-    include_full_man: bool
+    include_full_man: bool,
+    compacted: bool = False,
+    dropped_sections: Sequence[str] = ()
 ) -> str:
     prompt_title = title_override or f"{pn} {rev} — Analysis Plans & Reports Prompt"
 
@@ -263,10 +376,14 @@ def build_prompt_md(
 ```"""
 
     full_blocks = []
+    how = "compacted" if compacted else "verbatim"
     if include_full_sch and full_sch_md.strip():
-        full_blocks.append(md_collapsible_verbatim("Full Schematic Markdown (verbatim)", full_sch_md))
+        full_blocks.append(md_collapsible_verbatim(f"Full Schematic Markdown ({how})", full_sch_md))
     if include_full_man and full_man_md.strip():
-        full_blocks.append(md_collapsible_verbatim("Manual Commentary (verbatim)", full_man_md))
+        full_blocks.append(md_collapsible_verbatim(f"Manual Commentary ({how})", full_man_md))
+    if dropped_sections:
+        full_blocks.append("> NOTE: Omitted to fit the context budget: " + ", ".join(dropped_sections) +
+                           ". Ask for them if a deliverable depends on them.")
     full_sources_md = ("\n\n".join(full_blocks).strip()) if full_blocks else ""
 
     # Assemble document—no duplicated content sections.
@@ -293,7 +410,10 @@ def build_prompt_md(
         parts.append("\n## Inputs & Context (Quick-Scan)\nUse the following as ground truth context. Do not invent part numbers or nets not present unless explicitly stated as an assumption.\n\n")
         parts.append(quick_scan_md + "\n")
 
-    if full_sources_md:
+    if full_sources_md and compacted:
+        parts.append("\n## Full Source Context (Compacted)\nThe following sections carry the schematic export and manual commentary. Netlists are given as adjacency lists (each net with its PART.PAD members); a table repeated elsewhere is shown once and referenced.\n\n")
+        parts.append(full_sources_md + "\n")
+    elif full_sources_md:
         parts.append("\n## Full Source Context (Verbatim)\nThe following sections include the **complete** schematic export and manual commentary to ensure fidelity and traceability.\n\n")
         parts.append(full_sources_md + "\n")
 
@@ -336,6 +456,11 @@ def main():
     ap.add_argument("--no-full-sch", action="store_true", help="Do NOT embed full _sch.md content")
     ap.add_argument("--no-man", action="store_true", help="Do NOT embed _man.md content")
     ap.add_argument("--man", default=None, help="Explicit path to manual commentary markdown (overrides auto-detect)")
+    ap.add_argument("--verbatim", action="store_true", help="Embed sources byte-for-byte (no compaction, no budget)")
+    ap.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET,
+                    help="Max estimated tokens for the embedded sources (0 = unlimited)")
+    ap.add_argument("--priority", default=",".join(DEFAULT_PRIORITY),
+                    help="Comma-separated heading substrings, most important first, kept under --token-budget")
     args = ap.parse_args()
 
     # If user requested no-clobber, turn off force
@@ -369,18 +494,18 @@ def main():
     out_path = os.path.join(outdir, out_base)
 
     # Read and parse the schematic markdown
-    full_sch_md = read_text(in_path)
-    sections = split_sections(full_sch_md)
+    sch_doc = load_md(Path(in_path))
+    full_sch_md = sch_doc.text
 
     # Extract tables for optional Quick-Scan
     circuit_id = find_first_table_under_heading(
-        sections, ["circuit identification", "core identification", "identification"]
+        sch_doc, ["circuit identification", "core identification", "identification"]
     )
 
     netlist = []
     if args.max_netlist != 0:
         netlist_raw = find_first_table_under_heading(
-            sections, ["netlist (schematic)", "netlist", "schematic netlist"]
+            sch_doc, ["netlist (schematic)", "netlist", "schematic netlist"]
         )
         netlist = netlist_raw
         if args.dedupe_tables:
@@ -390,7 +515,7 @@ def main():
     partlist = []
     if args.max_partlist != 0:
         partlist_raw = find_first_table_under_heading(
-            sections, ["partlist", "bom", "bill of materials"]
+            sch_doc, ["partlist", "bom", "bill of materials"]
         )
         partlist = partlist_raw
         if args.dedupe_tables:
@@ -400,13 +525,14 @@ def main():
     pinout = []
     if not args.no_pinout:
         pinout = find_first_table_under_heading(
-            sections, ["pinout", "pinout for p1", "pin labels", "connector pinout"]
+            sch_doc, ["pinout", "pinout for p1", "pin labels", "connector pinout"]
         )
         if args.dedupe_tables:
             pinout = dedupe_table_lines(pinout)
 
     # Manual commentary path / content
     full_man_md = ""
+    man_doc: Optional[MdDoc] = None
     include_full_man = not args.no_man
     if include_full_man:
         man_path = args.man
@@ -416,10 +542,26 @@ def main():
             if os.path.isfile(guess):
                 man_path = guess
         if man_path:
-            full_man_md = try_read_text(man_path)
+            man_doc = try_load_md(Path(man_path))
+            full_man_md = man_doc.text if man_doc else ""
             if args.man is not None and not full_man_md.strip():
                 print(f"WARNING: Could not read manual commentary file: {man_path}", file=sys.stderr)
 
+    # Compaction stage: adjacency netlists, squeezed/deduplicated tables, then the token budget
+    embed_sch = full_sch_md if not args.no_full_sch else ""
+    embed_man = full_man_md if include_full_man else ""
+    before = embed_sch + embed_man
+    dropped: List[str] = []
+    if not args.verbatim and before.strip():
+        priority = [p.strip().lower() for p in args.priority.split(",")]
+        embed_sch, embed_man, dropped = compact_sources(sch_doc if embed_sch else None, man_doc if embed_man else None,
+                                                        args.token_budget, priority)
+        print(size_report("Sources before", before), file=sys.stderr)
+        print(size_report("Sources after ", embed_sch + embed_man) +
+              (f" (budget {args.token_budget:,} tok)" if args.token_budget > 0 else ""), file=sys.stderr)
+        if dropped:
+            print(f"Dropped for budget: {', '.join(dropped)}", file=sys.stderr)
+
     prompt_md = build_prompt_md(
         pn=pn,
         rev=rev,
@@ -430,15 +572,18 @@ def main():
         partlist_table=partlist,
         pinout_table=pinout,
         extra_notes=args.add_note,
-        full_sch_md=full_sch_md,
-        full_man_md=full_man_md,
+        full_sch_md=embed_sch,
+        full_man_md=embed_man,
         include_full_sch=(not args.no_full_sch),
-        include_full_man=include_full_man
+        include_full_man=include_full_man,
+        compacted=not args.verbatim,
+        dropped_sections=dropped
     )
 
     os.makedirs(outdir, exist_ok=True)
     write_text(out_path, prompt_md, force=args.force)
     print(f"Wrote: {out_path}")
+    print(size_report("Prompt", prompt_md), file=sys.stderr)
 
 if __name__ == "__main__":
     main()
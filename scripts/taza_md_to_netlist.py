@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Convert schematic exports (md/*_sch.md) to netlist JSON (json/*_sch.json, schema v1.1)
+
+taza_md_to_netlist.py
+
+Reads the Circuit Identification, Netlist and Partlist tables through the
+shared markdown parse (minipcb_md) and writes identity / metadata / components /
+nets in the json/ layout. Footprints and other fields the markdown does not
+carry are kept from the existing JSON. Each output records the sha256 of its
+source, so unchanged boards are skipped; the rest are converted in parallel.
+A JSON with no recorded source hash is hand-maintained: it is only replaced
+when the conversion matches it (netlist_drift is empty); otherwise the drift
+is reported and the file kept unless --force is given.
+Outputs are checked against json/schema/netlist.schema.json (reported as
+warnings; the file is still written).
+
+Examples
+--------
+# Convert every export under md/ into json/ (only what changed)
+python taza_md_to_netlist.py
+
+# One board, rebuilt even if up to date
+python taza_md_to_netlist.py md/04A-005_A1-01_sch.md --force
+
+# Report drift between json/ and md/ without writing anything (exit 1 on drift)
+python taza_md_to_netlist.py --check
+python taza_md_to_netlist.py --check --json drift.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from minipcb_md import load_md
+from minipcb_netlist import (SCH_MD_RE, dump_netlist, is_current, load_netlist,
+                             netlist_drift, netlist_from_md, source_sha256, validate_netlist)
+
+Job = Tuple[Path, Path, str, str]          # (sch.md, out .json, pn, rev)
+
+
+def discover(paths: List[Path], out_dir: Path) -> List[Job]:
+    """Schematic exports named by `paths` (files or folders, searched recursively), in path order."""
+    files: List[Path] = []
+    for p in paths:
+        files.extend(sorted(p.rglob("*.md")) if p.is_dir() else [p])
+    jobs: List[Job] = []
+    for f in files:
+        m = SCH_MD_RE.match(f.name)
+        if m and ".minipcb_cache" not in f.parts:
+            pn, rev = m.group("pn"), m.group("rev")
+            jobs.append((f, out_dir / f"{pn}_{rev}_sch.json", pn, rev))
+    return jobs
+
+
+def convert_one(job: Job, validate: bool, force: bool) -> Dict[str, Any]:
+    """Worker: convert and write one board (a drifted hand-maintained JSON is left alone unless `force`)."""
+    md_path, out_path, pn, rev = job
+    t0 = time.perf_counter()
+    sha = source_sha256(md_path.read_bytes())
+    previous = load_netlist(out_path)
+    nl = netlist_from_md(load_md(md_path), pn, rev, previous, source_name=md_path.name, sha=sha)
+    if previous is not None and not force and not (previous.get("metadata") or {}).get("source_sha256"):
+        drift = netlist_drift(previous, nl)
+        if drift:
+            return {"created": False, "kept": drift, "schema_errors": [], "seconds": time.perf_counter() - t0}
+    errors = validate_netlist(nl) if validate else []
+    text = dump_netlist(nl)
+    if not out_path.exists() or out_path.read_text(encoding="utf-8") != text:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(text, encoding="utf-8")
+    return {"created": previous is None, "kept": [], "schema_errors": errors, "seconds": time.perf_counter() - t0}
+
+
+def check_one(job: Job) -> Dict[str, Any]:
+    """Worker: drift between the JSON on disk and a fresh conversion."""
+    md_path, out_path, pn, rev = job
+    existing = load_netlist(out_path)
+    if existing is None:
+        return {"missing": True, "drift": []}
+    fresh = netlist_from_md(load_md(md_path), pn, rev, existing)
+    return {"missing": False, "drift": netlist_drift(existing, fresh)}
+
+
+def run_pool(fn, jobs: List[Job], workers: int, *extra) -> List[Tuple[Job, Optional[Dict[str, Any]], Optional[str]]]:
+    """(job, result, error) for every job, serially or across a process pool."""
+    results = []
+    if workers <= 1:
+        for job in jobs:
+            try:
+                results.append((job, fn(job, *extra), None))
+            except Exception as e:
+                results.append((job, None, f"{type(e).__name__}: {e}"))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futs = {pool.submit(fn, job, *extra): job for job in jobs}
+            for fut in as_completed(futs):
+                try:
+                    results.append((futs[fut], fut.result(), None))
+                except Exception as e:
+                    results.append((futs[fut], None, f"{type(e).__name__}: {e}"))
+    return sorted(results, key=lambda r: str(r[0][0]))
+
+
+def convert_all(jobs: List[Job], force: bool, validate: bool, workers: int) -> int:
+    t0 = time.perf_counter()
+    stale: List[Job] = []
+    for job in jobs:
+        if force or not is_current(load_netlist(job[1]), source_sha256(job[0].read_bytes())):
+            stale.append(job)
+    results = run_pool(convert_one, stale, max(1, min(workers, len(stale))), validate, force)
+
+    written = failed = warned = kept = 0
+    for (md_path, out_path, _, _), res, err in results:
+        if err:
+            failed += 1
+            print(f"❌ {md_path.name}: {err}", file=sys.stderr)
+            continue
+        if res["kept"]:
+            kept += 1
+            drift = res["kept"]
+            print(f"⚠️  {out_path}: hand-maintained, differs from {md_path.name} in {len(drift)} place(s); "
+                  f"not overwritten (--force to replace)")
+            for line in drift[:5]:
+                print(f"    {line}")
+            if len(drift) > 5:
+                print("    … (--check lists all)")
+            continue
+        written += 1
+        print(f"✅ {out_path}{' (new)' if res['created'] else ''}  ({res['seconds']*1000:.0f} ms)")
+        if res["schema_errors"]:
+            warned += 1
+            errs = res["schema_errors"]
+            print(f"   ⚠️  {len(errs)} schema error(s): " + "; ".join(errs[:3]) + (" …" if len(errs) > 3 else ""))
+    print(f"Netlist summary: {written} written, {len(jobs) - len(stale)} unchanged, {kept} kept (drift), "
+          f"{failed} failed, {warned} with schema errors ({len(jobs)} export(s)) in {time.perf_counter() - t0:.2f}s")
+    return 1 if failed else 0
+
+
+def check_all(jobs: List[Job], out_dir: Path, workers: int, report: Optional[Path]) -> int:
+    results = run_pool(check_one, jobs, max(1, min(workers, len(jobs))))
+    boards: Dict[str, Any] = {}
+    for (md_path, out_path, _, _), res, err in results:
+        if err:
+            boards[out_path.name] = {"source": md_path.name, "status": "error", "error": err}
+        elif res["missing"]:
+            boards[out_path.name] = {"source": md_path.name, "status": "missing"}
+        elif res["drift"]:
+            boards[out_path.name] = {"source": md_path.name, "status": "drift", "drift": res["drift"]}
+    sources = {out_path.name for _, out_path, _, _ in jobs}
+    for p in sorted(out_dir.glob("*_sch.json")):
+        if p.name not in sources:
+            boards[p.name] = {"source": None, "status": "no_source"}
+
+    for name, b in boards.items():
+        if b["status"] == "drift":
+            print(f"≠ {name} ({len(b['drift'])} difference(s))")
+            for line in b["drift"]:
+                print(f"    {line}")
+        elif b["status"] == "missing":
+            print(f"+ {name}: not generated yet (from {b['source']})")
+        elif b["status"] == "no_source":
+            print(f"? {name}: no matching markdown export")
+        else:
+            print(f"❌ {name}: {b['error']}")
+    counts = {s: sum(1 for b in boards.values() if b["status"] == s) for s in ("drift", "missing", "no_source", "error")}
+    in_sync = len(jobs) - counts["drift"] - counts["missing"] - counts["error"]
+    print(f"Check summary: {in_sync} in sync, {counts['drift']} drifted, {counts['missing']} missing JSON, "
+          f"{counts['no_source']} JSON without markdown, {counts['error']} failed")
+    if report:
+        report.write_text(json.dumps({"summary": {"in_sync": in_sync, **counts}, "boards": boards},
+                                     indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Report: {report}")
+    return 1 if counts["drift"] or counts["missing"] or counts["error"] else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert md/*_sch.md schematic exports to schema v1.1 netlist JSON. No AI calls.")
+    ap.add_argument("paths", type=Path, nargs="*", help="Exports or folders to convert (default: md/)")
+    ap.add_argument("--out-dir", type=Path, default=Path("json"), help="Where the *_sch.json files live (default: json/)")
+    ap.add_argument("--check", action="store_true", help="Report drift between existing JSON and the markdown; write nothing")
+    ap.add_argument("--json", type=Path, default=None, help="With --check: also write the drift report as JSON")
+    ap.add_argument("--force", action="store_true",
+                    help="Convert even when the source hash is unchanged, and replace hand-maintained JSON that drifted")
+    ap.add_argument("--no-validate", action="store_true", help="Skip the JSON Schema check")
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="Parallel workers (default: CPU count)")
+    args = ap.parse_args()
+
+    paths = args.paths or [Path("md")]
+    for p in paths:
+        if not p.exists():
+            ap.error(f"not found: {p}")
+    jobs = discover(paths, args.out_dir)
+    if not jobs:
+        print("No *_sch.md exports found.")
+        return
+    workers = args.jobs or os.cpu_count() or 1
+    if args.check:
+        sys.exit(check_all(jobs, args.out_dir, workers, args.json))
+    sys.exit(convert_all(jobs, args.force, not args.no_validate, workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Query the corpus-wide netlist connectivity index
+
+taza_netgraph.py
+
+Builds (or refreshes) json/.minipcb_cache/netgraph.npz from json/*_sch.json
+through minipcb_netgraph — only boards whose JSON changed are re-read — and
+answers connectivity questions with array lookups over every board at once.
+
+Examples
+--------
+python taza_netgraph.py build                        # refresh the index, print its size
+python taza_netgraph.py nets Q1                      # nets touching Q1 on every board
+python taza_netgraph.py nets Q1 --board 04B-005_A1-04
+python taza_netgraph.py reach OUTPUT --kind C --value 100n            # caps on OUTPUT
+python taza_netgraph.py reach OUTPUT --kind C --value 100n --hops 1   # ... or one part away
+python taza_netgraph.py fanout --top 15
+python taza_netgraph.py fanout --board 04A-005_A1-01 --json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from minipcb_netgraph import DEFAULT_INDEX, load_or_build
+
+
+def cmd_build(g, args) -> int:
+    kinds = np.bincount(g.comp_kind, minlength=len(g.tables["kind"].strings))
+    top = ", ".join(f"{g.tables['kind'].strings[k]}:{kinds[k]}" for k in np.argsort(-kinds)[:8] if kinds[k])
+    print(f"{g.n_boards} boards · {len(g.comp_refdes)} components · {len(g.net_name)} nets · {len(g.pin_comp)} pins")
+    print(f"Strings: {len(g.tables['net'].strings)} net names, {len(g.tables['refdes'].strings)} refdes, "
+          f"{len(g.tables['value'].strings)} values, {len(g.tables['footprint'].strings)} footprints")
+    print(f"Kinds: {top}")
+    return 0
+
+
+def cmd_nets(g, args) -> int:
+    comps = g.components(args.refdes, args.board)
+    if not len(comps):
+        print(f"❌ {args.refdes} not found" + (f" on {args.board}" if args.board else ""))
+        return 1
+    out = {}
+    for c in comps.tolist():
+        nets = g.nets_of_components(np.array([c]))
+        out[g.board_keys[g.comp_board[c]]] = g.strings("net", g.net_name[nets])
+    if args.json:
+        print(json.dumps(out, indent=2, ensure_ascii=False))
+    else:
+        for board, nets in out.items():
+            print(f"{board}: {', '.join(nets)}")
+        print(f"{args.refdes} on {len(out)} board(s)")
+    return 0
+
+
+def cmd_reach(g, args) -> int:
+    hits = g.boards_where(args.net, args.kind, args.value, args.hops)
+    if args.json:
+        print(json.dumps(hits, indent=2, ensure_ascii=False))
+    else:
+        for board, refs in hits.items():
+            print(f"{board}: {', '.join(refs)}")
+        what = " ".join(x for x in (args.value, args.kind) if x) or "any part"
+        print(f"{len(hits)} board(s) where {args.net} reaches {what} within {args.hops} hop(s)")
+    return 0
+
+
+def cmd_fanout(g, args) -> int:
+    pins, comps = g.fanout()
+    rows = np.arange(len(g.net_name))
+    if args.board:
+        b = g.board(args.board)
+        rows = rows[g.board_net_ptr[b]:g.board_net_ptr[b + 1]]
+    rows = rows[np.lexsort((rows, -pins[rows]))][:args.top or None]
+    table = [{"board": g.board_keys[g.net_board[r]], "net": g.tables["net"].strings[g.net_name[r]],
+              "pins": int(pins[r]), "components": int(comps[r])} for r in rows.tolist()]
+    if args.json:
+        print(json.dumps(table, indent=2, ensure_ascii=False))
+    else:
+        for t in table:
+            print(f"{t['pins']:5d} pins {t['components']:5d} parts  {t['net']}  ({t['board']})")
+    return 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Connectivity queries over every json/*_sch.json netlist (array index).")
+    ap.add_argument("--json-dir", type=Path, default=Path("json"), help="Folder with the *_sch.json files")
+    ap.add_argument("--index", type=Path, default=None, help=f"Index file (default: <json-dir>/{DEFAULT_INDEX})")
+    ap.add_argument("--force", action="store_true", help="Rebuild the index from scratch")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build", help="Refresh the index and print its size")
+    p = sub.add_parser("nets", help="Nets touching a part")
+    p.add_argument("refdes")
+    p.add_argument("--board", default=None, help="Only this board (PN_REV)")
+    p.add_argument("--json", action="store_true", help="JSON output")
+    p = sub.add_parser("reach", help="Boards where a net reaches a kind/value of part")
+    p.add_argument("net")
+    p.add_argument("--kind", default=None, help="Refdes prefix, e.g. C, R, Q")
+    p.add_argument("--value", default=None, help="Part value, e.g. 100n (compared numerically when it parses)")
+    p.add_argument("--hops", type=int, default=0, help="Parts that may sit in between (rails are never crossed)")
+    p.add_argument("--json", action="store_true", help="JSON output")
+    p = sub.add_parser("fanout", help="Pins and parts per net, largest first")
+    p.add_argument("--board", default=None, help="Only this board (PN_REV)")
+    p.add_argument("--top", type=int, default=20, help="Rows to show (0 = all)")
+    p.add_argument("--json", action="store_true", help="JSON output")
+    args = ap.parse_args()
+
+    if not args.json_dir.is_dir():
+        ap.error(f"not a folder: {args.json_dir}")
+    t0 = time.perf_counter()
+    g, parsed = load_or_build(args.json_dir, args.index, args.force)
+    if args.cmd == "build":
+        print(f"✅ index ready: {parsed} board(s) re-read, {g.n_boards - parsed} reused in {time.perf_counter() - t0:.3f}s")
+    try:
+        rc = {"build": cmd_build, "nets": cmd_nets, "reach": cmd_reach, "fanout": cmd_fanout}[args.cmd](g, args)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}", file=sys.stderr)
+        rc = 1
+    sys.exit(rc)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Structural diff between netlist revisions, and draft ECL entries
+
+taza_netlist_diff.py
+
+Compares two revisions of a board (json/*_sch.json or md/*_sch.md) with
+minipcb_netdiff: added / removed parts, value and footprint changes, renamed
+nets (matched by membership), nets gained or lost and pins moved between nets.
+With --all, every consecutive revision pair found in json/ and md/ is diffed
+(both sides read from the same format) and an ECL.json-shaped draft is
+produced for each pair the ECL does not record yet.
+
+Examples
+--------
+# Two files; markdown report on stdout
+python taza_netlist_diff.py md/04B-360_A1-02_sch.md md/04B-360_A1-03_sch.md
+
+# Same, saved as JSON and markdown
+python taza_netlist_diff.py json/06B-03_A1-01_sch.json json/06B-03_A1-02_sch.json --json d.json --md d.md
+
+# Every revision pair in the corpus, reports under diffs/, drafts for ECL.json
+python taza_netlist_diff.py --all --out-dir diffs --ecl-draft ecl_draft.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from minipcb_netdiff import diff_markdown, ecl_change, load_revision, netlist_diff, parse_source_name, rev_key
+
+Sources = Dict[str, Dict[str, Dict[str, Path]]]          # pn -> rev -> {"json"|"md": path}
+
+
+def discover(json_dir: Path, md_dir: Path) -> Sources:
+    found: Sources = {}
+    for kind, folder, pattern in (("json", json_dir, "*_sch.json"), ("md", md_dir, "*_sch.md")):
+        if not folder.is_dir():
+            continue
+        for p in sorted(folder.glob(pattern)):
+            ident = parse_source_name(p)
+            if ident:
+                found.setdefault(ident[0], {}).setdefault(ident[1], {})[kind] = p
+    return found
+
+
+def pick_pair(a: Dict[str, Path], b: Dict[str, Path]) -> Tuple[Path, Path]:
+    """Both sides from the same format when possible (JSON first), so format differences are not diffs."""
+    for kind in ("json", "md"):
+        if kind in a and kind in b:
+            return a[kind], b[kind]
+    return a.get("json") or a["md"], b.get("json") or b["md"]
+
+
+def board_link(root: Path, pn: str) -> str:
+    """./<folder>/<PN>.html as used by ECL.json (the page's folder when it exists)."""
+    for page in sorted(root.glob(f"*/{pn}.html")):
+        return f"./{page.parent.name}/{page.name}"
+    return f"./{pn[:3]}/{pn}.html"
+
+
+def write_reports(diff: Dict, out_dir: Path) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = out_dir / f"{diff['board']}_{diff['from_rev']}_to_{diff['to_rev']}_diff"
+    stem.with_suffix(".json").write_text(json.dumps(diff, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    stem.with_suffix(".md").write_text(diff_markdown(diff), encoding="utf-8")
+    return stem
+
+
+def run_all(args) -> int:
+    t0 = time.perf_counter()
+    sources = discover(args.json_dir, args.md_dir)
+    try:
+        ecl = json.loads(args.ecl.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        ecl = []
+    logged = {(e.get("board"), e.get("rev")) for e in ecl if isinstance(e, dict)}
+    root = args.ecl.resolve().parent
+    drafts: List[Dict[str, str]] = []
+    pairs = failed = 0
+    for pn in sorted(sources):
+        revs = sorted(sources[pn], key=rev_key)
+        for old_rev, new_rev in zip(revs, revs[1:]):
+            pairs += 1
+            old_p, new_p = pick_pair(sources[pn][old_rev], sources[pn][new_rev])
+            try:
+                diff = netlist_diff(load_revision(old_p), load_revision(new_p), args.rename_min)
+            except Exception as e:
+                failed += 1
+                print(f"❌ {pn} {old_rev} -> {new_rev}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            diff.update(board=pn, from_rev=old_rev, to_rev=new_rev, from_file=str(old_p), to_file=str(new_p))
+            change = ecl_change(diff)
+            is_logged = (pn, new_rev) in logged
+            print(f"{'=' if diff['identical'] else '≠'} {pn} {change}{'  (in ECL)' if is_logged else ''}")
+            if args.out_dir:
+                write_reports(diff, args.out_dir)
+            if not is_logged or args.include_logged:
+                drafts.append({"date": date.today().isoformat(), "board": pn, "rev": new_rev,
+                               "change": change, "link": board_link(root, pn)})
+    if args.ecl_draft:
+        args.ecl_draft.write_text(json.dumps(drafts, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"ECL draft: {args.ecl_draft} ({len(drafts)} entr{'y' if len(drafts) == 1 else 'ies'})")
+    boards = sum(1 for pn in sources if len(sources[pn]) > 1)
+    print(f"Diff summary: {pairs} revision pair(s) on {boards} board(s), {len(drafts)} ECL draft(s), "
+          f"{failed} failed in {time.perf_counter() - t0:.2f}s")
+    return 1 if failed else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Diff two netlist revisions, or every consecutive revision pair (--all).")
+    ap.add_argument("old", type=Path, nargs="?", help="Older revision (*_sch.json or *_sch.md)")
+    ap.add_argument("new", type=Path, nargs="?", help="Newer revision")
+    ap.add_argument("--json", type=Path, default=None, help="Write the diff as JSON")
+    ap.add_argument("--md", type=Path, default=None, help="Write the markdown report")
+    ap.add_argument("--all", action="store_true", help="Diff every consecutive revision pair in --json-dir and --md-dir")
+    ap.add_argument("--json-dir", type=Path, default=Path("json"), help="Netlist JSON folder (with --all)")
+    ap.add_argument("--md-dir", type=Path, default=Path("md"), help="Schematic export folder (with --all)")
+    ap.add_argument("--out-dir", type=Path, default=None, help="With --all: write <PN>_<A>_to_<B>_diff.json/.md here")
+    ap.add_argument("--ecl", type=Path, default=Path("ECL.json"), help="ECL.json, to skip pairs already logged")
+    ap.add_argument("--ecl-draft", type=Path, default=None, help="With --all: write draft ECL entries (JSON list)")
+    ap.add_argument("--include-logged", action="store_true", help="Draft entries even for revisions already in the ECL")
+    ap.add_argument("--rename-min", type=float, default=0.5, help="Membership similarity for a net rename (0-1)")
+    args = ap.parse_args()
+
+    if args.all:
+        if args.old or args.new:
+            ap.error("--all takes no file arguments")
+        sys.exit(run_all(args))
+    if not (args.old and args.new):
+        ap.error("give OLD and NEW, or --all")
+    for p in (args.old, args.new):
+        if not p.exists():
+            ap.error(f"not found: {p}")
+    try:
+        diff = netlist_diff(load_revision(args.old), load_revision(args.new), args.rename_min)
+    except Exception as e:
+        sys.exit(f"❌ {type(e).__name__}: {e}")
+    diff.update(from_file=str(args.old), to_file=str(args.new))
+    if args.json:
+        args.json.write_text(json.dumps(diff, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    if args.md:
+        args.md.write_text(diff_markdown(diff), encoding="utf-8")
+    if not (args.json or args.md):
+        print(diff_markdown(diff))
+    print(("✅ identical" if diff["identical"] else "≠ ") + ("" if diff["identical"] else ecl_change(diff)))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validate the json/ corpus against the schemas in json/schema/
+
+taza_validate_json.py
+
+Each schema is compiled once per worker process (minipcb_jsonschema) and the
+files are validated in chunks across a process pool. Files are routed to a
+schema by name (default: *_sch.json -> netlist.schema.json, add more with
+--route); every other .json file is still parsed, so syntax errors are caught
+everywhere. Results are remembered per file by (mtime, size) together with a
+hash of the schemas and routes in json/.minipcb_cache/validate_cache.json,
+so a pre-commit run only re-checks what changed and still reports old errors.
+
+Errors carry RFC 6901 JSON pointers into the file and into the schema.
+Exit status is 1 when any file is invalid.
+
+Examples
+--------
+python taza_validate_json.py                         # everything under json/
+python taza_validate_json.py json/04A-005_A1-01_sch.json --no-cache
+python taza_validate_json.py --format json --report validation.json
+python taza_validate_json.py --format jsonl | jq .   # one error per line
+python taza_validate_json.py --route "*_pcb.json=netlist.schema.json"
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from minipcb_jsonschema import DEFAULT_ROUTES, SchemaSet, instance_errors
+
+CACHE_DIR = ".minipcb_cache"
+CACHE_NAME = "validate_cache.json"
+CACHE_FORMAT = 1
+PARALLEL_MIN = 200           # below this many files the pool start-up costs more than it saves
+
+_schemas: Optional[SchemaSet] = None
+_max_errors = 0
+
+
+def _init_worker(schema_dir: str, routes: List[Tuple[str, str]], max_errors: int) -> None:
+    """Pool initializer: compile the schemas once for the life of the worker."""
+    global _schemas, _max_errors
+    _schemas = SchemaSet(Path(schema_dir), routes)
+    _schemas.compile_all()
+    _max_errors = max_errors
+
+
+def validate_file(path: str) -> Dict[str, Any]:
+    res: Dict[str, Any] = {"file": path, "schema": _schemas.schema_for(Path(path)), "errors": []}
+    try:
+        instance = json.loads(Path(path).read_bytes())
+    except (OSError, ValueError) as e:
+        res["errors"] = [{"pointer": "", "schema_pointer": "", "keyword": "parse", "message": str(e)}]
+        return res
+    if res["schema"]:
+        res["errors"] = instance_errors(_schemas.validator(res["schema"]), instance, _max_errors)
+    return res
+
+
+def validate_chunk(paths: List[str]) -> List[Dict[str, Any]]:
+    return [validate_file(p) for p in paths]
+
+
+def collect(paths: List[Path]) -> List[Path]:
+    files: List[Path] = []
+    for p in paths:
+        if p.is_dir():
+            files.extend(f for f in sorted(p.rglob("*.json")) if CACHE_DIR not in f.parts)
+        else:
+            files.append(p)
+    return files
+
+
+class ValidationCache:
+    """{resolved path: [mtime_ns, size, result]} under one schema digest."""
+
+    def __init__(self, path: Path, digest: str):
+        self.path, self.digest = path, digest
+        self.files: Dict[str, list] = {}
+        try:
+            blob = json.loads(path.read_text(encoding="utf-8"))
+            if blob.get("format") == CACHE_FORMAT and blob.get("schemas") == digest:
+                self.files = blob.get("files", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    @staticmethod
+    def stamp(p: Path) -> List[int]:
+        st = p.stat()
+        return [st.st_mtime_ns, st.st_size]
+
+    def get(self, p: Path) -> Optional[Dict[str, Any]]:
+        """Cached result for `p` (reported under the path given now), or None when stale."""
+        ent = self.files.get(str(p.resolve()))
+        if not ent or ent[:2] != self.stamp(p):
+            return None
+        return {**ent[2], "file": str(p)}
+
+    def put(self, p: Path, result: Dict[str, Any]) -> None:
+        self.files[str(p.resolve())] = self.stamp(p) + [result]
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"format": CACHE_FORMAT, "schemas": self.digest, "files": self.files},
+                                      ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+def run(files: List[Path], schema_dir: Path, routes: List[Tuple[str, str]], workers: int,
+        max_errors: int) -> List[Dict[str, Any]]:
+    names = [str(f) for f in files]
+    if workers <= 1 or len(names) < PARALLEL_MIN:
+        _init_worker(str(schema_dir), routes, max_errors)
+        return validate_chunk(names)
+    size = max(16, len(names) // (workers * 4))
+    chunks = [names[i:i + size] for i in range(0, len(names), size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(schema_dir), routes, max_errors)) as pool:
+        return [r for chunk in pool.map(validate_chunk, chunks) for r in chunk]
+
+
+def parse_route(text: str) -> Tuple[str, str]:
+    glob, sep, schema = text.partition("=")
+    if not sep or not glob.strip() or not schema.strip():
+        raise argparse.ArgumentTypeError(f"expected GLOB=SCHEMA, got {text!r}")
+    return glob.strip(), schema.strip()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Validate json/ files against the JSON Schemas in json/schema/.")
+    ap.add_argument("paths", type=Path, nargs="*", help="Files or folders (default: json/)")
+    ap.add_argument("--schema-dir", type=Path, default=Path("json") / "schema", help="Folder holding the schemas")
+    ap.add_argument("--route", type=parse_route, action="append", default=[],
+                    help="GLOB=SCHEMA file routing, tried before the defaults (repeatable)")
+    ap.add_argument("--format", choices=("text", "json", "jsonl"), default="text", help="Report format on stdout")
+    ap.add_argument("--report", type=Path, default=None, help="Also write the full JSON report here")
+    ap.add_argument("--max-errors", type=int, default=50, help="Errors kept per file (0 = all)")
+    ap.add_argument("--no-cache", action="store_true", help="Re-validate every file, ignoring cached results")
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="Worker processes (default: CPU count)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    routes = args.route + DEFAULT_ROUTES
+    try:
+        schemas = SchemaSet(args.schema_dir, routes)
+        schemas.compile_all()       # fail fast on a broken schema, before any worker starts
+    except Exception as e:
+        sys.exit(f"Schema error: {type(e).__name__}: {e}")
+
+    files = collect(args.paths or [Path("json")])
+    cache = ValidationCache(args.schema_dir.parent / CACHE_DIR / CACHE_NAME, f"{schemas.digest}:{args.max_errors}")
+    results: List[Dict[str, Any]] = []
+    todo: List[Path] = []
+    for f in files:
+        hit = None if args.no_cache else cache.get(f)
+        if hit is None:
+            todo.append(f)
+        else:
+            results.append(hit)
+    cached = len(results)
+    workers = args.jobs or os.cpu_count() or 1
+    for r in run(todo, args.schema_dir, routes, workers, args.max_errors):
+        cache.put(Path(r["file"]), {k: v for k, v in r.items() if k != "file"})
+        results.append(r)
+    cache.save()
+    results.sort(key=lambda r: r["file"])
+
+    invalid = [r for r in results if r["errors"]]
+    unmatched = sum(1 for r in results if not r["schema"] and not r["errors"])
+    summary = {"files": len(files), "checked": len(todo), "cached": cached,
+               "valid": len(results) - len(invalid) - unmatched, "invalid": len(invalid), "no_schema": unmatched,
+               "errors": sum(len(r["errors"]) for r in invalid), "seconds": round(time.perf_counter() - t0, 3)}
+    report = {"schemas": {name: str(p) for name, p in schemas.paths.items()}, "routes": routes,
+              "summary": summary, "invalid": invalid}
+
+    if args.format == "json":
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    elif args.format == "jsonl":
+        for r in invalid:
+            for e in r["errors"]:
+                print(json.dumps({"file": r["file"], "schema": r["schema"], **e}, ensure_ascii=False))
+    else:
+        for r in invalid:
+            for e in r["errors"]:
+                where = f" at {e['schema_pointer']}" if e["schema_pointer"] else ""
+                print(f"{r['file']}:{e['pointer'] or '/'}: {e['message']} [{e['keyword']}{where}]")
+        print(f"Validation summary: {summary['valid']} valid, {summary['invalid']} invalid "
+              f"({summary['errors']} error(s)), {summary['no_schema']} without a schema, "
+              f"{summary['checked']} checked, {summary['cached']} from cache · {summary['seconds']:.2f}s")
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    sys.exit(1 if invalid else 0)
+
+
+if __name__ == "__main__":
+    main()
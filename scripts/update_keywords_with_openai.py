@@ -1,14 +1,26 @@
+import argparse
 import os
 from bs4 import BeautifulSoup
-import openai
+
+from minipcb_ai import CACHE_USE, ResponseCache, add_cache_args, cache_mode_from_args, cached_call, client_pool
+from minipcb_ai_batch import BatchJob, BatchRunner, add_batch_args, estimate_tokens
+from minipcb_eta import EtaModel
+from minipcb_usage import USAGE_DB_NAME, USAGE_DIR_NAME
 
 # Load API key from environment variable
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     raise EnvironmentError("OPENAI_API_KEY environment variable not set.")
 
-# New client-based API for openai>=1.0.0
-client = openai.OpenAI(api_key=api_key)
+# Shared keep-alive client (openai>=1.0.0); concurrent batch calls reuse its connections
+client = client_pool().openai(api_key)
+
+# Byte-identical prompts (e.g. re-running after a crash) are served from the shared response cache
+cache = ResponseCache()
+cache_mode = CACHE_USE
+
+MODEL = "gpt-4"  # or "gpt-3.5-turbo"
+MAX_OUTPUT = 200          # expected answer length, in tokens, for rate limiting
 
 def extract_text_for_prompt(soup):
     content = []
@@ -44,28 +56,40 @@ def get_ai_keywords(text):
         f"{text}\n\nKeywords:"
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4",  # or "gpt-3.5-turbo"
-        messages=[
-            {"role": "system", "content": "You are an expert SEO assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7
-    )
+    messages = [
+        {"role": "system", "content": "You are an expert SEO assistant."},
+        {"role": "user", "content": prompt}
+    ]
 
-    return response.choices[0].message.content.strip()
+    def call():
+        response = client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=0.7
+        )
+        return response.choices[0].message.content.strip()
 
-def update_keywords_in_html(filepath):
+    text, _ = cached_call(cache, cache_mode, MODEL, {"api": "chat", "temperature": 0.7}, messages, call)
+    return text
+
+def read_page(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
-        html = f.read()
+        return BeautifulSoup(f.read(), 'html.parser')
 
-    soup = BeautifulSoup(html, 'html.parser')
-    text_for_prompt = extract_text_for_prompt(soup)
+def prepare_job(filepath):
+    """Build a page's batch job (the prompt text only); None if there is nothing to prompt with."""
+    text_for_prompt = extract_text_for_prompt(read_page(filepath))
     if not text_for_prompt.strip():
         print(f"[!] Skipped (no useful content): {filepath}")
-        return
+        return None
+    return BatchJob(key=filepath, payload=text_for_prompt,
+                    est_tokens=estimate_tokens(text_for_prompt, max_output=MAX_OUTPUT))
 
-    keywords = get_ai_keywords(text_for_prompt)
+def write_keywords(job, keywords):
+    """Batch writer: runs one page at a time, in the order answers arrive; the page is parsed again here
+    so a site-wide run does not keep every page's soup in memory."""
+    filepath = job.key
+    soup = read_page(filepath)
 
     meta_tag = soup.find('meta', attrs={'name': 'keywords'})
     if meta_tag:
@@ -85,6 +109,11 @@ def update_keywords_in_html(filepath):
 
     print(f"[✓] AI keywords updated: {filepath}")
 
+def update_keywords_in_html(filepath):
+    job = prepare_job(filepath)
+    if job is not None:
+        write_keywords(job, get_ai_keywords(job.payload))
+
 def find_html_files(root_dir):
     for dirpath, _, filenames in os.walk(root_dir):
         for file in filenames:
@@ -92,6 +121,25 @@ def find_html_files(root_dir):
                 yield os.path.join(dirpath, file)
 
 if __name__ == '__main__':
-    root_directory = '.'  # Change this path if needed
-    for html_file in find_html_files(root_directory):
-        update_keywords_in_html(html_file)
+    ap = argparse.ArgumentParser(description="Refresh <meta name=keywords> on every page using OpenAI.")
+    ap.add_argument("root", nargs="?", default=".", help="Folder to scan (default: current directory)")
+    add_cache_args(ap)
+    add_batch_args(ap, default_checkpoint=".minipcb_ai/keywords_checkpoint.jsonl")
+    args = ap.parse_args()
+    cache_mode = cache_mode_from_args(args)
+
+    # Latency history from miniPCB Studio/Catalog runs here orders the batch shortest-first
+    eta = EtaModel(os.path.join(USAGE_DIR_NAME, USAGE_DB_NAME))
+    runner = BatchRunner(call=lambda job: get_ai_keywords(job.payload), write=write_keywords,
+                         concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm, checkpoint=args.checkpoint,
+                         predict=lambda job: eta.predict(MODEL, estimate_tokens(job.payload)))
+    if args.fresh:
+        runner.checkpoint.reset()
+    done = runner.checkpoint.load_done()
+    # Pages finished by an interrupted run are not even re-parsed
+    jobs = [j for j in (prepare_job(p) for p in find_html_files(args.root) if p not in done) if j is not None]
+    summary = runner.run(jobs)
+    print(f"[i] {summary.done} updated, {summary.failed} failed, {len(done)} already done "
+          f"in {summary.elapsed:.1f}s (concurrency {runner.concurrency})")
+    print(f"[i] Response cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    print(f"[i] HTTP pool: {client_pool().summary()}")